@@ -0,0 +1,586 @@
+#!/usr/bin/env python3
+"""
+Inverted-index BM25 engine for sparse search over the legal corpus.
+
+Replaces rank-bm25's full-corpus scoring (a Python loop over every document's
+term-frequency dict per query token) with CSR-style postings held in NumPy
+arrays, so query cost scales with the postings of the query terms rather
+than with corpus size.
+
+Key features:
+- CSR postings: term -> sorted doc ids + term frequencies
+- Precomputed IDF (ATIRE/BM25Okapi variant with epsilon floor) and length norms
+- Vectorized score accumulation over only the touched postings
+- argpartition top-k selection instead of a full argsort
+- Optional MaxScore pruning using per-term score upper bounds
+- Score parity with rank_bm25.BM25Okapi for existing pickled indexes
+- Versioned, pickle-free on-disk format of flat .npy arrays that is
+  memory-mapped on load, so workers share pages via the OS page cache
+
+Author: RightLine Team
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+# Defaults match scripts/build_bm25_index.py and rank_bm25.BM25Okapi
+DEFAULT_K1 = 1.5
+DEFAULT_B = 0.75
+DEFAULT_EPSILON = 0.25
+
+LEGAL_STOP_WORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for',
+    'from', 'has', 'he', 'in', 'is', 'it', 'its', 'of', 'on',
+    'that', 'the', 'to', 'was', 'will', 'with'
+})
+
+
+def optimize_tokenize_legal_text(text: str) -> List[str]:
+    """
+    Advanced tokenization optimized for legal document analysis.
+
+    Features:
+    - Preserves legal citations and references
+    - Handles section numbers and legal formatting
+    - Optimized for BM25 performance
+
+    Args:
+        text: Raw text to tokenize
+
+    Returns:
+        List of optimized tokens for legal document search
+    """
+    if not text:
+        return []
+
+    # Convert to lowercase for case-insensitive matching
+    text = text.lower()
+
+    # Preserve important legal patterns
+    # Keep section references like "section 5", "s. 12", "sec 15a"
+    text = re.sub(r'\bs\.?\s*(\d+[a-z]?)\b', r'section\1', text)
+    text = re.sub(r'\bsec\.?\s*(\d+[a-z]?)\b', r'section\1', text)
+
+    # Keep chapter references like "[chapter 28:01]"
+    text = re.sub(r'\[chapter\s+([0-9:]+)\]', r'chapter\1', text)
+
+    # Keep court citations and case numbers
+    text = re.sub(r'\[(\d{4})\]\s*([a-z]+)\s*(\d+)', r'\1\2\3', text)
+
+    # Basic tokenization - split on non-alphanumeric, keep numbers and letters
+    tokens = re.findall(r'\b[a-z0-9]+\b', text)
+
+    # Filter out very short tokens and common stop words
+    filtered_tokens = [
+        token for token in tokens
+        if len(token) >= 2 and token not in LEGAL_STOP_WORDS
+    ]
+
+    # Limit token count for performance (BM25 works best with 50-200 tokens per doc)
+    return filtered_tokens[:200]
+
+
+class InvertedBM25Index:
+    """
+    BM25 index stored as CSR postings in flat NumPy arrays.
+
+    Postings for term ``t`` live in ``doc_ids[offsets[t]:offsets[t + 1]]`` (sorted
+    ascending) with matching ``tfs``. ``length_norms`` holds the precomputed
+    ``k1 * (1 - b + b * dl / avgdl)`` per document and ``term_upper_bounds`` the
+    maximum contribution any document can receive from each term (for MaxScore).
+    """
+
+    def __init__(
+        self,
+        vocabulary: Union[Dict[str, int], "SortedVocabulary"],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        tfs: np.ndarray,
+        idf: np.ndarray,
+        length_norms: np.ndarray,
+        term_upper_bounds: np.ndarray,
+        k1: float = DEFAULT_K1,
+        b: float = DEFAULT_B,
+    ):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.idf = idf
+        self.length_norms = length_norms
+        self.term_upper_bounds = term_upper_bounds
+        self.k1 = k1
+        self.b = b
+
+    @property
+    def corpus_size(self) -> int:
+        return int(self.length_norms.shape[0])
+
+    @property
+    def num_postings(self) -> int:
+        return int(self.doc_ids.shape[0])
+
+    @classmethod
+    def build(
+        cls,
+        corpus_tokens: Iterable[List[str]],
+        k1: float = DEFAULT_K1,
+        b: float = DEFAULT_B,
+        epsilon: float = DEFAULT_EPSILON,
+    ) -> "InvertedBM25Index":
+        """Build the index from tokenized documents (one token list per chunk)."""
+        doc_term_counts = [Counter(tokens) for tokens in corpus_tokens]
+        doc_lengths = [sum(counts.values()) for counts in doc_term_counts]
+        return cls._from_term_counts(doc_term_counts, doc_lengths, k1=k1, b=b, epsilon=epsilon)
+
+    @classmethod
+    def from_rank_bm25(cls, bm25: Any) -> "InvertedBM25Index":
+        """Convert a legacy ``rank_bm25.BM25Okapi`` (as found in old pickles)."""
+        return cls._from_term_counts(
+            bm25.doc_freqs,
+            bm25.doc_len,
+            k1=bm25.k1,
+            b=bm25.b,
+            epsilon=getattr(bm25, "epsilon", DEFAULT_EPSILON),
+        )
+
+    @classmethod
+    def _from_term_counts(
+        cls,
+        doc_term_counts: List[Dict[str, int]],
+        doc_lengths: List[int],
+        k1: float,
+        b: float,
+        epsilon: float,
+    ) -> "InvertedBM25Index":
+        corpus_size = len(doc_term_counts)
+        if corpus_size == 0:
+            raise ValueError("Cannot build BM25 index from an empty corpus")
+
+        # Invert doc -> {term: tf} into term -> [(doc, tf)] in doc order
+        vocabulary: Dict[str, int] = {}
+        term_docs: List[List[int]] = []
+        term_tfs: List[List[int]] = []
+        for doc_id, counts in enumerate(doc_term_counts):
+            for term, tf in counts.items():
+                term_id = vocabulary.get(term)
+                if term_id is None:
+                    term_id = len(vocabulary)
+                    vocabulary[term] = term_id
+                    term_docs.append([])
+                    term_tfs.append([])
+                term_docs[term_id].append(doc_id)
+                term_tfs[term_id].append(tf)
+
+        doc_freqs = np.fromiter((len(d) for d in term_docs), dtype=np.int64, count=len(term_docs))
+        offsets = np.zeros(len(term_docs) + 1, dtype=np.int64)
+        np.cumsum(doc_freqs, out=offsets[1:])
+        doc_ids = np.fromiter(
+            (d for docs in term_docs for d in docs), dtype=np.int32, count=int(offsets[-1])
+        )
+        tfs = np.fromiter(
+            (t for counts in term_tfs for t in counts), dtype=np.float32, count=int(offsets[-1])
+        )
+
+        # BM25Okapi IDF with epsilon floor for terms in more than half the corpus
+        idf = np.log(corpus_size - doc_freqs + 0.5) - np.log(doc_freqs + 0.5)
+        average_idf = float(idf.mean()) if idf.size else 0.0
+        idf = np.where(idf < 0, epsilon * average_idf, idf).astype(np.float32)
+
+        lengths = np.asarray(doc_lengths, dtype=np.float64)
+        avgdl = float(lengths.mean()) or 1.0
+        length_norms = (k1 * (1 - b + b * lengths / avgdl)).astype(np.float32)
+
+        index = cls(
+            vocabulary=vocabulary,
+            offsets=offsets,
+            doc_ids=doc_ids,
+            tfs=tfs,
+            idf=idf,
+            length_norms=length_norms,
+            term_upper_bounds=np.zeros(len(vocabulary), dtype=np.float32),
+            k1=k1,
+            b=b,
+        )
+        index.term_upper_bounds = index._compute_term_upper_bounds()
+        return index
+
+    def _compute_term_upper_bounds(self) -> np.ndarray:
+        """Max per-document contribution of each term, used for MaxScore pruning."""
+        contributions = self.tfs * (self.k1 + 1) / (self.tfs + self.length_norms[self.doc_ids])
+        upper = np.zeros(len(self.vocabulary), dtype=np.float32)
+        non_empty = self.offsets[:-1] < self.offsets[1:]
+        if contributions.size:
+            upper[non_empty] = np.maximum.reduceat(contributions, self.offsets[:-1][non_empty])
+        return upper * self.idf
+
+    def _term_contributions(
+        self, term_id: int, weight: float, restrict_to: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Doc ids and weighted BM25 contributions for one term's postings."""
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        ids = self.doc_ids[start:end]
+        tfs = self.tfs[start:end]
+        if restrict_to is not None:
+            # Postings are sorted, so candidate membership is a binary search
+            pos = np.searchsorted(ids, restrict_to)
+            pos = pos[pos < ids.shape[0]]
+            hit = pos[ids[pos] == restrict_to[: pos.shape[0]]] if pos.size else pos
+            ids, tfs = ids[hit], tfs[hit]
+        scores = (weight * self.idf[term_id]) * tfs * (self.k1 + 1) / (tfs + self.length_norms[ids])
+        return ids, scores
+
+    def search(
+        self,
+        query_tokens: List[str],
+        top_k: int = 50,
+        use_maxscore: bool = True,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score the query against the index and return the top-k documents.
+
+        Repeated query tokens are weighted by their count, matching
+        ``BM25Okapi.get_scores``. With ``use_maxscore`` the low-impact terms are
+        only scored for documents that can still reach the top-k.
+
+        Returns:
+            (doc_ids, scores) sorted by descending score; only positive scores
+        """
+        query_terms = []
+        for term, count in Counter(query_tokens).items():
+            term_id = self.vocabulary.get(term)
+            if term_id is not None:
+                query_terms.append((term_id, count))
+        empty = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))
+        if not query_terms or top_k <= 0:
+            return empty
+
+        # Highest-impact terms first so the top-k threshold rises quickly
+        query_terms.sort(key=lambda tc: self.term_upper_bounds[tc[0]] * tc[1], reverse=True)
+        bounds = [float(self.term_upper_bounds[t]) * c for t, c in query_terms]
+        remaining_bound = sum(bounds)
+
+        cand_ids = np.empty(0, dtype=np.int32)
+        cand_scores = np.empty(0, dtype=np.float32)
+        restrict: Optional[np.ndarray] = None
+
+        for (term_id, count), bound in zip(query_terms, bounds):
+            remaining_bound -= bound
+            ids, scores = self._term_contributions(term_id, float(count), restrict)
+            if restrict is None:
+                cand_ids, cand_scores = self._merge(cand_ids, cand_scores, ids, scores)
+            else:
+                # ids is a subset of the (sorted) candidates
+                cand_scores[np.searchsorted(cand_ids, ids)] += scores
+
+            if use_maxscore and restrict is None and cand_ids.shape[0] > top_k:
+                threshold = np.partition(cand_scores, -top_k)[-top_k]
+                if remaining_bound < threshold:
+                    # Unseen documents can no longer enter the top-k; keep only
+                    # candidates that still can and score the rest against them
+                    keep = cand_scores + remaining_bound >= threshold
+                    cand_ids, cand_scores = cand_ids[keep], cand_scores[keep]
+                    restrict = cand_ids
+
+        positive = cand_scores > 0
+        cand_ids, cand_scores = cand_ids[positive], cand_scores[positive]
+        if cand_ids.shape[0] > top_k:
+            top = np.argpartition(cand_scores, -top_k)[-top_k:]
+            cand_ids, cand_scores = cand_ids[top], cand_scores[top]
+        order = np.argsort(-cand_scores, kind="stable")
+        return cand_ids[order], cand_scores[order]
+
+    @staticmethod
+    def _merge(
+        ids_a: np.ndarray, scores_a: np.ndarray, ids_b: np.ndarray, scores_b: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Sum two sparse (sorted id, score) vectors into one sorted vector."""
+        if ids_a.shape[0] == 0:
+            return ids_b, scores_b.astype(np.float32, copy=True)
+        ids = np.concatenate((ids_a, ids_b))
+        unique_ids, inverse = np.unique(ids, return_inverse=True)
+        summed = np.bincount(inverse, weights=np.concatenate((scores_a, scores_b)))
+        return unique_ids.astype(np.int32, copy=False), summed.astype(np.float32)
+
+    def get_scores(self, query_tokens: List[str]) -> np.ndarray:
+        """Dense score vector over the whole corpus (debugging / parity checks)."""
+        scores = np.zeros(self.corpus_size, dtype=np.float64)
+        for term, count in Counter(query_tokens).items():
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            ids, contrib = self._term_contributions(term_id, float(count))
+            np.add.at(scores, ids, contrib)
+        return scores
+
+
+# ---------------------------------------------------------------------------
+# On-disk format (v2): a directory of flat arrays plus a JSON manifest
+# ---------------------------------------------------------------------------
+
+INDEX_FORMAT_NAME = "rightline-bm25-csr"
+INDEX_FORMAT_VERSION = 2
+MANIFEST_FILENAME = "manifest.json"
+
+# Every file in an index directory except the manifest itself
+INDEX_ARRAY_FILES = (
+    "offsets.npy",
+    "doc_ids.npy",
+    "tfs.npy",
+    "idf.npy",
+    "length_norms.npy",
+    "term_upper_bounds.npy",
+    "terms.npy",
+    "term_offsets.npy",
+    "chunk_metadata.npy",
+    "chunk_metadata_offsets.npy",
+)
+
+
+def build_object_key(prefix: str, build_id: str, name: str) -> str:
+    """Remote key of ``name`` in build ``build_id`` under ``prefix``.
+
+    Each build's arrays live under their own ``<prefix>/<build_id>/``, and
+    only ``<prefix>/manifest.json`` names the current build, so an upload
+    never overwrites files a reader may be downloading.
+    """
+    return f"{prefix.rstrip('/')}/{build_id}/{name}"
+
+
+class SortedVocabulary:
+    """
+    Read-only term -> term id mapping over a memory-mapped blob of sorted terms.
+
+    Terms are stored UTF-8 encoded, concatenated in byte order, with term ``i``
+    at ``blob[offsets[i]:offsets[i + 1]]``. Lookup is a binary search, so
+    opening the vocabulary costs nothing regardless of its size.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return int(self._offsets.shape[0]) - 1
+
+    def _term_bytes(self, i: int) -> bytes:
+        return self._blob[self._offsets[i]:self._offsets[i + 1]].tobytes()
+
+    def get(self, term: str, default: Optional[int] = None) -> Optional[int]:
+        key = term.encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term_bytes(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self._term_bytes(lo) == key:
+            return lo
+        return default
+
+    def __contains__(self, term: str) -> bool:
+        return self.get(term) is not None
+
+    def __getitem__(self, term: str) -> int:
+        term_id = self.get(term)
+        if term_id is None:
+            raise KeyError(term)
+        return term_id
+
+
+class ChunkMetadataTable:
+    """Compact, lazily decoded table of per-chunk metadata (one JSON object per row)."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return int(self._offsets.shape[0]) - 1
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return json.loads(self._blob[self._offsets[i]:self._offsets[i + 1]].tobytes())
+
+
+def _pack_strings(values: List[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenate byte strings into (uint8 blob, int64 offsets)."""
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum([len(v) for v in values], out=offsets[1:])
+    blob = np.frombuffer(b"".join(values), dtype=np.uint8)
+    return blob, offsets
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_index_dir(
+    index: InvertedBM25Index,
+    chunk_metadata: List[Dict[str, Any]],
+    output_dir: Union[str, Path],
+    build_info: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Write ``index`` and its chunk metadata as a versioned index directory.
+
+    Terms are re-numbered in UTF-8 byte order so the vocabulary can be
+    binary-searched after memory-mapping. Returns the written manifest, whose
+    ``build_id`` is derived from the file checksums.
+    """
+    if len(chunk_metadata) != index.corpus_size:
+        raise ValueError("chunk_metadata must have one entry per indexed chunk")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Re-order postings from build order to sorted-term order
+    terms = sorted(index.vocabulary, key=lambda t: t.encode("utf-8"))
+    old_ids = np.fromiter((index.vocabulary[t] for t in terms), dtype=np.int64, count=len(terms))
+    lengths = (index.offsets[1:] - index.offsets[:-1])[old_ids]
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    gather = np.repeat(index.offsets[old_ids] - offsets[:-1], lengths) + np.arange(offsets[-1])
+
+    terms_blob, term_offsets = _pack_strings([t.encode("utf-8") for t in terms])
+    metadata_blob, metadata_offsets = _pack_strings(
+        [json.dumps(m, separators=(",", ":"), ensure_ascii=False).encode("utf-8") for m in chunk_metadata]
+    )
+
+    arrays = {
+        "offsets.npy": offsets,
+        "doc_ids.npy": np.asarray(index.doc_ids)[gather].astype(np.int32),
+        "tfs.npy": np.asarray(index.tfs)[gather].astype(np.float32),
+        "idf.npy": np.asarray(index.idf)[old_ids].astype(np.float32),
+        "length_norms.npy": np.asarray(index.length_norms, dtype=np.float32),
+        "term_upper_bounds.npy": np.asarray(index.term_upper_bounds)[old_ids].astype(np.float32),
+        "terms.npy": terms_blob,
+        "term_offsets.npy": term_offsets,
+        "chunk_metadata.npy": metadata_blob,
+        "chunk_metadata_offsets.npy": metadata_offsets,
+    }
+
+    files: Dict[str, Dict[str, Any]] = {}
+    for name, array in arrays.items():
+        path = output_dir / name
+        np.save(path, array, allow_pickle=False)
+        files[name] = {"sha256": _file_sha256(path), "bytes": path.stat().st_size}
+
+    build_id = hashlib.sha256(
+        "".join(files[name]["sha256"] for name in INDEX_ARRAY_FILES).encode()
+    ).hexdigest()[:16]
+
+    manifest = {
+        "format": INDEX_FORMAT_NAME,
+        "format_version": INDEX_FORMAT_VERSION,
+        "build_id": build_id,
+        "corpus_size": index.corpus_size,
+        "vocab_size": len(terms),
+        "num_postings": index.num_postings,
+        "k1": index.k1,
+        "b": index.b,
+        "build_timestamp": time.time(),
+        **(build_info or {}),
+        "files": files,
+    }
+
+    # Manifest last, atomically: a directory with a manifest is complete
+    tmp_manifest = output_dir / f".{MANIFEST_FILENAME}.tmp"
+    tmp_manifest.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_manifest, output_dir / MANIFEST_FILENAME)
+    return manifest
+
+
+def read_manifest(index_dir: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    """Read an index directory's manifest, or None if absent/unreadable."""
+    try:
+        return json.loads((Path(index_dir) / MANIFEST_FILENAME).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def validate_manifest(manifest: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Return a reason the manifest is unusable by this code, or None if it is fine."""
+    if not manifest:
+        return "missing manifest"
+    if manifest.get("format") != INDEX_FORMAT_NAME:
+        return f"unknown format {manifest.get('format')!r}"
+    if manifest.get("format_version") != INDEX_FORMAT_VERSION:
+        return f"unsupported format_version {manifest.get('format_version')!r}"
+    missing = [name for name in INDEX_ARRAY_FILES if name not in manifest.get("files", {})]
+    if missing:
+        return f"manifest lists no entry for {missing}"
+    return None
+
+
+def verify_index_dir(index_dir: Union[str, Path], deep: bool = False) -> Optional[str]:
+    """
+    Check an index directory against its manifest.
+
+    The shallow check (version + file sizes) is cheap enough for every startup;
+    ``deep`` additionally verifies SHA-256 checksums, which is done once after
+    a download. Returns a failure reason, or None if the directory is valid.
+    """
+    index_dir = Path(index_dir)
+    manifest = read_manifest(index_dir)
+    reason = validate_manifest(manifest)
+    if reason:
+        return reason
+    for name, expected in manifest["files"].items():
+        path = index_dir / name
+        if not path.exists():
+            return f"{name} missing"
+        if path.stat().st_size != expected["bytes"]:
+            return f"{name} size mismatch"
+        if deep and _file_sha256(path) != expected["sha256"]:
+            return f"{name} checksum mismatch"
+    return None
+
+
+def open_index_dir(
+    index_dir: Union[str, Path],
+) -> Tuple[InvertedBM25Index, ChunkMetadataTable, Dict[str, Any]]:
+    """
+    Memory-map an index directory written by ``write_index_dir``.
+
+    No array data is read here; pages are faulted in on first access and
+    shared between processes mapping the same files.
+    """
+    index_dir = Path(index_dir)
+    manifest = read_manifest(index_dir)
+    reason = validate_manifest(manifest)
+    if reason:
+        raise ValueError(f"Invalid BM25 index at {index_dir}: {reason}")
+
+    def load(name: str) -> np.ndarray:
+        return np.load(index_dir / name, mmap_mode="r", allow_pickle=False)
+
+    index = InvertedBM25Index(
+        vocabulary=SortedVocabulary(load("terms.npy"), load("term_offsets.npy")),
+        offsets=load("offsets.npy"),
+        doc_ids=load("doc_ids.npy"),
+        tfs=load("tfs.npy"),
+        idf=load("idf.npy"),
+        length_norms=load("length_norms.npy"),
+        term_upper_bounds=load("term_upper_bounds.npy"),
+        k1=manifest["k1"],
+        b=manifest["b"],
+    )
+    metadata = ChunkMetadataTable(load("chunk_metadata.npy"), load("chunk_metadata_offsets.npy"))
+    return index, metadata, manifest
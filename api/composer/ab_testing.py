@@ -26,10 +26,11 @@ from enum import Enum
 
 import structlog
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
 from langsmith import Client, traceable
 from pydantic import BaseModel, Field
 
+from api.llm.registry import llm_registry
+
 logger = structlog.get_logger(__name__)
 
 
@@ -277,7 +278,7 @@ class ABTestManager:
                        query_preview=query[:100])
             
             # Execute prompt variant
-            llm = ChatOpenAI(
+            llm = llm_registry.get_chat_openai(
                 model="gpt-4o-mini",
                 temperature=0.1,
                 max_tokens=1500
@@ -592,7 +593,7 @@ Rate grounding quality from 0.0 to 1.0 where:
 
 Return only a decimal number between 0.0 and 1.0."""
             
-            llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.0, max_tokens=50)
+            llm = llm_registry.get_chat_openai(model="gpt-4o-mini", temperature=0.0, max_tokens=50)
             
             template = ChatPromptTemplate.from_messages([
                 ("system", grounding_prompt),
@@ -633,7 +634,7 @@ Rate legal accuracy from 0.0 to 1.0 where:
 
 Return only a decimal number between 0.0 and 1.0."""
             
-            llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.0, max_tokens=50)
+            llm = llm_registry.get_chat_openai(model="gpt-4o-mini", temperature=0.0, max_tokens=50)
             
             template = ChatPromptTemplate.from_messages([
                 ("system", accuracy_prompt),
@@ -716,7 +717,7 @@ Rate completeness from 0.0 to 1.0 where:
 
 Return only a decimal number between 0.0 and 1.0."""
             
-            llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.0, max_tokens=50)
+            llm = llm_registry.get_chat_openai(model="gpt-4o-mini", temperature=0.0, max_tokens=50)
             
             template = ChatPromptTemplate.from_messages([
                 ("system", completeness_prompt),
@@ -983,7 +984,7 @@ class ABTestOrchestrator:
             from api.composer.prompts import get_prompt_template
             template = get_prompt_template(template_name)
             
-            llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.1, max_tokens=1500)
+            llm = llm_registry.get_chat_openai(model="gpt-4o-mini", temperature=0.1, max_tokens=1500)
             chain = template | llm
             response = await chain.ainvoke({"query": query, "context": context, **kwargs})
             
@@ -997,7 +998,7 @@ class ABTestOrchestrator:
             from api.composer.prompts import get_prompt_template
             template = get_prompt_template(template_name)
             
-            llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.1, max_tokens=1500)
+            llm = llm_registry.get_chat_openai(model="gpt-4o-mini", temperature=0.1, max_tokens=1500)
             chain = template | llm
             response = await chain.ainvoke({"query": query, "context": context, **kwargs})
             
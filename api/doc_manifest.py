@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+doc_id -> R2 object key manifest for parent documents.
+
+Parent documents live at ``corpus/docs/{doc_type}/{doc_id}.json``, but the
+doc_type recorded on chunks does not always match the folder a document was
+written to, so the retrieval engine used to probe up to a dozen candidate keys
+per parent. The ingest scripts (scripts/chunk_docs.py,
+scripts/milvus_upsert_v2.py) now publish a manifest mapping every doc_id to
+its exact key; at query time each parent fetch is a single GET, and probing is
+kept only as a counted fallback for documents missing from the manifest.
+
+Manifest format (JSON, stored at DOC_MANIFEST_R2_KEY):
+    {"version": 1, "build_timestamp": <unix ts>, "docs": {"<doc_id>": "<object key>", ...}}
+
+Author: RightLine Team
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+DOC_MANIFEST_R2_KEY = os.environ.get("DOC_MANIFEST_R2_KEY", "corpus/indexes/doc_manifest.json")
+DOC_MANIFEST_REFRESH_SECONDS = int(os.environ.get("DOC_MANIFEST_REFRESH_SECONDS", "3600"))
+DOC_MANIFEST_VERSION = 1
+PARENT_DOCS_PREFIX = "corpus/docs/"
+
+R2_BUCKET_NAME = os.environ.get("R2_BUCKET_NAME") or os.environ.get("CLOUDFLARE_R2_BUCKET_NAME", "gweta-prod-documents")
+
+
+def doc_id_from_key(object_key: str) -> Optional[str]:
+    """Return the doc_id for a parent document key, or None for non-document objects."""
+    if not object_key.startswith(PARENT_DOCS_PREFIX) or not object_key.endswith(".json"):
+        return None
+    name = object_key.rsplit("/", 1)[-1][: -len(".json")]
+    return name or None
+
+
+def build_doc_manifest(r2_client, bucket: str, prefix: str = PARENT_DOCS_PREFIX) -> Dict[str, str]:
+    """List every parent document under ``prefix`` and map doc_id -> object key."""
+    docs: Dict[str, str] = {}
+    paginator = r2_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            doc_id = doc_id_from_key(obj["Key"])
+            if doc_id is None:
+                continue
+            if doc_id in docs and docs[doc_id] != obj["Key"]:
+                logger.warning("Duplicate parent document id", doc_id=doc_id, kept=docs[doc_id], ignored=obj["Key"])
+                continue
+            docs[doc_id] = obj["Key"]
+    return docs
+
+
+def load_doc_manifest_from_r2(r2_client, bucket: str, key: str = DOC_MANIFEST_R2_KEY) -> Dict[str, str]:
+    """Fetch the published manifest, returning an empty mapping if none exists."""
+    try:
+        response = r2_client.get_object(Bucket=bucket, Key=key)
+    except Exception:
+        return {}
+    return json.loads(response["Body"].read()).get("docs", {})
+
+
+def save_doc_manifest(r2_client, bucket: str, docs: Dict[str, str], key: str = DOC_MANIFEST_R2_KEY) -> None:
+    """Publish the manifest to R2."""
+    body = {"version": DOC_MANIFEST_VERSION, "build_timestamp": time.time(), "docs": docs}
+    r2_client.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=json.dumps(body, separators=(",", ":")).encode("utf-8"),
+        ContentType="application/json",
+        Metadata={"doc_count": str(len(docs)), "version": str(DOC_MANIFEST_VERSION)},
+    )
+
+
+def update_doc_manifest(r2_client, bucket: str, new_entries: Dict[str, str], key: str = DOC_MANIFEST_R2_KEY) -> int:
+    """Merge ``new_entries`` into the published manifest; returns the new size."""
+    docs = load_doc_manifest_from_r2(r2_client, bucket, key)
+    docs.update(new_entries)
+    save_doc_manifest(r2_client, bucket, docs, key)
+    return len(docs)
+
+
+class DocManifest:
+    """
+    In-memory doc_id -> object key lookup, loaded lazily from R2.
+
+    The manifest is refreshed at most every DOC_MANIFEST_REFRESH_SECONDS using a
+    conditional GET, so newly ingested documents are picked up without a
+    restart. Keys discovered by the probe fallback are remembered locally.
+    """
+
+    def __init__(self, r2_key: str = DOC_MANIFEST_R2_KEY, refresh_seconds: int = DOC_MANIFEST_REFRESH_SECONDS):
+        self.r2_key = r2_key
+        self.refresh_seconds = refresh_seconds
+        self._docs: Dict[str, str] = {}
+        self._etag: Optional[str] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self.stats = {"hits": 0, "misses": 0, "fallback_probes": 0, "fallback_found": 0, "loads": 0}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _needs_refresh(self) -> bool:
+        return time.time() - self._loaded_at >= self.refresh_seconds
+
+    def _fetch(self, r2_client) -> None:
+        """Blocking conditional GET of the manifest (run in an executor)."""
+        kwargs: Dict[str, Any] = {"Bucket": R2_BUCKET_NAME, "Key": self.r2_key}
+        if self._etag:
+            kwargs["IfNoneMatch"] = self._etag
+        try:
+            response = r2_client.get_object(**kwargs)
+        except Exception as e:
+            status = getattr(e, "response", {}).get("ResponseMetadata", {}).get("HTTPStatusCode")
+            if status != 304:
+                logger.warning("Parent document manifest unavailable", key=self.r2_key, error=str(e))
+            return
+
+        data = json.loads(response["Body"].read())
+        if data.get("version") != DOC_MANIFEST_VERSION:
+            logger.warning("Unsupported parent document manifest version", version=data.get("version"))
+            return
+        # Keep locally learned keys that the published manifest does not know yet
+        self._docs = {**self._docs, **data.get("docs", {})}
+        self._etag = response.get("ETag")
+        self.stats["loads"] += 1
+        logger.info("Parent document manifest loaded", documents=len(self._docs), key=self.r2_key)
+
+    async def ensure_loaded(self, get_r2_client: Callable[[], Any]) -> None:
+        """Load or refresh the manifest if it is stale (concurrent callers share one fetch)."""
+        if not self._needs_refresh():
+            return
+        async with self._lock:
+            if not self._needs_refresh():
+                return
+            r2_client = get_r2_client()
+            if r2_client is not None:
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(None, self._fetch, r2_client)
+            # Also throttles retries when the manifest is missing or R2 is down
+            self._loaded_at = time.time()
+
+    async def resolve(self, doc_id: str, get_r2_client: Callable[[], Any]) -> Optional[str]:
+        """Return the exact object key for ``doc_id``, or None if unknown."""
+        await self.ensure_loaded(get_r2_client)
+        key = self._docs.get(doc_id)
+        self.stats["hits" if key else "misses"] += 1
+        return key
+
+    def record(self, doc_id: str, object_key: str) -> None:
+        """Remember a key found by the probe fallback."""
+        self._docs[doc_id] = object_key
+        self.stats["fallback_found"] += 1
+
+
+# Singleton shared by all retrieval engines in the process
+parent_doc_manifest = DocManifest()
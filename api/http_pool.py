@@ -0,0 +1,241 @@
+"""Shared, lifespan-owned HTTP connection pools for upstream services.
+
+Every upstream (Milvus HTTP API, OpenAI, WhatsApp Graph API) gets one long-lived
+``httpx.AsyncClient`` with keep-alive, connection limits, per-upstream
+timeouts and HTTP/2 when the ``h2`` package is installed. The FastAPI
+lifespan calls ``startup()``/``shutdown()``; clients such as ``MilvusClient``
+and ``EmbeddingClient`` borrow connections via ``client(name)``, which falls
+back to a short-lived client when no pool is running (scripts, tests).
+
+The R2 boto3 client uses its own urllib3 pool, which is sized here as well
+via ``r2_client_config()``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2 support)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+HTTP2_ENABLED = os.environ.get("HTTP2_ENABLED", "1") == "1" and HTTP2_AVAILABLE
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "60"))  # seconds
+
+
+@dataclass(frozen=True)
+class UpstreamConfig:
+    """Connection pool and timeout settings for one upstream service."""
+
+    name: str
+    timeout: httpx.Timeout
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    http2: bool = HTTP2_ENABLED
+
+
+UPSTREAMS: Dict[str, UpstreamConfig] = {
+    "milvus": UpstreamConfig(
+        name="milvus",
+        timeout=httpx.Timeout(30.0, connect=5.0),
+        max_connections=int(os.environ.get("MILVUS_MAX_CONNECTIONS", "20")),
+        max_keepalive_connections=int(os.environ.get("MILVUS_MAX_KEEPALIVE", "10")),
+    ),
+    "openai": UpstreamConfig(
+        name="openai",
+        timeout=httpx.Timeout(30.0, connect=5.0),
+        max_connections=int(os.environ.get("OPENAI_MAX_CONNECTIONS", "50")),
+        max_keepalive_connections=int(os.environ.get("OPENAI_MAX_KEEPALIVE", "20")),
+    ),
+    "whatsapp": UpstreamConfig(
+        name="whatsapp",
+        timeout=httpx.Timeout(10.0, connect=5.0),
+        max_connections=int(os.environ.get("WHATSAPP_MAX_CONNECTIONS", "10")),
+        max_keepalive_connections=int(os.environ.get("WHATSAPP_MAX_KEEPALIVE", "5")),
+    ),
+}
+
+
+@dataclass
+class PoolMetrics:
+    """Counters for one upstream pool.
+
+    ``waiting`` counts in-flight requests that have not yet started sending
+    (queued for a pooled connection or still connecting); ``reused`` counts
+    requests served on an already-open connection.
+    """
+
+    requests: int = 0
+    in_flight: int = 0
+    waiting: int = 0
+    peak_in_flight: int = 0
+    connections_opened: int = 0
+    reused: int = 0
+    errors: int = 0
+    total_wait_ms: float = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        completed = max(self.requests - self.in_flight, 0)
+        return {
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "queued": self.waiting,
+            "peak_in_flight": self.peak_in_flight,
+            "connections_opened": self.connections_opened,
+            "reused_connections": self.reused,
+            "reuse_ratio": round(self.reused / completed, 3) if completed else 0.0,
+            "errors": self.errors,
+            "avg_wait_ms": round(self.total_wait_ms / completed, 2) if completed else 0.0,
+        }
+
+
+class InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """AsyncHTTPTransport that records pool metrics via httpcore trace events."""
+
+    def __init__(self, metrics: PoolMetrics, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.metrics = metrics
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        metrics = self.metrics
+        started = time.perf_counter()
+        state = {"connected": False, "sending": False}
+        upstream_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            if event_name == "connection.connect_tcp.complete":
+                state["connected"] = True
+            elif event_name.endswith("send_request_headers.started") and not state["sending"]:
+                state["sending"] = True
+                metrics.waiting -= 1
+                metrics.total_wait_ms += (time.perf_counter() - started) * 1000
+            if upstream_trace is not None:
+                await upstream_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        metrics.requests += 1
+        metrics.in_flight += 1
+        metrics.waiting += 1
+        metrics.peak_in_flight = max(metrics.peak_in_flight, metrics.in_flight)
+        try:
+            return await super().handle_async_request(request)
+        except Exception:
+            metrics.errors += 1
+            raise
+        finally:
+            metrics.in_flight -= 1
+            if not state["sending"]:
+                metrics.waiting -= 1
+            if state["connected"]:
+                metrics.connections_opened += 1
+            elif state["sending"]:
+                metrics.reused += 1
+
+
+class HTTPClientPool:
+    """Process-wide owner of one pooled ``httpx.AsyncClient`` per upstream."""
+
+    def __init__(self, upstreams: Optional[Dict[str, UpstreamConfig]] = None):
+        self._upstreams = upstreams or UPSTREAMS
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._metrics: Dict[str, PoolMetrics] = {name: PoolMetrics() for name in self._upstreams}
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_started(self) -> bool:
+        return bool(self._clients)
+
+    def _build_client(self, config: UpstreamConfig) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        )
+        transport = InstrumentedTransport(
+            self._metrics[config.name],
+            http2=config.http2,
+            limits=limits,
+            retries=1,  # Transparently retry failed connects on stale pooled sockets
+        )
+        return httpx.AsyncClient(transport=transport, timeout=config.timeout)
+
+    async def startup(self) -> None:
+        """Open the pooled clients (idempotent)."""
+        async with self._lock:
+            if self._clients:
+                return
+            for name, config in self._upstreams.items():
+                self._clients[name] = self._build_client(config)
+            logger.info(
+                "HTTP client pools started",
+                upstreams=list(self._clients),
+                http2=HTTP2_ENABLED,
+                http2_available=HTTP2_AVAILABLE,
+            )
+
+    async def shutdown(self) -> None:
+        """Close the pooled clients and their connections."""
+        async with self._lock:
+            clients, self._clients = self._clients, {}
+            for client in clients.values():
+                await client.aclose()
+            if clients:
+                logger.info("HTTP client pools closed", metrics=self.metrics())
+
+    def get(self, name: str) -> Optional[httpx.AsyncClient]:
+        """Return the pooled client for ``name`` if the pool is running."""
+        return self._clients.get(name)
+
+    @asynccontextmanager
+    async def client(self, name: str, timeout: Optional[Any] = None) -> AsyncIterator[httpx.AsyncClient]:
+        """Yield the pooled client for ``name``, or a short-lived one outside the app.
+
+        ``timeout`` only applies to the fallback client; pooled requests use
+        the upstream's configured timeouts unless overridden per request.
+        """
+        pooled = self._clients.get(name)
+        if pooled is not None:
+            yield pooled
+            return
+
+        config = self._upstreams.get(name)
+        fallback_timeout = timeout if timeout is not None else (config.timeout if config else 30.0)
+        async with httpx.AsyncClient(timeout=fallback_timeout) as client:
+            yield client
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-upstream pool metrics for observability endpoints and logs."""
+        return {name: metrics.snapshot() for name, metrics in self._metrics.items()}
+
+
+def r2_client_config():
+    """botocore Config sizing the R2 connection pool to the fetch concurrency.
+
+    boto3 keeps connections alive by default but only pools 10 per client,
+    fewer than ``R2_CONCURRENT_REQUESTS`` parallel chunk fetches.
+    """
+    from botocore.config import Config
+
+    return Config(
+        max_pool_connections=int(os.environ.get("R2_CONCURRENT_REQUESTS", "20")),
+        connect_timeout=5,
+        read_timeout=int(os.environ.get("R2_REQUEST_TIMEOUT", "30")),
+        retries={"max_attempts": 3, "mode": "standard"},
+        tcp_keepalive=True,
+    )
+
+
+# Singleton instance owned by the FastAPI lifespan
+http_client_pool = HTTPClientPool()
@@ -1,5 +1,6 @@
 """LLM module for GPT-5 models using Responses API."""
 
 from .gpt5_wrapper import GPT5ProWrapper, GPT5Wrapper, get_gpt5_model
+from .registry import LLMRegistry, llm_registry
 
-__all__ = ["GPT5ProWrapper", "GPT5Wrapper", "get_gpt5_model"]
+__all__ = ["GPT5ProWrapper", "GPT5Wrapper", "get_gpt5_model", "LLMRegistry", "llm_registry"]
@@ -3,23 +3,129 @@ GPT-5 Pro wrapper for the Responses API.
 
 This module provides a LangChain-compatible wrapper for GPT-5 models
 that use OpenAI's new Responses API instead of Chat Completions.
+
+Streaming uses the Responses event stream: output-text deltas are yielded
+as they arrive, reasoning-summary deltas are surfaced in
+``additional_kwargs["reasoning_summary"]`` (never in ``content``), and token
+usage arrives as ``usage_metadata`` on a final empty chunk. Closing or
+cancelling the stream closes the upstream HTTP response.
 """
 
 import os
 import asyncio
-from typing import Any, Dict, List, Optional, AsyncIterator
+from contextlib import aclosing, nullcontext
+from typing import Any, Callable, Dict, List, Optional, AsyncIterator, Set
 from dataclasses import dataclass
 
 import structlog
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, BadRequestError
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AIMessage, AIMessageChunk
-from langchain_core.outputs import Generation, LLMResult, ChatResult, ChatGeneration
+from langchain_core.messages.ai import UsageMetadata
+from langchain_core.outputs import Generation, LLMResult, ChatResult, ChatGeneration, ChatGenerationChunk
 from langchain_core.callbacks import CallbackManagerForLLMRun, AsyncCallbackManagerForLLMRun
 from pydantic import BaseModel, Field
 
 logger = structlog.get_logger(__name__)
 
+# Models whose streaming request was rejected; they use a single non-streaming call
+_NON_STREAMING_MODELS: Set[str] = set()
+
+
+def _usage_metadata(usage: Any) -> Optional[UsageMetadata]:
+    """Convert Responses API usage to LangChain usage metadata."""
+    if usage is None:
+        return None
+    reasoning_tokens = getattr(getattr(usage, "output_tokens_details", None), "reasoning_tokens", None)
+    metadata = UsageMetadata(
+        input_tokens=usage.input_tokens,
+        output_tokens=usage.output_tokens,
+        total_tokens=usage.total_tokens,
+    )
+    if reasoning_tokens is not None:
+        metadata["output_token_details"] = {"reasoning": reasoning_tokens}
+    return metadata
+
+
+def _final_chunk(response: Any) -> ChatGenerationChunk:
+    """Empty chunk carrying usage and completion metadata for a finished response."""
+    return ChatGenerationChunk(
+        message=AIMessageChunk(content="", usage_metadata=_usage_metadata(getattr(response, "usage", None))),
+        generation_info={
+            "model_name": getattr(response, "model", None),
+            "response_id": getattr(response, "id", None),
+            "status": getattr(response, "status", None),
+        },
+    )
+
+
+def _reserve_budget(budget: Any, request: Dict[str, Any]) -> Any:
+    """Context manager holding the model's registry budget for one request.
+
+    The token estimate (input characters / 4 plus the output cap) is charged
+    against the model's tokens-per-minute bucket. Wrappers built outside the
+    registry have no budget and are not throttled.
+    """
+    if budget is None:
+        return nullcontext()
+    return budget.reserve(len(request["input"]) // 4 + request["max_output_tokens"])
+
+
+async def _stream_response_chunks(
+    client: AsyncOpenAI,
+    request: Dict[str, Any],
+    extract_output_text: Callable[[Any], str],
+) -> AsyncIterator[ChatGenerationChunk]:
+    """Yield chunks from the Responses event stream as events arrive.
+
+    Falls back to one non-streaming call (yielded as a single chunk) when
+    the model rejects streaming requests.
+    """
+    model = request["model"]
+    if model in _NON_STREAMING_MODELS:
+        response = await client.responses.create(**request)
+        yield ChatGenerationChunk(message=AIMessageChunk(content=extract_output_text(response)))
+        yield _final_chunk(response)
+        return
+
+    try:
+        stream = await client.responses.create(**request, stream=True)
+    except BadRequestError as e:
+        if "stream" not in str(e).lower():
+            raise
+        logger.warning("Responses streaming unsupported, using single-shot generation", model=model, error=str(e))
+        _NON_STREAMING_MODELS.add(model)
+        async for chunk in _stream_response_chunks(client, request, extract_output_text):
+            yield chunk
+        return
+
+    try:
+        async for event in stream:
+            event_type = getattr(event, "type", "")
+            if event_type == "response.output_text.delta":
+                if event.delta:
+                    yield ChatGenerationChunk(message=AIMessageChunk(content=event.delta))
+            elif event_type == "response.reasoning_summary_text.delta":
+                yield ChatGenerationChunk(
+                    message=AIMessageChunk(content="", additional_kwargs={"reasoning_summary": event.delta})
+                )
+            elif event_type in ("response.completed", "response.incomplete"):
+                if event_type == "response.incomplete":
+                    logger.warning(
+                        "GPT-5 response incomplete",
+                        model=model,
+                        reason=getattr(getattr(event.response, "incomplete_details", None), "reason", None),
+                    )
+                yield _final_chunk(event.response)
+            elif event_type == "response.failed":
+                error = getattr(event.response, "error", None)
+                raise RuntimeError(f"Response failed: {getattr(error, 'message', error)}")
+            elif event_type == "error":
+                raise RuntimeError(f"Response stream error: {event.message}")
+    finally:
+        # Closing the HTTP response stops the upstream generation on cancel/disconnect
+        await stream.close()
+
 
 class GPT5ProWrapper(BaseChatModel):
     """
@@ -35,6 +141,7 @@ class GPT5ProWrapper(BaseChatModel):
     reasoning_effort: str = Field(default="high")  # GPT-5 Pro only supports "high"
     verbosity: str = Field(default="medium")
     client: Optional[AsyncOpenAI] = Field(default=None, exclude=True)
+    budget: Optional[Any] = Field(default=None, exclude=True)  # registry ModelBudget
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -62,6 +169,17 @@ class GPT5ProWrapper(BaseChatModel):
         
         return "\n\n".join(formatted_messages)
     
+    def _response_request(self, messages: List[BaseMessage]) -> Dict[str, Any]:
+        """Responses API request parameters for ``messages``."""
+        return {
+            "model": self.model,
+            "input": self._convert_messages_to_input(messages),
+            "reasoning": {"effort": self.reasoning_effort},
+            "text": {"verbosity": self.verbosity},
+            "max_output_tokens": self.max_tokens,
+            "store": False,  # For privacy, don't store responses
+        }
+    
     def _extract_output_text(self, response: Any) -> str:
         """Extract plain text from Responses API output (robust to SDK/dict).
         Falls back to string conversion if structured fields are missing.
@@ -124,19 +242,10 @@ class GPT5ProWrapper(BaseChatModel):
     ) -> ChatResult:
         """Generate response using GPT-5 Pro via Responses API."""
         try:
-            input_text = self._convert_messages_to_input(messages)
-            
             # Use the Responses API
-            response = await self.client.responses.create(
-                model=self.model,
-                input=input_text,
-                reasoning={"effort": self.reasoning_effort},
-                text={
-                    "verbosity": self.verbosity
-                },
-                max_output_tokens=self.max_tokens,
-                store=False  # For privacy, don't store responses
-            )
+            request = self._response_request(messages)
+            async with _reserve_budget(self.budget, request):
+                response = await self.client.responses.create(**request)
             
             # Extract the output text robustly
             output_text = self._extract_output_text(response)
@@ -149,42 +258,20 @@ class GPT5ProWrapper(BaseChatModel):
             logger.error("GPT-5 Pro generation failed", error=str(e))
             raise
     
-    async def astream(
+    async def _astream(
         self,
-        input: Any,
-        config: Optional[Any] = None,
-        **kwargs: Any
-    ) -> AsyncIterator[AIMessageChunk]:
-        """Stream responses from GPT-5 Pro."""
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        """Stream output-text deltas from GPT-5 Pro as the Responses API emits them."""
         try:
-            # Convert input to appropriate format
-            if isinstance(input, list):
-                input_text = self._convert_messages_to_input(input)
-            else:
-                input_text = str(input)
-            
-            # GPT-5 Pro doesn't support streaming in the same way
-            # We'll simulate streaming by yielding the full response
-            response = await self.client.responses.create(
-                model=self.model,
-                input=input_text,
-                reasoning={"effort": self.reasoning_effort},
-                text={
-                    "verbosity": self.verbosity
-                },
-                max_output_tokens=self.max_tokens,
-                store=False
-            )
-            
-            # Extract output text robustly
-            output_text = self._extract_output_text(response)
-            
-            # Simulate streaming by yielding AIMessageChunk pieces
-            chunk_size = 200
-            for i in range(0, len(output_text), chunk_size):
-                yield AIMessageChunk(content=output_text[i:i+chunk_size])
-                await asyncio.sleep(0.005)
-                
+            request = self._response_request(messages)
+            chunks = _stream_response_chunks(self.client, request, self._extract_output_text)
+            async with _reserve_budget(self.budget, request), aclosing(chunks):
+                async for chunk in chunks:
+                    yield chunk
         except Exception as e:
             logger.error("GPT-5 Pro streaming failed", error=str(e))
             raise
@@ -227,6 +314,7 @@ class GPT5Wrapper(BaseChatModel):
     reasoning_effort: str = Field(default="medium")  # low, medium, high
     verbosity: str = Field(default="medium")
     client: Optional[AsyncOpenAI] = Field(default=None, exclude=True)
+    budget: Optional[Any] = Field(default=None, exclude=True)  # registry ModelBudget
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -253,6 +341,17 @@ class GPT5Wrapper(BaseChatModel):
         
         return "\n\n".join(formatted_messages)
     
+    def _response_request(self, messages: List[BaseMessage]) -> Dict[str, Any]:
+        """Responses API request parameters for ``messages``."""
+        return {
+            "model": self.model,
+            "input": self._convert_messages_to_input(messages),
+            "reasoning": {"effort": self.reasoning_effort},
+            "text": {"verbosity": self.verbosity},
+            "max_output_tokens": self.max_tokens,
+            "store": False,  # For privacy, don't store responses
+        }
+    
     def _extract_output_text(self, response: Any) -> str:
         """Extract plain text from Responses API output (robust to SDK/dict).
         Falls back to string conversion if structured fields are missing.
@@ -315,18 +414,9 @@ class GPT5Wrapper(BaseChatModel):
     ) -> ChatResult:
         """Generate response using GPT-5 via Responses API."""
         try:
-            input_text = self._convert_messages_to_input(messages)
-            
-            response = await self.client.responses.create(
-                model=self.model,
-                input=input_text,
-                reasoning={"effort": self.reasoning_effort},
-                text={
-                    "verbosity": self.verbosity
-                },
-                max_output_tokens=self.max_tokens,
-                store=False
-            )
+            request = self._response_request(messages)
+            async with _reserve_budget(self.budget, request):
+                response = await self.client.responses.create(**request)
             
             output_text = self._extract_output_text(response)
             
@@ -338,38 +428,20 @@ class GPT5Wrapper(BaseChatModel):
             logger.error("GPT-5 generation failed", error=str(e))
             raise
     
-    async def astream(
+    async def _astream(
         self,
-        input: Any,
-        config: Optional[Any] = None,
-        **kwargs: Any
-    ) -> AsyncIterator[AIMessageChunk]:
-        """Stream responses from GPT-5."""
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        """Stream output-text deltas from GPT-5 as the Responses API emits them."""
         try:
-            if isinstance(input, list):
-                input_text = self._convert_messages_to_input(input)
-            else:
-                input_text = str(input)
-            
-            response = await self.client.responses.create(
-                model=self.model,
-                input=input_text,
-                reasoning={"effort": self.reasoning_effort},
-                text={
-                    "verbosity": self.verbosity
-                },
-                max_output_tokens=self.max_tokens,
-                store=False
-            )
-            
-            output_text = self._extract_output_text(response)
-            
-            # Simulate streaming by yielding AIMessageChunk pieces
-            chunk_size = 50
-            for i in range(0, len(output_text), chunk_size):
-                yield AIMessageChunk(content=output_text[i:i+chunk_size])
-                await asyncio.sleep(0.01)
-                
+            request = self._response_request(messages)
+            chunks = _stream_response_chunks(self.client, request, self._extract_output_text)
+            async with _reserve_budget(self.budget, request), aclosing(chunks):
+                async for chunk in chunks:
+                    yield chunk
         except Exception as e:
             logger.error("GPT-5 streaming failed", error=str(e))
             raise
@@ -416,19 +488,9 @@ def get_gpt5_model(
         verbosity: "low", "medium", "high"
     
     Returns:
-        Appropriate GPT-5 wrapper for LangChain
+        Appropriate GPT-5 wrapper for LangChain, cached by the process-wide
+        registry and sharing its pooled OpenAI client and per-model budget
     """
-    if model_name == "gpt-5-pro":
-        return GPT5ProWrapper(
-            model=model_name,
-            max_tokens=max_tokens,
-            reasoning_effort="high",  # Pro only supports high
-            verbosity=verbosity
-        )
-    else:
-        return GPT5Wrapper(
-            model=model_name,
-            max_tokens=max_tokens,
-            reasoning_effort=reasoning_effort,
-            verbosity=verbosity
-        )
+    from .registry import llm_registry
+
+    return llm_registry.get_gpt5_model(model_name, reasoning_effort, max_tokens, verbosity)
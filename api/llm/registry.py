@@ -0,0 +1,331 @@
+"""Process-wide registry of LLM clients with per-model request budgets.
+
+Every ``get_gpt5_model`` call used to build a new wrapper and a new
+``AsyncOpenAI`` client, so a single query opened separate connection pools
+for intent, context resolution, synthesis and each quality-gate check. The
+registry instead:
+
+- Caches one wrapper per (model, reasoning effort, max tokens, verbosity)
+  and event loop
+- Backs every wrapper (and ``ChatOpenAI`` users) with one ``AsyncOpenAI``
+  client on the shared ``openai`` HTTP pool, so connections are reused
+- Applies a per-model budget: a concurrency semaphore plus request-per-minute
+  and token-per-minute buckets, so bursts wait locally instead of turning
+  into 429 storms
+
+Budgets are configured per model in ``MODEL_LIMITS`` (overridable with
+``LLM_LIMIT_<MODEL>=concurrency,rpm,tpm``, e.g. ``LLM_LIMIT_GPT_5_PRO=4,60,200000``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+import weakref
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+import structlog
+from langchain_core.rate_limiters import BaseRateLimiter
+from openai import AsyncOpenAI
+
+from api.http_pool import HTTPClientPool, UPSTREAMS, http_client_pool
+from api.llm.gpt5_wrapper import GPT5ProWrapper, GPT5Wrapper
+
+logger = structlog.get_logger(__name__)
+
+LLM_REQUEST_TIMEOUT = float(os.environ.get("LLM_REQUEST_TIMEOUT", "300"))  # seconds
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "2"))
+
+
+@dataclass(frozen=True)
+class ModelLimit:
+    """Local budget for one model: in-flight calls, requests/min and tokens/min."""
+
+    max_concurrency: int
+    requests_per_minute: int
+    tokens_per_minute: int
+
+
+DEFAULT_MODEL_LIMIT = ModelLimit(max_concurrency=16, requests_per_minute=500, tokens_per_minute=400_000)
+
+MODEL_LIMITS: Dict[str, ModelLimit] = {
+    "gpt-5-pro": ModelLimit(max_concurrency=4, requests_per_minute=60, tokens_per_minute=200_000),
+    "gpt-5": ModelLimit(max_concurrency=16, requests_per_minute=500, tokens_per_minute=400_000),
+    "gpt-5-mini": ModelLimit(max_concurrency=32, requests_per_minute=1000, tokens_per_minute=1_000_000),
+    "gpt-4o-mini": ModelLimit(max_concurrency=32, requests_per_minute=1000, tokens_per_minute=1_000_000),
+}
+
+
+def model_limit(model: str) -> ModelLimit:
+    """Budget for ``model``, honouring an ``LLM_LIMIT_<MODEL>`` override."""
+    override = os.environ.get(f"LLM_LIMIT_{model.upper().replace('-', '_').replace('.', '_')}")
+    if override:
+        try:
+            concurrency, rpm, tpm = (int(v) for v in override.split(","))
+            return ModelLimit(concurrency, rpm, tpm)
+        except ValueError:
+            logger.warning("Invalid LLM limit override, using defaults", model=model, value=override)
+    return MODEL_LIMITS.get(model, DEFAULT_MODEL_LIMIT)
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at ``per_minute / 60`` per second.
+
+    Waiters are served in FIFO order; a request larger than the bucket
+    capacity is clamped so it can still proceed once the bucket is full.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Take ``amount`` tokens, waiting for refill if needed; returns seconds waited."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                delay = (amount - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self._tokens -= amount
+        return waited
+
+
+class ModelBudget:
+    """Concurrency and rate budget shared by every caller of one model."""
+
+    def __init__(self, model: str, limit: ModelLimit):
+        self.model = model
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit.max_concurrency)
+        self._requests = TokenBucket(limit.requests_per_minute)
+        self._tokens = TokenBucket(limit.tokens_per_minute)
+        self.stats = {"calls": 0, "in_flight": 0, "queued": 0, "throttled": 0, "total_wait_ms": 0.0}
+
+    async def acquire_rate(self, estimated_tokens: int = 0) -> float:
+        """Wait for request and token budget (no concurrency slot); returns seconds waited."""
+        waited = await self._requests.acquire(1)
+        if estimated_tokens:
+            waited += await self._tokens.acquire(estimated_tokens)
+        return waited
+
+    @asynccontextmanager
+    async def reserve(self, estimated_tokens: int = 0) -> AsyncIterator[None]:
+        """Hold a concurrency slot and rate budget for one call (or one stream)."""
+        started = time.perf_counter()
+        self.stats["queued"] += 1
+        admitted = False
+        try:
+            async with self._semaphore:
+                await self.acquire_rate(estimated_tokens)
+                admitted = True
+                self.stats["queued"] -= 1
+                waited_ms = (time.perf_counter() - started) * 1000
+                self.stats["total_wait_ms"] += waited_ms
+                if waited_ms > 1:
+                    self.stats["throttled"] += 1
+                self.stats["calls"] += 1
+                self.stats["in_flight"] += 1
+                try:
+                    yield
+                finally:
+                    self.stats["in_flight"] -= 1
+        finally:
+            if not admitted:
+                self.stats["queued"] -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        calls = self.stats["calls"]
+        return {
+            **self.limit.__dict__,
+            "calls": calls,
+            "in_flight": self.stats["in_flight"],
+            "queued": self.stats["queued"],
+            "throttled": self.stats["throttled"],
+            "avg_wait_ms": round(self.stats["total_wait_ms"] / calls, 2) if calls else 0.0,
+        }
+
+
+class BudgetRateLimiter(BaseRateLimiter):
+    """LangChain rate limiter drawing on a model's request bucket (for ChatOpenAI)."""
+
+    def __init__(self, budget: ModelBudget):
+        self.budget = budget
+
+    def acquire(self, *, blocking: bool = True) -> bool:  # pragma: no cover - sync paths unused
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        await self.budget.acquire_rate()
+        return True
+
+
+class _LoopClients:
+    """OpenAI client, cached wrappers and budgets bound to one event loop.
+
+    ``httpx.AsyncClient`` connections and asyncio locks/semaphores belong to
+    the loop they were first used on, so nothing here is reused across loops.
+    """
+
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
+        self.owns_http_client = http_client is None
+        if http_client is None:
+            config = UPSTREAMS["openai"]
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=config.max_connections,
+                    max_keepalive_connections=config.max_keepalive_connections,
+                ),
+                timeout=config.timeout,
+            )
+        self.http_client = http_client
+        self.client = AsyncOpenAI(
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            http_client=http_client,
+            timeout=httpx.Timeout(LLM_REQUEST_TIMEOUT, connect=5.0),
+            max_retries=LLM_MAX_RETRIES,
+        )
+        self.models: Dict[Tuple[Any, ...], Any] = {}
+        self.budgets: Dict[str, ModelBudget] = {}
+
+    def budget(self, model: str) -> ModelBudget:
+        budget = self.budgets.get(model)
+        if budget is None:
+            budget = self.budgets[model] = ModelBudget(model, model_limit(model))
+        return budget
+
+
+class LLMRegistry:
+    """Process-wide cache of model wrappers sharing one pooled OpenAI client.
+
+    Clients, wrappers and budgets are kept per running event loop. In the API
+    there is one loop, so everything is shared process-wide on the app's
+    ``openai`` pool. Scripts and tests that start a new loop per call
+    (``asyncio.run``, including the wrappers' sync ``_generate``) get a
+    private client and budgets for each loop instead of reusing objects
+    bound to a closed one. Outside any loop, wrappers are built uncached
+    with their own client, as before the registry.
+    """
+
+    def __init__(self, http_pool: HTTPClientPool = http_client_pool):
+        self.http_pool = http_pool
+        self._scopes: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopClients]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._pool_loop: Optional[asyncio.AbstractEventLoop] = None  # loop that adopted the app pool
+
+    def _scope(self) -> Optional[_LoopClients]:
+        """Clients for the running loop; None outside a loop."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        scope = self._scopes.get(loop)
+        if scope is None:
+            # The app pool's connections belong to the loop that first adopts them
+            pooled = self.http_pool.get("openai") if self._pool_loop in (None, loop) else None
+            if pooled is not None:
+                self._pool_loop = loop
+            scope = self._scopes[loop] = _LoopClients(pooled)
+            logger.info("Shared OpenAI client created", pooled=not scope.owns_http_client)
+        return scope
+
+    def budget(self, model: str) -> Optional[ModelBudget]:
+        """Budget shared by every wrapper of ``model`` on the running loop."""
+        scope = self._scope()
+        return scope.budget(model) if scope else None
+
+    def get_gpt5_model(
+        self,
+        model_name: str = "gpt-5-pro",
+        reasoning_effort: str = "high",
+        max_tokens: int = 2000,
+        verbosity: str = "medium",
+    ):
+        """Cached GPT-5 wrapper for this configuration."""
+        if model_name == "gpt-5-pro":
+            reasoning_effort = "high"  # Pro only supports high
+        cls = GPT5ProWrapper if model_name == "gpt-5-pro" else GPT5Wrapper
+        scope = self._scope()
+        if scope is None:
+            return cls(model=model_name, max_tokens=max_tokens, reasoning_effort=reasoning_effort, verbosity=verbosity)
+        key = ("gpt5", model_name, reasoning_effort, max_tokens, verbosity)
+        model = scope.models.get(key)
+        if model is None:
+            model = cls(
+                model=model_name,
+                max_tokens=max_tokens,
+                reasoning_effort=reasoning_effort,
+                verbosity=verbosity,
+                client=scope.client,
+                budget=scope.budget(model_name),
+            )
+            scope.models[key] = model
+        return model
+
+    def get_chat_openai(self, model: str = "gpt-4o-mini", temperature: float = 0.1, max_tokens: int = 1500):
+        """Cached ChatOpenAI on the shared connection pool and the model's request budget."""
+        from langchain_openai import ChatOpenAI
+
+        scope = self._scope()
+        if scope is None:
+            return ChatOpenAI(model=model, temperature=temperature, max_tokens=max_tokens, max_retries=LLM_MAX_RETRIES)
+        key = ("chat", model, temperature, max_tokens)
+        llm = scope.models.get(key)
+        if llm is None:
+            llm = ChatOpenAI(
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                http_async_client=scope.http_client,
+                rate_limiter=BudgetRateLimiter(scope.budget(model)),
+                max_retries=LLM_MAX_RETRIES,
+            )
+            scope.models[key] = llm
+        return llm
+
+    async def shutdown(self) -> None:
+        """Drop cached models and close private HTTP clients.
+
+        Called by the API lifespan before the shared HTTP pool closes, so no
+        cached wrapper outlives its connections. Private clients of other,
+        already closed loops are dropped without closing.
+        """
+        loop = asyncio.get_running_loop()
+        for scope_loop, scope in list(self._scopes.items()):
+            if scope.owns_http_client and scope_loop is loop:
+                await scope.http_client.aclose()
+        self._scopes.clear()
+        self._pool_loop = None
+
+    def metrics(self) -> Dict[str, Any]:
+        """Per-model budget usage (on the running loop) for observability endpoints."""
+        try:
+            scope = self._scopes.get(asyncio.get_running_loop())
+        except RuntimeError:
+            scope = None
+        return {
+            "cached_models": len(scope.models) if scope else 0,
+            "pooled": scope is not None and not scope.owns_http_client,
+            "loops": len(self._scopes),
+            "models": {name: budget.snapshot() for name, budget in scope.budgets.items()} if scope else {},
+        }
+
+
+# Singleton shared by every graph node, quality gate and A/B test
+llm_registry = LLMRegistry()
@@ -9,7 +9,8 @@ from __future__ import annotations
 import logging
 import os
 import time
-from typing import Any
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
 
 import structlog
 from fastapi import FastAPI, HTTPException, Request, status
@@ -61,6 +62,44 @@ structlog.configure(
 logger = structlog.get_logger(__name__)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Own process-wide resources shared across requests.
+    
+    Pooled HTTP clients (Milvus, OpenAI) are opened first so the retrieval
+    engine (retrievers, R2 client, Milvus connection, BM25 index), created once
+    here and leased by every graph node, warms up on kept-alive connections.
+    Cached LLM wrappers share the pooled OpenAI client and are dropped before
+    the pool closes. Post-answer side effects (response caching, memory
+    updates) are drained from the write-behind queue before anything closes.
+    Cross-encoder inference runs on its own micro-batching worker pool so it
+    does not compete with R2/BM25 I/O on the default executor. WhatsApp
+    webhook messages are answered by a Redis-stream worker pool whose lanes
+    finish their queued jobs before the shared clients close.
+    """
+    from api.http_pool import http_client_pool
+    from api.llm.registry import llm_registry
+    from api.tools.rerank_inference import rerank_inference
+    from api.tools.retrieval_engine import retrieval_engine_registry
+    from api.whatsapp_queue import whatsapp_queue
+    from api.write_behind import write_behind_queue
+    
+    await http_client_pool.startup()
+    await retrieval_engine_registry.startup()
+    await rerank_inference.startup()
+    await write_behind_queue.startup()
+    await whatsapp_queue.startup()
+    try:
+        yield
+    finally:
+        await whatsapp_queue.shutdown()
+        await write_behind_queue.shutdown()
+        await rerank_inference.shutdown()
+        await retrieval_engine_registry.shutdown()
+        await llm_registry.shutdown()
+        await http_client_pool.shutdown()
+
+
 def create_app() -> FastAPI:
     """Create and configure FastAPI application for serverless deployment."""
     settings = get_settings()
@@ -83,7 +122,7 @@ def create_app() -> FastAPI:
         version="1.0.0",
         default_response_class=ORJSONResponse,
         debug=settings.debug,
-        # No lifespan for serverless - connections created per request
+        lifespan=lifespan,
     )
     
     # Add CORS middleware - allow all localhost origins for development
@@ -12,17 +12,22 @@ import asyncio
 import os
 import time
 import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Any, Dict, List, Literal, Optional
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional
 
 import structlog
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import StateGraph, END
+from langchain_core.callbacks.manager import adispatch_custom_event
 from langchain_core.runnables import RunnableConfig
 from langchain_core.tracers import LangChainTracer
 from langchain_openai import ChatOpenAI
 from langsmith import Client, traceable
 from api.llm.gpt5_wrapper import get_gpt5_model
+from api.write_behind import write_behind_queue
+from libs.caching.embedding_service import current_embedding_service
+from libs.caching.single_flight import SINGLE_FLIGHT_ENABLED, Flight, SingleFlight
 
 from api.schemas.agent_state import AgentState, update_intent_routing, update_query_processing, update_retrieval_results, update_final_output
 
@@ -33,6 +38,40 @@ LANGSMITH_API_KEY = os.environ.get("LANGCHAIN_API_KEY")
 LANGSMITH_PROJECT = os.environ.get("LANGCHAIN_PROJECT", "rightline-legal-ai")
 LANGSMITH_ENDPOINT = os.environ.get("LANGCHAIN_ENDPOINT", "https://api.smith.langchain.com")
 
+# Custom astream_events event carrying synthesis deltas to streaming clients
+SYNTHESIS_TOKEN_EVENT = "synthesis_token"
+
+
+async def _emit_synthesis_token(content: str) -> None:
+    """Forward a synthesis delta to astream_events consumers (no-op outside a graph run)."""
+    try:
+        await adispatch_custom_event(SYNTHESIS_TOKEN_EVENT, {"content": content})
+    except RuntimeError:
+        # No parent run (node called directly, e.g. in tests)
+        pass
+
+
+async def _write_cached_responses(items: List[Any]) -> None:
+    """Write-behind handler: cache a batch of (cache, entry) items, one pipeline per cache."""
+    batches: Dict[int, Any] = {}
+    for cache, entry in items:
+        batches.setdefault(id(cache), (cache, []))[1].append(entry)
+    for cache, entries in batches.values():
+        await cache.cache_responses(entries)
+
+
+async def _write_memory_updates(items: List[Any]) -> None:
+    """Write-behind handler: apply a batch of (memory, update) items per coordinator."""
+    batches: Dict[int, Any] = {}
+    for memory, update in items:
+        batches.setdefault(id(memory), (memory, []))[1].append(update)
+    for memory, updates in batches.values():
+        await memory.apply_updates(updates)
+
+
+write_behind_queue.register("cache_response", _write_cached_responses)
+write_behind_queue.register("memory_update", _write_memory_updates)
+
 
 class QueryOrchestrator:
     """Main orchestrator for agentic query processing using LangGraph."""
@@ -41,6 +80,12 @@ class QueryOrchestrator:
         """Initialize the orchestrator with a compiled graph and caching."""
         self.graph = self._build_graph()
         
+        # Embedding client behind the per-request embedding service (created lazily)
+        self._embedding_client = None
+        
+        # Coalesces concurrent identical queries (created with the cache's Redis client)
+        self._single_flight = None
+        
         # Initialize semantic cache for performance optimization
         self.cache = None
         try:
@@ -102,6 +147,51 @@ class QueryOrchestrator:
             logger.warning("Failed to initialize memory", error=str(e))
             self.memory = None
     
+    async def _load_memory_snapshot(self, state: AgentState) -> Dict[str, Any]:
+        """Fetch the conversation window and user profile once per query.
+
+        Returns AgentState updates (``short_term_context``, ``long_term_profile``,
+        ``memory_tokens_used``); later nodes slice them with
+        :meth:`_memory_context` instead of reading Redis and Firestore again.
+
+        Like the per-node reads it replaces, this only uses a coordinator that
+        is already attached; it never creates one, so queries do no memory I/O
+        by default.
+        """
+        if not self.memory:
+            return {}
+        try:
+            snapshot = await self.memory.get_snapshot(
+                user_id=state.user_id,
+                session_id=state.session_id
+            )
+            logger.debug("Memory snapshot loaded",
+                        conversation_msgs=len(snapshot["conversation_history"]),
+                        memory_tokens=snapshot["tokens_used"]["total"],
+                        trace_id=state.trace_id)
+            return {
+                "short_term_context": snapshot["conversation_history"],
+                "long_term_profile": snapshot["user_profile"],
+                "memory_tokens_used": snapshot["tokens_used"]["total"],
+            }
+        except Exception as e:
+            logger.warning("Failed to load memory snapshot", error=str(e))
+            return {}
+    
+    def _memory_context(self, state: AgentState, max_tokens: int) -> Optional[Dict[str, Any]]:
+        """Memory context for one node's token budget, sliced from the state snapshot."""
+        if not state.short_term_context and not state.long_term_profile:
+            return None
+        from libs.memory.coordinator import MemoryCoordinator
+        
+        return MemoryCoordinator.slice_context(
+            {
+                "conversation_history": state.short_term_context,
+                "user_profile": state.long_term_profile,
+            },
+            max_tokens
+        )
+    
     async def _ensure_cache_connected(self):
         """Ensure cache is connected (lazy initialization)."""
         if self.cache and self.cache._redis_client is None:
@@ -475,6 +565,8 @@ class QueryOrchestrator:
     async def _route_intent_node(self, state: AgentState) -> Dict[str, Any]:
         """01_intent_classifier: Classify user intent with advanced legal reasoning framework."""
         start_time = time.time()
+        # Memory loads while the intent is classified; later nodes slice the snapshot
+        memory_task = asyncio.create_task(self._load_memory_snapshot(state))
         
         try:
             # LangSmith: Record input metadata
@@ -502,35 +594,30 @@ class QueryOrchestrator:
                                        cache_hit=True,
                                        duration_ms=round(duration_ms, 2),
                                        trace_id=state.trace_id)
-                            return cached_intent
+                            return {**cached_intent, **(await memory_task)}
                 except Exception as e:
                     logger.warning("Intent cache check failed", error=str(e))
             
-            # Get user profile for personalization (ARCH-036)
-            user_profile = None
-            if self.memory:
-                try:
-                    await self._ensure_memory_connected()
-                    if self.memory:
-                        full_context = await self.memory.get_full_context(
-                            user_id=state.user_id,
-                            session_id=state.session_id,
-                            max_tokens=500  # Small budget for intent classification
-                        )
-                        user_profile = full_context.get('user_profile', {})
-                        logger.debug("User profile retrieved for intent classification",
-                                    query_count=user_profile.get('query_count', 0))
-                except Exception as e:
-                    logger.warning("Failed to get user profile", error=str(e))
-            
             # Cache miss - perform classification
             # ARCH-048: Use enhanced heuristics with confidence threshold
             heuristic_result = self._classify_intent_heuristic(state.raw_query)
             jurisdiction = self._detect_jurisdiction(state.raw_query)
             date_context = self._extract_date_context(state.raw_query)
+            heuristic_confident = bool(heuristic_result and heuristic_result.get("confidence", 0) >= 0.8)
+            
+            llm_intent = None
+            if not heuristic_confident:
+                logger.debug("Heuristic uncertain, using LLM fallback",
+                           heuristic_confidence=heuristic_result.get("confidence", 0) if heuristic_result else None,
+                           trace_id=state.trace_id)
+                llm_intent = await self._classify_intent_llm(state.raw_query)
+            
+            # User profile for personalization (ARCH-036), from the memory snapshot
+            memory_update = await memory_task
+            user_profile = memory_update.get("long_term_profile")
             
             # If heuristics are confident (>=0.8), use them directly
-            if heuristic_result and heuristic_result.get("confidence", 0) >= 0.8:
+            if heuristic_confident:
                 logger.debug("Using heuristic classification",
                            intent=heuristic_result.get("intent"),
                            confidence=heuristic_result.get("confidence"),
@@ -545,12 +632,6 @@ class QueryOrchestrator:
             
             # If heuristics are uncertain or low confidence, fall back to LLM
             else:
-                logger.debug("Heuristic uncertain, using LLM fallback",
-                           heuristic_confidence=heuristic_result.get("confidence", 0) if heuristic_result else None,
-                           trace_id=state.trace_id)
-                
-                llm_intent = await self._classify_intent_llm(state.raw_query)
-                
                 # Use user profile for personalization if available
                 default_complexity = "moderate"
                 default_user_type = "professional"
@@ -637,7 +718,7 @@ class QueryOrchestrator:
                 except Exception as e:
                     logger.warning("Failed to cache intent", error=str(e))
             
-            return result
+            return {**result, **memory_update}
             
         except Exception as e:
             logger.error("01_intent_classifier failed", error=str(e), trace_id=state.trace_id)
@@ -651,7 +732,8 @@ class QueryOrchestrator:
                 "intent_confidence": 0.5,
                 "complexity": "moderate",
                 "user_type": "professional",
-                "reasoning_framework": "irac"
+                "reasoning_framework": "irac",
+                **(await memory_task)
             }
     
     async def _rewrite_expand_node(self, state: AgentState) -> Dict[str, Any]:
@@ -659,22 +741,12 @@ class QueryOrchestrator:
         start_time = time.time()
         
         try:
-            # Get memory context if available (ARCH-035: Memory in query rewriter)
-            memory_context = None
-            if self.memory:
-                try:
-                    await self._ensure_memory_connected()
-                    if self.memory:
-                        memory_context = await self.memory.get_full_context(
-                            user_id=state.user_id,
-                            session_id=state.session_id,
-                            max_tokens=1000  # Limited budget for rewriter
-                        )
-                        logger.info("Memory context retrieved for query rewriting",
-                                   conversation_msgs=len(memory_context.get('conversation_history', [])),
-                                   trace_id=state.trace_id)
-                except Exception as e:
-                    logger.warning("Failed to get memory for query rewriting", error=str(e))
+            # Memory context from the request snapshot (ARCH-035: Memory in query rewriter)
+            memory_context = self._memory_context(state, max_tokens=1000)  # Limited budget for rewriter
+            if memory_context:
+                logger.info("Memory context retrieved for query rewriting",
+                           conversation_msgs=len(memory_context.get('conversation_history', [])),
+                           trace_id=state.trace_id)
             
             # LangSmith: Log input artifacts (avoid positional dict that breaks logging formatting)
             logger.info(
@@ -700,6 +772,13 @@ class QueryOrchestrator:
             # History-aware rewrite (simplified for stability)
             rewritten_query = await self._rewrite_query_with_context(state, query_to_rewrite, memory_context)
             
+            # Dense retrieval embeds variants of the rewritten query; declare them now
+            # so they go out in one embeddings call with anything else still missing
+            embeddings = current_embedding_service()
+            if embeddings is not None:
+                from api.tools.retrieval_engine import QueryProcessor
+                embeddings.expect(QueryProcessor.dense_query_variants(rewritten_query))
+            
             # Generate hypothetical documents (simplified for now)
             hypothetical_docs = [f"Hypothetical legal document for: {rewritten_query}"]
             sub_questions = []  # Simplified for initial implementation
@@ -784,24 +863,24 @@ class QueryOrchestrator:
                        complexity=getattr(state, 'complexity', 'moderate'),
                        trace_id=state.trace_id)
             
-            # Use RetrievalEngine components directly to access both branches
-            from api.tools.retrieval_engine import RetrievalEngine
-            engine = RetrievalEngine()
-            
-            # Update retrievers with adaptive top_k using object.__setattr__ for Pydantic compatibility
-            object.__setattr__(engine.milvus_retriever, 'top_k', retrieval_top_k)
-            object.__setattr__(engine.bm25_retriever, 'top_k', retrieval_top_k)
+            # Use the shared RetrievalEngine components directly to access both branches
+            from api.tools.retrieval_engine import retrieval_engine_registry
             
-            # Launch BM25 and Milvus in parallel with timing
-            bm25_start = time.time()
-            milvus_start = time.time()
-            
-            bm25_task = asyncio.create_task(engine.bm25_retriever.aget_relevant_documents(query))
-            milvus_task = asyncio.create_task(engine.milvus_retriever.aget_relevant_documents(query))
-            bm25_docs, milvus_docs = await asyncio.gather(bm25_task, milvus_task, return_exceptions=False)
-            
-            bm25_time = time.time() - bm25_start
-            milvus_time = time.time() - milvus_start
+            async with retrieval_engine_registry.lease() as engine:
+                # Adaptive top_k is passed per call; the shared retrievers are never mutated
+                bm25_start = time.time()
+                milvus_start = time.time()
+                
+                bm25_task = asyncio.create_task(
+                    engine.bm25_retriever.aget_relevant_documents(query, top_k=retrieval_top_k)
+                )
+                milvus_task = asyncio.create_task(
+                    engine.milvus_retriever.aget_relevant_documents(query, top_k=retrieval_top_k)
+                )
+                bm25_docs, milvus_docs = await asyncio.gather(bm25_task, milvus_task, return_exceptions=False)
+                
+                bm25_time = time.time() - bm25_start
+                milvus_time = time.time() - milvus_start
             
             # Convert LangChain Documents back to RetrievalResult
             bm25_results = [doc.metadata.get("retrieval_result") for doc in bm25_docs if doc.metadata.get("retrieval_result")]
@@ -823,7 +902,7 @@ class QueryOrchestrator:
             
             if chunk_keys:
                 try:
-                    # Fetch content in batches
+                    # Fetch content in batches (R2 fetches don't need the Milvus connection)
                     chunk_contents = await engine._fetch_chunk_contents_batch(chunk_keys)
                     
                     # Update RetrievalResult objects with populated content
@@ -1091,8 +1170,8 @@ class QueryOrchestrator:
             parent_doc_cache = {}
             
             if parent_doc_requests:
-                from api.tools.retrieval_engine import RetrievalEngine
-                async with RetrievalEngine() as engine:
+                from api.tools.retrieval_engine import retrieval_engine_registry
+                async with retrieval_engine_registry.lease() as engine:
                     parent_docs = await engine._fetch_parent_documents_batch(parent_doc_requests)
                     
                     # Build cache dict
@@ -1267,8 +1346,8 @@ class QueryOrchestrator:
             
             # Batch fetch missing parent documents from R2
             if parent_doc_requests:
-                from api.tools.retrieval_engine import RetrievalEngine
-                async with RetrievalEngine() as engine:
+                from api.tools.retrieval_engine import retrieval_engine_registry
+                async with retrieval_engine_registry.lease() as engine:
                     parent_docs = await engine._fetch_parent_documents_batch(parent_doc_requests)
                     
                     # Map fetched parents back to chunks
@@ -1354,23 +1433,13 @@ class QueryOrchestrator:
             user_type = getattr(state, 'user_type', 'professional')
             reasoning_framework = getattr(state, 'reasoning_framework', 'irac')
             
-            # Get memory context if available (ARCH-041: Memory-aware synthesis)
-            memory_context = None
-            if self.memory:
-                try:
-                    await self._ensure_memory_connected()
-                    if self.memory:
-                        memory_context = await self.memory.get_full_context(
-                            user_id=state.user_id,
-                            session_id=state.session_id,
-                            max_tokens=1500  # Leave room for other context
-                        )
-                        logger.info("Memory context retrieved for synthesis",
-                                   conversation_msgs=len(memory_context.get('conversation_history', [])),
-                                   memory_tokens=memory_context.get('tokens_used', {}).get('total', 0),
-                                   trace_id=state.trace_id)
-                except Exception as e:
-                    logger.warning("Failed to get memory context", error=str(e))
+            # Memory context from the request snapshot (ARCH-041: Memory-aware synthesis)
+            memory_context = self._memory_context(state, max_tokens=1500)  # Leave room for other context
+            if memory_context:
+                logger.info("Memory context retrieved for synthesis",
+                           conversation_msgs=len(memory_context.get('conversation_history', [])),
+                           memory_tokens=memory_context.get('tokens_used', {}).get('total', 0),
+                           trace_id=state.trace_id)
             
             # LangSmith: Log input artifacts
             logger.info(
@@ -1450,6 +1519,10 @@ class QueryOrchestrator:
             first_token_time = None
             
             async for chunk in llm.astream(template.format_messages(**synthesis_context)):
+                # Reasoning-summary and usage chunks carry no answer text
+                if not chunk.content:
+                    continue
+                
                 if first_token_time is None:
                     first_token_time = time.time()
                     first_token_ms = (first_token_time - start_time) * 1000
@@ -1457,8 +1530,8 @@ class QueryOrchestrator:
                                first_token_ms=round(first_token_ms, 2),
                                trace_id=state.trace_id)
                 
-                if chunk.content:
-                    final_answer += chunk.content
+                final_answer += chunk.content
+                await _emit_synthesis_token(chunk.content)
             
             # Extract citations and create synthesis object
             cited_sources = self._extract_citations(final_answer, getattr(state, 'bundled_context', []))
@@ -2067,120 +2140,69 @@ Return ONLY the rewritten query, no explanation."""
             logger.warning("Query decomposition failed", error=str(e))
             return []
     
-    async def run_query(self, state: AgentState) -> AgentState:
-        """Run a query through the orchestrator with semantic caching."""
-        config = RunnableConfig(
+    @asynccontextmanager
+    async def _request_scope(self, state: AgentState) -> AsyncIterator[None]:
+        """Per-request resources shared by every node (currently the embedding service).
+        
+        All embedding work for the request (semantic cache lookup and write,
+        dense retrieval variants) goes through one request-scoped service, so
+        each text is embedded at most once. Only the raw query is declared
+        here; the rewrite node declares the retrieval variants of the
+        rewritten query, which is what dense retrieval actually embeds.
+        """
+        from api.tools.retrieval_engine import OPENAI_EMBEDDING_MODEL, EmbeddingClient
+        from libs.caching.embedding_service import embedding_scope
+        from libs.caching.embedding_store import get_embedding_store
+        
+        if self.cache:
+            await self._ensure_cache_connected()
+        redis_client = self.cache._redis_client if self.cache else None
+        
+        if self._embedding_client is None:
+            self._embedding_client = EmbeddingClient()
+        
+        with embedding_scope(
+            self._embedding_client, redis_client, store=get_embedding_store(), model=OPENAI_EMBEDDING_MODEL
+        ) as embeddings:
+            embeddings.expect([state.raw_query])
+            yield
+    
+    def _run_config(self, state: AgentState) -> RunnableConfig:
+        return RunnableConfig(
             configurable={"thread_id": state.session_id},
             metadata={"trace_id": state.trace_id}
         )
-        
+    
+    async def run_query(self, state: AgentState) -> AgentState:
+        """Run a query through the orchestrator with semantic caching."""
+        async with self._request_scope(state):
+            return await self._run_query(state)
+    
+    async def _run_query(self, state: AgentState) -> AgentState:
+        """Cache lookup, graph execution, cache write and memory update for one query."""
         logger.info("Starting query orchestration", 
                    trace_id=state.trace_id,
                    user_id=state.user_id,
                    query_preview=state.raw_query[:50])
         
         try:
-            # Check cache first (performance optimization)
-            if self.cache:
-                try:
-                    await self._ensure_cache_connected()
-                    
-                    if self.cache:  # Might be None if connection failed
-                        user_type = getattr(state, 'user_type', 'professional')
-                        cached_response = await self.cache.get_cached_response(
-                            query=state.raw_query,
-                            user_type=user_type,
-                            check_semantic=True  # Enable semantic matching
-                        )
-                        
-                        if cached_response:
-                            # Cache hit - populate state and return
-                            logger.info("Returning cached response",
-                                       trace_id=state.trace_id,
-                                       cache_hit_type=cached_response.get("_cache_hit", "unknown"),
-                                       cache_similarity=cached_response.get("_cache_similarity"))
-                            
-                            # Update state with cached data
-                            state.final_answer = cached_response.get("final_answer")
-                            state.synthesis = cached_response.get("synthesis", {})
-                            state.cited_sources = cached_response.get("cited_sources", [])
-                            
-                            # Add cache metadata to state
-                            state.safety_flags["from_cache"] = True
-                            state.safety_flags["cache_hit_type"] = cached_response.get("_cache_hit")
-                            
-                            # Record minimal timing (very fast!)
-                            state.node_timings["total_cached"] = 50  # Approximate cache hit time
-                            
-                            return state
-                except Exception as e:
-                    logger.warning("Cache check failed, continuing with full pipeline", error=str(e))
-            
-            # Cache miss - run full pipeline
-            logger.info("Cache miss, running full pipeline", trace_id=state.trace_id)
-            
-            # Run the graph
-            result = await self.graph.ainvoke(state, config=config)
-            
-            # LangGraph returns the updated state as a dict-like object
-            # Convert it back to AgentState for type safety
-            if isinstance(result, dict):
-                # Update the original state with the results
-                updated_state = state.model_copy(update=result)
-                result = updated_state
-            
-            logger.info("Query orchestration completed successfully",
-                       trace_id=state.trace_id,
-                       final_answer_length=len(result.final_answer or ""))
-            
-            # Cache the response for future queries
-            if self.cache and result.final_answer:
-                try:
-                    cache_data = {
-                        "final_answer": result.final_answer,
-                        "synthesis": result.synthesis or {},
-                        "cited_sources": result.cited_sources,
-                        "_cached_at": datetime.utcnow().isoformat()
-                    }
-                    
-                    # Determine TTL based on complexity and confidence
-                    ttl_seconds = self._get_cache_ttl(result)
-                    
-                    user_type = getattr(result, 'user_type', 'professional')
-                    
-                    await self.cache.cache_response(
-                        query=state.raw_query,
-                        response=cache_data,
-                        user_type=user_type,
-                        ttl_seconds=ttl_seconds
-                    )
-                    
-                    logger.info("Response cached for future queries",
-                               trace_id=state.trace_id,
-                               ttl_seconds=ttl_seconds)
-                except Exception as e:
-                    logger.warning("Failed to cache response", error=str(e), trace_id=state.trace_id)
+            cached_state = await self._get_cached_state(state)
+            if cached_state is not None:
+                return cached_state
             
-            # Update memory systems after successful query (ARCH-037)
-            if self.memory and result.final_answer:
-                try:
-                    await self.memory.update_memories(
-                        user_id=state.user_id,
-                        session_id=state.session_id,
-                        query=state.raw_query,
-                        response=result.final_answer,
-                        metadata={
-                            "complexity": getattr(result, 'complexity', 'moderate'),
-                            "legal_areas": getattr(result, 'legal_areas', []),
-                            "user_type": getattr(result, 'user_type', 'professional'),
-                            "intent": getattr(result, 'intent', 'rag_qa')
-                        }
-                    )
-                    logger.debug("Memories updated", trace_id=state.trace_id)
-                except Exception as e:
-                    logger.warning("Failed to update memories", error=str(e), trace_id=state.trace_id)
-            
-            return result
+            async with self._query_flight(state) as flight:
+                if flight.shared_result is not None:
+                    return self._apply_cached_response(state, flight.shared_result)
+                
+                # Cache miss - run full pipeline
+                logger.info("Cache miss, running full pipeline", trace_id=state.trace_id)
+                
+                # Run the graph
+                result = await self.graph.ainvoke(state, config=self._run_config(state))
+                final_state = await self._complete_query(state, result)
+                if final_state.final_answer:
+                    flight.set_result(self._response_payload(final_state))
+                return final_state
             
         except Exception as e:
             logger.error("Query orchestration failed", 
@@ -2188,6 +2210,207 @@ Return ONLY the rewritten query, no explanation."""
                         trace_id=state.trace_id)
             raise
     
+    async def stream_query(self, state: AgentState) -> AsyncIterator[Dict[str, Any]]:
+        """Run a query and yield pipeline events as they happen.
+        
+        Events are plain dicts:
+        - ``{"type": "node", "node": name, "status": "start" | "end", "output": dict}``
+        - ``{"type": "token", "node": name, "content": delta}`` for each synthesis delta
+        - ``{"type": "final", "state": AgentState, "from_cache": bool}`` once, last
+        
+        Events are pulled from ``graph.astream_events`` only as fast as the
+        caller consumes them, and closing the generator (e.g. on client
+        disconnect) cancels the graph run.
+        """
+        async with self._request_scope(state):
+            logger.info("Starting streamed query orchestration",
+                       trace_id=state.trace_id,
+                       user_id=state.user_id,
+                       query_preview=state.raw_query[:50])
+            
+            cached_state = await self._get_cached_state(state)
+            if cached_state is not None:
+                if cached_state.final_answer:
+                    yield {"type": "token", "node": "cache", "content": cached_state.final_answer}
+                yield {"type": "final", "state": cached_state, "from_cache": True}
+                return
+            
+            async with self._query_flight(state) as flight:
+                if flight.shared_result is not None:
+                    shared_state = self._apply_cached_response(state, flight.shared_result)
+                    if shared_state.final_answer:
+                        yield {"type": "token", "node": "cache", "content": shared_state.final_answer}
+                    yield {"type": "final", "state": shared_state, "from_cache": True}
+                    return
+                
+                result = None
+                events = self.graph.astream_events(state, config=self._run_config(state), version="v2")
+                try:
+                    async for event in events:
+                        kind = event["event"]
+                        node = event.get("metadata", {}).get("langgraph_node")
+                        
+                        if kind == "on_custom_event" and event["name"] == SYNTHESIS_TOKEN_EVENT:
+                            yield {"type": "token", "node": node, "content": event["data"]["content"]}
+                        elif kind in ("on_chain_start", "on_chain_end") and node and event["name"] == node:
+                            output = event["data"].get("output") if kind == "on_chain_end" else None
+                            yield {
+                                "type": "node",
+                                "node": node,
+                                "status": "start" if kind == "on_chain_start" else "end",
+                                "output": output if isinstance(output, dict) else {},
+                            }
+                        elif kind == "on_chain_end" and not event.get("parent_ids"):
+                            result = event["data"].get("output")
+                finally:
+                    await events.aclose()
+                
+                if result is None:
+                    raise RuntimeError("Graph run ended without a final state")
+                
+                final_state = await self._complete_query(state, result)
+                if final_state.final_answer:
+                    flight.set_result(self._response_payload(final_state))
+            yield {"type": "final", "state": final_state, "from_cache": False}
+    
+    async def _get_cached_state(self, state: AgentState) -> Optional[AgentState]:
+        """Return ``state`` populated from the semantic cache, or None on a miss."""
+        if not self.cache:
+            return None
+        
+        try:
+            await self._ensure_cache_connected()
+            
+            if self.cache:  # Might be None if connection failed
+                user_type = getattr(state, 'user_type', 'professional')
+                cached_response = await self.cache.get_cached_response(
+                    query=state.raw_query,
+                    user_type=user_type,
+                    check_semantic=True  # Enable semantic matching
+                )
+                
+                if cached_response:
+                    # Cache hit - populate state and return
+                    logger.info("Returning cached response",
+                               trace_id=state.trace_id,
+                               cache_hit_type=cached_response.get("_cache_hit", "unknown"),
+                               cache_similarity=cached_response.get("_cache_similarity"))
+                    return self._apply_cached_response(state, cached_response)
+        except Exception as e:
+            logger.warning("Cache check failed, continuing with full pipeline", error=str(e))
+        
+        return None
+    
+    def _apply_cached_response(self, state: AgentState, cached_response: Dict[str, Any]) -> AgentState:
+        """Populate ``state`` from a cached (or single-flight shared) response."""
+        # Update state with cached data
+        state.final_answer = cached_response.get("final_answer")
+        state.synthesis = cached_response.get("synthesis", {})
+        state.cited_sources = cached_response.get("cited_sources", [])
+        
+        # Add cache metadata to state
+        state.safety_flags["from_cache"] = True
+        state.safety_flags["cache_hit_type"] = cached_response.get("_cache_hit", "single_flight")
+        
+        # Record minimal timing (very fast!)
+        state.node_timings["total_cached"] = 50  # Approximate cache hit time
+        
+        return state
+    
+    @staticmethod
+    def _response_payload(result: AgentState) -> Dict[str, Any]:
+        """JSON-serialisable answer fields shared through the cache and single-flight."""
+        return {
+            "final_answer": result.final_answer,
+            "synthesis": result.synthesis or {},
+            "cited_sources": [
+                c.model_dump(mode="json") if hasattr(c, "model_dump") else c
+                for c in result.cited_sources
+            ],
+        }
+    
+    @asynccontextmanager
+    async def _query_flight(self, state: AgentState) -> AsyncIterator[Flight]:
+        """Coalesce concurrent identical queries (keyed on the exact-cache key).
+        
+        Followers get ``flight.shared_result``; the leader runs the pipeline
+        and calls ``flight.set_result``. Without a cache (or with
+        SINGLE_FLIGHT_ENABLED=false) every request leads its own flight.
+        """
+        if not SINGLE_FLIGHT_ENABLED or not self.cache:
+            yield Flight(key="")
+            return
+        
+        if self._single_flight is None:
+            self._single_flight = SingleFlight(redis_client=self.cache._redis_client)
+        key = self.cache._get_exact_cache_key(state.raw_query, state.user_type or "professional")
+        async with self._single_flight.flight(key) as flight:
+            if flight.shared_result is not None:
+                logger.info("Returning single-flight shared response", trace_id=state.trace_id)
+            yield flight
+    
+    async def _complete_query(self, state: AgentState, result: Any) -> AgentState:
+        """Turn the graph output into an AgentState, then cache it and update memories."""
+        # LangGraph returns the updated state as a dict-like object
+        # Convert it back to AgentState for type safety
+        if isinstance(result, dict):
+            # Update the original state with the results
+            updated_state = state.model_copy(update=result)
+            result = updated_state
+        
+        logger.info("Query orchestration completed successfully",
+                   trace_id=state.trace_id,
+                   final_answer_length=len(result.final_answer or ""))
+        
+        # Cache the response and update memory after the answer is returned;
+        # both go through the write-behind queue when it is running
+        if self.cache and result.final_answer:
+            try:
+                embeddings = current_embedding_service()
+                entry = {
+                    "query": state.raw_query,
+                    "response": {
+                        **self._response_payload(result),
+                        "_cached_at": datetime.utcnow().isoformat()
+                    },
+                    "user_type": getattr(result, 'user_type', 'professional'),
+                    # Determine TTL based on complexity and confidence
+                    "ttl_seconds": self._get_cache_ttl(result),
+                    # Reuse the request's query embedding rather than re-embedding later
+                    "embedding": embeddings.peek(state.raw_query) if embeddings else None,
+                }
+                if not write_behind_queue.submit("cache_response", (self.cache, entry)):
+                    await self.cache.cache_responses([entry])
+                
+                logger.info("Response cached for future queries",
+                           trace_id=state.trace_id,
+                           ttl_seconds=entry["ttl_seconds"])
+            except Exception as e:
+                logger.warning("Failed to cache response", error=str(e), trace_id=state.trace_id)
+        
+        # Update memory systems after successful query (ARCH-037)
+        if self.memory and result.final_answer:
+            try:
+                update = {
+                    "user_id": state.user_id,
+                    "session_id": state.session_id,
+                    "query": state.raw_query,
+                    "response": result.final_answer,
+                    "metadata": {
+                        "complexity": getattr(result, 'complexity', 'moderate'),
+                        "legal_areas": getattr(result, 'legal_areas', []),
+                        "user_type": getattr(result, 'user_type', 'professional'),
+                        "intent": getattr(result, 'intent', 'rag_qa')
+                    }
+                }
+                if not write_behind_queue.submit("memory_update", (self.memory, update)):
+                    await self.memory.apply_updates([update])
+                logger.debug("Memories updated", trace_id=state.trace_id)
+            except Exception as e:
+                logger.warning("Failed to update memories", error=str(e), trace_id=state.trace_id)
+        
+        return result
+    
     def _decide_refinement_strategy(self, state: AgentState) -> str:
         """
         ARCH-049: Decide whether to refine synthesis or request more sources.
@@ -2782,13 +3005,13 @@ Return ONLY the JSON object, no other text."""
             )
             
             # Run retrieval with gap query
-            from api.tools.retrieval_engine import RetrievalEngine
+            from api.tools.retrieval_engine import retrieval_engine_registry
             
-            async with RetrievalEngine() as engine:
+            async with retrieval_engine_registry.lease() as engine:
                 # Use Milvus for semantic retrieval with gap query
                 additional_docs = await engine.milvus_retriever.aget_relevant_documents(
                     gap_query,
-                    k=15  # Get 15 additional documents
+                    top_k=15  # Get 15 additional documents
                 )
             
             # Convert LangChain documents to lightweight result objects
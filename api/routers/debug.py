@@ -120,3 +120,96 @@ async def get_api_health() -> HealthResponse:
         environment=env_status,
         services=services
     )
+
+
+@router.get("/http-pools")
+async def get_http_pool_metrics() -> Dict[str, Any]:
+    """Get connection pool metrics (in-flight, queued, reused) per upstream."""
+    from api.http_pool import HTTP2_ENABLED, http_client_pool
+    
+    return {
+        "started": http_client_pool.is_started,
+        "http2": HTTP2_ENABLED,
+        "upstreams": http_client_pool.metrics(),
+    }
+
+
+@router.get("/llm-budgets")
+async def get_llm_budgets() -> Dict[str, Any]:
+    """Get per-model LLM budget usage (in-flight, queued, throttled calls)."""
+    from api.llm.registry import llm_registry
+    
+    return llm_registry.metrics()
+
+
+@router.get("/write-behind")
+async def get_write_behind_metrics() -> Dict[str, Any]:
+    """Get write-behind queue depth, batching and drop counters per side effect."""
+    from api.write_behind import write_behind_queue
+    
+    return {
+        "started": write_behind_queue.is_started,
+        "side_effects": write_behind_queue.metrics(),
+    }
+
+
+@router.get("/content-cache")
+async def get_content_cache_stats() -> Dict[str, Any]:
+    """Get R2 chunk/parent content cache metrics (hits, misses, bytes)."""
+    from libs.caching.content_cache import r2_content_cache
+    
+    return {
+        "disk_enabled": r2_content_cache.disk is not None,
+        "max_memory_bytes": r2_content_cache.max_memory_bytes,
+        "stats": r2_content_cache.get_stats().as_dict(),
+    }
+
+
+@router.get("/embedding-store")
+async def get_embedding_store_stats() -> Dict[str, Any]:
+    """Get local content-hash embedding store metrics (entries, hits, writes)."""
+    from libs.caching.embedding_store import get_embedding_store
+    
+    store = get_embedding_store()
+    if store is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "root": str(store.root),
+        "dim": store.dim,
+        "stats": store.get_stats().as_dict(),
+    }
+
+
+@router.get("/rerank-cache")
+async def get_rerank_cache_stats() -> Dict[str, Any]:
+    """Get cross-encoder score cache metrics (entries, hits, misses)."""
+    from api.tools.reranker import rerank_score_cache
+    
+    return {
+        "max_entries": rerank_score_cache.max_entries,
+        "ttl_seconds": rerank_score_cache.ttl_seconds,
+        "stats": rerank_score_cache.stats(),
+    }
+
+
+@router.get("/rerank-inference")
+async def get_rerank_inference_metrics() -> Dict[str, Any]:
+    """Get reranker inference pool metrics (queue wait, batch size, latency percentiles)."""
+    from api.tools.rerank_inference import rerank_inference
+    
+    return {
+        "started": rerank_inference.is_started,
+        **rerank_inference.metrics(),
+    }
+
+
+@router.get("/whatsapp-queue")
+async def get_whatsapp_queue_metrics() -> Dict[str, Any]:
+    """Get WhatsApp job queue depth, dedup, retry and dead-letter counters."""
+    from api.whatsapp_queue import whatsapp_queue
+    
+    return {
+        "started": whatsapp_queue.is_started,
+        **whatsapp_queue.metrics(),
+    }
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import asyncio
 import json
 import time
 import uuid
@@ -13,7 +12,6 @@ from pydantic import BaseModel
 
 from api.analytics import log_query
 from api.auth import User, get_current_user
-from api.composer.synthesis import compose_legal_answer
 from api.models import (
     Citation,
     FeedbackRequest,
@@ -21,7 +19,6 @@ from api.models import (
     QueryRequest,
     QueryResponse,
 )
-from api.tools.retrieval_engine import search_legal_documents
 from libs.firebase.client import get_firestore_async_client
 from libs.firestore.feedback import save_feedback_to_firestore
 from api.orchestrators.query_orchestrator import get_orchestrator
@@ -32,6 +29,63 @@ logger = structlog.get_logger(__name__)
 router = APIRouter()
 
 
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _state_confidence(result_state: Any) -> float:
+    """Confidence reported for an orchestrator result."""
+    synthesis_obj = getattr(result_state, "synthesis", {}) or {}
+    confidence = synthesis_obj.get("confidence", 0.5)
+    if getattr(result_state, "reranked_results", None):
+        confidence = max(confidence, 0.7)
+    elif getattr(result_state, "combined_results", None):
+        confidence = max(confidence, 0.6)
+    return confidence
+
+
+def _node_progress_event(event: Dict[str, Any]) -> Optional[tuple]:
+    """Map an orchestrator node event to an SSE (event, data) pair, if clients care about it."""
+    node, node_status = event["node"], event["status"]
+    
+    if node == "03_retrieval_parallel" and node_status == "start":
+        return "retrieval", {
+            'status': 'searching',
+            'message': 'Searching legal documents...',
+            'progress': 0.2
+        }
+    
+    if node == "04_merge_results" and node_status == "end":
+        results_count = len(event["output"].get("combined_results", []))
+        if results_count == 0:
+            return "warning", {
+                'type': 'no_results',
+                'message': 'No relevant documents found for this query'
+            }
+        return "retrieval", {
+            'status': 'completed',
+            'message': f'Found {results_count} relevant documents',
+            'results_count': results_count,
+            'progress': 0.5
+        }
+    
+    if node == "08_synthesis" and node_status == "start":
+        return "meta", {
+            'status': 'synthesizing',
+            'message': 'Generating AI legal analysis...',
+            'progress': 0.7
+        }
+    
+    if node == "08b_quality_gate" and node_status == "end" and event["output"].get("quality_passed") is False:
+        return "warning", {
+            'type': 'quality_gate',
+            'message': 'Answer did not pass all quality checks and may be refined'
+        }
+    
+    return None
+
+
 @router.post("/v1/query", response_model=QueryResponse, tags=["Query"])
 async def query_legal_information(
     request: Request,
@@ -109,11 +163,7 @@ async def query_legal_information(
             ))
         
         # Calculate confidence from the orchestrator results
-        confidence = synthesis_obj.get("confidence", 0.5)
-        if getattr(result_state, "reranked_results", None):
-            confidence = max(confidence, 0.7)
-        elif getattr(result_state, "combined_results", None):
-            confidence = max(confidence, 0.6)
+        confidence = _state_confidence(result_state)
         
         # Build the response using orchestrator outputs
         tldr_text = synthesis_obj.get("tldr", final_answer if final_answer else "No summary available")
@@ -259,137 +309,95 @@ async def stream_legal_query(
     Events:
         - meta: Query metadata and processing start
         - retrieval: Document retrieval progress
-        - token: AI-generated response tokens
+        - token: AI-generated response tokens, forwarded as the model emits them
         - citation: Source document citations
         - warning: Quality gate warnings
-        - final: Complete response summary
+        - final: Complete response summary (authoritative answer text; replaces
+          streamed tokens if a later refinement step rewrote the answer)
     """
     # Rate limiting check  
     await query_rate_limiter.check_rate_limit(request)
     
     async def generate_sse_stream() -> AsyncGenerator[str, None]:
-        """Generate Server-Sent Events for the query processing pipeline."""
+        """Forward orchestrator events to the client as Server-Sent Events.
+        
+        Events are pulled from the graph only as fast as the client reads
+        them, so a slow client applies backpressure and a disconnect closes
+        the generator, which cancels the graph run.
+        """
         
         request_id = str(uuid.uuid4())
         start_time = time.time()
         
         try:
             # Event 1: Meta - Query processing start
-            yield f"event: meta\n"
-            meta_data = {
+            yield _sse("meta", {
                 'request_id': request_id,
                 'query': query[:100] + '...' if len(query) > 100 else query,
                 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S UTC'),
                 'user_id': current_user.uid,
                 'status': 'processing'
-            }
-            yield f"data: {json.dumps(meta_data)}\n\n"
-            
-            # Event 2: Retrieval - Start document search
-            yield f"event: retrieval\n"
-            retrieval_data = {
-                'status': 'searching',
-                'message': 'Searching legal documents...',
-                'progress': 0.2
-            }
-            yield f"data: {json.dumps(retrieval_data)}\n\n"
+            })
             
-            # Execute retrieval
-            retrieval_results, retrieval_confidence = await search_legal_documents(
-                query=query,
-                top_k=10,
-                min_score=0.1
+            orchestrator = get_orchestrator()
+            state = create_initial_state(
+                user_id=current_user.uid,
+                session_id=request.headers.get("x-session-id") or f"web-{uuid.uuid4().hex[:8]}",
+                raw_query=query,
             )
+            state.request_id = request_id
             
-            # Event 3: Retrieval - Results found
-            yield f"event: retrieval\n"
-            retrieval_results_data = {
-                'status': 'completed',
-                'message': f'Found {len(retrieval_results)} relevant documents',
-                'results_count': len(retrieval_results),
-                'confidence': retrieval_confidence,
-                'progress': 0.5
-            }
-            yield f"data: {json.dumps(retrieval_results_data)}\n\n"
+            token_position = 0
+            first_token_ms = None
+            result_state = None
             
-            if not retrieval_results:
-                # Event: Warning - No results
-                yield f"event: warning\n"
-                warning_data = {
-                    'type': 'no_results',
-                    'message': 'No relevant documents found for this query'
-                }
-                yield f"data: {json.dumps(warning_data)}\n\n"
+            async for event in orchestrator.stream_query(state):
+                if event["type"] == "token":
+                    # Event: Token - model deltas as they arrive
+                    if first_token_ms is None:
+                        first_token_ms = int((time.time() - start_time) * 1000)
+                    yield _sse("token", {
+                        'token': event["content"],
+                        'position': token_position,
+                        'node': event["node"]
+                    })
+                    token_position += 1
                 
-                # Event: Final - Fallback response
-                yield f"event: final\n"
-                final_fallback_data = {
-                    'request_id': request_id,
-                    'tldr': 'No specific legal information found for this query.',
-                    'key_points': ['Query may be too specific or outside legal domain'],
-                    'citations': [],
-                    'confidence': 0.1,
-                    'processing_time_ms': int((time.time() - start_time) * 1000)
-                }
-                yield f"data: {json.dumps(final_fallback_data)}\n\n"
-                return
-            
-            # Event 4: Synthesis - Start AI processing
-            yield f"event: meta\n"
-            synthesis_start_data = {
-                'status': 'synthesizing',
-                'message': 'Generating AI legal analysis...',
-                'progress': 0.7
-            }
-            yield f"data: {json.dumps(synthesis_start_data)}\n\n"
-            
-            # Execute synthesis
-            composed_answer = await compose_legal_answer(
-                results=retrieval_results,
-                query=query,
-                confidence=retrieval_confidence,
-                lang="en",
-                use_openai=True
-            )
-            
-            # Event 5: Token streaming (simulate for now - real implementation would stream from OpenAI)
-            tokens = composed_answer.tldr.split()
-            for i, token in enumerate(tokens):
-                yield f"event: token\n"
-                token_data = {
-                    'token': token + ' ',
-                    'position': i,
-                    'total_tokens': len(tokens)
-                }
-                yield f"data: {json.dumps(token_data)}\n\n"
+                elif event["type"] == "node":
+                    progress_event = _node_progress_event(event)
+                    if progress_event is not None:
+                        yield _sse(*progress_event)
                 
-                # Small delay to simulate real streaming
-                await asyncio.sleep(0.05)
+                elif event["type"] == "final":
+                    result_state = event["state"]
+            
+            synthesis_obj = getattr(result_state, "synthesis", {}) or {}
+            tldr = getattr(result_state, "final_answer", None) or synthesis_obj.get("tldr", "")
+            confidence = _state_confidence(result_state)
+            citations = synthesis_obj.get("citations", [])
             
-            # Event 6: Citations
-            for i, citation in enumerate(composed_answer.citations):
-                yield f"event: citation\n"
-                citation_data = {
+            # Event: Citations
+            for i, citation in enumerate(citations):
+                yield _sse("citation", {
                     'index': i + 1,
                     'title': citation.get('title', 'Legal Document'),
-                    'source': citation.get('source_url', ''),
+                    'source': citation.get('source_url', citation.get('url', '')),
                     'relevance': citation.get('relevance', 0.8)
-                }
-                yield f"data: {json.dumps(citation_data)}\n\n"
+                })
             
-            # Event 7: Final - Complete response
+            # Event: Final - Complete response (authoritative text)
             processing_time = int((time.time() - start_time) * 1000)
-            yield f"event: final\n"
-            final_data = {
+            yield _sse("final", {
                 'request_id': request_id,
-                'tldr': composed_answer.tldr,
-                'key_points': composed_answer.key_points,
-                'citations_count': len(composed_answer.citations),
-                'confidence': retrieval_confidence,
+                'tldr': tldr,
+                'key_points': synthesis_obj.get("key_points", []),
+                'citations_count': len(citations),
+                'confidence': confidence,
+                'from_cache': bool(result_state.safety_flags.get("from_cache")) if result_state else False,
+                'first_token_ms': first_token_ms,
                 'processing_time_ms': processing_time,
                 'status': 'completed'
-            }
-            yield f"data: {json.dumps(final_data)}\n\n"
+            })
             
             # Log successful query
             try:
@@ -398,8 +406,8 @@ async def stream_legal_query(
                     user_id=current_user.uid,
                     channel="stream",
                     query_text=query,
-                    response_topic=composed_answer.tldr[:100],
-                    confidence=retrieval_confidence,
+                    response_topic=tldr[:100],
+                    confidence=confidence,
                     response_time_ms=processing_time,
                     status="success",
                     session_id=request.headers.get("x-session-id", "unknown"),
@@ -414,14 +422,12 @@ async def stream_legal_query(
                         error=str(e))
             
             # Event: Error
-            yield f"event: error\n"
-            error_data = {
+            yield _sse("error", {
                 'request_id': request_id,
                 'error': 'Query processing failed',
                 'message': 'Please try again later',
                 'processing_time_ms': int((time.time() - start_time) * 1000)
-            }
-            yield f"data: {json.dumps(error_data)}\n\n"
+            })
     
     return StreamingResponse(
         generate_sse_stream(),
@@ -0,0 +1,250 @@
+"""Dedicated CPU inference service for the cross-encoder reranker.
+
+``CrossEncoder.predict`` used to run on the event loop's default thread pool,
+next to boto3 R2 fetches and BM25 loads. Under concurrent queries the torch
+threads and the I/O threads contended for the same workers, and every query
+paid for its own small ``predict`` call.
+
+This service owns a fixed ``ThreadPoolExecutor`` used only for reranker
+inference and pins torch's intra-op thread count once at startup. Score
+requests go through one asyncio queue: the dispatcher takes the first request,
+waits up to ``RERANK_BATCH_WINDOW_MS`` for concurrent requests to join (or
+until ``RERANK_MAX_BATCH_PAIRS`` pairs are collected), runs a single
+``predict`` per model on the concatenated pairs and splits the scores back.
+At most ``RERANK_INFERENCE_WORKERS`` batches run at once.
+
+Queue wait, batch size and inference time are recorded for
+``/debug/rerank-inference``. When the service is not started (scripts,
+tests), ``score()`` runs ``predict`` directly on the default executor.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+RERANK_INFERENCE_WORKERS = int(os.environ.get("RERANK_INFERENCE_WORKERS", "1"))
+RERANK_INFERENCE_THREADS = int(os.environ.get("RERANK_INFERENCE_THREADS", str(min(4, os.cpu_count() or 1))))
+RERANK_BATCH_WINDOW_MS = float(os.environ.get("RERANK_BATCH_WINDOW_MS", "5"))
+RERANK_MAX_BATCH_PAIRS = int(os.environ.get("RERANK_MAX_BATCH_PAIRS", "256"))
+
+# Recent samples kept for latency percentiles
+_LATENCY_SAMPLES = 1000
+
+
+@dataclass
+class _ScoreRequest:
+    model: Any
+    pairs: List[List[str]]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+def _percentile(samples: Sequence[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 2)
+
+
+@dataclass
+class InferenceMetrics:
+    """Counters and recent latency samples for the inference service."""
+
+    requests: int = 0
+    pairs: int = 0
+    batches: int = 0
+    failed: int = 0
+    queue_wait_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=_LATENCY_SAMPLES))
+    inference_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=_LATENCY_SAMPLES))
+
+    def snapshot(self, depth: int) -> Dict[str, Any]:
+        return {
+            "depth": depth,
+            "requests": self.requests,
+            "pairs": self.pairs,
+            "batches": self.batches,
+            "failed": self.failed,
+            "avg_requests_per_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "queue_wait_p50_ms": _percentile(self.queue_wait_ms, 50),
+            "queue_wait_p99_ms": _percentile(self.queue_wait_ms, 99),
+            "inference_p50_ms": _percentile(self.inference_ms, 50),
+            "inference_p99_ms": _percentile(self.inference_ms, 99),
+        }
+
+
+def _pin_torch_threads(threads: int) -> None:
+    try:
+        import torch  # type: ignore
+    except Exception:  # pragma: no cover - torch only ships with sentence-transformers
+        return
+    torch.set_num_threads(threads)
+
+
+class RerankInferenceService:
+    """Process-wide micro-batching executor for cross-encoder ``predict`` calls."""
+
+    def __init__(
+        self,
+        workers: int = RERANK_INFERENCE_WORKERS,
+        threads: int = RERANK_INFERENCE_THREADS,
+        batch_window: float = RERANK_BATCH_WINDOW_MS / 1000,
+        max_batch_pairs: int = RERANK_MAX_BATCH_PAIRS,
+    ):
+        self.workers = max(1, workers)
+        self.threads = max(1, threads)
+        self.batch_window = batch_window
+        self.max_batch_pairs = max_batch_pairs
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._running: set = set()
+        self._metrics = InferenceMetrics()
+
+    @property
+    def is_started(self) -> bool:
+        return self._dispatcher is not None
+
+    async def startup(self) -> None:
+        if self._dispatcher is not None:
+            return
+        _pin_torch_threads(self.threads)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="rerank-inference")
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._dispatcher = asyncio.create_task(self._dispatch(), name="rerank-inference-dispatcher")
+        logger.info(
+            "Rerank inference service started",
+            workers=self.workers,
+            torch_threads=self.threads,
+            batch_window_ms=self.batch_window * 1000,
+            max_batch_pairs=self.max_batch_pairs,
+        )
+
+    async def score(self, model: Any, pairs: List[List[str]]) -> List[float]:
+        """Score (query, document) pairs with ``model``, batched with concurrent callers."""
+        if not pairs:
+            return []
+        if self._queue is None:
+            loop = asyncio.get_running_loop()
+            scores = await loop.run_in_executor(None, model.predict, pairs)
+            return [float(s) for s in scores]
+        request = _ScoreRequest(model=model, pairs=pairs, future=asyncio.get_running_loop().create_future())
+        self._queue.put_nowait(request)
+        return await request.future
+
+    async def _next_batch(self) -> List[_ScoreRequest]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        size = len(batch[0].pairs)
+        deadline = loop.time() + self.batch_window
+        try:
+            while size < self.max_batch_pairs:
+                if self._queue.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        request = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    request = self._queue.get_nowait()
+                batch.append(request)
+                size += len(request.pairs)
+        except asyncio.CancelledError:
+            self._fail(batch)
+            raise
+        return batch
+
+    @staticmethod
+    def _fail(requests: List[_ScoreRequest]) -> None:
+        for request in requests:
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("Rerank inference service stopped"))
+
+    async def _dispatch(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._slots.acquire()
+            except asyncio.CancelledError:
+                self._fail(batch)
+                raise
+            task = asyncio.create_task(self._run_batch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch: List[_ScoreRequest]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            dispatched = time.perf_counter()
+            for request in batch:
+                self._metrics.queue_wait_ms.append((dispatched - request.enqueued_at) * 1000)
+
+            # Requests normally share one model; group in case a caller brings its own
+            by_model: Dict[int, List[_ScoreRequest]] = {}
+            for request in batch:
+                by_model.setdefault(id(request.model), []).append(request)
+
+            for requests in by_model.values():
+                pairs = [pair for request in requests for pair in request.pairs]
+                started = time.perf_counter()
+                try:
+                    scores = await loop.run_in_executor(self._executor, requests[0].model.predict, pairs)
+                except Exception as e:
+                    self._metrics.failed += len(requests)
+                    for request in requests:
+                        if not request.future.done():
+                            request.future.set_exception(e)
+                    continue
+                finally:
+                    self._metrics.inference_ms.append((time.perf_counter() - started) * 1000)
+                    self._metrics.batches += 1
+
+                offset = 0
+                for request in requests:
+                    count = len(request.pairs)
+                    if not request.future.done():
+                        request.future.set_result([float(s) for s in scores[offset:offset + count]])
+                    offset += count
+                self._metrics.requests += len(requests)
+                self._metrics.pairs += len(pairs)
+        finally:
+            self._slots.release()
+
+    async def shutdown(self) -> None:
+        """Stop dispatching, finish running batches and release the worker threads."""
+        if self._dispatcher is None:
+            return
+        self._dispatcher.cancel()
+        await asyncio.gather(self._dispatcher, return_exceptions=True)
+        await asyncio.gather(*self._running, return_exceptions=True)
+        while not self._queue.empty():
+            self._fail([self._queue.get_nowait()])
+        self._executor.shutdown(wait=True)
+        self._dispatcher = None
+        self._queue = None
+        self._executor = None
+        logger.info("Rerank inference service stopped", metrics=self.metrics())
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, batching and latency percentiles for observability endpoints."""
+        snapshot = self._metrics.snapshot(self._queue.qsize() if self._queue is not None else 0)
+        snapshot.update({"workers": self.workers, "torch_threads": self.threads})
+        return snapshot
+
+
+# Singleton owned by the FastAPI lifespan
+rerank_inference = RerankInferenceService()
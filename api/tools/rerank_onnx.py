@@ -0,0 +1,260 @@
+"""ONNX Runtime int8 backend for the cross-encoder reranker.
+
+Running a cross-encoder through sentence-transformers on CPU pads every batch
+to the longest pair and executes fp32 torch kernels, which is too slow for
+``BAAI/bge-reranker-v2-m3`` inside our latency budget. This backend exports
+the HuggingFace sequence-classification model to ONNX once, quantizes its
+weights to int8 with ``onnxruntime.quantization.quantize_dynamic`` and serves
+it with an ``InferenceSession``.
+
+``OnnxCrossEncoder.predict`` has the same contract as ``CrossEncoder.predict``
+(a list of [query, document] pairs in, one relevance score per pair out,
+after the activation the model's config asks for), so ``BGEReranker`` and
+the inference service use it unchanged. Pairs are tokenized without
+padding, sorted by token length and grouped into length buckets
+(``RERANK_ONNX_BUCKETS``); each batch is padded only to its own longest
+pair, so short chunks don't pay for long ones.
+
+Exported graphs are cached under ``RERANK_ONNX_DIR/<model>/``, together
+with ``rerank.json`` recording the score activation. Requires the
+optional ``onnxruntime`` and ``transformers`` packages (plus ``torch`` for
+the one-off export).
+
+Usage:
+    from api.tools.rerank_onnx import OnnxCrossEncoder
+
+    model = OnnxCrossEncoder.from_pretrained("BAAI/bge-reranker-v2-m3")
+    scores = model.predict([["query", "chunk text"], ...])
+"""
+
+from __future__ import annotations
+
+import inspect
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+RERANK_ONNX_DIR = Path(os.environ.get("RERANK_ONNX_DIR", Path.home() / ".cache" / "rightline" / "rerank-onnx"))
+RERANK_ONNX_BATCH_SIZE = int(os.environ.get("RERANK_ONNX_BATCH_SIZE", "32"))
+RERANK_ONNX_BUCKETS = tuple(
+    int(b) for b in os.environ.get("RERANK_ONNX_BUCKETS", "32,64,128,256,512").split(",")
+)
+
+FP32_FILENAME = "model.onnx"
+INT8_FILENAME = "model.int8.onnx"
+SETTINGS_FILENAME = "rerank.json"
+_MODEL_INPUTS = ("input_ids", "attention_mask", "token_type_ids")
+
+
+_ACTIVATIONS = {
+    "sigmoid": lambda logits: 1.0 / (1.0 + np.exp(-logits)),
+    "identity": lambda logits: logits,
+    "tanh": np.tanh,
+}
+
+
+def default_activation(config: Dict[str, Any]) -> str:
+    """Score activation ``CrossEncoder`` would apply for a model with this HF config.
+
+    Mirrors ``CrossEncoder.get_default_activation_fn``: the activation stored
+    by sentence-transformers in the config wins; otherwise sigmoid for
+    single-label models and identity (raw logits) for the rest.
+    """
+    path = (config.get("sentence_transformers") or {}).get("activation_fn") or config.get(
+        "sbert_ce_default_activation_function"
+    )
+    if path:
+        name = path.rsplit(".", 1)[-1].lower()
+        if name in _ACTIVATIONS:
+            return name
+        logger.warning("Unsupported reranker activation, using model default", activation=path)
+    num_labels = config.get("num_labels") or len(config.get("id2label") or {}) or 1
+    return "sigmoid" if num_labels == 1 else "identity"
+
+
+def model_dir(model_name: str, root: Path = RERANK_ONNX_DIR) -> Path:
+    """Directory holding the exported graphs and tokenizer for ``model_name``."""
+    return Path(root) / model_name.replace("/", "__")
+
+
+def export_onnx(model_name: str, output_dir: Path, quantize: bool = True, opset: int = 17) -> Path:
+    """Export ``model_name`` to ONNX (optionally int8-quantized) and return the graph path."""
+    import torch  # type: ignore
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer  # type: ignore
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    fp32_path = output_dir / FP32_FILENAME
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+    dummy = tokenizer(["query"], ["document text"], return_tensors="pt")
+    input_names = [name for name in _MODEL_INPUTS if name in dummy]
+
+    # Batch and sequence axes stay dynamic so batches are padded per bucket
+    dynamic_axes: Dict[str, Dict[int, str]] = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    export_options: Dict[str, Any] = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # The TorchScript exporter honours dynamic_axes; newer torch defaults to dynamo
+        export_options["dynamo"] = False
+
+    logger.info("Exporting reranker to ONNX", model=model_name, path=str(fp32_path))
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(dummy[name] for name in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            **export_options,
+        )
+    tokenizer.save_pretrained(str(output_dir))
+    config = model.config.to_dict()
+    config["num_labels"] = model.config.num_labels
+    (output_dir / SETTINGS_FILENAME).write_text(json.dumps({"activation": default_activation(config)}))
+
+    if not quantize:
+        return fp32_path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic  # type: ignore
+
+    int8_path = output_dir / INT8_FILENAME
+    quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+    logger.info(
+        "Quantized reranker to int8",
+        model=model_name,
+        fp32_mb=round(fp32_path.stat().st_size / 1e6, 1),
+        int8_mb=round(int8_path.stat().st_size / 1e6, 1),
+    )
+    return int8_path
+
+
+def _load_activation(model_name: str, directory: Path) -> str:
+    """Activation saved with the export; older exports fall back to the HF config."""
+    settings = directory / SETTINGS_FILENAME
+    if settings.exists():
+        return json.loads(settings.read_text())["activation"]
+    from transformers import AutoConfig  # type: ignore
+
+    config = AutoConfig.from_pretrained(model_name)
+    activation = default_activation(dict(config.to_dict(), num_labels=config.num_labels))
+    settings.write_text(json.dumps({"activation": activation}))
+    return activation
+
+
+def _bucket(length: int, buckets: Sequence[int]) -> int:
+    for boundary in buckets:
+        if length <= boundary:
+            return boundary
+    return buckets[-1] if buckets else length
+
+
+class OnnxCrossEncoder:
+    """ONNX Runtime cross-encoder with dynamic padding and length-bucketed batches."""
+
+    def __init__(
+        self,
+        session: Any,
+        tokenizer: Any,
+        max_length: int = 256,
+        batch_size: int = RERANK_ONNX_BATCH_SIZE,
+        buckets: Sequence[int] = RERANK_ONNX_BUCKETS,
+        activation: str = "sigmoid",
+    ):
+        if activation not in _ACTIVATIONS:
+            raise ValueError(f"Unknown reranker activation: {activation}")
+        self.session = session
+        self.activation = activation
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.batch_size = max(1, batch_size)
+        self.buckets = tuple(sorted(b for b in buckets if b <= max_length)) or (max_length,)
+        self._input_names = {i.name for i in session.get_inputs()}
+
+    @classmethod
+    def from_pretrained(
+        cls,
+        model_name: str,
+        max_length: int = 256,
+        quantize: bool = True,
+        cache_dir: Path = RERANK_ONNX_DIR,
+        threads: Optional[int] = None,
+    ) -> "OnnxCrossEncoder":
+        """Load the cached ONNX graph for ``model_name``, exporting it on first use."""
+        import onnxruntime as ort  # type: ignore
+        from transformers import AutoTokenizer  # type: ignore
+
+        directory = model_dir(model_name, cache_dir)
+        path = directory / (INT8_FILENAME if quantize else FP32_FILENAME)
+        if not path.exists():
+            path = export_onnx(model_name, directory, quantize=quantize)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+        tokenizer = AutoTokenizer.from_pretrained(str(directory))
+        activation = _load_activation(model_name, directory)
+        logger.info("Loaded ONNX reranker", model=model_name, path=str(path), quantized=quantize, activation=activation)
+        return cls(session, tokenizer, max_length=max_length, activation=activation)
+
+    def _batches(self, lengths: List[int]) -> List[List[int]]:
+        """Group pair indices by length bucket, shortest first, ``batch_size`` at a time."""
+        order = sorted(range(len(lengths)), key=lengths.__getitem__)
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_bucket = None
+        for index in order:
+            bucket = _bucket(lengths[index], self.buckets)
+            if current and (bucket != current_bucket or len(current) >= self.batch_size):
+                batches.append(current)
+                current = []
+            current.append(index)
+            current_bucket = bucket
+        if current:
+            batches.append(current)
+        return batches
+
+    def _feeds(self, encoded: Dict[str, List[List[int]]], indices: List[int]) -> Dict[str, np.ndarray]:
+        width = max(len(encoded["input_ids"][i]) for i in indices)
+        pad_id = self.tokenizer.pad_token_id or 0
+        feeds: Dict[str, np.ndarray] = {}
+        for name in _MODEL_INPUTS:
+            if name not in self._input_names:
+                continue
+            fill = pad_id if name == "input_ids" else 0
+            rows = np.full((len(indices), width), fill, dtype=np.int64)
+            for row, i in enumerate(indices):
+                values = encoded[name][i] if name in encoded else [0] * len(encoded["input_ids"][i])
+                rows[row, :len(values)] = values
+            feeds[name] = rows
+        return feeds
+
+    def predict(self, pairs: List[List[str]], **_: Any) -> List[float]:
+        """Score [query, document] pairs; returns activated scores in input order."""
+        if not pairs:
+            return []
+        encoded = self.tokenizer(
+            [pair[0] for pair in pairs],
+            [pair[1] for pair in pairs],
+            truncation="longest_first",
+            max_length=self.max_length,
+            padding=False,
+        )
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+        scores = np.zeros(len(pairs), dtype=np.float32)
+        for indices in self._batches(lengths):
+            logits = self.session.run(None, self._feeds(encoded, indices))[0]
+            scores[indices] = _ACTIVATIONS[self.activation](logits[:, 0])
+        return scores.tolist()
@@ -5,6 +5,20 @@ This module provides a production-grade reranking capability using the
 BGE-reranker-v2 model from BAAI. The reranker improves retrieval quality
 by reordering candidate chunks based on their actual relevance to the query.
 
+Cross-encoder scores are cached per (query, chunk_id, chunk text) in a
+process-wide ``RerankScoreCache``, so a second rerank pass after iterative
+retrieval only scores the newly added candidates. Queries are normalised
+(case, punctuation, whitespace) before hashing, so near-duplicate queries
+that miss the semantic cache still reuse scores within
+``RERANK_SCORE_CACHE_TTL`` seconds. Uncached pairs are scored on the
+dedicated, micro-batching ``rerank_inference`` service.
+
+The model runs on one of two backends, chosen with ``RERANK_BACKEND``:
+``torch`` (sentence-transformers ``CrossEncoder``, the default) or ``onnx``
+(an int8-quantized ONNX Runtime graph from ``api.tools.rerank_onnx``, fast
+enough for ``BAAI/bge-reranker-v2-m3`` on CPU). ``RERANK_MODEL`` and
+``RERANK_MAX_LENGTH`` pick the model and token budget.
+
 Usage:
     from api.reranker import BGEReranker
     
@@ -13,12 +27,19 @@ Usage:
 """
 
 import asyncio
+import copy
+import hashlib
 import logging
+import os
+import re
 import time
-from typing import List, Optional, Tuple
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 
 import structlog
 
+from api.tools.rerank_inference import rerank_inference
+
 # Optional dependency: sentence-transformers
 try:
     from sentence_transformers import CrossEncoder  # type: ignore
@@ -27,21 +48,96 @@ except Exception:  # pragma: no cover - optional in some environments (e.g., Stu
 
 logger = structlog.get_logger(__name__)
 
+RERANK_BACKEND = os.environ.get("RERANK_BACKEND", "torch").lower()  # torch | onnx
+RERANK_MODEL = os.environ.get("RERANK_MODEL", "cross-encoder/ms-marco-TinyBERT-L-2-v2")
+RERANK_MAX_LENGTH = int(os.environ.get("RERANK_MAX_LENGTH", "256"))
+RERANK_SCORE_CACHE_SIZE = int(os.environ.get("RERANK_SCORE_CACHE_SIZE", "50000"))  # entries
+RERANK_SCORE_CACHE_TTL = int(os.environ.get("RERANK_SCORE_CACHE_TTL", "900"))  # seconds
+
+ScoreKey = Tuple[str, str, str]
+
+
+class RerankScoreCache:
+    """Bounded LRU of cross-encoder scores keyed by (query hash, chunk_id, text hash)."""
+
+    def __init__(self, max_entries: int = RERANK_SCORE_CACHE_SIZE, ttl_seconds: float = RERANK_SCORE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._scores: "OrderedDict[ScoreKey, Tuple[float, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def query_hash(query: str, namespace: str = "") -> str:
+        normalised = " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+        return hashlib.sha1(f"{namespace}\x00{normalised}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def key(query_hash: str, chunk_id: str, text: str) -> ScoreKey:
+        return query_hash, chunk_id, hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get(self, key: ScoreKey) -> Optional[float]:
+        entry = self._scores.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.ttl_seconds:
+            if entry is not None:
+                del self._scores[key]
+            self.misses += 1
+            return None
+        self._scores.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: ScoreKey, score: float) -> None:
+        self._scores[key] = (score, time.monotonic())
+        self._scores.move_to_end(key)
+        while len(self._scores) > self.max_entries:
+            self._scores.popitem(last=False)
+
+    def clear(self) -> None:
+        self._scores.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._scores),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Process-wide score cache shared by reranker instances
+rerank_score_cache = RerankScoreCache()
+
 
 class BGEReranker:
     """Production BGE-reranker-v2 for improving retrieval quality."""
     
-    def __init__(self, model_name: str = "cross-encoder/ms-marco-TinyBERT-L-2-v2"):
+    def __init__(
+        self,
+        model_name: str = RERANK_MODEL,
+        score_cache: Optional[RerankScoreCache] = None,
+        backend: str = RERANK_BACKEND,
+        max_length: int = RERANK_MAX_LENGTH
+    ):
         """Initialize optimized reranker for <2.5s latency.
         
         Args:
             model_name: HuggingFace model name (using smallest/fastest model)
+            score_cache: Cache of (query, chunk) scores (defaults to the process-wide cache)
+            backend: "torch" (sentence-transformers) or "onnx" (int8 ONNX Runtime)
+            max_length: Maximum tokens per (query, chunk) pair
         """
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"Unknown reranker backend: {backend}")
         self.model_name = model_name
-        self.model: Optional[CrossEncoder] = None
+        self.backend = backend
+        self.max_length = max_length
+        self.score_cache = score_cache if score_cache is not None else rerank_score_cache
+        self.model = None  # CrossEncoder or OnnxCrossEncoder, both expose predict()
         self._loading = False
         self._model_cache = {}  # Cache loaded models
-        self._lib_available = CrossEncoder is not None
+        self._lib_available = CrossEncoder is not None or backend == "onnx"
         
     async def _load_model(self) -> None:
         """Load the reranker model (async to avoid blocking)."""
@@ -56,23 +152,17 @@ class BGEReranker:
                     model=self.model_name,
                 )
                 return
-            logger.info("Loading BGE reranker model", model=self.model_name)
+            logger.info("Loading BGE reranker model", model=self.model_name, backend=self.backend)
             start_time = time.time()
             
             # Load model in thread to avoid blocking (optimized for speed)
             loop = asyncio.get_event_loop()
-            self.model = await loop.run_in_executor(
-                None, 
-                lambda: CrossEncoder(
-                    self.model_name, 
-                    max_length=256,  # Reduced for speed
-                    device='cpu'     # Force CPU for consistent performance
-                )
-            )
+            self.model = await loop.run_in_executor(None, self._load_backend)
             
             load_time = time.time() - start_time
             logger.info("BGE reranker model loaded successfully", 
                        model=self.model_name, 
+                       backend=self.backend,
                        load_time_ms=round(load_time * 1000, 2))
                        
         except Exception as e:
@@ -83,6 +173,29 @@ class BGEReranker:
         finally:
             self._loading = False
     
+    def _load_backend(self):
+        """Build the scoring model for the configured backend (runs in a thread)."""
+        if self.backend == "onnx":
+            try:
+                from api.tools.rerank_inference import RERANK_INFERENCE_THREADS
+                from api.tools.rerank_onnx import OnnxCrossEncoder
+                
+                return OnnxCrossEncoder.from_pretrained(
+                    self.model_name,
+                    max_length=self.max_length,
+                    threads=RERANK_INFERENCE_THREADS
+                )
+            except ImportError as e:
+                logger.warning("ONNX reranker backend unavailable, falling back to torch",
+                              model=self.model_name, error=str(e))
+                if CrossEncoder is None:
+                    return None
+        return CrossEncoder(
+            self.model_name, 
+            max_length=self.max_length,  # Reduced for speed
+            device='cpu'                 # Force CPU for consistent performance
+        )
+    
     async def rerank(
         self, 
         query: str, 
@@ -112,11 +225,14 @@ class BGEReranker:
         start_time = time.time()
         
         try:
-            # Prepare query-document pairs for reranking
-            query_doc_pairs = []
-            for candidate in candidates:
+            query_hash = self.score_cache.query_hash(query, namespace=f"{self.backend}:{self.model_name}")
+            scores: List[Optional[float]] = []
+            pending: List[int] = []
+            pending_pairs = []
+            keys = []
+            for i, candidate in enumerate(candidates):
                 # Use chunk text if available, otherwise use a preview
-                doc_text = candidate.chunk_text
+                doc_text = getattr(candidate, "chunk_text", None) or getattr(candidate, "content", None)
                 if not doc_text:
                     # Fallback to metadata or empty string
                     doc_text = candidate.metadata.get("section_path", "")
@@ -124,32 +240,45 @@ class BGEReranker:
                 # Truncate for speed (shorter = faster inference)
                 if len(doc_text) > 500:
                     doc_text = doc_text[:500] + "..."
-                    
-                query_doc_pairs.append([query, doc_text])
+                
+                key = self.score_cache.key(query_hash, str(candidate.chunk_id), doc_text)
+                keys.append(key)
+                cached = self.score_cache.get(key)
+                scores.append(cached)
+                if cached is None:
+                    pending.append(i)
+                    pending_pairs.append([query, doc_text])
             
             logger.info("Starting BGE reranking", 
                        query_preview=query[:50],
-                       candidates=len(candidates))
+                       candidates=len(candidates),
+                       cached_scores=len(candidates) - len(pending))
             
-            # Run reranking in thread to avoid blocking
-            loop = asyncio.get_event_loop()
-            scores = await loop.run_in_executor(
-                None,
-                lambda: self.model.predict(query_doc_pairs)
-            )
+            if pending_pairs:
+                # Only score pairs not seen before, batched with concurrent queries
+                # on the dedicated inference pool
+                new_scores = await rerank_inference.score(self.model, pending_pairs)
+                for i, new_score in zip(pending, new_scores):
+                    scores[i] = float(new_score)
+                    self.score_cache.put(keys[i], scores[i])
             
-            # Create reranked results with new scores
+            # Score copies so callers' candidates (e.g. combined_results re-ranked
+            # after iterative retrieval) keep their original retrieval scores
             reranked_candidates = []
-            for i, (candidate, new_score) in enumerate(zip(candidates, scores)):
-                # Update confidence (score is read-only property that returns confidence)
-                candidate.confidence = float(new_score)
-                candidate.metadata.update({
-                    "original_confidence": candidate.confidence,
-                    "reranker_score": float(new_score),
+            for candidate, new_score in zip(candidates, scores):
+                reranked = copy.copy(candidate)
+                metadata = dict(candidate.metadata)
+                source = metadata.get("source", "unknown")
+                metadata.update({
+                    "original_confidence": metadata.get("original_confidence", candidate.confidence),
+                    "reranker_score": new_score,
                     "reranker_model": self.model_name,
-                    "source": f"{candidate.metadata.get('source', 'unknown')}_reranked"
+                    "source": source if source.endswith("_reranked") else f"{source}_reranked"
                 })
-                reranked_candidates.append(candidate)
+                reranked.metadata = metadata
+                # Update confidence (score is read-only property that returns confidence)
+                reranked.confidence = new_score
+                reranked_candidates.append(reranked)
             
             # Sort by new scores (descending)
             reranked_candidates.sort(key=lambda x: x.score, reverse=True)
@@ -161,6 +290,7 @@ class BGEReranker:
             
             logger.info("BGE reranking completed",
                        input_candidates=len(candidates),
+                       scored_pairs=len(pending_pairs),
                        output_results=len(final_results),
                        rerank_time_ms=round(rerank_time * 1000, 2),
                        top_score=final_results[0].score if final_results else 0,
@@ -12,16 +12,21 @@ import json
 import os
 import re
 import time
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple, Set
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Set
 
 import boto3
-import httpx
 import structlog
 from pydantic import BaseModel, Field, ConfigDict
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from api.doc_manifest import parent_doc_manifest
+from api.http_pool import HTTPClientPool, http_client_pool, r2_client_config
+from libs.caching.content_cache import NOT_MODIFIED, LoaderResult, r2_content_cache
+from libs.caching.embedding_service import current_embedding_service
+
 # Import reranker for quality improvement
 from api.tools.reranker import get_reranker, RerankerConfig
 from api.models import ChunkV3 as Chunk, ParentDocumentV3 as ParentDocument
@@ -48,6 +53,10 @@ R2_BUCKET_NAME = os.environ.get("R2_BUCKET_NAME") or os.environ.get("CLOUDFLARE_
 R2_CONCURRENT_REQUESTS = int(os.environ.get("R2_CONCURRENT_REQUESTS", "20"))  # Max concurrent R2 requests
 R2_REQUEST_TIMEOUT = int(os.environ.get("R2_REQUEST_TIMEOUT", "30"))  # R2 request timeout in seconds
 
+# Milvus multi-vector search configuration
+MILVUS_BATCH_SEARCH = os.environ.get("MILVUS_BATCH_SEARCH", "1") == "1"  # One request for all query variants
+MILVUS_SEARCH_CONCURRENCY = int(os.environ.get("MILVUS_SEARCH_CONCURRENCY", "4"))  # Fallback per-variant fan-out
+
 # OpenAI configuration for embeddings (must match index dim=3072)
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 OPENAI_EMBEDDING_MODEL = os.environ.get("OPENAI_EMBEDDING_MODEL", "text-embedding-3-large")
@@ -240,6 +249,14 @@ class QueryProcessor:
                 break
         return out
 
+    @classmethod
+    def dense_query_variants(cls, query: str, max_variants: int = 4) -> List[str]:
+        """Texts MilvusRetriever embeds for ``query`` (normalized original first)."""
+        normalized_query = cls.normalize_query(query)
+        clean_query, _ = cls.extract_date_context(normalized_query)
+        intent = cls.detect_intent(clean_query)
+        return cls.generate_reformulations(clean_query, intent, max_variants=max_variants)
+
     @staticmethod
     def extract_keywords(text: str) -> List[str]:
         """Neutral keyword extraction (kept for compatibility; not labor-specific)."""
@@ -251,10 +268,12 @@ class QueryProcessor:
 class MilvusClient:
     """Milvus client for vector operations."""
     
-    def __init__(self):
+    def __init__(self, http_pool: HTTPClientPool = http_client_pool):
+        self.http_pool = http_pool
         self.base_url = None
         self.headers = {}
         self.connected = False
+        self._batch_search_supported = True
     
     async def connect(self) -> bool:
         """Setup HTTP client for Milvus Cloud API."""
@@ -281,8 +300,8 @@ class MilvusClient:
             }
             
             # Test connection with collections list endpoint
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.post(f"{self.base_url}/collections/list", headers=self.headers)
+            async with self.http_pool.client("milvus", timeout=10.0) as client:
+                response = await client.post(f"{self.base_url}/collections/list", headers=self.headers, timeout=10.0)
                 if response.status_code == 200:
                     self.connected = True
                     logger.info("Milvus HTTP API connected", endpoint=self.base_url, collection=MILVUS_COLLECTION_NAME)
@@ -300,6 +319,84 @@ class MilvusClient:
         """No persistent connection to close in HTTP mode."""
         self.connected = False
     
+    @staticmethod
+    def _build_search_payload(
+        query_vectors: List[List[float]],
+        top_k: int,
+        doc_type_filter: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Build a Milvus Cloud HTTP API v2 search request for one or more vectors."""
+        search_payload = {
+            "collectionName": MILVUS_COLLECTION_NAME,
+            "data": query_vectors,
+            "limit": top_k,
+            "searchParams": {
+                "anns_field": "embedding",
+                "metric_type": "COSINE",
+                "params": {"radius": 0.0, "range_filter": 1.0}  # Return all results within cosine range
+            },
+            "outputFields": [
+                "chunk_id",           # v3.0 primary key
+                "parent_doc_id",      # For small-to-big expansion
+                "tree_node_id",       # PageIndex tree node reference
+                "chunk_object_key",   # For R2 content fetching
+                "source_document_key", # For document serving
+                "doc_type",           # Document type filtering
+                "num_tokens",         # Token count metadata
+                "nature",             # Legal document nature
+                "year",               # Publication year
+                "chapter",            # Chapter reference
+                "date_context"        # Date context
+            ]
+        }
+        
+        # Add filter expression if specified
+        if doc_type_filter:
+            types = ",".join([f'"{t}"' for t in doc_type_filter])
+            search_payload["filter"] = f"doc_type in [{types}]"
+        
+        return search_payload
+    
+    @staticmethod
+    def _hit_to_result(hit: Dict[str, Any]) -> RetrievalResult:
+        """Convert one Milvus search hit to a RetrievalResult."""
+        # Parse metadata if it's a JSON string
+        metadata = hit.get("metadata", {})
+        if isinstance(metadata, str):
+            try:
+                metadata = json.loads(metadata)
+            except:
+                metadata = {}
+        
+        # For v3.0 schema with enhanced metadata
+        chunk = Chunk(
+            chunk_id=str(hit.get("chunk_id", "")),
+            chunk_text="",  # Will be populated from R2 or parent expansion
+            doc_id=hit.get("parent_doc_id", ""),
+            doc_type=metadata.get("doc_type", "unknown"),
+            metadata=metadata,
+            entities={}
+        )
+        
+        return RetrievalResult(
+            chunk=chunk,
+            confidence=min(1.0, float(hit.get("distance", 0.5))),
+            metadata={
+                "source": "vector",
+                **metadata,
+                "tree_node_id": hit.get("tree_node_id", ""),
+                "chunk_object_key": hit.get("chunk_object_key", ""),  # Store R2 key
+                "parent_doc_id": hit.get("parent_doc_id", ""),        # 🔧 FIX: Explicitly store parent_doc_id
+                "source_document_key": hit.get("source_document_key", ""),
+                "doc_type": hit.get("doc_type", ""),
+                "num_tokens": hit.get("num_tokens", 0),
+                "nature": hit.get("nature", ""),
+                "year": hit.get("year", 0),
+                "chapter": hit.get("chapter", ""),
+                "date_context": hit.get("date_context", "")
+            }
+        )
+    
     @retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1, min=1, max=5))
     async def search_similar(
         self, 
@@ -314,38 +411,10 @@ class MilvusClient:
             return []
         
         try:
-            # Build search request payload for Milvus Cloud HTTP API v2
-            search_payload = {
-                "collectionName": MILVUS_COLLECTION_NAME,
-                "data": [query_vector],
-                "limit": top_k,
-                "searchParams": {
-                    "anns_field": "embedding",
-                    "metric_type": "COSINE",
-                    "params": {"radius": 0.0, "range_filter": 1.0}  # Return all results within cosine range
-                },
-                "outputFields": [
-                    "chunk_id",           # v3.0 primary key
-                    "parent_doc_id",      # For small-to-big expansion
-                    "tree_node_id",       # PageIndex tree node reference
-                    "chunk_object_key",   # For R2 content fetching
-                    "source_document_key", # For document serving
-                    "doc_type",           # Document type filtering
-                    "num_tokens",         # Token count metadata
-                    "nature",             # Legal document nature
-                    "year",               # Publication year
-                    "chapter",            # Chapter reference
-                    "date_context"        # Date context
-                ]
-            }
-            
-            # Add filter expression if specified
-            if doc_type_filter:
-                types = ",".join([f'"{t}"' for t in doc_type_filter])
-                search_payload["filter"] = f"doc_type in [{types}]"
+            search_payload = self._build_search_payload([query_vector], top_k, doc_type_filter)
             
             # Perform HTTP search
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with self.http_pool.client("milvus") as client:
                 response = await client.post(
                     f"{self.base_url}/entities/search",
                     headers=self.headers,
@@ -364,51 +433,7 @@ class MilvusClient:
                            raw_response=data if len(str(data)) < 500 else "Response too large")
                 
                 # Convert to RetrievalResult objects
-                retrieval_results = []
-                results = data.get("data", [])
-                if results:
-                    for hit in results:
-                        # Parse metadata if it's a JSON string
-                        metadata = hit.get("metadata", {})
-                        if isinstance(metadata, str):
-                            try:
-                                metadata = json.loads(metadata)
-                            except:
-                                metadata = {}
-                        
-                        # For v3.0 schema with enhanced metadata
-                        # Create ChunkV3 object for RetrievalResult
-                        from api.models import ChunkV3
-                        chunk = ChunkV3(
-                            chunk_id=str(hit.get("chunk_id", "")),
-                            chunk_text="",  # Will be populated from R2 or parent expansion
-                            doc_id=hit.get("parent_doc_id", ""),
-                            doc_type=metadata.get("doc_type", "unknown"),
-                            metadata=metadata,
-                            entities={}
-                        )
-                        
-                        retrieval_results.append(RetrievalResult(
-                            chunk=chunk,
-                            confidence=min(1.0, float(hit.get("distance", 0.5))),
-                            metadata={
-                                "source": "vector",
-                                **metadata,
-                                "tree_node_id": hit.get("tree_node_id", ""),
-                                "chapter": hit.get("chapter", ""),
-                                "nature": hit.get("nature", ""),
-                                "year": hit.get("year", ""),
-                                "chunk_object_key": hit.get("chunk_object_key", ""),  # Store R2 key
-                                "parent_doc_id": hit.get("parent_doc_id", ""),        # 🔧 FIX: Explicitly store parent_doc_id
-                                "source_document_key": hit.get("source_document_key", ""),
-                                "doc_type": hit.get("doc_type", ""),
-                                "num_tokens": hit.get("num_tokens", 0),
-                                "nature": hit.get("nature", ""),
-                                "year": hit.get("year", 0),
-                                "chapter": hit.get("chapter", ""),
-                                "date_context": hit.get("date_context", "")
-                            }
-                        ))
+                retrieval_results = [self._hit_to_result(hit) for hit in data.get("data", []) or []]
                 
                 logger.info(
                     "Vector search completed", 
@@ -422,35 +447,129 @@ class MilvusClient:
             logger.error("Vector search failed", error=str(e))
             return []
 
-    @retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=1, min=1, max=5))
+    async def _search_batched(
+        self,
+        query_vectors: List[List[float]],
+        top_k: int,
+        doc_type_filter: Optional[List[str]] = None,
+    ) -> Optional[List[List[RetrievalResult]]]:
+        """Search all vectors in one request (nq > 1).
+        
+        Returns None when the endpoint does not return per-vector result
+        groups, so the caller can fall back to concurrent single searches.
+        """
+        search_payload = self._build_search_payload(query_vectors, top_k, doc_type_filter)
+        try:
+            async with self.http_pool.client("milvus") as client:
+                response = await client.post(
+                    f"{self.base_url}/entities/search",
+                    headers=self.headers,
+                    json=search_payload
+                )
+            if response.status_code != 200:
+                logger.warning("Milvus batched search failed", status=response.status_code, response=response.text)
+                return None
+            groups = response.json().get("data", []) or []
+        except Exception as e:
+            logger.warning("Milvus batched search failed", error=str(e))
+            return None
+        
+        # Grouped responses are a list of hit lists, one per query vector; a flat
+        # hit list cannot be attributed to variants, so stop trying batch mode.
+        if len(groups) != len(query_vectors) or not all(isinstance(g, list) for g in groups):
+            logger.info("Milvus batched search returned ungrouped hits; using concurrent searches")
+            self._batch_search_supported = False
+            return None
+        
+        return [[self._hit_to_result(hit) for hit in group] for group in groups]
+    
+    @staticmethod
+    def _dedupe_across_variants(results: List[List[RetrievalResult]]) -> List[List[RetrievalResult]]:
+        """Keep each chunk only under the variant where it scored highest.
+        
+        The per-variant list shape is preserved so callers can still attribute
+        hits to ``variant_idx``; ``matched_variants`` records every variant
+        that returned the chunk.
+        """
+        best: Dict[str, Tuple[int, RetrievalResult]] = {}
+        matched: Dict[str, List[int]] = {}
+        for variant_idx, hits in enumerate(results):
+            for hit in hits:
+                chunk_id = hit.chunk_id
+                matched.setdefault(chunk_id, []).append(variant_idx)
+                if chunk_id not in best or hit.score > best[chunk_id][1].score:
+                    best[chunk_id] = (variant_idx, hit)
+        
+        deduped: List[List[RetrievalResult]] = [[] for _ in results]
+        for chunk_id, (variant_idx, hit) in best.items():
+            hit.metadata["variant_idx"] = variant_idx
+            hit.metadata["matched_variants"] = matched[chunk_id]
+            deduped[variant_idx].append(hit)
+        for hits in deduped:
+            hits.sort(key=lambda r: r.score, reverse=True)
+        return deduped
+    
     async def search_similar_multi(
         self,
         query_vectors: List[List[float]],
         top_k: int = 20,
         doc_type_filter: Optional[List[str]] = None,
     ) -> List[List[RetrievalResult]]:
-        """Search with multiple query vectors using HTTP API (sequential calls)."""
+        """Search with multiple query vectors, one result list per vector.
+        
+        Sends a single batched request when the endpoint supports it, otherwise
+        runs per-vector searches concurrently (bounded by
+        MILVUS_SEARCH_CONCURRENCY). Hits are deduplicated on chunk_id across
+        variants before being returned.
+        """
         if not self.connected:
             logger.warning("Milvus HTTP API not connected")
             return []
+        if not query_vectors:
+            return []
         
-        # For HTTP API, we'll make sequential calls for each vector
-        # This is less efficient than the SDK's batch mode, but keeps us under size limits
-        results = []
-        for query_vector in query_vectors:
-            single_result = await self.search_similar(
-                query_vector=query_vector,
-                top_k=top_k,
-                doc_type_filter=doc_type_filter
-            )
-            results.append(single_result)
+        start_time = time.time()
+        results: Optional[List[List[RetrievalResult]]] = None
+        mode = "concurrent"
+        
+        if MILVUS_BATCH_SEARCH and self._batch_search_supported and len(query_vectors) > 1:
+            results = await self._search_batched(query_vectors, top_k, doc_type_filter)
+            if results is not None:
+                mode = "batched"
+        
+        if results is None:
+            semaphore = asyncio.Semaphore(MILVUS_SEARCH_CONCURRENCY)
+            
+            async def search_one(query_vector: List[float]) -> List[RetrievalResult]:
+                async with semaphore:
+                    return await self.search_similar(
+                        query_vector=query_vector,
+                        top_k=top_k,
+                        doc_type_filter=doc_type_filter
+                    )
+            
+            results = list(await asyncio.gather(*(search_one(v) for v in query_vectors)))
         
+        raw_hits = sum(len(hits) for hits in results)
+        results = self._dedupe_across_variants(results)
+        
+        logger.info(
+            "Multi-vector search completed",
+            mode=mode,
+            variants=len(query_vectors),
+            raw_hits=raw_hits,
+            unique_hits=sum(len(hits) for hits in results),
+            latency_ms=round((time.time() - start_time) * 1000, 2)
+        )
         return results
 
 
 class EmbeddingClient:
     """OpenAI client for generating embeddings."""
     
+    def __init__(self, http_pool: HTTPClientPool = http_client_pool):
+        self.http_pool = http_pool
+    
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=10))
     async def get_embedding(self, text: str) -> Optional[List[float]]:
         """Get embedding for text using OpenAI API."""
@@ -466,7 +585,7 @@ class EmbeddingClient:
             return None
 
         try:
-            async with httpx.AsyncClient(timeout=httpx.Timeout(30.0)) as client:
+            async with self.http_pool.client("openai") as client:
                 response = await client.post(
                     "https://api.openai.com/v1/embeddings",
                     headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
@@ -480,7 +599,7 @@ class EmbeddingClient:
             return None
         
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with self.http_pool.client("openai", timeout=10.0) as client:
                 response = await client.post(
                     "https://api.openai.com/v1/embeddings",
                     headers={
@@ -532,8 +651,9 @@ class OpenAIReranker:
     """Optional reranker using OpenAI (lightweight prompt-based scoring)."""
     model: str
 
-    def __init__(self, model: str):
+    def __init__(self, model: str, http_pool: HTTPClientPool = http_client_pool):
         self.model = model
+        self.http_pool = http_pool
 
     async def rerank(self, query: str, candidates: List[RetrievalResult], max_items: int = 40) -> List[RetrievalResult]:
         # For efficiency and stability, apply deterministic boosts locally; skip remote call by default.
@@ -542,7 +662,7 @@ class OpenAIReranker:
         if not texts:
             return []
         try:
-            async with httpx.AsyncClient(timeout=15.0) as client:
+            async with self.http_pool.client("openai") as client:
                 response = await client.post(
                     "https://api.openai.com/v1/embeddings",
                     headers={
@@ -566,7 +686,7 @@ class OpenAIReranker:
             return None
         
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with self.http_pool.client("openai", timeout=10.0) as client:
                 response = await client.post(
                     "https://api.openai.com/v1/embeddings",
                     headers={
@@ -619,36 +739,36 @@ class MilvusRetriever(BaseRetriever):
         object.__setattr__(self, 'top_k', top_k)
     
     def _get_relevant_documents(
-        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, top_k: Optional[int] = None
     ) -> List[Document]:
         """Synchronous wrapper - not used in async context."""
         raise NotImplementedError("Use aget_relevant_documents for async retrieval")
     
     async def _aget_relevant_documents(
-        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, top_k: Optional[int] = None
     ) -> List[Document]:
-        """Async retrieval from Milvus with LangSmith tracing."""
+        """Async retrieval from Milvus with LangSmith tracing.
+        
+        ``top_k`` is a per-call override so a shared retriever can serve
+        requests with different adaptive parameters without being mutated.
+        """
         
         # Handle both string and dict input from LCEL chain
         if isinstance(query, dict):
             query = query.get("query", str(query))
         
+        top_k = top_k or self.top_k
+        
         # Connect to Milvus if needed
         if not self.milvus_client.connected:
             await self.milvus_client.connect()
         
-        # Process query and generate embeddings
-        normalized_query = self.query_processor.normalize_query(query)
-        clean_query, _ = self.query_processor.extract_date_context(normalized_query)
-        intent = self.query_processor.detect_intent(clean_query)
-        
         # Generate query variants for better recall
-        variants = self.query_processor.generate_reformulations(
-            clean_query, intent, max_variants=4
-        )
+        variants = self.query_processor.dense_query_variants(query, max_variants=4)
         
-        # Get embeddings for all variants
-        embeddings = await self.embedding_client.get_embeddings(variants)
+        # Get embeddings for all variants (reusing any the request already computed)
+        embedder = current_embedding_service() or self.embedding_client
+        embeddings = await embedder.get_embeddings(variants)
         if not embeddings:
             logger.warning("No embeddings generated for Milvus retrieval")
             return []
@@ -657,7 +777,7 @@ class MilvusRetriever(BaseRetriever):
         doc_types = ["act", "ordinance", "si", "constitution"]
         dense_hits_by_variant = await self.milvus_client.search_similar_multi(
             query_vectors=embeddings,
-            top_k=self.top_k,
+            top_k=top_k,
             doc_type_filter=doc_types,
         )
         
@@ -702,22 +822,22 @@ class BM25Retriever(BaseRetriever):
         object.__setattr__(self, 'top_k', top_k)
     
     def _get_relevant_documents(
-        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, top_k: Optional[int] = None
     ) -> List[Document]:
         """Synchronous wrapper - not used in async context."""
         raise NotImplementedError("Use aget_relevant_documents for async retrieval")
     
     async def _aget_relevant_documents(
-        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, top_k: Optional[int] = None
     ) -> List[Document]:
-        """Async retrieval from BM25 with LangSmith tracing."""
+        """Async retrieval from BM25 with LangSmith tracing (``top_k`` overrides per call)."""
         
         # Handle both string and dict input from LCEL chain
         if isinstance(query, dict):
             query = query.get("query", str(query))
         
         # Perform BM25 search
-        bm25_results = await self.bm25_provider.search(query, top_k=self.top_k)
+        bm25_results = await self.bm25_provider.search(query, top_k=top_k or self.top_k)
         
         # Convert to LangChain Documents
         documents = []
@@ -755,17 +875,23 @@ class RetrievalEngine:
     - Full LangSmith tracing and observability
     """
     
-    def __init__(self):
-        # Initialize core components
-        self.milvus_client = MilvusClient()
-        self.embedding_client = EmbeddingClient()
+    def __init__(self, http_pool: HTTPClientPool = http_client_pool):
+        # Initialize core components (HTTP connections come from the shared pool)
+        self.milvus_client = MilvusClient(http_pool)
+        self.embedding_client = EmbeddingClient(http_pool)
         self.query_processor = QueryProcessor()
         self._r2_client = None  # Initialize R2 client attribute
-        self._r2_semaphore = asyncio.Semaphore(5)  # Limit concurrent R2 requests
-        
-        # Initialize BM25 provider
-        from api.bm25_provider import ProductionBM25Provider
-        self.bm25_provider = ProductionBM25Provider()
+        # Limit concurrent R2 requests (shared by all requests when the engine is pooled)
+        self._r2_semaphore = asyncio.Semaphore(R2_CONCURRENT_REQUESTS)
+        # doc_id -> parent document key manifest (shared, loaded lazily from R2)
+        self.doc_manifest = parent_doc_manifest
+        # Parsed chunk/parent objects: in-process LRU + on-disk store (shared)
+        self.content_cache = r2_content_cache
+        
+        # Share the process-wide BM25 provider so the index is loaded once per
+        # process rather than once per engine
+        from api.bm25_provider import production_bm25_provider
+        self.bm25_provider = production_bm25_provider
         
         # Initialize LangChain retrievers
         self.milvus_retriever = MilvusRetriever(
@@ -836,46 +962,76 @@ class RetrievalEngine:
                 endpoint_url=R2_ENDPOINT,
                 aws_access_key_id=R2_ACCESS_KEY,
                 aws_secret_access_key=R2_SECRET_KEY,
-                region_name='auto'  # R2 uses 'auto' region
+                region_name='auto',  # R2 uses 'auto' region
+                config=r2_client_config()  # Pool sized to R2_CONCURRENT_REQUESTS
             )
         return self._r2_client
     
+    async def _load_r2_object(self, object_key: str, if_none_match: Optional[str] = None) -> LoaderResult:
+        """Content-cache loader: GET an R2 object, optionally conditional on its ETag.
+        
+        Returns (body, etag), NOT_MODIFIED, or None if the key does not exist;
+        other errors propagate so they are not negatively cached.
+        """
+        r2_client = self._get_r2_client()
+        request = {"Bucket": R2_BUCKET_NAME, "Key": object_key}
+        if if_none_match:
+            request["IfNoneMatch"] = if_none_match
+        
+        def get_object():
+            response = r2_client.get_object(**request)
+            return response['Body'].read(), response.get('ETag')
+        
+        async with self._r2_semaphore:  # Limit concurrent requests
+            try:
+                # Use asyncio to make the sync boto3 call non-blocking
+                loop = asyncio.get_event_loop()
+                body, etag = await loop.run_in_executor(None, get_object)
+            except Exception as e:
+                error = getattr(e, "response", None) or {}
+                status = error.get("ResponseMetadata", {}).get("HTTPStatusCode")
+                code = error.get("Error", {}).get("Code")
+                if status == 304 or code == "304":
+                    return NOT_MODIFIED
+                if status == 404 or code in ("NoSuchKey", "404"):
+                    return None
+                raise
+        
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        return body, etag if isinstance(etag, str) else None
+    
     async def _fetch_chunk_content_from_r2(self, chunk_object_key: str) -> Optional[Chunk]:
-        """Fetch single chunk content from R2.
+        """Fetch single chunk content from R2 through the tiered content cache.
         
         Args:
             chunk_object_key: R2 object key for the chunk (e.g., 'corpus/chunks/act/chunk_001.json')
             
         Returns:
-            Dict containing chunk data including chunk_text, or None if fetch fails
+            Parsed chunk (a copy of the cached object), or None if fetch fails
         """
         r2_client = self._get_r2_client()
         if not r2_client:
             return None
-            
-        async with self._r2_semaphore:  # Limit concurrent requests
-            try:
-                # Use asyncio to make the sync boto3 call non-blocking
-                loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(
-                    None,
-                    lambda: r2_client.get_object(
-                        Bucket=R2_BUCKET_NAME,
-                        Key=chunk_object_key
-                    )
-                )
-                
-                content = response['Body'].read().decode('utf-8')
-                chunk_dict = json.loads(content)
-                return Chunk(**chunk_dict)
-                
-            except Exception as e:
-                logger.warning(
-                    "Failed to fetch chunk content from R2",
-                    chunk_key=chunk_object_key,
-                    error=str(e)
-                )
-                return None
+        
+        try:
+            chunk = await self.content_cache.get_or_load(
+                chunk_object_key,
+                lambda etag: self._load_r2_object(chunk_object_key, etag),
+                parse=lambda body: Chunk(**json.loads(body)),
+            )
+        except Exception as e:
+            logger.warning(
+                "Failed to fetch chunk content from R2",
+                chunk_key=chunk_object_key,
+                error=str(e)
+            )
+            return None
+        
+        if chunk is None:
+            logger.warning("Chunk content not found in R2", chunk_key=chunk_object_key)
+            return None
+        return chunk.model_copy()
     
     async def _fetch_chunk_contents_batch(self, chunk_object_keys: List[str]) -> List[Optional[Chunk]]:
         """Fetch multiple chunk contents from R2 in parallel.
@@ -933,52 +1089,56 @@ class RetrievalEngine:
         return processed_results
 
     async def _fetch_parent_document_from_r2(self, parent_doc_id: str, doc_type: str = "") -> Optional[ParentDocument]:
-        """Fetch full parent document from R2 for small-to-big retrieval."""
+        """Fetch full parent document from R2 for small-to-big retrieval.
+        
+        The exact key comes from the ingest-time doc_id manifest, so this is one
+        GET; guessing keys by probing is only a fallback for unmanifested docs.
+        """
         r2_client = self._get_r2_client()
         if not r2_client:
             return None
-        # Construct parent document object key.
-        # Note: In V3, parent_doc_id is the canonical doc_id, so we can look it up directly.
-        # The doc_type helps narrow the path for efficiency but is not strictly required if IDs are unique.
-        possible_prefixes = [f"corpus/docs/{doc_type}/", "corpus/docs/"] if doc_type else ["corpus/docs/"]
-        
-        for prefix in possible_prefixes:
-            # Attempt to find the document in primary and fallback locations
-            # This is robust to cases where doc_type might be missing from metadata
-            # but the doc_id is globally unique.
-            for dt in ["act", "si", "judgment", "constitution", "ordinance", ""]:
-                key = f"{prefix}{dt}/{parent_doc_id}.json" if dt else f"{prefix}{parent_doc_id}.json"
-                result = await self._fetch_parent_document_from_r2_key(key)
-                if result:
-                    return result
+        
+        manifest_key = await self.doc_manifest.resolve(parent_doc_id, self._get_r2_client)
+        if manifest_key:
+            result = await self._fetch_parent_document_from_r2_key(manifest_key)
+            if result:
+                return result
+        
+        # Fallback: probe candidate keys. The doc_type folder is tried first; the
+        # remaining folders cover chunks whose doc_type metadata is missing or stale.
+        candidate_keys = [f"corpus/docs/{doc_type}/{parent_doc_id}.json"] if doc_type else []
+        for dt in ["act", "si", "judgment", "constitution", "ordinance", ""]:
+            candidate_keys.append(f"corpus/docs/{dt}/{parent_doc_id}.json" if dt else f"corpus/docs/{parent_doc_id}.json")
+        
+        for key in dict.fromkeys(candidate_keys):
+            if key == manifest_key:
+                continue
+            self.doc_manifest.stats["fallback_probes"] += 1
+            result = await self._fetch_parent_document_from_r2_key(key)
+            if result:
+                self.doc_manifest.record(parent_doc_id, key)
+                logger.info("Parent document resolved by probing", doc_id=parent_doc_id, key=key)
+                return result
         
         logger.warning("Parent document not found in any known R2 path", doc_id=parent_doc_id)
         return None
     
     async def _fetch_parent_document_from_r2_key(self, parent_object_key: str) -> Optional[ParentDocument]:
-        """Fetch parent document by exact R2 key."""
-        async with self._r2_semaphore:
-            try:
-                loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(
-                    None,
-                    lambda: self._get_r2_client().get_object(
-                        Bucket=R2_BUCKET_NAME,
-                        Key=parent_object_key
-                    )
-                )
-                
-                content = response['Body'].read().decode('utf-8')
-                parent_dict = json.loads(content)
-                return ParentDocument(**parent_dict)
-                
-            except Exception as e:
-                logger.debug(
-                    "Parent document not found at key",
-                    key=parent_object_key,
-                    error=str(e)
-                )
-                return None
+        """Fetch parent document by exact R2 key (missing keys are negatively cached)."""
+        try:
+            parent = await self.content_cache.get_or_load(
+                parent_object_key,
+                lambda etag: self._load_r2_object(parent_object_key, etag),
+                parse=lambda body: ParentDocument(**json.loads(body)),
+            )
+        except Exception as e:
+            logger.debug(
+                "Parent document not found at key",
+                key=parent_object_key,
+                error=str(e)
+            )
+            return None
+        return parent.model_copy() if parent is not None else None
     
     async def _fetch_parent_documents_batch(self, parent_doc_requests: List[tuple]) -> List[Optional[ParentDocument]]:
         """Fetch multiple parent documents in parallel.
@@ -1152,6 +1312,28 @@ class RetrievalEngine:
 
     # Legacy shortcut methods removed - using modern vector + BM25 retrieval only
     
+    async def warmup(self) -> None:
+        """Eagerly establish connections and load indexes.
+        
+        Called once by the registry at application startup so that queries
+        in steady state perform no connection setup or index loads.
+        """
+        start_time = time.time()
+        milvus_ok = await self.milvus_client.connect()
+        bm25_ok = await self.bm25_provider._ensure_index_loaded()
+        r2_ok = self._get_r2_client() is not None
+        if r2_ok:
+            await self.doc_manifest.ensure_loaded(self._get_r2_client)
+        
+        logger.info(
+            "Retrieval engine warmed up",
+            milvus_connected=milvus_ok,
+            bm25_loaded=bm25_ok,
+            r2_configured=r2_ok,
+            parent_manifest_docs=len(self.doc_manifest),
+            duration_ms=round((time.time() - start_time) * 1000, 2)
+        )
+    
     async def __aenter__(self):
         """Async context manager entry."""
         await self.milvus_client.connect()
@@ -1329,6 +1511,72 @@ class RetrievalEngine:
         return round(weighted_confidence, 3)
 
 
+class RetrievalEngineRegistry:
+    """
+    Process-wide registry owning the shared RetrievalEngine.
+    
+    The FastAPI lifespan calls ``startup()`` once so every graph node reuses the
+    same retrievers, R2 client, Milvus connection and loaded BM25 index. Outside
+    the app (scripts, tests, LangGraph Studio) ``lease()`` falls back to a
+    short-lived engine per call, matching the previous behaviour.
+    """
+    
+    def __init__(self):
+        self._engine: Optional[RetrievalEngine] = None
+        self._lock = asyncio.Lock()
+    
+    @property
+    def is_started(self) -> bool:
+        return self._engine is not None
+    
+    async def startup(self) -> RetrievalEngine:
+        """Create and warm the shared engine (idempotent)."""
+        async with self._lock:
+            if self._engine is None:
+                engine = RetrievalEngine()
+                try:
+                    await engine.warmup()
+                except Exception as e:
+                    # Components connect lazily, so a failed warmup is not fatal
+                    logger.warning("Retrieval engine warmup failed", error=str(e))
+                self._engine = engine
+                logger.info("Shared retrieval engine registered")
+            return self._engine
+    
+    async def shutdown(self) -> None:
+        """Release the shared engine's connections."""
+        async with self._lock:
+            if self._engine is not None:
+                await self._engine.milvus_client.disconnect()
+                self._engine = None
+                logger.info("Shared retrieval engine released")
+    
+    def get_engine(self) -> RetrievalEngine:
+        """Return the shared engine, or a new lazily-connecting engine if none is registered."""
+        if self._engine is not None:
+            return self._engine
+        return RetrievalEngine()
+    
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[RetrievalEngine]:
+        """Yield the shared engine, or a per-call engine if none is registered.
+        
+        The shared engine is never disconnected on exit; callers pass
+        per-request parameters (e.g. ``top_k``) at call time instead of
+        mutating its retrievers.
+        """
+        if self._engine is not None:
+            yield self._engine
+            return
+        
+        async with RetrievalEngine() as engine:
+            yield engine
+
+
+# Singleton registry, started by the API lifespan
+retrieval_engine_registry = RetrievalEngineRegistry()
+
+
 # Convenience functions for direct use
 
 async def search_legal_documents(
@@ -1349,7 +1597,7 @@ async def search_legal_documents(
         min_score=min_score
     )
     
-    engine = RetrievalEngine()
+    engine = retrieval_engine_registry.get_engine()
     results = await engine.retrieve(query, config)
     confidence = engine.calculate_confidence(results)
     
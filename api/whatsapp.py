@@ -2,6 +2,10 @@
 
 This module handles WhatsApp webhook verification and message processing.
 Follows Meta's WhatsApp Business API specifications.
+
+Inbound messages are handed to ``api.whatsapp_queue`` so the webhook can
+acknowledge immediately; answers are sent over the pooled "whatsapp" HTTP
+client.
 """
 
 from __future__ import annotations
@@ -17,9 +21,11 @@ from fastapi import HTTPException, Request, status
 from pydantic import BaseModel, Field
 
 from libs.common.settings import get_settings
+from api.http_pool import http_client_pool
 from api.models import QueryRequest, QueryResponse
 from api.tools.retrieval_engine import search_legal_documents
 from api.composer.synthesis import compose_legal_answer
+from api.whatsapp_queue import whatsapp_queue
 
 logger = structlog.get_logger(__name__)
 
@@ -262,7 +268,7 @@ async def send_whatsapp_message(
     }
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with http_client_pool.client("whatsapp", timeout=10.0) as client:
             response = await client.post(url, json=payload, headers=headers)
             response.raise_for_status()
             
@@ -406,9 +412,33 @@ async def process_whatsapp_message(message: WhatsAppMessage, from_number: str) -
         )
 
 
+async def answer_whatsapp_message(message: WhatsAppMessage, state: dict[str, Any] | None = None) -> None:
+    """Compose and send the answer to one inbound message.
+    
+    Args:
+        message: WhatsApp message object
+        state: Per-job scratch space kept across queue retries, so a failed
+            send is retried without recomposing the answer
+    """
+    state = state if state is not None else {}
+    if "response_text" not in state:
+        state["response_text"] = await process_whatsapp_message(message, message.from_)
+    await send_whatsapp_message(message.from_, state["response_text"])
+
+
+async def _run_whatsapp_job(message: dict[str, Any], state: dict[str, Any]) -> None:
+    await answer_whatsapp_message(WhatsAppMessage.model_validate(message), state)
+
+
+whatsapp_queue.register(_run_whatsapp_job)
+
+
 async def handle_whatsapp_webhook(request: Request, payload: WhatsAppWebhookPayload) -> dict[str, str]:
     """Handle incoming WhatsApp webhook.
     
+    Messages are queued for the worker pool and the webhook returns right
+    away; without a running queue they are answered inline.
+    
     Args:
         request: FastAPI request object
         payload: Parsed webhook payload
@@ -445,12 +475,12 @@ async def handle_whatsapp_webhook(request: Request, payload: WhatsAppWebhookPayl
                     # Get sender info
                     from_number = message.from_
                     
-                    # Process message and get response
-                    response_text = await process_whatsapp_message(message, from_number)
+                    if await whatsapp_queue.submit(message.model_dump(by_alias=True), from_number):
+                        continue
                     
-                    # Send response back
+                    # Process message and send the response inline
                     try:
-                        await send_whatsapp_message(from_number, response_text)
+                        await answer_whatsapp_message(message)
                     except Exception as e:
                         logger.error(
                             "Failed to send WhatsApp response",
@@ -0,0 +1,414 @@
+"""Lifespan-owned job queue and worker pool for WhatsApp webhook messages.
+
+The webhook used to retrieve, compose and send each answer inline before
+returning 200. Meta retries webhooks that take too long, so a burst of slow
+answers turned into duplicate work and timeouts. The webhook now only
+enqueues each message and acknowledges immediately.
+
+Jobs are appended to a Redis stream (``WHATSAPP_STREAM``) and read through a
+consumer group. Each process is its own consumer (``hostname-pid`` unless
+``WHATSAPP_CONSUMER`` is set), so uvicorn workers on one host never share
+pending entries. Jobs a process holds are re-claimed on every sweep to keep
+them fresh; entries left pending by a crashed or replaced process go idle
+and are taken over with ``XAUTOCLAIM`` once idle for
+``WHATSAPP_CLAIM_IDLE_SECONDS``. Before enqueueing, the WhatsApp message id
+is claimed with ``SET NX`` for ``WHATSAPP_DEDUP_TTL`` seconds, so Meta's
+redeliveries are dropped.
+
+A reader task hands each job to one of ``WHATSAPP_WORKERS`` lanes, chosen by
+a hash of the sender's number. Each lane processes its jobs one at a time,
+so one sender's messages are answered in the order they arrived while
+different senders are served concurrently. Ordering is per process: with
+several workers, consecutive messages from one sender can be read by
+different processes and answered concurrently. A failed job is retried in its
+lane with exponential backoff (``WHATSAPP_RETRY_BASE_SECONDS``), up to
+``WHATSAPP_MAX_ATTEMPTS`` attempts. After that it is copied to
+``WHATSAPP_DEAD_LETTER_STREAM`` and acknowledged. Entries that cannot be
+parsed are dead-lettered and acknowledged without being processed. If the
+dead-letter write itself fails, the entry stays pending and is claimed again
+after ``WHATSAPP_CLAIM_IDLE_SECONDS``.
+
+When the queue is not running (no Redis, scripts, tests), ``submit()``
+returns False and the webhook processes the message inline as before.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import socket
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+WHATSAPP_STREAM = os.environ.get("WHATSAPP_STREAM", "whatsapp:jobs")
+WHATSAPP_DEAD_LETTER_STREAM = os.environ.get("WHATSAPP_DEAD_LETTER_STREAM", "whatsapp:dead")
+WHATSAPP_CONSUMER_GROUP = os.environ.get("WHATSAPP_CONSUMER_GROUP", "whatsapp-workers")
+WHATSAPP_CONSUMER = os.environ.get("WHATSAPP_CONSUMER", "")  # default: hostname-pid, resolved at startup
+WHATSAPP_CLAIM_IDLE_SECONDS = float(os.environ.get("WHATSAPP_CLAIM_IDLE_SECONDS", "300"))
+WHATSAPP_WORKERS = int(os.environ.get("WHATSAPP_WORKERS", "4"))
+WHATSAPP_MAX_ATTEMPTS = int(os.environ.get("WHATSAPP_MAX_ATTEMPTS", "4"))
+WHATSAPP_RETRY_BASE_SECONDS = float(os.environ.get("WHATSAPP_RETRY_BASE_SECONDS", "1"))
+WHATSAPP_DEDUP_TTL = int(os.environ.get("WHATSAPP_DEDUP_TTL", "86400"))  # seconds
+WHATSAPP_STREAM_MAXLEN = int(os.environ.get("WHATSAPP_STREAM_MAXLEN", "10000"))
+WHATSAPP_DRAIN_SECONDS = float(os.environ.get("WHATSAPP_DRAIN_SECONDS", "10"))
+
+_DEDUP_PREFIX = "whatsapp:seen:"
+_LANE_DEPTH = 100  # jobs buffered per lane before the reader waits
+_READ_BLOCK_MS = 1000
+
+JobHandler = Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[None]]
+
+
+@dataclass
+class WhatsAppJob:
+    """One queued inbound message."""
+
+    entry_id: str
+    message_id: str
+    sender: str
+    message: Dict[str, Any]
+    enqueued_at: float
+
+
+@dataclass
+class WhatsAppQueueMetrics:
+    """Counters for the WhatsApp job queue."""
+
+    enqueued: int = 0
+    duplicates: int = 0
+    processed: int = 0
+    retried: int = 0
+    reclaimed: int = 0
+    dead_lettered: int = 0
+    total_latency_ms: float = 0.0
+
+    def snapshot(self, depth: int) -> Dict[str, Any]:
+        return {
+            "depth": depth,
+            "enqueued": self.enqueued,
+            "duplicates": self.duplicates,
+            "processed": self.processed,
+            "retried": self.retried,
+            "reclaimed": self.reclaimed,
+            "dead_lettered": self.dead_lettered,
+            "avg_latency_ms": round(self.total_latency_ms / self.processed, 2) if self.processed else 0.0,
+        }
+
+
+class WhatsAppJobQueue:
+    """Process-wide Redis stream consumer with per-sender ordered worker lanes.
+
+    ``handler(message, state)`` processes one message. ``state`` is a dict
+    kept across retries of the same job, so a handler can store the composed
+    answer and only repeat the send when a retry happens.
+    """
+
+    def __init__(
+        self,
+        stream: str = WHATSAPP_STREAM,
+        group: str = WHATSAPP_CONSUMER_GROUP,
+        consumer: str = WHATSAPP_CONSUMER,
+        workers: int = WHATSAPP_WORKERS,
+        max_attempts: int = WHATSAPP_MAX_ATTEMPTS,
+        retry_base: float = WHATSAPP_RETRY_BASE_SECONDS,
+        dedup_ttl: int = WHATSAPP_DEDUP_TTL,
+        claim_idle: float = WHATSAPP_CLAIM_IDLE_SECONDS,
+    ):
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer
+        self.claim_idle = claim_idle
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self.dedup_ttl = dedup_ttl
+        self._redis: Any = None
+        self._handler: Optional[JobHandler] = None
+        self._lanes: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._reader: Optional[asyncio.Task] = None
+        self._held: Set[str] = set()  # entry ids read by this process and not yet acknowledged
+        self._metrics = WhatsAppQueueMetrics()
+
+    @property
+    def is_started(self) -> bool:
+        return self._reader is not None
+
+    def register(self, handler: JobHandler) -> None:
+        """Set the message handler (called once by the webhook module)."""
+        self._handler = handler
+
+    async def startup(self, redis_client: Any = None) -> None:
+        """Create the consumer group and start the reader and lanes.
+
+        Without a Redis client the queue stays stopped and callers process
+        messages inline.
+        """
+        if self._reader is not None:
+            return
+        if redis_client is None:
+            from libs.caching.redis_client import get_redis_client
+            redis_client = await get_redis_client()
+        if redis_client is None:
+            logger.warning("Redis unavailable, WhatsApp messages will be processed inline")
+            return
+        try:
+            await redis_client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                logger.warning("Failed to create WhatsApp consumer group", error=str(e))
+                return
+        self._redis = redis_client
+        # Resolved here rather than at import so forked workers get their own pid
+        self.consumer = self.consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self._lanes = [asyncio.Queue(maxsize=_LANE_DEPTH) for _ in range(self.workers)]
+        self._tasks = [
+            asyncio.create_task(self._run_lane(lane), name=f"whatsapp-lane-{i}")
+            for i, lane in enumerate(self._lanes)
+        ]
+        self._reader = asyncio.create_task(self._read(), name="whatsapp-reader")
+        logger.info("WhatsApp job queue started", stream=self.stream, consumer=self.consumer, workers=self.workers)
+
+    async def submit(self, message: Dict[str, Any], sender: str) -> bool:
+        """Queue an inbound message for the worker pool.
+
+        Returns False when the queue is not running and the caller should
+        process the message itself. Returns True once the message is queued,
+        or skipped because its id was already seen.
+        """
+        if self._reader is None or self._handler is None:
+            return False
+        message_id = message.get("id", "")
+        try:
+            if message_id:
+                claimed = await self._redis.set(_DEDUP_PREFIX + message_id, "1", nx=True, ex=self.dedup_ttl)
+                if not claimed:
+                    self._metrics.duplicates += 1
+                    logger.info("Duplicate WhatsApp message skipped", message_id=message_id)
+                    return True
+            await self._redis.xadd(
+                self.stream,
+                {
+                    "message_id": message_id,
+                    "sender": sender,
+                    "message": json.dumps(message),
+                    "enqueued_at": str(time.time()),
+                },
+                maxlen=WHATSAPP_STREAM_MAXLEN,
+                approximate=True,
+            )
+        except Exception as e:
+            logger.warning("Failed to enqueue WhatsApp message, processing inline", message_id=message_id, error=str(e))
+            return False
+        self._metrics.enqueued += 1
+        return True
+
+    def _lane_for(self, sender: str) -> asyncio.Queue:
+        return self._lanes[zlib.crc32(sender.encode("utf-8")) % len(self._lanes)]
+
+    @staticmethod
+    def _job(entry_id: str, fields: Dict[str, Any]) -> WhatsAppJob:
+        return WhatsAppJob(
+            entry_id=entry_id,
+            message_id=fields.get("message_id", ""),
+            sender=fields.get("sender", ""),
+            message=json.loads(fields.get("message", "{}")),
+            enqueued_at=float(fields.get("enqueued_at", time.time())),
+        )
+
+    async def _dispatch(self, entry_id: str, fields: Dict[str, Any]) -> None:
+        if not fields:
+            # Deleted before it was acknowledged; nothing left to process
+            await self._ack(entry_id)
+            return
+        try:
+            job = self._job(entry_id, fields)
+        except (TypeError, ValueError) as e:
+            # Retrying cannot fix a malformed entry; park it and move on
+            logger.error("Malformed WhatsApp job, moving to dead letter stream", entry_id=entry_id, error=str(e))
+            self._metrics.dead_lettered += 1
+            if await self._dead_letter({**fields, "error": f"malformed: {e}"}):
+                await self._ack(entry_id)
+            return
+        self._held.add(entry_id)
+        await self._lane_for(job.sender).put(job)
+
+    async def _dead_letter(self, fields: Dict[str, Any]) -> bool:
+        try:
+            await self._redis.xadd(
+                WHATSAPP_DEAD_LETTER_STREAM, fields, maxlen=WHATSAPP_STREAM_MAXLEN, approximate=True
+            )
+            return True
+        except Exception as e:
+            logger.warning("Failed to write WhatsApp dead letter", message_id=fields.get("message_id"), error=str(e))
+            return False
+
+    async def _ack(self, entry_id: str) -> None:
+        try:
+            await self._redis.xack(self.stream, self.group, entry_id)
+            await self._redis.xdel(self.stream, entry_id)
+        except Exception as e:
+            logger.warning("Failed to acknowledge WhatsApp job", entry_id=entry_id, error=str(e))
+
+    async def _sweep(self) -> None:
+        """Refresh the idle time of held jobs, then take over abandoned ones.
+
+        Held jobs (queued in a lane or being processed) are re-claimed by this
+        consumer so a slow backlog is never mistaken for a dead consumer's.
+        Entries idle for ``claim_idle`` belong to a consumer that stopped
+        without acknowledging them (crash, redeploy) and are claimed here.
+        """
+        min_idle_ms = int(self.claim_idle * 1000)
+        try:
+            if self._held:
+                await self._redis.xclaim(
+                    self.stream, self.group, self.consumer, min_idle_time=0,
+                    message_ids=list(self._held), justid=True,
+                )
+            start = "0-0"
+            while True:
+                response = await self._redis.xautoclaim(
+                    self.stream, self.group, self.consumer, min_idle_time=min_idle_ms, start_id=start, count=50
+                )
+                start, entries = response[0], response[1]
+                for entry_id, fields in entries:
+                    if entry_id in self._held:
+                        continue
+                    self._metrics.reclaimed += 1
+                    logger.info("Reclaimed abandoned WhatsApp job", entry_id=entry_id)
+                    await self._dispatch(entry_id, fields)
+                if not entries or start in ("0-0", b"0-0"):
+                    break
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("WhatsApp pending sweep failed", error=str(e))
+
+    async def _read(self) -> None:
+        # Start with this consumer's unacknowledged history (jobs in flight at
+        # the last shutdown, when WHATSAPP_CONSUMER is a stable name), then
+        # switch to new entries
+        cursor = "0"
+        loop = asyncio.get_running_loop()
+        next_sweep = loop.time()
+        while True:
+            if loop.time() >= next_sweep:
+                await self._sweep()
+                next_sweep = loop.time() + self.claim_idle / 4
+            try:
+                response = await self._redis.xreadgroup(
+                    self.group, self.consumer, {self.stream: cursor}, count=50,
+                    block=min(_READ_BLOCK_MS, max(1, int(self.claim_idle * 250))),  # wake for the next sweep
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("WhatsApp stream read failed", error=str(e))
+                await asyncio.sleep(1)
+                continue
+            entries = response[0][1] if response else []
+            if not entries:
+                if cursor != ">":
+                    cursor = ">"
+                else:
+                    # Some clients (fakeredis) return from a blocking read at once
+                    await asyncio.sleep(0.01)
+                continue
+            for entry_id, fields in entries:
+                if cursor != ">":
+                    cursor = entry_id  # keep paging through history
+                    if entry_id in self._held:
+                        continue
+                await self._dispatch(entry_id, fields)
+
+    async def _run_lane(self, lane: asyncio.Queue) -> None:
+        while True:
+            job = await lane.get()
+            try:
+                await self._process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Never let one job take the lane (and every sender hashed to it) down
+                logger.error("WhatsApp job crashed its lane", message_id=job.message_id, error=str(e))
+            finally:
+                self._held.discard(job.entry_id)
+                lane.task_done()
+
+    async def _process(self, job: WhatsAppJob) -> None:
+        state: Dict[str, Any] = {}
+        acknowledge = True
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self._handler(job.message, state)
+                self._metrics.processed += 1
+                self._metrics.total_latency_ms += (time.time() - job.enqueued_at) * 1000
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    self._metrics.dead_lettered += 1
+                    logger.error(
+                        "WhatsApp job failed, moving to dead letter stream",
+                        message_id=job.message_id,
+                        attempts=attempt,
+                        error=str(e),
+                    )
+                    # Left pending (and reclaimed later) if the dead letter is lost
+                    acknowledge = await self._dead_letter(
+                        {"message_id": job.message_id, "sender": job.sender,
+                         "message": json.dumps(job.message), "error": str(e)}
+                    )
+                    break
+                self._metrics.retried += 1
+                delay = self.retry_base * 2 ** (attempt - 1)
+                logger.warning(
+                    "WhatsApp job failed, retrying",
+                    message_id=job.message_id,
+                    attempt=attempt,
+                    retry_in_s=delay,
+                    error=str(e),
+                )
+                await asyncio.sleep(delay)
+        if acknowledge:
+            await self._ack(job.entry_id)
+
+    async def shutdown(self, timeout: float = WHATSAPP_DRAIN_SECONDS) -> None:
+        """Stop reading, let lanes finish queued jobs (up to ``timeout``), then stop.
+
+        Jobs not finished in time stay pending in the stream. Another
+        consumer claims them once they have been idle for ``claim_idle``
+        (or this consumer re-reads them on startup if its name is stable).
+        """
+        if self._reader is None:
+            return
+        self._reader.cancel()
+        await asyncio.gather(self._reader, return_exceptions=True)
+        try:
+            await asyncio.wait_for(asyncio.gather(*(lane.join() for lane in self._lanes)), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("WhatsApp queue drain timed out", metrics=self.metrics())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._reader = None
+        self._tasks = []
+        self._lanes = []
+        self._held.clear()
+        logger.info("WhatsApp job queue stopped", metrics=self.metrics())
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth and counters for observability endpoints."""
+        return self._metrics.snapshot(sum(lane.qsize() for lane in self._lanes))
+
+
+# Singleton owned by the FastAPI lifespan
+whatsapp_queue = WhatsAppJobQueue()
@@ -0,0 +1,200 @@
+"""Lifespan-owned write-behind queue for post-answer side effects.
+
+Caching the response and updating conversation memory do not change the
+answer, so the orchestrator hands them to this queue instead of awaiting
+them before returning. Each side-effect kind has its own bounded queue and
+worker. The worker collects up to ``batch_size`` items, or whatever arrives
+within ``flush_interval`` of the first one, and passes the batch to the
+handler its owner registered. The handler then writes the whole batch with
+one Redis pipeline and one Firestore write per user.
+
+When a queue is full, new items are dropped and counted rather than growing
+memory without bound. ``shutdown()`` drains pending items for up to
+``WRITE_BEHIND_DRAIN_SECONDS`` before stopping the workers. When the queue is
+not running (scripts, tests), ``submit()`` returns False and callers apply
+the side effect inline.
+
+Per-kind settings come from ``SIDE_EFFECTS`` and can be overridden with
+``WRITE_BEHIND_<KIND>_MAX_QUEUE``, ``..._BATCH_SIZE``,
+``..._FLUSH_MS`` and ``..._ENABLED``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+WRITE_BEHIND_DRAIN_SECONDS = float(os.environ.get("WRITE_BEHIND_DRAIN_SECONDS", "10"))
+
+BatchHandler = Callable[[List[Any]], Awaitable[None]]
+
+
+@dataclass(frozen=True)
+class SideEffectConfig:
+    """Queue bound and batching settings for one side-effect kind."""
+
+    name: str
+    max_queue: int = 1000
+    batch_size: int = 50
+    flush_interval: float = 0.05  # seconds to wait for a batch to fill
+    enabled: bool = True
+
+
+def _side_effect(name: str, **defaults: Any) -> SideEffectConfig:
+    prefix = f"WRITE_BEHIND_{name.upper()}_"
+    config = SideEffectConfig(name=name, **defaults)
+    return SideEffectConfig(
+        name=name,
+        max_queue=int(os.environ.get(prefix + "MAX_QUEUE", config.max_queue)),
+        batch_size=int(os.environ.get(prefix + "BATCH_SIZE", config.batch_size)),
+        flush_interval=float(os.environ.get(prefix + "FLUSH_MS", config.flush_interval * 1000)) / 1000,
+        enabled=os.environ.get(prefix + "ENABLED", "1" if config.enabled else "0") == "1",
+    )
+
+
+SIDE_EFFECTS: Dict[str, SideEffectConfig] = {
+    "cache_response": _side_effect("cache_response", max_queue=1000, batch_size=50, flush_interval=0.05),
+    "memory_update": _side_effect("memory_update", max_queue=2000, batch_size=100, flush_interval=0.1),
+}
+
+
+@dataclass
+class SideEffectMetrics:
+    """Counters for one side-effect queue."""
+
+    enqueued: int = 0
+    processed: int = 0
+    dropped: int = 0
+    failed: int = 0
+    batches: int = 0
+    total_flush_ms: float = 0.0
+
+    def snapshot(self, depth: int) -> Dict[str, Any]:
+        return {
+            "depth": depth,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "avg_batch_size": round(self.processed / self.batches, 2) if self.batches else 0.0,
+            "avg_flush_ms": round(self.total_flush_ms / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+class WriteBehindQueue:
+    """Process-wide owner of one bounded queue and worker per side-effect kind."""
+
+    def __init__(self, side_effects: Optional[Dict[str, SideEffectConfig]] = None):
+        self._configs = side_effects or SIDE_EFFECTS
+        self._handlers: Dict[str, BatchHandler] = {}
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._metrics: Dict[str, SideEffectMetrics] = {name: SideEffectMetrics() for name in self._configs}
+
+    @property
+    def is_started(self) -> bool:
+        return bool(self._workers)
+
+    def register(self, kind: str, handler: BatchHandler) -> None:
+        """Set the batch handler for ``kind`` (called once by the side effect's owner)."""
+        if kind not in self._configs:
+            raise ValueError(f"Unknown side effect: {kind}")
+        self._handlers[kind] = handler
+
+    async def startup(self) -> None:
+        if self._workers:
+            return
+        for name, config in self._configs.items():
+            if not config.enabled:
+                continue
+            self._queues[name] = asyncio.Queue(maxsize=config.max_queue)
+            self._workers[name] = asyncio.create_task(self._run(config), name=f"write-behind-{name}")
+        logger.info("Write-behind queue started", side_effects=list(self._workers))
+
+    def submit(self, kind: str, item: Any) -> bool:
+        """Queue ``item`` for background processing.
+
+        Returns False when the kind is not running here (no queue, disabled or
+        no handler) and the caller should apply the side effect itself.
+        Returns True once the item is queued, or dropped because the queue is
+        full.
+        """
+        queue = self._queues.get(kind)
+        if queue is None or kind not in self._handlers:
+            return False
+        metrics = self._metrics[kind]
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            metrics.dropped += 1
+            logger.warning("Write-behind queue full, dropping side effect", kind=kind, depth=queue.qsize())
+            return True
+        metrics.enqueued += 1
+        return True
+
+    async def _next_batch(self, queue: asyncio.Queue, config: SideEffectConfig) -> List[Any]:
+        batch = [await queue.get()]
+        if queue.qsize() < config.batch_size - 1 and config.flush_interval > 0:
+            # Let concurrent requests' side effects join this batch
+            await asyncio.sleep(config.flush_interval)
+        while len(batch) < config.batch_size and not queue.empty():
+            batch.append(queue.get_nowait())
+        return batch
+
+    async def _run(self, config: SideEffectConfig) -> None:
+        queue = self._queues[config.name]
+        metrics = self._metrics[config.name]
+        while True:
+            batch = await self._next_batch(queue, config)
+            started = time.perf_counter()
+            try:
+                await self._handlers[config.name](batch)
+                metrics.processed += len(batch)
+            except Exception as e:
+                metrics.failed += len(batch)
+                logger.warning("Write-behind batch failed", kind=config.name, items=len(batch), error=str(e))
+            finally:
+                metrics.batches += 1
+                metrics.total_flush_ms += (time.perf_counter() - started) * 1000
+                for _ in batch:
+                    queue.task_done()
+
+    async def shutdown(self, timeout: float = WRITE_BEHIND_DRAIN_SECONDS) -> None:
+        """Drain queued side effects (up to ``timeout`` seconds), then stop the workers."""
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues.values())),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            for name, queue in self._queues.items():
+                if queue.qsize():
+                    self._metrics[name].dropped += queue.qsize()
+            logger.warning("Write-behind drain timed out", metrics=self.metrics())
+        for worker in self._workers.values():
+            worker.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
+        self._queues.clear()
+        logger.info("Write-behind queue stopped", metrics=self.metrics())
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-kind queue depth and counters for observability endpoints."""
+        return {
+            name: metrics.snapshot(self._queues[name].qsize() if name in self._queues else 0)
+            for name, metrics in self._metrics.items()
+        }
+
+
+# Singleton owned by the FastAPI lifespan
+write_behind_queue = WriteBehindQueue()
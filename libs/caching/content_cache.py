@@ -0,0 +1,318 @@
+"""
+Two-tier content cache for immutable-ish R2 objects (chunks, parent documents).
+
+Provides:
+- Level 1: In-process, byte-bounded LRU of *parsed* objects (no JSON/pydantic work on hit)
+- Level 2: On-disk content-addressed store keyed by (object key, ETag), shared by
+  every worker on the host and surviving restarts
+- Negative caching of missing keys with a short TTL
+- Hit/miss/byte metrics
+
+Disk entries are served without a round trip while fresh; once older than
+``revalidate_seconds`` they are revalidated with a conditional GET
+(``IfNoneMatch``), which costs no body transfer when the object is unchanged.
+
+Follows .cursorrules: async-first, graceful degradation, comprehensive metrics.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+CONTENT_CACHE_MAX_MB = int(os.environ.get("CONTENT_CACHE_MAX_MB", "256"))
+CONTENT_CACHE_DIR = os.environ.get("CONTENT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "rightline-content"))
+CONTENT_CACHE_DISK_ENABLED = os.environ.get("CONTENT_CACHE_DISK_ENABLED", "1") == "1"
+CONTENT_CACHE_DISK_MAX_MB = int(os.environ.get("CONTENT_CACHE_DISK_MAX_MB", "2048"))
+CONTENT_CACHE_NEGATIVE_TTL = int(os.environ.get("CONTENT_CACHE_NEGATIVE_TTL", "300"))  # seconds
+CONTENT_CACHE_REVALIDATE_SECONDS = int(os.environ.get("CONTENT_CACHE_REVALIDATE_SECONDS", "86400"))
+
+
+class _NotModified:
+    """Sentinel returned by loaders when a conditional GET matched the ETag."""
+
+    def __repr__(self) -> str:
+        return "NOT_MODIFIED"
+
+
+NOT_MODIFIED = _NotModified()
+
+# A loader receives the ETag to revalidate (or None) and returns
+# (body, etag), NOT_MODIFIED, or None when the object does not exist.
+# Any exception is treated as a transient failure and is not cached.
+LoaderResult = Union[Tuple[bytes, Optional[str]], _NotModified, None]
+Loader = Callable[[Optional[str]], Awaitable[LoaderResult]]
+
+
+@dataclass
+class ContentCacheStats:
+    """Content cache statistics for monitoring."""
+
+    memory_hits: int = 0
+    disk_hits: int = 0
+    revalidated: int = 0
+    negative_hits: int = 0
+    misses: int = 0
+    bytes_fetched: int = 0
+    bytes_from_disk: int = 0
+    evictions: int = 0
+    memory_bytes: int = 0
+    memory_items: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered without downloading a body."""
+        hits = self.memory_hits + self.disk_hits + self.revalidated + self.negative_hits
+        total = hits + self.misses
+        return hits / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "hit_rate": round(self.hit_rate, 3)}
+
+
+class DiskContentStore:
+    """
+    Content-addressed blobs on local disk.
+
+    ``keys/<sha256(key)>.json`` records the ETag last seen for an object key,
+    and ``blobs/<sha256(key + etag)>`` holds that version's body. Writes go
+    through a temp file and ``os.replace`` so concurrent workers never read a
+    partial blob.
+    """
+
+    def __init__(self, root: Union[str, Path], max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._written_since_prune = 0
+
+    @staticmethod
+    def _digest(*parts: str) -> str:
+        return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+    def _key_path(self, key: str) -> Path:
+        return self.root / "keys" / f"{self._digest(key)}.json"
+
+    def _blob_path(self, key: str, etag: str) -> Path:
+        digest = self._digest(key, etag)
+        return self.root / "blobs" / digest[:2] / digest
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str, float]]:
+        """Return (body, etag, stored_at) for the last stored version of ``key``."""
+        try:
+            entry = json.loads(self._key_path(key).read_bytes())
+            body = self._blob_path(key, entry["etag"]).read_bytes()
+        except (OSError, ValueError, KeyError):
+            return None
+        return body, entry["etag"], entry["stored_at"]
+
+    def put(self, key: str, body: bytes, etag: str) -> None:
+        self._atomic_write(self._blob_path(key, etag), body)
+        self.touch(key, etag)
+        self._written_since_prune += len(body)
+        if self._written_since_prune > self.max_bytes // 10:
+            self.prune()
+
+    def touch(self, key: str, etag: str) -> None:
+        """Mark ``key``'s stored version as freshly validated."""
+        self._atomic_write(self._key_path(key), json.dumps({"etag": etag, "stored_at": time.time()}).encode())
+
+    def prune(self) -> None:
+        """Delete least-recently-written blobs until under ``max_bytes``."""
+        self._written_since_prune = 0
+        blobs = []
+        total = 0
+        for path in (self.root / "blobs").glob("*/*"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            blobs.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        blobs.sort()
+        for _, size, path in blobs:
+            if total <= self.max_bytes * 0.9:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+        logger.info("Content cache disk pruned", remaining_bytes=total, max_bytes=self.max_bytes)
+
+
+class TieredContentCache:
+    """
+    Memory LRU + disk store in front of an object loader.
+
+    Usage:
+        obj = await cache.get_or_load(key, loader, parse=lambda body: Chunk(**json.loads(body)))
+
+    Parsed objects are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes: int = CONTENT_CACHE_MAX_MB * 1024 * 1024,
+        disk_dir: Optional[Union[str, Path]] = CONTENT_CACHE_DIR if CONTENT_CACHE_DISK_ENABLED else None,
+        disk_max_bytes: int = CONTENT_CACHE_DISK_MAX_MB * 1024 * 1024,
+        negative_ttl: int = CONTENT_CACHE_NEGATIVE_TTL,
+        revalidate_seconds: int = CONTENT_CACHE_REVALIDATE_SECONDS,
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.negative_ttl = negative_ttl
+        self.revalidate_seconds = revalidate_seconds
+        self.disk = DiskContentStore(disk_dir, disk_max_bytes) if disk_dir else None
+        self._memory: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._missing: Dict[str, float] = {}
+        self._stats = ContentCacheStats()
+
+    # ------------------------------------------------------------------
+    # Memory tier
+    # ------------------------------------------------------------------
+
+    def _remember(self, key: str, obj: Any, size: int) -> None:
+        if size > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._stats.memory_bytes -= self._memory.pop(key)[1]
+        self._memory[key] = (obj, size)
+        self._stats.memory_bytes += size
+        while self._stats.memory_bytes > self.max_memory_bytes:
+            _, (_, evicted_size) = self._memory.popitem(last=False)
+            self._stats.memory_bytes -= evicted_size
+            self._stats.evictions += 1
+        self._stats.memory_items = len(self._memory)
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Return the parsed object for ``key`` if it is in memory (no I/O)."""
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        self._memory.move_to_end(key)
+        return entry[0]
+
+    def _is_known_missing(self, key: str) -> bool:
+        expires_at = self._missing.get(key)
+        if expires_at is None:
+            return False
+        if expires_at < time.time():
+            del self._missing[key]
+            return False
+        return True
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    async def get_or_load(self, key: str, loader: Loader, parse: Callable[[bytes], Any]) -> Optional[Any]:
+        """Return the parsed object for ``key``, loading and caching it on a miss.
+
+        Returns None for missing objects (negatively cached) and for bodies
+        that fail to parse. Loader exceptions propagate and are not cached.
+        """
+        obj = self.peek(key)
+        if obj is not None:
+            self._stats.memory_hits += 1
+            return obj
+
+        if self._is_known_missing(key):
+            self._stats.negative_hits += 1
+            return None
+
+        loop = asyncio.get_event_loop()
+        stored = await loop.run_in_executor(None, self.disk.get, key) if self.disk else None
+        if stored is not None:
+            body, etag, stored_at = stored
+            if time.time() - stored_at < self.revalidate_seconds:
+                self._stats.disk_hits += 1
+                self._stats.bytes_from_disk += len(body)
+                return self._parse_and_remember(key, body, parse)
+
+            try:
+                result = await loader(etag)
+            except Exception as e:
+                # Serve the stale copy rather than failing while R2 is unreachable
+                logger.warning("Content revalidation failed, serving stale copy", key=key, error=str(e))
+                result = NOT_MODIFIED
+            if result is NOT_MODIFIED:
+                self._stats.revalidated += 1
+                self._stats.bytes_from_disk += len(body)
+                await loop.run_in_executor(None, self.disk.touch, key, etag)
+                return self._parse_and_remember(key, body, parse)
+        else:
+            result = await loader(None)
+
+        if result is None or result is NOT_MODIFIED:
+            self._stats.misses += 1
+            self._missing[key] = time.time() + self.negative_ttl
+            return None
+
+        body, etag = result
+        self._stats.misses += 1
+        self._stats.bytes_fetched += len(body)
+        obj = self._parse_and_remember(key, body, parse)
+        if obj is not None and self.disk and etag:
+            try:
+                await loop.run_in_executor(None, self.disk.put, key, body, etag)
+            except OSError as e:
+                logger.warning("Content cache disk write failed", key=key, error=str(e))
+        return obj
+
+    def _parse_and_remember(self, key: str, body: bytes, parse: Callable[[bytes], Any]) -> Optional[Any]:
+        try:
+            obj = parse(body)
+        except Exception as e:
+            logger.warning("Cached content failed to parse", key=key, error=str(e))
+            return None
+        self._remember(key, obj, len(body))
+        return obj
+
+    def invalidate(self, key: str) -> None:
+        """Drop ``key`` from the memory tier and the negative cache."""
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._stats.memory_bytes -= entry[1]
+            self._stats.memory_items = len(self._memory)
+        self._missing.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop the memory tier and negative cache (disk entries are kept)."""
+        self._memory.clear()
+        self._missing.clear()
+        self._stats.memory_bytes = 0
+        self._stats.memory_items = 0
+
+    def get_stats(self) -> ContentCacheStats:
+        """Get cache statistics."""
+        return self._stats
+
+
+# Process-wide cache for R2 chunk and parent document objects
+r2_content_cache = TieredContentCache()
@@ -0,0 +1,228 @@
+"""
+Request-scoped embedding service.
+
+A single query used to be embedded up to three times: on semantic cache
+lookup, again on cache write, and again (with its variants) for dense
+retrieval. ``RequestEmbeddingService`` sits in front of an embedding client
+for the lifetime of one request and:
+
+- Memoizes vectors per text (concurrent callers share in-flight work)
+- Consults the local content-hash embedding store (float16, persistent,
+  shared with ingestion) when one is configured; writing new vectors back
+  to it is opt-in, because the store never evicts and query text is
+  unbounded
+- Consults the Redis embedding cache (base64 float32, shared across workers)
+- Sends every text still missing, plus any texts the request has said it
+  will need, to the embeddings API in one batched call
+
+The service for the current request is bound with :func:`embedding_scope`
+and found by callers through :func:`current_embedding_service`, so shared
+components (the semantic cache, retrievers) pick it up without new
+parameters threading through the graph.
+
+Follows .cursorrules: async-first, graceful degradation, comprehensive metrics.
+"""
+
+import asyncio
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import structlog
+
+from libs.caching.embedding_store import EmbeddingStore
+from libs.caching.semantic_cache import decode_embedding, embedding_cache_key, encode_embedding
+
+logger = structlog.get_logger(__name__)
+
+EMBEDDING_CACHE_TTL = int(os.environ.get("EMBEDDING_CACHE_TTL", "86400"))  # seconds
+EMBEDDING_STORE_WRITE_BACK = os.environ.get("EMBEDDING_STORE_WRITE_BACK", "false").lower() == "true"
+
+
+class RequestEmbeddingService:
+    """
+    Per-request memoizing front for an embedding client.
+
+    Exposes the same ``get_embeddings(texts)`` interface as
+    ``EmbeddingClient`` so it can be used anywhere a client is expected.
+    Failed lookups are not memoized; a later call retries them.
+    Vectors fetched upstream go to the TTL-bounded Redis cache, and to the
+    store only when ``write_store`` is set.
+    """
+
+    def __init__(
+        self,
+        embedding_client: Any,
+        redis_client: Any = None,
+        ttl: int = EMBEDDING_CACHE_TTL,
+        store: Optional[EmbeddingStore] = None,
+        model: str = "",
+        write_store: bool = EMBEDDING_STORE_WRITE_BACK,
+    ):
+        self.embedding_client = embedding_client
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.store = store
+        self.model = model
+        self.write_store = write_store
+        self._vectors: Dict[str, List[float]] = {}
+        self._pending: Dict[str, "asyncio.Future[Optional[List[float]]]"] = {}
+        self._expected: Dict[str, None] = {}
+        self.stats = {"requested": 0, "memo_hits": 0, "store_hits": 0, "redis_hits": 0, "api_texts": 0, "api_calls": 0}
+
+    def expect(self, texts: Iterable[str]) -> None:
+        """Declare texts this request will embed later.
+
+        They are not fetched now; they ride along with the next call that
+        has to go upstream, so a request costs one embeddings round trip.
+        """
+        for text in texts:
+            if text and text not in self._vectors:
+                self._expected[text] = None
+
+    async def get_embeddings(self, texts: List[str]) -> Optional[List[List[float]]]:
+        """Return one embedding per text, or None if any could not be produced."""
+        unique = list(dict.fromkeys(texts))
+        self.stats["requested"] += len(texts)
+
+        missing = [t for t in unique if t not in self._vectors and t not in self._pending]
+        self.stats["memo_hits"] += len(unique) - len(missing)
+        if missing:
+            await self._resolve(missing)
+
+        waiting = [self._pending[t] for t in unique if t not in self._vectors and t in self._pending]
+        if waiting:
+            await asyncio.gather(*waiting)
+
+        if not all(t in self._vectors for t in unique):
+            return None
+        return [self._vectors[t] for t in texts]
+
+    def peek(self, text: str) -> Optional[List[float]]:
+        """Return the vector for ``text`` if this request already has it, without fetching."""
+        return self._vectors.get(text)
+    
+    async def get_embedding(self, text: str) -> Optional[List[float]]:
+        embeddings = await self.get_embeddings([text])
+        return embeddings[0] if embeddings else None
+
+    async def _resolve(self, missing: List[str]) -> None:
+        batch = list(dict.fromkeys(
+            missing + [t for t in self._expected if t not in self._vectors and t not in self._pending]
+        ))
+        self._expected.clear()
+
+        loop = asyncio.get_event_loop()
+        futures = {text: loop.create_future() for text in batch}
+        self._pending.update(futures)
+        try:
+            found = await self._read_store(batch)
+            self.stats["store_hits"] += len(found)
+
+            from_redis = await self._read_redis([t for t in batch if t not in found])
+            self.stats["redis_hits"] += len(from_redis)
+            found.update(from_redis)
+
+            remaining = [t for t in batch if t not in found]
+            if remaining:
+                fetched = await self._fetch_upstream(remaining)
+                found.update(fetched)
+                if fetched:
+                    await self._write_redis(fetched)
+                    await self._write_store(fetched)
+
+            self._vectors.update(found)
+        finally:
+            for text, future in futures.items():
+                self._pending.pop(text, None)
+                if not future.done():
+                    future.set_result(self._vectors.get(text))
+
+    async def _fetch_upstream(self, texts: List[str]) -> Dict[str, List[float]]:
+        self.stats["api_calls"] += 1
+        self.stats["api_texts"] += len(texts)
+        try:
+            embeddings = await self.embedding_client.get_embeddings(texts)
+        except Exception as e:
+            logger.warning("Embedding request failed", texts=len(texts), error=str(e))
+            return {}
+        if not embeddings or len(embeddings) != len(texts):
+            logger.warning("Embedding request returned no vectors", texts=len(texts))
+            return {}
+        return {text: list(embedding) for text, embedding in zip(texts, embeddings)}
+
+    async def _read_store(self, texts: List[str]) -> Dict[str, List[float]]:
+        if self.store is None or not texts:
+            return {}
+        try:
+            loop = asyncio.get_event_loop()
+            vectors = await loop.run_in_executor(None, self.store.get_many, self.model, texts)
+        except Exception as e:
+            logger.warning("Embedding store read failed", error=str(e))
+            return {}
+        return {text: vector.tolist() for text, vector in zip(texts, vectors) if vector is not None}
+
+    async def _write_store(self, vectors: Dict[str, List[float]]) -> None:
+        if self.store is None or not self.write_store:
+            return
+        try:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self.store.put_many, self.model, list(vectors), list(vectors.values()))
+        except Exception as e:
+            logger.warning("Embedding store write failed", error=str(e))
+
+    async def _read_redis(self, texts: List[str]) -> Dict[str, List[float]]:
+        if self.redis_client is None or not texts:
+            return {}
+        try:
+            values = await self.redis_client.mget([embedding_cache_key(t) for t in texts])
+        except Exception as e:
+            logger.warning("Embedding cache read failed", error=str(e))
+            return {}
+        return {
+            text: decode_embedding(value).tolist()
+            for text, value in zip(texts, values)
+            if value
+        }
+
+    async def _write_redis(self, vectors: Dict[str, List[float]]) -> None:
+        if self.redis_client is None:
+            return
+        try:
+            pipe = self.redis_client.pipeline()
+            for text, embedding in vectors.items():
+                pipe.setex(embedding_cache_key(text), self.ttl, encode_embedding(embedding))
+            await pipe.execute()
+        except Exception as e:
+            logger.warning("Embedding cache write failed", error=str(e))
+
+
+_current_service: ContextVar[Optional[RequestEmbeddingService]] = ContextVar(
+    "request_embedding_service", default=None
+)
+
+
+def current_embedding_service() -> Optional[RequestEmbeddingService]:
+    """Return the embedding service bound to the current request, if any."""
+    return _current_service.get()
+
+
+@contextmanager
+def embedding_scope(
+    embedding_client: Any,
+    redis_client: Any = None,
+    store: Optional[EmbeddingStore] = None,
+    model: str = "",
+    write_store: bool = EMBEDDING_STORE_WRITE_BACK,
+) -> Iterator[RequestEmbeddingService]:
+    """Bind a fresh :class:`RequestEmbeddingService` for the duration of a request."""
+    service = RequestEmbeddingService(
+        embedding_client, redis_client, store=store, model=model, write_store=write_store
+    )
+    token = _current_service.set(service)
+    try:
+        yield service
+    finally:
+        _current_service.reset(token)
+        logger.debug("Request embedding stats", **service.stats)
@@ -0,0 +1,282 @@
+"""
+Persistent content-addressed embedding store.
+
+Embeddings are keyed by ``sha256(model, normalized text)``, so the same text
+embedded with the same model is only ever paid for once: re-ingestion embeds
+only new or changed chunk text, and the API reads vectors ingestion already
+paid for. The store never evicts, so the API only writes query vectors back
+when ``EMBEDDING_STORE_WRITE_BACK`` is enabled; otherwise they live in the
+TTL-bounded Redis embedding cache.
+
+Layout under ``root``:
+
+- ``meta.json``: vector dimension and format version
+- ``vectors.f16``: float16 rows, memory-mapped, grown by doubling
+- ``keys.bin``: append-only 32-byte digests; the i-th digest owns row i
+
+A write stores the vector rows first and only then appends their digests, so
+a reader never finds a key whose vector is not yet written. Writers take an
+``flock`` on ``.lock``, which makes the store safe to share between the
+ingestion script and several API workers on one host. Readers pick up rows
+written by other processes when ``keys.bin`` grows.
+
+float16 halves the footprint of float32 (6 KB per 3072-dim vector); the
+rounding error (~1e-3 relative) does not change cosine rankings in practice.
+
+Follows .cursorrules: graceful degradation, comprehensive metrics.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+import structlog
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts run a single writer
+    fcntl = None
+
+logger = structlog.get_logger(__name__)
+
+EMBEDDING_STORE_DIR = os.environ.get("EMBEDDING_STORE_DIR", "")
+EMBEDDING_STORE_FORMAT = 1
+
+_DIGEST_BYTES = 32
+_INITIAL_ROWS = 1024
+
+
+def normalize_embedding_text(text: str) -> str:
+    """Collapse whitespace so formatting-only changes map to the same key."""
+    return " ".join(text.split())
+
+
+def embedding_key(model: str, text: str) -> bytes:
+    """Store key for ``text`` embedded with ``model``."""
+    return hashlib.sha256(f"{model}\x00{normalize_embedding_text(text)}".encode("utf-8")).digest()
+
+
+@dataclass
+class EmbeddingStoreStats:
+    """Embedding store statistics for monitoring."""
+
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    entries: int = 0
+    capacity: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {**asdict(self), "hit_rate": round(self.hit_rate, 3)}
+
+
+class EmbeddingStore:
+    """Memory-mapped float16 embedding store with a content-hash key index."""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._meta_path = self.root / "meta.json"
+        self._vectors_path = self.root / "vectors.f16"
+        self._keys_path = self.root / "keys.bin"
+        self._lock_path = self.root / ".lock"
+        self._thread_lock = threading.Lock()
+        self._index: Dict[bytes, int] = {}
+        self._keys_offset = 0
+        self._vectors: Optional[np.memmap] = None
+        self.dim: Optional[int] = None
+        self._stats = EmbeddingStoreStats()
+        with self._thread_lock:
+            self._load_meta()
+            self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        """Return the float32 vector for ``text`` under ``model``, or None."""
+        return self.get_many(model, [text])[0]
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Return one float32 vector (or None) per text."""
+        keys = [embedding_key(model, text) for text in texts]
+        with self._thread_lock:
+            if any(key not in self._index for key in keys):
+                self._refresh()  # another process may have written them
+            rows = [self._index.get(key) for key in keys]
+            results = [
+                np.asarray(self._vectors[row], dtype=np.float32) if row is not None else None
+                for row in rows
+            ]
+        hits = sum(1 for row in rows if row is not None)
+        self._stats.hits += hits
+        self._stats.misses += len(rows) - hits
+        return results
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Iterable[Sequence[float]]) -> int:
+        """Store vectors for texts not already present; returns the number written."""
+        pending: Dict[bytes, np.ndarray] = {}
+        for text, vector in zip(texts, vectors):
+            pending[embedding_key(model, text)] = np.asarray(vector, dtype=np.float16).ravel()
+        if not pending:
+            return 0
+        with self._thread_lock, self._file_lock():
+            self._refresh()
+            new = [(key, vec) for key, vec in pending.items() if key not in self._index]
+            if not new:
+                return 0
+            dim = len(new[0][1])
+            if self.dim is None:
+                self._init_meta(dim)
+            if any(len(vec) != self.dim for _, vec in new):
+                raise ValueError(f"embedding store holds {self.dim}-dim vectors")
+
+            start = self._keys_offset // _DIGEST_BYTES
+            self._ensure_capacity(start + len(new))
+            for offset, (_, vec) in enumerate(new):
+                self._vectors[start + offset] = vec
+            self._vectors.flush()
+
+            # Vectors first, then keys: a visible key always has its vector
+            self._drop_partial_key()
+            with open(self._keys_path, "ab") as f:
+                f.write(b"".join(key for key, _ in new))
+            for offset, (key, _) in enumerate(new):
+                self._index[key] = start + offset
+            self._keys_offset += len(new) * _DIGEST_BYTES
+        self._stats.writes += len(new)
+        return len(new)
+
+    def put(self, model: str, text: str, vector: Sequence[float]) -> int:
+        return self.put_many(model, [text], [vector])
+
+    def get_stats(self) -> EmbeddingStoreStats:
+        """Get store statistics."""
+        self._stats.entries = len(self._index)
+        self._stats.capacity = len(self._vectors) if self._vectors is not None else 0
+        return self._stats
+
+    # ------------------------------------------------------------------
+    # Internals (call with _thread_lock held)
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _file_lock(self):
+        """Serialize writers across processes sharing ``root``."""
+        with open(self._lock_path, "a+") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _drop_partial_key(self) -> None:
+        """Cut a digest left half-written by a crashed writer (call under the file lock).
+
+        Appending after a partial digest would shift every later key off its
+        32-byte boundary and map it to the wrong row.
+        """
+        try:
+            size = self._keys_path.stat().st_size
+        except OSError:
+            return
+        if size % _DIGEST_BYTES:
+            logger.warning("Truncating partial embedding key", root=str(self.root), bytes=size % _DIGEST_BYTES)
+            os.truncate(self._keys_path, size - size % _DIGEST_BYTES)
+
+    def _load_meta(self) -> None:
+        try:
+            meta = json.loads(self._meta_path.read_text())
+        except (OSError, ValueError):
+            return
+        if meta.get("format") != EMBEDDING_STORE_FORMAT:
+            raise ValueError(f"Unsupported embedding store format {meta.get('format')} in {self.root}")
+        self.dim = int(meta["dim"])
+
+    def _init_meta(self, dim: int) -> None:
+        self._load_meta()  # another process may have created it
+        if self.dim is not None:
+            return
+        self.dim = dim
+        tmp = self._meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"format": EMBEDDING_STORE_FORMAT, "dim": dim, "dtype": "float16"}))
+        os.replace(tmp, self._meta_path)
+
+    def _map(self) -> None:
+        rows = self._vectors_path.stat().st_size // (self.dim * 2) if self._vectors_path.exists() else 0
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float16, mode="r+", shape=(rows, self.dim)) if rows else None
+
+    def _ensure_capacity(self, rows: int) -> None:
+        capacity = len(self._vectors) if self._vectors is not None else 0
+        if rows <= capacity:
+            return
+        new_capacity = max(_INITIAL_ROWS, capacity)
+        while new_capacity < rows:
+            new_capacity *= 2
+        self._vectors = None
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 2)
+        self._map()
+
+    def _refresh(self) -> None:
+        """Index keys appended since the last refresh (by this or another process)."""
+        try:
+            size = self._keys_path.stat().st_size
+        except OSError:
+            return
+        size -= size % _DIGEST_BYTES  # ignore a partially appended digest
+        if size <= self._keys_offset:
+            return
+        if self.dim is None:
+            self._load_meta()
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            data = f.read(size - self._keys_offset)
+        row = self._keys_offset // _DIGEST_BYTES
+        for i in range(0, len(data), _DIGEST_BYTES):
+            self._index.setdefault(data[i:i + _DIGEST_BYTES], row)
+            row += 1
+        self._keys_offset = size
+        if self._vectors is None or len(self._vectors) < row:
+            self._map()
+
+
+_store: Optional[EmbeddingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_embedding_store(root: str = EMBEDDING_STORE_DIR) -> Optional[EmbeddingStore]:
+    """Process-wide store at ``EMBEDDING_STORE_DIR``; None when unset or unusable."""
+    global _store
+    if not root:
+        return None
+    with _store_lock:
+        if _store is None or _store.root != Path(root):
+            try:
+                _store = EmbeddingStore(root)
+                logger.info("Embedding store opened", root=root, entries=len(_store), dim=_store.dim)
+            except Exception as e:
+                logger.warning("Embedding store unavailable", root=root, error=str(e))
+                return None
+        return _store
@@ -7,13 +7,27 @@ Provides:
 - Level 3: Intent caching
 - Level 4: Embedding caching
 
+Semantic lookups are answered from an in-process index per user type: a
+row-normalized float32 matrix scored with a single matrix-vector product.
+Embeddings are persisted in Redis as base64-encoded float32 bytes alongside
+their expiry, and the index is resynced from Redis every
+SEMANTIC_INDEX_SYNC_SECONDS so entries written by other workers are picked up
+and expired members are dropped from both the index and the Redis set. A
+resync only fetches embeddings for members the index does not hold yet (the
+expiry of the others is already known locally) and runs as one background
+task per user type; requests keep searching the current index meanwhile.
+
 Follows .cursorrules: async-first, graceful degradation, comprehensive metrics.
 """
 
+import asyncio
+import base64
 import hashlib
 import json
+import os
+import time
 from dataclasses import dataclass
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterable, Tuple
 from datetime import datetime
 
 import numpy as np
@@ -21,6 +35,8 @@ import structlog
 
 logger = structlog.get_logger(__name__)
 
+SEMANTIC_INDEX_SYNC_SECONDS = int(os.environ.get("SEMANTIC_INDEX_SYNC_SECONDS", "60"))
+
 
 @dataclass
 class CacheStats:
@@ -30,6 +46,7 @@ class CacheStats:
     exact_hits: int = 0
     semantic_hits: int = 0
     misses: int = 0
+    semantic_pruned: int = 0
     
     @property
     def hit_rate(self) -> float:
@@ -39,6 +56,127 @@ class CacheStats:
         return (self.exact_hits + self.semantic_hits) / self.total_requests
 
 
+def encode_embedding(embedding: Iterable[float]) -> str:
+    """Encode an embedding as base64 float32 bytes (safe for decode_responses clients)."""
+    return base64.b64encode(np.asarray(embedding, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def decode_embedding(encoded: str) -> np.ndarray:
+    """Decode an embedding written by :func:`encode_embedding`."""
+    return np.frombuffer(base64.b64decode(encoded), dtype=np.float32)
+
+
+def embedding_cache_key(text: str) -> str:
+    """Redis key for the cached (binary) embedding of ``text``."""
+    return f"cache:embedding:f32:{hashlib.md5(text.encode('utf-8')).hexdigest()}"
+
+
+class SemanticIndex:
+    """
+    In-memory nearest-neighbour index over cached query embeddings.
+
+    Rows are unit-normalized float32 vectors, so cosine similarity against
+    every entry is one ``matrix @ query``. Storage grows by doubling and
+    removal swaps the last row into the freed slot, keeping both O(dim).
+    Each row carries the wall-clock expiry of its Redis entry so expired
+    rows are pruned before scoring.
+    """
+
+    def __init__(self, initial_capacity: int = 64):
+        self._initial_capacity = initial_capacity
+        self._matrix: Optional[np.ndarray] = None
+        self._expires_at = np.zeros(0, dtype=np.float64)
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self.synced_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def keys(self) -> List[str]:
+        return list(self._keys)
+
+    @property
+    def dim(self) -> Optional[int]:
+        return None if self._matrix is None else self._matrix.shape[1]
+
+    def add(self, key: str, embedding: Iterable[float], expires_at: float) -> bool:
+        """Insert or replace ``key``; returns False for zero or mismatched vectors."""
+        vec = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vec))
+        if norm == 0.0 or (self._matrix is not None and vec.shape[0] != self.dim):
+            return False
+
+        if self._matrix is None:
+            self._matrix = np.empty((self._initial_capacity, vec.shape[0]), dtype=np.float32)
+            self._expires_at = np.empty(self._initial_capacity, dtype=np.float64)
+
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._keys)
+            if row == self._matrix.shape[0]:
+                self._matrix = np.concatenate([self._matrix, np.empty_like(self._matrix)])
+                self._expires_at = np.concatenate([self._expires_at, np.empty_like(self._expires_at)])
+            self._keys.append(key)
+            self._rows[key] = row
+
+        self._matrix[row] = vec / norm
+        self._expires_at[row] = expires_at
+        return True
+
+    def remove(self, key: str) -> None:
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self._keys) - 1
+        if row != last:
+            moved = self._keys[last]
+            self._matrix[row] = self._matrix[last]
+            self._expires_at[row] = self._expires_at[last]
+            self._keys[row] = moved
+            self._rows[moved] = row
+        self._keys.pop()
+
+    def prune_expired(self, now: Optional[float] = None) -> List[str]:
+        """Drop rows whose Redis entry has expired; returns the removed keys."""
+        n = len(self._keys)
+        if n == 0:
+            return []
+        now = time.time() if now is None else now
+        expired = [self._keys[i] for i in np.flatnonzero(self._expires_at[:n] <= now)]
+        for key in expired:
+            self.remove(key)
+        return expired
+
+    def search(self, embedding: Iterable[float], top_k: int = 1) -> List[Tuple[str, float]]:
+        """Return up to ``top_k`` (key, cosine similarity) pairs, best first."""
+        n = len(self._keys)
+        if n == 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0 or query.shape[0] != self.dim:
+            return []
+
+        scores = self._matrix[:n] @ (query / norm)
+        if top_k >= n:
+            order = np.argsort(-scores)
+        else:
+            top = np.argpartition(-scores, top_k)[:top_k]
+            order = top[np.argsort(-scores[top])]
+        return [(self._keys[i], float(scores[i])) for i in order]
+
+    def clear(self) -> None:
+        self._matrix = None
+        self._expires_at = np.zeros(0, dtype=np.float64)
+        self._keys.clear()
+        self._rows.clear()
+        self.synced_at = 0.0
+
+
 class SemanticCache:
     """
     Multi-level semantic cache for legal AI queries.
@@ -77,6 +215,8 @@ class SemanticCache:
         self._redis_client = None
         self._embedding_client = None
         self._stats = CacheStats()
+        self._semantic_indexes: Dict[str, SemanticIndex] = {}
+        self._index_syncs: Dict[str, "asyncio.Task[None]"] = {}
     
     async def connect(self, use_fake: bool = None):
         """
@@ -131,6 +271,9 @@ class SemanticCache:
     
     async def disconnect(self):
         """Disconnect from Redis."""
+        for task in self._index_syncs.values():
+            task.cancel()
+        self._index_syncs.clear()
         if self._redis_client is not None:
             try:
                 # Note: We don't close here because redis_client manages the singleton
@@ -140,6 +283,16 @@ class SemanticCache:
             except Exception as e:
                 logger.warning("Error during disconnect", error=str(e))
     
+    def _embeddings(self):
+        """
+        Return the embedding source for this call.
+        
+        Prefers the request-scoped service (shared with retrieval) and falls
+        back to the cache's own embedding client.
+        """
+        from libs.caching.embedding_service import current_embedding_service
+        return current_embedding_service() or self._embedding_client
+    
     def _get_exact_cache_key(self, query: str, user_type: str) -> str:
         """
         Generate cache key for exact match.
@@ -207,7 +360,7 @@ class SemanticCache:
             logger.error("Error checking exact cache", error=str(e))
         
         # Level 2: Semantic similarity (if enabled and embedding client available)
-        if check_semantic and self._embedding_client is not None:
+        if check_semantic and self._embeddings() is not None:
             try:
                 similar_response = await self._find_similar_cached_query(query, user_type)
                 
@@ -250,58 +403,89 @@ class SemanticCache:
             user_type: User type
             ttl_seconds: TTL in seconds (default: self.default_ttl)
         """
+        await self.cache_responses([{
+            "query": query,
+            "response": response,
+            "user_type": user_type,
+            "ttl_seconds": ttl_seconds,
+        }])
+    
+    async def cache_responses(self, entries: List[Dict[str, Any]]):
+        """
+        Cache a batch of responses with one embeddings call and one pipeline.
+        
+        Each entry has ``query`` and ``response`` and optionally ``user_type``,
+        ``ttl_seconds`` and a precomputed ``embedding`` (skips re-embedding
+        when the request already embedded the query).
+        
+        Args:
+            entries: Responses to cache
+        """
         if self._redis_client is None:
             logger.warning("Redis not connected, cannot cache")
             return
-        
-        if ttl_seconds is None:
-            ttl_seconds = self.default_ttl
+        if not entries:
+            return
         
         try:
-            # Store exact match
-            exact_key = self._get_exact_cache_key(query, user_type)
-            
-            # Remove all internal metadata (fields starting with _) before storing
-            clean_response = {k: v for k, v in response.items() if not k.startswith('_')}
-            
-            await self._redis_client.setex(
-                exact_key,
-                ttl_seconds,
-                json.dumps(clean_response)
-            )
-            
-            # Generate embedding for semantic search (if client available)
-            embedding = None
-            if self._embedding_client is not None:
+            # Generate embeddings for semantic search (if client available)
+            embeddings: Dict[str, Optional[List[float]]] = {
+                entry["query"]: entry.get("embedding") for entry in entries
+            }
+            missing = [query for query, embedding in embeddings.items() if embedding is None]
+            embedder = self._embeddings() if missing else None
+            if embedder is not None:
                 try:
-                    embeddings = await self._embedding_client.get_embeddings([query])
-                    embedding = embeddings[0] if embeddings else None
+                    fetched = await embedder.get_embeddings(missing)
+                    if fetched:
+                        embeddings.update(zip(missing, fetched))
                 except Exception as e:
                     logger.warning("Failed to generate embedding", error=str(e))
             
-            # Store metadata (including embedding for semantic search)
-            metadata = {
-                "query": query,
-                "user_type": user_type,
-                "created_at": datetime.utcnow().isoformat(),
-                "hit_count": "0"
-            }
-            
-            if embedding:
-                metadata["embedding"] = json.dumps(embedding)
+            pipe = self._redis_client.pipeline(transaction=False)
+            indexed = []
+            for entry in entries:
+                query = entry["query"]
+                user_type = entry.get("user_type") or "professional"
+                ttl_seconds = entry.get("ttl_seconds") or self.default_ttl
+                exact_key = self._get_exact_cache_key(query, user_type)
+                
+                # Remove all internal metadata (fields starting with _) before storing
+                clean_response = {k: v for k, v in entry["response"].items() if not k.startswith('_')}
+                pipe.setex(exact_key, ttl_seconds, json.dumps(clean_response))
+                
+                # Store metadata (including embedding for semantic search)
+                metadata = {
+                    "query": query,
+                    "user_type": user_type,
+                    "created_at": datetime.utcnow().isoformat(),
+                    "hit_count": "0"
+                }
+                
+                embedding = embeddings.get(query)
+                expires_at = time.time() + ttl_seconds
+                if embedding:
+                    metadata["embedding_f32"] = encode_embedding(embedding)
+                    metadata["expires_at"] = str(expires_at)
+                    indexed.append((exact_key, user_type, embedding, expires_at))
+                
+                pipe.hset(f"{exact_key}:meta", mapping=metadata)
+                pipe.expire(f"{exact_key}:meta", ttl_seconds)
+                
+                # Add to semantic search index if embedding available
+                if embedding:
+                    pipe.sadd(f"semantic_index:{user_type}", exact_key)
             
-            await self._redis_client.hset(f"{exact_key}:meta", mapping=metadata)
-            await self._redis_client.expire(f"{exact_key}:meta", ttl_seconds)
+            await pipe.execute()
             
-            # Add to semantic search index if embedding available
-            if embedding:
-                await self._add_to_semantic_index(exact_key, user_type)
+            for exact_key, user_type, embedding, expires_at in indexed:
+                self._add_to_local_index(exact_key, user_type, embedding, expires_at)
             
             logger.info(
-                "Response cached",
-                cache_key=exact_key,
-                ttl_seconds=ttl_seconds,
-                query_preview=query[:50]
+                "Responses cached",
+                entries=len(entries),
+                indexed=len(indexed),
+                query_preview=entries[0]["query"][:50]
             )
             
         except Exception as e:
@@ -328,7 +512,7 @@ class SemanticCache:
         user_type: str
     ) -> Optional[Dict[str, Any]]:
         """
-        Find semantically similar cached query using cosine similarity.
+        Find semantically similar cached query using the in-process index.
         
         Args:
             query: User query
@@ -337,76 +521,163 @@ class SemanticCache:
         Returns:
             Dict with response, similarity, and original_query, or None
         """
-        if self._embedding_client is None:
+        embedder = self._embeddings()
+        if embedder is None:
             return None
         
         try:
             # Get query embedding
-            embeddings = await self._embedding_client.get_embeddings([query])
+            embeddings = await embedder.get_embeddings([query])
             if not embeddings:
                 return None
             
-            query_embedding = np.array(embeddings[0])
-            
-            # Get all cached keys for this user type from semantic index
-            index_key = f"semantic_index:{user_type}"
-            cached_keys = await self._redis_client.smembers(index_key)
+            index = await self._get_semantic_index(user_type)
+            expired = index.prune_expired()
+            if expired:
+                await self._remove_from_semantic_index(user_type, expired)
             
-            if not cached_keys:
+            matches = index.search(embeddings[0], top_k=1)
+            if not matches:
                 return None
             
-            # Compare embeddings to find best match
-            max_similarity = 0.0
-            best_match_key = None
-            best_match_meta = None
+            best_match_key, similarity = matches[0]
+            if similarity < self.similarity_threshold:
+                return None
             
-            for cached_key in cached_keys:
-                # Get cached embedding
-                cached_meta = await self._redis_client.hgetall(f"{cached_key}:meta")
-                if not cached_meta or "embedding" not in cached_meta:
-                    continue
-                
-                cached_embedding_json = cached_meta["embedding"]
-                cached_embedding = np.array(json.loads(cached_embedding_json))
-                
-                # Compute cosine similarity
-                similarity = self._cosine_similarity(query_embedding, cached_embedding)
-                
-                if similarity > max_similarity:
-                    max_similarity = similarity
-                    best_match_key = cached_key
-                    best_match_meta = cached_meta
+            # Fetch cached response
+            cached_response = await self._redis_client.get(best_match_key)
+            if not cached_response:
+                # Evicted or deleted before its recorded expiry
+                index.remove(best_match_key)
+                await self._remove_from_semantic_index(user_type, [best_match_key])
+                return None
             
-            # Check if similarity exceeds threshold
-            if max_similarity >= self.similarity_threshold and best_match_key:
-                # Fetch cached response
-                cached_response = await self._redis_client.get(best_match_key)
-                if cached_response:
-                    # Increment hit count
-                    await self._redis_client.hincrby(f"{best_match_key}:meta", "hit_count", 1)
-                    
-                    return {
-                        "response": json.loads(cached_response),
-                        "similarity": max_similarity,
-                        "original_query": best_match_meta["query"]
-                    }
+            # Increment hit count
+            meta_key = f"{best_match_key}:meta"
+            await self._redis_client.hincrby(meta_key, "hit_count", 1)
+            original_query = await self._redis_client.hget(meta_key, "query")
             
-            return None
+            return {
+                "response": json.loads(cached_response),
+                "similarity": similarity,
+                "original_query": original_query or ""
+            }
             
         except Exception as e:
             logger.error("Semantic similarity search failed", error=str(e))
             return None
     
-    async def _add_to_semantic_index(self, cache_key: str, user_type: str):
+    async def _get_semantic_index(self, user_type: str) -> SemanticIndex:
         """
-        Add cache entry to semantic search index.
+        Return the in-process index for ``user_type``, resyncing it from Redis when stale.
+        
+        At most one sync per user type runs at a time. Callers only wait for
+        it when the index has never been loaded; afterwards the refresh runs
+        in the background and callers search the index they have.
         
         Args:
-            cache_key: Cache key to add to index
             user_type: User type
+            
+        Returns:
+            SemanticIndex for the user type
+        """
+        index = self._semantic_indexes.get(user_type)
+        if index is None:
+            index = self._semantic_indexes[user_type] = SemanticIndex()
+        if time.time() - index.synced_at >= SEMANTIC_INDEX_SYNC_SECONDS:
+            task = self._index_syncs.get(user_type)
+            if task is None or task.done():
+                task = self._index_syncs[user_type] = asyncio.create_task(
+                    self._sync_semantic_index(user_type, index)
+                )
+            if index.synced_at == 0.0:
+                await asyncio.shield(task)
+        return index
+    
+    async def _sync_semantic_index(self, user_type: str, index: SemanticIndex):
+        """
+        Reconcile the index with the Redis set, fetching only new members.
+        
+        Members dropped from the set are removed locally; members already
+        indexed keep their local expiry. New members' embeddings are read in
+        one pipelined round trip, and those whose metadata has expired are
+        removed from the Redis set. Entries written before binary embeddings
+        (JSON ``embedding`` field, no ``expires_at``) are still loaded, using
+        the key TTL for expiry.
+        
+        Args:
+            user_type: User type
+            index: Index to refresh
         """
         index_key = f"semantic_index:{user_type}"
-        await self._redis_client.sadd(index_key, cache_key)
+        try:
+            members = set(await self._redis_client.smembers(index_key))
+            for key in [k for k in index.keys() if k not in members]:
+                index.remove(key)
+            new = [member for member in members if member not in index]
+            
+            results = []
+            if new:
+                pipe = self._redis_client.pipeline()
+                for member in new:
+                    pipe.hmget(f"{member}:meta", "embedding_f32", "embedding", "expires_at")
+                    pipe.ttl(f"{member}:meta")
+                results = await pipe.execute()
+            
+            now = time.time()
+            stale = []
+            for i, member in enumerate(new):
+                (encoded, legacy_json, expires_at), ttl = results[2 * i], results[2 * i + 1]
+                if encoded is None and legacy_json is None:
+                    stale.append(member)
+                    continue
+                embedding = decode_embedding(encoded) if encoded is not None else json.loads(legacy_json)
+                if expires_at is not None:
+                    expiry = float(expires_at)
+                else:
+                    expiry = now + ttl if ttl is not None and ttl >= 0 else float("inf")
+                index.add(member, embedding, expiry)
+            
+            index.synced_at = now
+            if stale:
+                await self._remove_from_semantic_index(user_type, stale)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Semantic index sync failed", user_type=user_type, error=str(e))
+            return
+        
+        logger.debug(
+            "Semantic index synced",
+            user_type=user_type,
+            entries=len(index),
+            fetched=len(new),
+            pruned=len(stale)
+        )
+    
+    def _add_to_local_index(
+        self,
+        cache_key: str,
+        user_type: str,
+        embedding: List[float],
+        expires_at: Optional[float] = None
+    ):
+        """Add an entry to the in-process semantic index for ``user_type``."""
+        index = self._semantic_indexes.get(user_type)
+        if index is None:
+            index = self._semantic_indexes[user_type] = SemanticIndex()
+        index.add(cache_key, embedding, expires_at if expires_at is not None else float("inf"))
+    
+    async def _remove_from_semantic_index(self, user_type: str, cache_keys: List[str]):
+        """
+        Remove expired entries from the Redis semantic index set.
+        
+        Args:
+            user_type: User type
+            cache_keys: Cache keys to remove
+        """
+        await self._redis_client.srem(f"semantic_index:{user_type}", *cache_keys)
+        self._stats.semantic_pruned += len(cache_keys)
     
     async def get_embedding_cache(self, query: str) -> Optional[List[float]]:
         """
@@ -421,12 +692,12 @@ class SemanticCache:
         if self._redis_client is None:
             return None
         
-        key = f"cache:embedding:{hashlib.md5(query.encode()).hexdigest()}"
+        key = embedding_cache_key(query)
         
         try:
             cached = await self._redis_client.get(key)
             if cached:
-                return json.loads(cached)
+                return decode_embedding(cached).tolist()
         except Exception as e:
             logger.error("Error getting embedding cache", error=str(e))
         
@@ -449,10 +720,10 @@ class SemanticCache:
         if self._redis_client is None:
             return
         
-        key = f"cache:embedding:{hashlib.md5(query.encode()).hexdigest()}"
+        key = embedding_cache_key(query)
         
         try:
-            await self._redis_client.setex(key, ttl, json.dumps(embedding))
+            await self._redis_client.setex(key, ttl, encode_embedding(embedding))
         except Exception as e:
             logger.error("Error caching embedding", error=str(e))
     
@@ -540,6 +811,10 @@ class SemanticCache:
                 if cursor == 0:
                     break
             
+            # Force a resync so cleared entries drop out of the local indexes
+            for index in self._semantic_indexes.values():
+                index.clear()
+            
             logger.info("Cache cleared", pattern=pattern, deleted=deleted)
             return deleted
             
@@ -0,0 +1,204 @@
+"""
+Single-flight coalescing of concurrent identical queries.
+
+When many users ask the same question at once, every request misses the
+semantic cache together and runs the full pipeline. ``SingleFlight`` lets
+the first request for a key (the leader) run it, while concurrent requests
+for the same key (followers) wait for the leader's result:
+
+- Within a worker, followers await the leader's in-process future
+- Across workers (when Redis is available), the leader holds a
+  ``SET NX PX`` lock, stores its result under a short-lived key and
+  publishes it on a pub/sub channel that followers in other workers
+  subscribe to
+
+A follower whose leader fails, is cancelled or does not answer within
+``SINGLE_FLIGHT_WAIT_SECONDS`` gets no shared result and runs the query
+itself, so coalescing never turns one failure into many.
+
+Usage:
+    async with single_flight.flight(key) as flight:
+        if flight.shared_result is not None:
+            return flight.shared_result      # follower
+        result = await run_pipeline()
+        flight.set_result(result)            # leader
+
+Follows .cursorrules: async-first, graceful degradation, comprehensive metrics.
+"""
+
+import asyncio
+import json
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+SINGLE_FLIGHT_ENABLED = os.environ.get("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+SINGLE_FLIGHT_LOCK_TTL = float(os.environ.get("SINGLE_FLIGHT_LOCK_TTL", "180"))  # seconds
+SINGLE_FLIGHT_WAIT_SECONDS = float(os.environ.get("SINGLE_FLIGHT_WAIT_SECONDS", "120"))
+SINGLE_FLIGHT_RESULT_TTL = int(os.environ.get("SINGLE_FLIGHT_RESULT_TTL", "30"))  # seconds
+
+class Flight:
+    """One request's view of a coalesced query: leader or follower."""
+
+    def __init__(self, key: str, shared_result: Optional[Dict[str, Any]] = None):
+        self.key = key
+        self.shared_result = shared_result
+        self.result: Optional[Dict[str, Any]] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.shared_result is None
+
+    def set_result(self, result: Dict[str, Any]) -> None:
+        """Record the leader's JSON-serialisable result for followers."""
+        self.result = result
+
+
+class SingleFlight:
+    """
+    In-process and (optionally) cross-worker request coalescing.
+
+    Results must be JSON-serialisable dicts so they can be shared across
+    workers. Keys should already be normalised (e.g. the exact-cache key).
+    """
+
+    def __init__(
+        self,
+        redis_client: Any = None,
+        lock_ttl: float = SINGLE_FLIGHT_LOCK_TTL,
+        wait_timeout: float = SINGLE_FLIGHT_WAIT_SECONDS,
+        result_ttl: int = SINGLE_FLIGHT_RESULT_TTL,
+    ):
+        self.redis_client = redis_client
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.result_ttl = result_ttl
+        self._inflight: Dict[str, "asyncio.Future[Optional[Dict[str, Any]]]"] = {}
+        self.stats = {"leaders": 0, "local_followers": 0, "remote_followers": 0, "fallbacks": 0}
+
+    @asynccontextmanager
+    async def flight(self, key: str) -> AsyncIterator[Flight]:
+        """Join the flight for ``key``; see the module docstring for usage."""
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            result = await self._wait_local(key, inflight)
+            if result is not None:
+                self.stats["local_followers"] += 1
+                yield Flight(key, result)
+                return
+            # Leader failed or timed out; run independently rather than electing a new leader
+            self.stats["fallbacks"] += 1
+            yield Flight(key)
+            return
+
+        future: "asyncio.Future[Optional[Dict[str, Any]]]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        flight = Flight(key)
+        lock_token = None
+        try:
+            if self.redis_client is not None:
+                remote, lock_token = await self._join_remote(key)
+                if remote is not None:
+                    self.stats["remote_followers"] += 1
+                    flight = Flight(key, remote)
+                    future.set_result(remote)
+                    yield flight
+                    return
+
+            self.stats["leaders"] += 1
+            yield flight
+        finally:
+            # A leader without a result (error, cancellation) releases followers to run themselves
+            if not future.done():
+                future.set_result(flight.result)
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            if lock_token is not None:
+                await self._publish(key, flight.result)
+                await self._release(key, lock_token)
+
+    async def _wait_local(self, key: str, future: "asyncio.Future[Optional[Dict[str, Any]]]") -> Optional[Dict[str, Any]]:
+        # Shield so a cancelled or timed-out follower does not cancel the leader's future
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.wait_timeout)
+        except asyncio.TimeoutError:
+            logger.info("Single-flight leader did not answer, running independently", key=key)
+            return None
+
+    async def _join_remote(self, key: str):
+        """Take the cross-worker lock, or wait for the worker holding it.
+
+        Returns ``(result, None)`` as a follower, ``(None, token)`` as the
+        leader, or ``(None, None)`` when Redis coordination is unavailable or
+        the remote leader did not answer in time.
+        """
+        token = uuid.uuid4().hex
+        pubsub = None
+        try:
+            # Subscribe before trying the lock so the leader's publish cannot be missed
+            pubsub = self.redis_client.pubsub()
+            await pubsub.subscribe(f"{key}:flight:done")
+
+            if await self.redis_client.set(f"{key}:flight:lock", token, nx=True, px=int(self.lock_ttl * 1000)):
+                return None, token
+
+            # Another worker is leading; it may already have finished
+            stored = await self.redis_client.get(f"{key}:flight:result")
+            if stored:
+                return json.loads(stored), None
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.wait_timeout
+            while (remaining := deadline - loop.time()) > 0:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=min(remaining, 1.0))
+                if message is None:
+                    continue
+                data = message.get("data")
+                if data:
+                    return json.loads(data), None
+                break  # leader failed
+
+            self.stats["fallbacks"] += 1
+            logger.info("Single-flight leader did not answer, running independently", key=key)
+            return None, None
+        except Exception as e:
+            logger.warning("Single-flight coordination failed, running independently", key=key, error=str(e))
+            return None, None
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.unsubscribe()
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def _publish(self, key: str, result: Optional[Dict[str, Any]]) -> None:
+        """Share the leader's result with other workers (an empty message signals failure)."""
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            if result is None:
+                pipe.publish(f"{key}:flight:done", "")
+            else:
+                payload = json.dumps(result, default=str)
+                pipe.setex(f"{key}:flight:result", self.result_ttl, payload)
+                pipe.publish(f"{key}:flight:done", payload)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning("Single-flight publish failed", key=key, error=str(e))
+
+    async def _release(self, key: str, token: str) -> None:
+        """Delete the lock if this worker still owns it (it may have expired and been retaken)."""
+        lock_key = f"{key}:flight:lock"
+        try:
+            owner = await self.redis_client.get(lock_key)
+            if isinstance(owner, bytes):
+                owner = owner.decode()
+            if owner == token:
+                await self.redis_client.delete(lock_key)
+        except Exception as e:
+            logger.warning("Single-flight lock release failed", key=key, error=str(e))
@@ -10,7 +10,7 @@ Follows .cursorrules: async-first, resource efficiency, clean interfaces.
 """
 
 import asyncio
-from typing import Dict, Any
+from typing import Any, Dict, List
 from datetime import datetime
 
 import structlog
@@ -31,6 +31,8 @@ class MemoryCoordinator:
     Usage:
         coordinator = MemoryCoordinator(redis_client, firestore_client)
         context = await coordinator.get_full_context(user_id, session_id)
+        snapshot = await coordinator.get_snapshot(user_id, session_id)  # once per request
+        context = MemoryCoordinator.slice_context(snapshot, max_tokens=1000)
         await coordinator.update_memories(user_id, session_id, query, response, metadata)
     """
     
@@ -65,51 +67,93 @@ class MemoryCoordinator:
         Returns:
             Dict with conversation_history, user_profile, and tokens_used
         """
-        # Allocate token budget
-        short_term_budget = int(max_tokens * 0.7)  # 70% to recent conversation
-        long_term_budget = int(max_tokens * 0.3)   # 30% to user profile
+        snapshot = await self.get_snapshot(user_id, session_id)
+        return self.slice_context(snapshot, max_tokens)
+    
+    async def get_snapshot(
+        self,
+        user_id: str,
+        session_id: str
+    ) -> Dict[str, Any]:
+        """
+        Fetch the whole session window and user profile once.
+        
+        One Redis LRANGE and one Firestore read; callers with different
+        token budgets slice the result with :meth:`slice_context` instead of
+        fetching again.
         
+        Args:
+            user_id: User identifier
+            session_id: Session identifier
+            
+        Returns:
+            Dict with conversation_history (chronological, unbudgeted),
+            user_profile, and tokens_used
+        """
         try:
             # Fetch in parallel for performance
-            short_term_task = self.short_term.get_context(session_id, short_term_budget)
+            short_term_task = self.short_term.get_messages(session_id)
             long_term_task = self.long_term.get_personalization_context(user_id)
             
-            short_term_context, long_term_context = await asyncio.gather(
+            messages, long_term_context = await asyncio.gather(
                 short_term_task,
                 long_term_task,
                 return_exceptions=True
             )
             
             # Handle errors gracefully
-            if isinstance(short_term_context, Exception):
-                logger.error("Failed to get short-term context", error=str(short_term_context))
-                short_term_context = []
+            if isinstance(messages, Exception):
+                logger.error("Failed to get short-term context", error=str(messages))
+                messages = []
             
             if isinstance(long_term_context, Exception):
                 logger.error("Failed to get long-term context", error=str(long_term_context))
                 long_term_context = {}
             
-            # Calculate actual tokens used
-            short_term_tokens = sum(len(m.get("content", "")) // 4 for m in short_term_context)
-            long_term_tokens = len(str(long_term_context)) // 4
-            
-            return {
-                "conversation_history": short_term_context,
-                "user_profile": long_term_context,
-                "tokens_used": {
-                    "short_term": short_term_tokens,
-                    "long_term": long_term_tokens,
-                    "total": short_term_tokens + long_term_tokens
-                }
-            }
+            return self._context(list(reversed(messages)), long_term_context)
             
         except Exception as e:
             logger.error("Failed to get full context", error=str(e))
-            return {
-                "conversation_history": [],
-                "user_profile": {},
-                "tokens_used": {"short_term": 0, "long_term": 0, "total": 0}
+            return self._context([], {})
+    
+    @staticmethod
+    def slice_context(snapshot: Dict[str, Any], max_tokens: int = 2000) -> Dict[str, Any]:
+        """
+        Cut a snapshot down to a token budget.
+        
+        Args:
+            snapshot: Result of :meth:`get_snapshot`
+            max_tokens: Total token budget for memory
+            
+        Returns:
+            Dict with conversation_history, user_profile, and tokens_used
+        """
+        from libs.memory.short_term import ShortTermMemory
+        
+        # Allocate token budget
+        short_term_budget = int(max_tokens * 0.7)  # 70% to recent conversation
+        
+        conversation = ShortTermMemory.fit_to_budget(
+            list(reversed(snapshot.get("conversation_history", []))),
+            short_term_budget
+        )
+        return MemoryCoordinator._context(conversation, snapshot.get("user_profile", {}))
+    
+    @staticmethod
+    def _context(conversation: List[Dict[str, Any]], user_profile: Dict[str, Any]) -> Dict[str, Any]:
+        # Calculate actual tokens used
+        short_term_tokens = sum(len(m.get("content", "")) // 4 for m in conversation)
+        long_term_tokens = len(str(user_profile)) // 4
+        
+        return {
+            "conversation_history": conversation,
+            "user_profile": user_profile,
+            "tokens_used": {
+                "short_term": short_term_tokens,
+                "long_term": long_term_tokens,
+                "total": short_term_tokens + long_term_tokens
             }
+        }
     
     async def update_memories(
         self,
@@ -129,39 +173,56 @@ class MemoryCoordinator:
             response: AI response
             metadata: Query metadata (complexity, legal_areas, user_type, etc.)
         """
+        await self.apply_updates([{
+            "user_id": user_id,
+            "session_id": session_id,
+            "query": query,
+            "response": response,
+            "metadata": metadata,
+        }])
+    
+    async def apply_updates(self, updates: List[Dict[str, Any]]):
+        """
+        Apply a batch of post-query memory updates.
+        
+        All exchanges go to Redis in one pipeline (user message before
+        assistant message, per session) and each user's profile gets one
+        coalesced Firestore write.
+        
+        Args:
+            updates: Dicts with user_id, session_id, query, response, metadata
+        """
+        if not updates:
+            return
         try:
-            # Update short-term (conversation)
-            short_term_task = asyncio.create_task(
-                self.short_term.add_message(session_id, "user", query, metadata)
-            )
+            messages = []
+            profile_updates: Dict[str, List[Dict[str, Any]]] = {}
+            for update in updates:
+                metadata = update.get("metadata") or {}
+                messages.append((update["session_id"], "user", update["query"], metadata))
+                messages.append((update["session_id"], "assistant", update["response"], None))
+                profile_updates.setdefault(update["user_id"], []).append({
+                    "complexity": metadata.get("complexity", "moderate"),
+                    "legal_areas": metadata.get("legal_areas", []),
+                    "user_type": metadata.get("user_type", "citizen"),
+                })
             
-            # Add assistant message
-            response_task = asyncio.create_task(
-                self.short_term.add_message(session_id, "assistant", response)
-            )
-            
-            # Update long-term (patterns)
-            long_term_task = asyncio.create_task(
-                self.long_term.update_after_query(
-                    user_id=user_id,
-                    query=query,
-                    complexity=metadata.get("complexity", "moderate"),
-                    legal_areas=metadata.get("legal_areas", []),
-                    user_type=metadata.get("user_type", "citizen")
-                )
-            )
-            
-            # Wait for all updates
-            await asyncio.gather(
-                short_term_task,
-                response_task,
-                long_term_task,
+            # Update short-term (conversation) and long-term (patterns) together
+            results = await asyncio.gather(
+                self.short_term.add_messages(messages),
+                *(
+                    self.long_term.apply_query_updates(user_id, user_updates)
+                    for user_id, user_updates in profile_updates.items()
+                ),
                 return_exceptions=True
             )
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error("Failed to update memory", error=str(result))
             
             logger.debug("Memories updated",
-                        user_id=user_id,
-                        session_id=session_id)
+                        updates=len(updates),
+                        users=len(profile_updates))
             
         except Exception as e:
             logger.error("Failed to update memories", error=str(e))
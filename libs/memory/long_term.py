@@ -95,6 +95,29 @@ class LongTermMemory:
             legal_areas: Legal areas covered
             user_type: Detected user type
         """
+        await self.apply_query_updates(user_id, [{
+            "complexity": complexity,
+            "legal_areas": legal_areas,
+            "user_type": user_type,
+        }])
+    
+    async def apply_query_updates(
+        self,
+        user_id: str,
+        updates: List[Dict[str, Any]]
+    ):
+        """
+        Fold several queries by one user into a single profile update.
+        
+        Counters are summed, legal areas unioned, and the last query's
+        complexity and user type win, so N queries cost one Firestore write.
+        
+        Args:
+            user_id: User identifier
+            updates: Per-query dicts with complexity, legal_areas, user_type (oldest first)
+        """
+        if not updates:
+            return
         try:
             doc_ref = self.firestore.collection("users").document(user_id)
             
@@ -102,27 +125,36 @@ class LongTermMemory:
             from google.cloud.firestore_v1 import ArrayUnion, Increment
             
             # Build update dict
+            last = updates[-1]
             update_data = {
-                "query_count": Increment(1),
+                "query_count": Increment(len(updates)),
                 "updated_at": datetime.utcnow().isoformat(),
-                "last_query_complexity": complexity,
-                "detected_user_type": user_type
+                "last_query_complexity": last.get("complexity", "moderate"),
+                "detected_user_type": last.get("user_type", "citizen")
             }
             
             # Add legal areas to interests
-            if legal_areas:
-                update_data["legal_interests"] = ArrayUnion(legal_areas)
+            legal_areas: List[str] = []
+            area_counts: Dict[str, int] = {}
+            for update in updates:
+                areas = update.get("legal_areas") or []
+                legal_areas.extend(area for area in areas if area not in legal_areas)
                 
                 # Increment frequency for first area
-                for area in legal_areas[:1]:  # Just first area to avoid too many fields
-                    update_data[f"area_frequency.{area}"] = Increment(1)
+                for area in areas[:1]:  # Just first area to avoid too many fields
+                    area_counts[area] = area_counts.get(area, 0) + 1
+            
+            if legal_areas:
+                update_data["legal_interests"] = ArrayUnion(legal_areas)
+                for area, count in area_counts.items():
+                    update_data[f"area_frequency.{area}"] = Increment(count)
             
             await doc_ref.update(update_data)
             
             logger.debug(
                 "User profile updated",
                 user_id=user_id,
-                complexity=complexity,
+                queries=len(updates),
                 legal_areas=legal_areas
             )
             
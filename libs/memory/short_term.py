@@ -12,7 +12,7 @@ Follows .cursorrules: async-first, sliding window, token budget management.
 
 import json
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 import structlog
 
@@ -63,24 +63,7 @@ class ShortTermMemory:
             content: Message content
             metadata: Optional metadata (intent, complexity, etc.)
         """
-        key = f"session:{session_id}:messages"
-        
-        # Create message object
-        message = {
-            "role": role,
-            "content": content,
-            "timestamp": datetime.utcnow().isoformat(),
-            "metadata": metadata or {}
-        }
-        
-        # Add to Redis list (LPUSH for newest first)
-        await self.redis.lpush(key, json.dumps(message))
-        
-        # Trim to max_messages (keep only recent)
-        await self.redis.ltrim(key, 0, self.max_messages - 1)
-        
-        # Set TTL (24 hours = 86400 seconds)
-        await self.redis.expire(key, 86400)
+        await self.add_messages([(session_id, role, content, metadata)])
         
         logger.debug(
             "Message added to short-term memory",
@@ -89,6 +72,44 @@ class ShortTermMemory:
             content_length=len(content)
         )
     
+    async def add_messages(
+        self,
+        messages: List[Tuple[str, str, str, Optional[Dict[str, Any]]]]
+    ):
+        """
+        Add messages to one or more sessions in a single Redis pipeline.
+        
+        Each session gets one LPUSH (in the given order), LTRIM and EXPIRE,
+        however many messages it receives.
+        
+        Args:
+            messages: (session_id, role, content, metadata) tuples, oldest first
+        """
+        by_session: Dict[str, List[str]] = {}
+        for session_id, role, content, metadata in messages:
+            # Create message object
+            message = {
+                "role": role,
+                "content": content,
+                "timestamp": datetime.utcnow().isoformat(),
+                "metadata": metadata or {}
+            }
+            by_session.setdefault(session_id, []).append(json.dumps(message))
+        
+        pipe = self.redis.pipeline(transaction=False)
+        for session_id, payloads in by_session.items():
+            key = f"session:{session_id}:messages"
+            
+            # Add to Redis list (LPUSH for newest first)
+            pipe.lpush(key, *payloads)
+            
+            # Trim to max_messages (keep only recent)
+            pipe.ltrim(key, 0, self.max_messages - 1)
+            
+            # Set TTL (24 hours = 86400 seconds)
+            pipe.expire(key, 86400)
+        await pipe.execute()
+    
     async def get_context(
         self,
         session_id: str,
@@ -104,21 +125,42 @@ class ShortTermMemory:
         Returns:
             List of messages (chronological order)
         """
-        key = f"session:{session_id}:messages"
+        messages = await self.get_messages(session_id)
+        return self.fit_to_budget(messages, max_tokens)
+    
+    async def get_messages(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        Get every message in the session window with a single LRANGE.
         
-        # Get all messages (newest first from Redis)
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            List of parsed messages (newest first, as stored in Redis)
+        """
+        key = f"session:{session_id}:messages"
         messages_json = await self.redis.lrange(key, 0, -1)
+        return [json.loads(msg_json) for msg_json in messages_json or []]
+    
+    @staticmethod
+    def fit_to_budget(
+        messages: List[Dict[str, Any]],
+        max_tokens: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Take the most recent messages that fit within a token budget.
         
-        if not messages_json:
-            return []
-        
-        # Parse and build context
+        Args:
+            messages: Parsed messages, newest first
+            max_tokens: Maximum tokens to return
+            
+        Returns:
+            List of messages (chronological order)
+        """
         context = []
         current_tokens = 0
         
-        for msg_json in messages_json:
-            message = json.loads(msg_json)
-            
+        for message in messages:
             # Estimate tokens (rough: 4 chars per token)
             msg_tokens = len(message["content"]) // 4
             
@@ -9,12 +9,14 @@ for fast loading during API requests.
 Key features:
 - Reads all chunks from R2 corpus
 - Advanced tokenization optimized for legal documents
-- Builds rank-bm25 index with optimal parameters
-- Saves index with pickle for fast loading
+- Builds an inverted-index BM25 engine (CSR postings, precomputed IDF and
+  length norms) so query latency scales with postings touched
+- Saves a pickle-free, memory-mappable index directory (flat .npy arrays plus
+  a versioned manifest with per-file checksums) for fast, shared loading
 - Performance optimizations for 50K+ document corpus
 
 Usage:
-    python scripts/build_bm25_index.py [--output_file PATH] [--max_docs INT] [--verbose]
+    python scripts/build_bm25_index.py [--output_dir PATH] [--max_docs INT] [--verbose]
 
 Author: RightLine Team  
 """
@@ -24,19 +26,26 @@ import asyncio
 import json
 import logging
 import os
-import pickle
-import re
 import sys
 import time
-from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 import boto3
 import structlog
 from dotenv import load_dotenv
-from rank_bm25 import BM25Okapi
 from tqdm import tqdm
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api.bm25_index import (
+    INDEX_ARRAY_FILES,
+    MANIFEST_FILENAME,
+    InvertedBM25Index,
+    build_object_key,
+    optimize_tokenize_legal_text,
+    verify_index_dir,
+    write_index_dir,
+)
+
 # Load environment variables from .env.local
 load_dotenv(".env.local")
 
@@ -48,7 +57,8 @@ logging.basicConfig(
 logger = structlog.get_logger()
 
 # Default configuration
-DEFAULT_OUTPUT_FILE = "data/processed/bm25_index.pkl"
+DEFAULT_OUTPUT_DIR = "data/processed/bm25_index_v2"
+DEFAULT_R2_PREFIX = "corpus/indexes/bm25_v2/"
 DEFAULT_MAX_DOCS = None
 
 # R2 configuration from environment  
@@ -121,57 +131,6 @@ def load_chunk_from_r2(r2_client, bucket: str, chunk_key: str) -> Optional[Dict[
         return None
 
 
-def optimize_tokenize_legal_text(text: str) -> List[str]:
-    """
-    Advanced tokenization optimized for legal document analysis.
-    
-    Features:
-    - Preserves legal citations and references
-    - Handles section numbers and legal formatting
-    - Optimized for BM25 performance
-    
-    Args:
-        text: Raw text to tokenize
-        
-    Returns:
-        List of optimized tokens for legal document search
-    """
-    if not text:
-        return []
-    
-    # Convert to lowercase for case-insensitive matching
-    text = text.lower()
-    
-    # Preserve important legal patterns
-    # Keep section references like "section 5", "s. 12", "sec 15a"
-    text = re.sub(r'\bs\.?\s*(\d+[a-z]?)\b', r'section\1', text)
-    text = re.sub(r'\bsec\.?\s*(\d+[a-z]?)\b', r'section\1', text)
-    
-    # Keep chapter references like "[chapter 28:01]"
-    text = re.sub(r'\[chapter\s+([0-9:]+)\]', r'chapter\1', text)
-    
-    # Keep court citations and case numbers
-    text = re.sub(r'\[(\d{4})\]\s*([a-z]+)\s*(\d+)', r'\1\2\3', text)
-    
-    # Basic tokenization - split on non-alphanumeric, keep numbers and letters
-    tokens = re.findall(r'\b[a-z0-9]+\b', text)
-    
-    # Filter out very short tokens and common stop words
-    legal_stop_words = {
-        'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 
-        'from', 'has', 'he', 'in', 'is', 'it', 'its', 'of', 'on',
-        'that', 'the', 'to', 'was', 'will', 'with'
-    }
-    
-    filtered_tokens = [
-        token for token in tokens 
-        if len(token) >= 2 and token not in legal_stop_words
-    ]
-    
-    # Limit token count for performance (BM25 works best with 50-200 tokens per doc)
-    return filtered_tokens[:200]
-
-
 def build_bm25_index_from_r2(
     r2_client, 
     bucket: str, 
@@ -240,7 +199,7 @@ def build_bm25_index_from_r2(
     logger.info("Building BM25 index...")
     bm25_start = time.time()
     
-    bm25_index = BM25Okapi(
+    bm25_index = InvertedBM25Index.build(
         corpus_texts,
         k1=BM25_K1,
         b=BM25_B
@@ -248,6 +207,7 @@ def build_bm25_index_from_r2(
     
     bm25_build_time = time.time() - bm25_start
     logger.info(f"BM25 index built in {bm25_build_time:.2f} seconds")
+    logger.info(f"  Vocabulary: {len(bm25_index.vocabulary):,} terms, {bm25_index.num_postings:,} postings")
     
     # Prepare index data for serialization
     index_data = {
@@ -277,65 +237,87 @@ def build_bm25_index_from_r2(
     return index_data
 
 
+def save_bm25_index_dir(index_data: Dict[str, Any], output_dir: str) -> Dict[str, Any]:
+    """Write the memory-mappable index directory and return its manifest."""
+    logger.info(f"Writing BM25 index directory to {output_dir}...")
+    
+    manifest = write_index_dir(
+        index_data["bm25_index"],
+        index_data["chunk_metadata"],
+        output_dir,
+        build_info={
+            "build_duration_seconds": index_data["build_duration_seconds"],
+            "max_docs_processed": index_data["parameters"]["max_docs_processed"],
+        },
+    )
+    
+    reason = verify_index_dir(output_dir, deep=True)
+    if reason:
+        raise RuntimeError(f"Written BM25 index failed verification: {reason}")
+    
+    total_mb = sum(f["bytes"] for f in manifest["files"].values()) / 1024 / 1024
+    logger.info(f"✅ BM25 index directory written")
+    logger.info(f"  Directory: {output_dir}")
+    logger.info(f"  Build id: {manifest['build_id']}")
+    logger.info(f"  Size: {total_mb:.2f} MB")
+    return manifest
+
+
 def save_bm25_index_to_r2(
     r2_client, 
     bucket: str,
-    index_data: Dict[str, Any], 
-    r2_key: str = "corpus/indexes/bm25_index.pkl"
+    output_dir: str,
+    manifest: Dict[str, Any],
+    r2_prefix: str = DEFAULT_R2_PREFIX
 ) -> None:
-    """Save BM25 index to R2 for cloud-native deployment."""
-    logger.info(f"Saving BM25 index to R2: {r2_key}...")
+    """Upload the index directory to R2 for cloud-native deployment.
     
-    # Serialize index data
-    serialized_data = pickle.dumps(index_data, protocol=pickle.HIGHEST_PROTOCOL)
+    Each build is uploaded under its own ``<r2_prefix>/<build_id>/``, never
+    over the files of a build workers may be downloading. The top-level
+    manifest, which names the current build, is published last, so readers
+    never see a manifest whose files are not yet uploaded.
+    """
+    r2_prefix = r2_prefix.rstrip("/") + "/"
+    build_id = manifest["build_id"]
+    logger.info(f"Uploading BM25 index to R2: {r2_prefix}{build_id}/...")
+    
+    for name in INDEX_ARRAY_FILES:
+        r2_client.upload_file(
+            os.path.join(output_dir, name),
+            bucket,
+            build_object_key(r2_prefix, build_id, name),
+            ExtraArgs={"ContentType": "application/octet-stream"},
+        )
     
-    # Upload to R2
-    r2_client.put_object(
-        Bucket=bucket,
-        Key=r2_key,
-        Body=serialized_data,
-        ContentType="application/octet-stream",
-        Metadata={
-            "index_type": "bm25",
-            "corpus_size": str(index_data['corpus_size']),
-            "build_timestamp": str(index_data['build_timestamp']),
-            "build_duration": str(index_data['build_duration_seconds']),
-            "bm25_k1": str(index_data['parameters']['k1']),
-            "bm25_b": str(index_data['parameters']['b'])
-        }
-    )
+    body = json.dumps(manifest, indent=2).encode("utf-8")
+    metadata = {
+        "index_type": "bm25",
+        "build_id": build_id,
+        "format_version": str(manifest["format_version"]),
+        "corpus_size": str(manifest["corpus_size"]),
+        "build_timestamp": str(manifest["build_timestamp"]),
+    }
+    # A copy beside the arrays keeps every build self-describing; the pointer goes last
+    for key in (build_object_key(r2_prefix, build_id, MANIFEST_FILENAME), r2_prefix + MANIFEST_FILENAME):
+        r2_client.put_object(
+            Bucket=bucket, Key=key, Body=body, ContentType="application/json", Metadata=metadata
+        )
     
     # Log success metrics
-    index_size_mb = len(serialized_data) / 1024 / 1024
+    index_size_mb = sum(f["bytes"] for f in manifest["files"].values()) / 1024 / 1024
     logger.info(f"✅ BM25 index uploaded to R2 successfully")
-    logger.info(f"  R2 key: {r2_key}")
+    logger.info(f"  R2 prefix: {r2_prefix}{build_id}/")
     logger.info(f"  Size: {index_size_mb:.2f} MB")
-    logger.info(f"  Chunks: {index_data['corpus_size']:,}")
+    logger.info(f"  Chunks: {manifest['corpus_size']:,}")
     logger.info(f"  Cloud-native: ✅ Ready for serverless deployment")
 
-def save_bm25_index_local_backup(index_data: Dict[str, Any], output_file: str) -> None:
-    """Save local backup copy for development (optional)."""
-    logger.info(f"Saving local backup to {output_file}...")
-    
-    # Ensure output directory exists
-    output_path = Path(output_file)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    # Save with optimized pickle protocol
-    with open(output_file, 'wb') as f:
-        pickle.dump(index_data, f, protocol=pickle.HIGHEST_PROTOCOL)
-    
-    # Log file size
-    file_size = os.path.getsize(output_file)
-    logger.info(f"✅ Local backup saved")
-    logger.info(f"  File: {output_file}")
-    logger.info(f"  Size: {file_size / 1024 / 1024:.2f} MB")
-
 
 def main():
     parser = argparse.ArgumentParser(description="Build BM25 index from R2 corpus for lightning-fast sparse search")
-    parser.add_argument("--output_file", type=str, default=DEFAULT_OUTPUT_FILE,
-                        help=f"Output file for BM25 index (default: {DEFAULT_OUTPUT_FILE})")
+    parser.add_argument("--output_dir", type=str, default=DEFAULT_OUTPUT_DIR,
+                        help=f"Output directory for BM25 index (default: {DEFAULT_OUTPUT_DIR})")
+    parser.add_argument("--r2_prefix", type=str, default=DEFAULT_R2_PREFIX,
+                        help=f"R2 prefix for the uploaded index (default: {DEFAULT_R2_PREFIX})")
     parser.add_argument("--max_docs", type=int, default=DEFAULT_MAX_DOCS,
                         help="Maximum number of chunks to process (for testing)")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
@@ -363,13 +345,12 @@ def main():
             verbose=args.verbose
         )
         
+        # Write the index directory locally (also the development copy)
+        manifest = save_bm25_index_dir(index_data, args.output_dir)
+        
         # Save index to R2 (cloud-native)
         logger.info("💾 Saving BM25 index to R2 (cloud-native deployment)...")
-        save_bm25_index_to_r2(r2_client, config["r2_bucket"], index_data)
-        
-        # Save local backup for development (optional)
-        if args.output_file:
-            save_bm25_index_local_backup(index_data, args.output_file)
+        save_bm25_index_to_r2(r2_client, config["r2_bucket"], args.output_dir, manifest, args.r2_prefix)
         
         # Performance summary
         build_time = index_data['build_duration_seconds']
@@ -379,7 +360,7 @@ def main():
         logger.info(f"  Chunks processed: {index_data['corpus_size']:,}")
         logger.info(f"  Build time: {build_time:.2f}s")
         logger.info(f"  Processing rate: {chunks_per_second:.1f} chunks/second")
-        logger.info(f"  Index file: {args.output_file}")
+        logger.info(f"  Index directory: {args.output_dir}")
         
         logger.info("✅ BM25 index build complete - ready for lightning-fast search!")
         
@@ -6,8 +6,20 @@ This script reads parsed documents from Cloudflare R2, chunks them into
 optimally-sized overlapping segments, and uploads individual chunk files
 back to R2 for retrieval by the API.
 
+Re-runs are incremental: a chunk manifest (doc_id -> content hash, chunk
+keys, chunker version) is read once per run, and a document is re-chunked
+only when its content hash or CHUNKER_VERSION changed. Chunks a re-chunked
+document no longer produces are deleted. The manifest is written back with
+a conditional PUT every CHUNK_MANIFEST_FLUSH_DOCS documents and at the end of
+the run, so an interrupted run resumes where it stopped.
+
+Documents are streamed through a pipeline: the catalog is read line by line,
+chunking and entity extraction run in a process pool (CHUNK_WORKERS), and
+uploads run in a thread pool (CHUNK_UPLOAD_CONCURRENCY). Only a bounded
+number of documents and uploads are in flight at once.
+
 Usage:
-    python scripts/chunk_docs.py [--max-docs N] [--verbose]
+    python scripts/chunk_docs.py [--max-docs N] [--workers N] [--upload-concurrency N] [--verbose]
 
 Environment Variables:
     CLOUDFLARE_R2_S3_ENDPOINT, CLOUDFLARE_R2_ACCESS_KEY_ID, 
@@ -15,14 +27,25 @@ Environment Variables:
 """
 
 import argparse
+import bisect
 import hashlib
 import json
 import logging
 import os
 import re
 import sys
-from typing import List, Optional, Dict, Any, Tuple, Set
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Dict, Any, Tuple, Set
 from api.models import ChunkV3 as Chunk  # Use canonical V3 model
+from api.doc_manifest import update_doc_manifest
+
+try:
+    from botocore.exceptions import ClientError
+except ImportError:  # pragma: no cover - boto3 is checked below
+    ClientError = Exception
 
 try:
     import boto3
@@ -43,15 +66,23 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def get_r2_client():
-    """Initialize and return a boto3 client for Cloudflare R2."""
+def get_r2_client(max_pool_connections: Optional[int] = None):
+    """Initialize and return a boto3 client for Cloudflare R2.
+    
+    ``max_pool_connections`` should be at least the upload concurrency, or
+    uploads queue for a connection (defaults to CHUNK_UPLOAD_CONCURRENCY).
+    """
     try:
         return boto3.client(
             service_name="s3",
             endpoint_url=os.environ["CLOUDFLARE_R2_S3_ENDPOINT"],
             aws_access_key_id=os.environ["CLOUDFLARE_R2_ACCESS_KEY_ID"],
             aws_secret_access_key=os.environ["CLOUDFLARE_R2_SECRET_ACCESS_KEY"],
-            config=Config(signature_version="s3v4"),
+            # One pooled connection per concurrent upload
+            config=Config(
+                signature_version="s3v4",
+                max_pool_connections=max(10, max_pool_connections or CHUNK_UPLOAD_CONCURRENCY),
+            ),
         )
     except KeyError as e:
         raise RuntimeError(f"Missing required environment variable for R2: {e}")
@@ -75,6 +106,21 @@ MIN_TOKENS = 10  # Minimum tokens per chunk (allow small but important documents
 OVERLAP_RATIO = 0.15  # 15 %
 CHARS_PER_TOKEN = 4  # Approximate characters per token for English text
 
+# Bump whenever chunking output changes so existing documents are re-chunked
+CHUNKER_VERSION = 1
+
+CHUNK_MANIFEST_R2_KEY = os.environ.get("CHUNK_MANIFEST_R2_KEY", "corpus/indexes/chunk_manifest.json")
+CHUNK_MANIFEST_FORMAT = 1
+CHUNK_MANIFEST_FLUSH_DOCS = int(os.environ.get("CHUNK_MANIFEST_FLUSH_DOCS", "200"))  # docs per manifest write
+
+# ---------------------------------------------------------------------------
+# Pipeline concurrency
+# ---------------------------------------------------------------------------
+
+CHUNK_WORKERS = int(os.environ.get("CHUNK_WORKERS", str(os.cpu_count() or 1)))
+CHUNK_UPLOAD_CONCURRENCY = int(os.environ.get("CHUNK_UPLOAD_CONCURRENCY", "16"))
+CHUNK_PROGRESS_SECONDS = float(os.environ.get("CHUNK_PROGRESS_SECONDS", "30"))
+
 # Entity extraction patterns (enhanced from enrich_chunks.py)
 PATTERNS = {
     # Date patterns: match various formats and normalize to ISO
@@ -106,35 +152,38 @@ COURTS = [
 ]
 
 
-def load_documents_from_r2(r2_client, bucket: str) -> List[Dict[str, Any]]:
-    """Load parsed documents from R2."""
+def iter_documents_from_r2(r2_client, bucket: str) -> Iterator[Dict[str, Any]]:
+    """Stream parsed documents from the R2 catalog one JSONL line at a time."""
     try:
-        # Download the parsed documents catalog from R2
         response = r2_client.get_object(Bucket=bucket, Key="corpus/processed/legislation_docs.jsonl")
-        content = response['Body'].read().decode('utf-8')
-        
-        # Parse JSONL content
-        documents = []
-        for line in content.strip().split('\n'):
-            if line.strip():
-                documents.append(json.loads(line))
-        
-        logger.info(f"Loaded {len(documents)} documents from R2")
-        return documents
-        
     except Exception as e:
         logger.error(f"Error loading documents from R2: {e}")
         raise
+    body = response['Body']
+    # botocore's StreamingBody yields lines via iter_lines(); plain file objects iterate by line
+    lines = body.iter_lines() if hasattr(body, "iter_lines") else body
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def load_documents_from_r2(r2_client, bucket: str) -> List[Dict[str, Any]]:
+    """Load parsed documents from R2."""
+    documents = list(iter_documents_from_r2(r2_client, bucket))
+    logger.info(f"Loaded {len(documents)} documents from R2")
+    return documents
 
 
-def upload_chunk_to_r2(r2_client, bucket: str, chunk: Dict[str, Any]) -> None:
-    """Upload a single chunk to R2 as an individual object."""
+def chunk_r2_key(chunk: Dict[str, Any]) -> str:
+    """R2 object key for a small chunk."""
+    return f"corpus/chunks/{chunk.get('doc_type', 'unknown')}/{chunk.get('chunk_id')}.json"
+
+
+def upload_chunk_to_r2(r2_client, bucket: str, chunk: Dict[str, Any]) -> Optional[str]:
+    """Upload a single chunk to R2 as an individual object; returns its key, or None on failure."""
     try:
-        chunk_id = chunk.get("chunk_id")
-        doc_type = chunk.get("doc_type", "unknown")
-        
         # Create R2 key for this chunk
-        r2_key = f"corpus/chunks/{doc_type}/{chunk_id}.json"
+        r2_key = chunk_r2_key(chunk)
         
         # Prepare chunk metadata for R2
         chunk_metadata = {
@@ -171,9 +220,11 @@ def upload_chunk_to_r2(r2_client, bucket: str, chunk: Dict[str, Any]) -> None:
             ContentType="application/json",
             Metadata=sanitized_metadata
         )
+        return r2_key
         
     except Exception as e:
         logger.error(f"Error uploading chunk {chunk.get('chunk_id')} to R2: {e}")
+        return None
 
 
 def upload_parent_doc_to_r2(r2_client, bucket: str, parent_doc: Dict[str, Any]) -> str:
@@ -224,48 +275,79 @@ def normalize_text(text: str) -> str:
     return text.strip()
 
 
-def find_sentence_boundary(text: str, position: int) -> int:
-    """Find the nearest sentence boundary to the given position."""
-    # Look for sentence-ending punctuation followed by space or newline
-    sentence_end_pattern = r'[.!?]\s+'
-    
-    # Search forward for the next sentence boundary
-    forward_match = re.search(sentence_end_pattern, text[position:])
-    forward_pos = position + forward_match.end() if forward_match else len(text)
-    
-    # Search backward for the previous sentence boundary
-    text_before = text[:position]
-    backward_matches = list(re.finditer(sentence_end_pattern, text_before))
-    backward_pos = backward_matches[-1].end() if backward_matches and backward_matches else 0
-    
-    # If no sentence boundaries found, just find word boundaries
-    if forward_pos == len(text) and backward_pos == 0:
-        # Try to find a space near the position
-        if position < len(text) and text[position] == ' ':
-            return position
-        
-        # Look for the nearest space
-        space_before = text[:position].rfind(' ')
-        space_after = text[position:].find(' ')
-        
-        if space_before == -1:
-            space_before = 0
-        if space_after == -1:
-            space_after = len(text) - position
-            
-        # Return the closest space
-        if position - space_before <= space_after:
-            return space_before
-        else:
-            return position + space_after
-    
-    # Return the closest sentence boundary
-    if position - backward_pos <= forward_pos - position:
-        return backward_pos
-    else:
+SENTENCE_END_PATTERN = re.compile(r'[.!?]\s+')
+
+
+class SentenceBoundaryIndex:
+    """
+    Sentence and word boundary offsets of a text, built in one pass.
+
+    ``find_sentence_boundary`` used to rescan the whole prefix of the text on
+    every call, which made chunking a long judgment quadratic. The index
+    records the start and end of every sentence-ending match once; each
+    lookup is then a ``bisect`` over those offsets. Word boundaries (spaces)
+    are only indexed the first time a lookup needs the fallback.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.text_length = len(text)
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        for match in SENTENCE_END_PATTERN.finditer(text):
+            self._starts.append(match.start())
+            self._ends.append(match.end())
+        self._spaces: Optional[List[int]] = None
+
+    def _space_offsets(self) -> List[int]:
+        if self._spaces is None:
+            self._spaces = [i for i, char in enumerate(self.text) if char == ' ']
+        return self._spaces
+
+    def nearest(self, position: int) -> int:
+        """Return the sentence (or word) boundary nearest to ``position``."""
+        # Next boundary: first sentence end starting at or after position
+        i = bisect.bisect_left(self._starts, position)
+        forward_pos = self._ends[i] if i < len(self._starts) else self.text_length
+
+        # Previous boundary: last sentence end that has punctuation and at
+        # least one whitespace character before position. Its trailing
+        # whitespace is cut off at position, as if matched in text[:position].
+        j = bisect.bisect_right(self._starts, position - 2) - 1
+        backward_pos = min(self._ends[j], position) if j >= 0 else 0
+
+        # If no sentence boundaries found, just find word boundaries
+        if forward_pos == self.text_length and backward_pos == 0:
+            if position < self.text_length and self.text[position] == ' ':
+                return position
+
+            spaces = self._space_offsets()
+            k = bisect.bisect_left(spaces, position)
+            space_before = spaces[k - 1] if k > 0 else 0
+            space_after = spaces[k] if k < len(spaces) else self.text_length
+
+            # Return the closest space
+            if position - space_before <= space_after - position:
+                return space_before
+            return space_after
+
+        # Return the closest sentence boundary
+        if position - backward_pos <= forward_pos - position:
+            return backward_pos
         return forward_pos
 
 
+def find_sentence_boundary(text: str, position: int, index: Optional[SentenceBoundaryIndex] = None) -> int:
+    """Find the nearest sentence boundary to the given position.
+
+    Pass a ``SentenceBoundaryIndex`` built for ``text`` when looking up more
+    than one position in the same text.
+    """
+    if index is None:
+        index = SentenceBoundaryIndex(text)
+    return index.nearest(position)
+
+
 def extract_entities(text: str) -> Dict[str, List[str]]:
     """Extract entities from text using regex patterns and normalize them."""
     entities = {}
@@ -422,6 +504,7 @@ def chunk_text(
     # Initialize window
     pos = 0
     chunk_index = 0
+    boundaries = SentenceBoundaryIndex(text)
     
     while pos < text_length:
         # Calculate end position for current chunk
@@ -430,7 +513,7 @@ def chunk_text(
         
         # Adjust to sentence boundary if not at end of text
         if end_pos < text_length:
-            end_pos = find_sentence_boundary(text, end_pos)
+            end_pos = boundaries.nearest(end_pos)
         
         # Extract chunk text
         chunk_text = text[pos:end_pos]
@@ -1008,13 +1091,15 @@ def chunk_judgment(doc: Dict[str, Any]) -> List[Chunk]:
         current_chunk_paras = []
         chunk_index = 0
         
+        # Normalize each paragraph once; overlap paragraphs are looked up by number
+        normalized_paras = {para_num: normalize_text(para) for para_num, para in filtered_body}
+        
         # Process paragraphs to create chunks
-        for i, (para_num, para) in enumerate(filtered_body):
-            # Normalize paragraph text
-            para_text = normalize_text(para)
+        for para_num, _ in filtered_body:
+            para_text = normalized_paras[para_num]
             
             # If adding this paragraph would exceed target size and we already have content
-            if current_chunk_text and len(current_chunk_text + " " + para_text) > chunk_size:
+            if current_chunk_text and len(current_chunk_text) + 1 + len(para_text) > chunk_size:
                 # Create a chunk from accumulated paragraphs
                 start_para = current_chunk_paras[0]
                 end_para = current_chunk_paras[-1]
@@ -1071,10 +1156,9 @@ def chunk_judgment(doc: Dict[str, Any]) -> List[Chunk]:
                 min_overlap_paras = 1
                 
                 for para_idx in reversed(current_chunk_paras):
-                    para_content = next((p for n, p in filtered_body if n == para_idx), "")
-                    para_content = normalize_text(para_content)
+                    para_content = normalized_paras[para_idx]
                     
-                    if len(overlap_text + " " + para_content) <= overlap_size or len(overlap_paras) < min_overlap_paras:
+                    if len(overlap_text) + 1 + len(para_content) <= overlap_size or len(overlap_paras) < min_overlap_paras:
                         overlap_paras.insert(0, para_idx)
                         overlap_text = para_content + " " + overlap_text if overlap_text else para_content
                     else:
@@ -1141,6 +1225,65 @@ def chunk_judgment(doc: Dict[str, Any]) -> List[Chunk]:
     return all_chunks
 
 
+def enrich_chunk(chunk: Chunk, verbose: bool = False) -> Chunk:
+    """Merge regex-extracted entities into a chunk; returns the chunk unchanged on error."""
+    try:
+        # Extract text for processing
+        chunk_text = chunk.chunk_text
+        
+        # Extract and normalize entities with improved extraction
+        entities = extract_entities(chunk_text)
+        
+        # Merge with existing entities if present
+        if chunk.entities and isinstance(chunk.entities, dict):
+            for entity_type, values in entities.items():
+                if entity_type in chunk.entities:
+                    # Combine and deduplicate
+                    if entity_type == "parties":
+                        # Special handling for parties
+                        chunk.entities[entity_type] = values
+                    else:
+                        existing = set(chunk.entities[entity_type])
+                        existing.update(values)
+                        chunk.entities[entity_type] = list(existing)
+                else:
+                    chunk.entities[entity_type] = values
+        else:
+            chunk.entities = entities
+        
+        # Extract date context if available
+        if "dates" in entities and entities["dates"] and not chunk.date_context:
+            # Use the first date as date_context if not already set
+            chunk.date_context = entities["dates"][0]
+        
+        # Add court to metadata if available
+        if "courts" in entities and entities["courts"]:
+            if "metadata" not in chunk:
+                chunk.metadata = {}
+            if "court" not in chunk.metadata or not chunk.metadata["court"]:
+                chunk.metadata["court"] = entities["courts"][0]
+        
+        if verbose:
+            logger.info(f"Enriched chunk {chunk.chunk_id}")
+            
+    except Exception as e:
+        logger.error(f"Error enriching chunk {chunk.chunk_id}: {e}")
+        if verbose:
+            import traceback
+            logger.error(traceback.format_exc())
+    
+    return chunk
+
+
+def count_entities(entity_maps) -> Dict[str, int]:
+    """Number of extracted entities per type across chunks' ``entities`` dicts."""
+    entity_counts: Dict[str, int] = {}
+    for entities in entity_maps:
+        for entity_type, values in (entities or {}).items():
+            entity_counts[entity_type] = entity_counts.get(entity_type, 0) + (len(values) if isinstance(values, list) else 1)
+    return entity_counts
+
+
 def enrich_chunks(chunks: List[Chunk], verbose: bool = False) -> List[Chunk]:
     """
     Enrich chunks with additional entity extraction and normalization.
@@ -1152,97 +1295,166 @@ def enrich_chunks(chunks: List[Chunk], verbose: bool = False) -> List[Chunk]:
     Returns:
         List of enriched chunks
     """
-    enriched_chunks = []
-    
-    for chunk in tqdm(chunks, desc="Enriching chunks"):
-        try:
-            # Extract text for processing
-            chunk_text = chunk.chunk_text
-            
-            # Extract and normalize entities with improved extraction
-            entities = extract_entities(chunk_text)
-            
-            # Merge with existing entities if present
-            if chunk.entities and isinstance(chunk.entities, dict):
-                for entity_type, values in entities.items():
-                    if entity_type in chunk.entities:
-                        # Combine and deduplicate
-                        if entity_type == "parties":
-                            # Special handling for parties
-                            chunk.entities[entity_type] = values
-                        else:
-                            existing = set(chunk.entities[entity_type])
-                            existing.update(values)
-                            chunk.entities[entity_type] = list(existing)
-                    else:
-                        chunk.entities[entity_type] = values
-            else:
-                chunk.entities = entities
-            
-            # Extract date context if available
-            if "dates" in entities and entities["dates"] and not chunk.date_context:
-                # Use the first date as date_context if not already set
-                chunk.date_context = entities["dates"][0]
-            
-            # Add court to metadata if available
-            if "courts" in entities and entities["courts"]:
-                if "metadata" not in chunk:
-                    chunk.metadata = {}
-                if "court" not in chunk.metadata or not chunk.metadata["court"]:
-                    chunk.metadata["court"] = entities["courts"][0]
-            
-            enriched_chunks.append(chunk)
-            
-            if verbose:
-                logger.info(f"Enriched chunk {chunk.chunk_id}")
-                
-        except Exception as e:
-            logger.error(f"Error enriching chunk {chunk.chunk_id}: {e}")
-            if verbose:
-                import traceback
-                logger.error(traceback.format_exc())
-            # Keep the original chunk
-            enriched_chunks.append(chunk)
-    
-    # Log statistics
-    entity_counts = {}
-    for chunk in enriched_chunks:
-        if chunk.entities:
-            for entity_type, values in chunk.entities.items():
-                if entity_type not in entity_counts:
-                    entity_counts[entity_type] = 0
-                entity_counts[entity_type] += len(values) if isinstance(values, list) else 1
+    enriched_chunks = [enrich_chunk(chunk, verbose) for chunk in tqdm(chunks, desc="Enriching chunks")]
     
     logger.info("Entity extraction statistics:")
-    for entity_type, count in entity_counts.items():
+    for entity_type, count in count_entities(chunk.entities for chunk in enriched_chunks).items():
         logger.info(f"  {entity_type}: {count}")
     
     return enriched_chunks
 
 
-def check_document_already_chunked(r2_client, bucket: str, doc_id: str) -> bool:
-    """Check if a document has already been chunked by looking for chunks in R2."""
+def is_legislation_document(doc: Dict[str, Any]) -> bool:
+    """True for acts, SIs, ordinances and the constitution; judgments otherwise."""
+    doc_type_value = (doc.get("doc_type") or "").lower()
+    nature_value = (doc.get("extra", {}).get("nature") or "").lower()
+    return (
+        doc_type_value in {"act", "si", "ordinance", "constitution", "legislation"}
+        or nature_value in {"act", "statutory instrument", "ordinance"}
+    )
+
+
+def chunk_document(doc: Dict[str, Any], enrich: bool = True) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Chunk (and optionally enrich) one parsed document.
+    
+    This is the CPU-bound stage of the pipeline and runs in a worker process,
+    so it takes and returns plain picklable dicts.
+    
+    Returns:
+        (chunk dicts, parent doc dicts)
+    """
+    if is_legislation_document(doc):
+        chunks, parent_docs = chunk_legislation(doc)
+    else:
+        chunks, parent_docs = chunk_judgment(doc), []
+    if enrich:
+        chunks = [enrich_chunk(chunk) for chunk in chunks]
+    return [chunk.model_dump() for chunk in chunks], parent_docs
+
+
+def document_content_hash(doc: Dict[str, Any]) -> str:
+    """Stable sha256 of a parsed document, used to detect content changes."""
+    canonical = json.dumps(doc, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def load_chunk_manifest(r2_client, bucket: str, key: str = CHUNK_MANIFEST_R2_KEY) -> Tuple[Dict[str, Dict[str, Any]], Optional[str]]:
+    """Fetch the chunk manifest and its ETag; an empty manifest if none exists yet."""
     try:
-        # List objects with prefix for this document's chunks
-        paginator = r2_client.get_paginator('list_objects_v2')
-        prefix = f"corpus/chunks/"
-        
-        for page in paginator.paginate(Bucket=bucket, Prefix=prefix, MaxKeys=1000):
-            for obj in page.get('Contents', []):
-                if obj['Key'].endswith('.json'):
-                    # Quick check: if any chunk file contains this doc_id, assume already chunked
-                    try:
-                        response = r2_client.get_object(Bucket=bucket, Key=obj['Key'])
-                        chunk_data = json.loads(response['Body'].read().decode('utf-8'))
-                        if chunk_data.get('doc_id') == doc_id:
-                            logger.info(f"Document {doc_id} already chunked, skipping")
-                            return True
-                    except Exception:
-                        continue  # Skip malformed chunks
-        return False
+        response = r2_client.get_object(Bucket=bucket, Key=key)
     except Exception as e:
-        logger.warning(f"Error checking if document {doc_id} is chunked: {e}")
-        return False
+        status = getattr(e, "response", {}).get("Error", {}).get("Code")
+        if status not in ("NoSuchKey", "404"):
+            logger.warning(f"Chunk manifest unavailable, treating all documents as new: {e}")
+        return {}, None
+    data = json.loads(response["Body"].read())
+    if data.get("version") != CHUNK_MANIFEST_FORMAT:
+        logger.warning(f"Unsupported chunk manifest format {data.get('version')}, rebuilding")
+        return {}, response.get("ETag")
+    return data.get("docs", {}), response.get("ETag")
+
+
+def is_document_current(manifest: Dict[str, Dict[str, Any]], doc_id: str, content_hash: str) -> bool:
+    """True if ``doc_id`` was chunked from the same content by the current chunker."""
+    entry = manifest.get(doc_id)
+    return bool(entry) and entry.get("content_hash") == content_hash and entry.get("chunker_version") == CHUNKER_VERSION
+
+
+def update_chunk_manifest(
+    r2_client,
+    bucket: str,
+    updates: Dict[str, Dict[str, Any]],
+    etag: Optional[str],
+    docs: Optional[Dict[str, Dict[str, Any]]] = None,
+    key: str = CHUNK_MANIFEST_R2_KEY,
+    max_attempts: int = 5,
+) -> Tuple[int, Optional[str]]:
+    """Merge ``updates`` into the published manifest with a conditional PUT.
+
+    ``docs`` and ``etag`` are the manifest as this run last read or wrote it.
+    The first attempt uses them as-is, and ``docs`` is updated in place. When
+    ``docs`` is not given, the manifest is read first. The write only succeeds
+    if the manifest is unchanged since then (``IfMatch``, or
+    ``IfNoneMatch="*"`` when it did not exist). If another run wrote it in the
+    meantime, the manifest is re-read into ``docs``, merged and retried.
+    Returns the manifest size and its new ETag, for the next call.
+    """
+    if docs is None:
+        docs, etag = load_chunk_manifest(r2_client, bucket, key)
+    for _ in range(max_attempts):
+        docs.update(updates)
+        body = {"version": CHUNK_MANIFEST_FORMAT, "build_timestamp": time.time(), "docs": docs}
+        condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+        try:
+            response = r2_client.put_object(
+                Bucket=bucket,
+                Key=key,
+                Body=json.dumps(body, separators=(",", ":")).encode("utf-8"),
+                ContentType="application/json",
+                Metadata={"doc_count": str(len(docs)), "chunker_version": str(CHUNKER_VERSION)},
+                **condition,
+            )
+            return len(docs), (response or {}).get("ETag")
+        except ClientError as e:
+            code = getattr(e, "response", {}).get("Error", {}).get("Code")
+            if code not in ("PreconditionFailed", "412", "ConditionalRequestConflict"):
+                raise
+            logger.info("Chunk manifest changed concurrently, merging and retrying")
+            current, etag = load_chunk_manifest(r2_client, bucket, key)
+            docs.clear()
+            docs.update(current)
+    raise RuntimeError(f"Could not update chunk manifest after {max_attempts} attempts")
+
+
+def delete_stale_chunks(r2_client, bucket: str, keys: List[str]) -> int:
+    """Delete chunk objects a re-chunked document no longer produces."""
+    deleted = 0
+    for start in range(0, len(keys), 1000):
+        batch = keys[start:start + 1000]
+        try:
+            r2_client.delete_objects(Bucket=bucket, Delete={"Objects": [{"Key": k} for k in batch], "Quiet": True})
+            deleted += len(batch)
+        except Exception as e:
+            logger.error(f"Failed to delete {len(batch)} stale chunks: {e}")
+    return deleted
+
+
+@dataclass
+class PipelineStats:
+    """Per-stage counters for the chunking pipeline."""
+
+    started: float = field(default_factory=time.perf_counter)
+    docs_read: int = 0
+    docs_skipped: int = 0
+    docs_chunked: int = 0
+    docs_failed: int = 0
+    docs_recorded: int = 0
+    chunks_generated: int = 0
+    chunks_uploaded: int = 0
+    chunk_uploads_failed: int = 0
+    parents_uploaded: int = 0
+    parent_uploads_failed: int = 0
+    peak_docs_in_flight: int = 0
+    peak_uploads_in_flight: int = 0
+    total_tokens: int = 0
+    total_chars: int = 0
+    entity_counts: Dict[str, int] = field(default_factory=dict)
+
+    def rate(self, count: int) -> float:
+        elapsed = time.perf_counter() - self.started
+        return count / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"read {self.docs_read} docs ({self.rate(self.docs_read):.1f}/s, {self.docs_skipped} current), "
+            f"chunked {self.docs_chunked} ({self.rate(self.docs_chunked):.1f}/s, {self.docs_failed} failed) "
+            f"into {self.chunks_generated} chunks ({self.rate(self.chunks_generated):.1f}/s), "
+            f"uploaded {self.chunks_uploaded} chunks ({self.rate(self.chunks_uploaded):.1f}/s, "
+            f"{self.chunk_uploads_failed} failed) and {self.parents_uploaded} parents, "
+            f"recorded {self.docs_recorded} docs; peak in flight: "
+            f"{self.peak_docs_in_flight} docs, {self.peak_uploads_in_flight} uploads"
+        )
 
 
 def process_documents_from_r2(
@@ -1253,118 +1465,237 @@ def process_documents_from_r2(
     enrich: bool = True,
     doc_ids: Optional[Set[str]] = None,
     force: bool = False,
-) -> None:
+    workers: Optional[int] = None,
+    upload_concurrency: int = CHUNK_UPLOAD_CONCURRENCY,
+) -> PipelineStats:
     """
     Process documents from R2, chunk them, and upload chunks back to R2.
     
+    Documents stream through three stages: the catalog is read one line at
+    a time, chunking and entity extraction run in a process pool of
+    ``workers``, and chunk/parent uploads run in a thread pool of
+    ``upload_concurrency``. At most ``2 * workers`` documents and
+    ``4 * upload_concurrency`` uploads are in flight, so memory stays
+    bounded regardless of corpus size.
+    
+    Each document is recorded in the chunk manifest once all its chunks and
+    parent docs are uploaded, and the manifest is written every CHUNK_MANIFEST_FLUSH_DOCS
+    documents. An interrupted run resumes by skipping recorded documents.
+    
     Args:
         r2_client: boto3 client for R2
         bucket: R2 bucket name
         max_docs: Maximum number of documents to process (for testing)
         verbose: Whether to print verbose output
         enrich: Whether to apply advanced entity enrichment
+        doc_ids: Only process these documents
+        force: Re-chunk documents even if the manifest says they are current
+        workers: Chunking processes (CHUNK_WORKERS); 1 chunks in a single background thread
+        upload_concurrency: Concurrent R2 uploads
+        
+    Returns:
+        Pipeline counters for the run
     """
-    # Load documents from R2
-    documents = load_documents_from_r2(r2_client, bucket)
-
-    # If specific doc_ids provided, filter
-    if doc_ids:
-        before = len(documents)
-        documents = [doc for doc in documents if doc.get("doc_id") in doc_ids]
-        logger.info(f"Filtered documents list from {before} to {len(documents)} based on --doc-ids filter")
+    workers = max(1, workers or CHUNK_WORKERS)
+    upload_concurrency = max(1, upload_concurrency)
+    max_docs_in_flight = 2 * workers
+    max_uploads_in_flight = 4 * upload_concurrency
+    stats = PipelineStats()
+    
+    # One read of the chunk manifest replaces per-document R2 scans
+    manifest, manifest_etag = load_chunk_manifest(r2_client, bucket)
+    logger.info(f"Chunk manifest lists {len(manifest)} documents (chunker v{CHUNKER_VERSION})")
+    
+    # Per-document upload progress, dropped once the document is recorded
+    doc_state: Dict[str, Dict[str, Any]] = {}
+    manifest_updates: Dict[str, Dict[str, Any]] = {}
+    stale_keys: List[str] = []
+    parent_keys: Dict[str, str] = {}
+    chunk_futures: Dict[Future, Tuple[str, str]] = {}
+    upload_futures: Dict[Future, Tuple[str, str, str]] = {}  # -> (kind, doc_id, parent_doc_id)
+    last_progress = time.perf_counter()
+    
+    def flush_manifest() -> None:
+        nonlocal stale_keys, manifest_etag
+        if stale_keys:
+            logger.info(f"Deleted {delete_stale_chunks(r2_client, bucket, stale_keys)} stale chunks")
+            stale_keys = []
+        if manifest_updates:
+            try:
+                manifest_size, manifest_etag = update_chunk_manifest(
+                    r2_client, bucket, manifest_updates, manifest_etag, docs=manifest
+                )
+                logger.info(f"Chunk manifest updated ({manifest_size} documents)")
+            except Exception as e:
+                logger.error(f"Failed to update chunk manifest: {e}")
+            manifest_updates.clear()
+    
+    def record_document(doc_id: str) -> None:
+        state = doc_state.pop(doc_id)
+        if state["failed"]:
+            return  # retried on the next run
+        previous = manifest.get(doc_id, {}).get("chunk_keys", [])
+        stale_keys.extend(sorted(set(previous) - set(state["keys"])))
+        manifest_updates[doc_id] = {
+            "content_hash": state["content_hash"],
+            "chunk_keys": sorted(state["keys"]),
+            "chunker_version": CHUNKER_VERSION,
+            "chunked_at": time.time(),
+        }
+        stats.docs_recorded += 1
+        if len(manifest_updates) >= CHUNK_MANIFEST_FLUSH_DOCS:
+            flush_manifest()
     
-    if max_docs:
-        documents = documents[:max_docs]
-        logger.info(f"Limited processing to {max_docs} documents for testing")
+    def finish_uploads(done) -> None:
+        for future in done:
+            kind, owner, parent_id = upload_futures.pop(future)
+            try:
+                key = future.result()
+            except Exception as e:
+                logger.error(f"Failed to upload {kind} for document {owner}: {e}")
+                key = None
+            state = doc_state[owner]
+            if kind == "parent":
+                # A missing parent breaks small-to-big lookups, so the document is retried
+                if key:
+                    parent_keys[parent_id] = key
+                    stats.parents_uploaded += 1
+                else:
+                    state["failed"] = True
+                    stats.parent_uploads_failed += 1
+            elif key:
+                state["keys"].append(key)
+                stats.chunks_uploaded += 1
+            else:
+                state["failed"] = True
+                stats.chunk_uploads_failed += 1
+            state["pending"] -= 1
+            if state["pending"] == 0:
+                record_document(owner)
+    
+    def submit_upload(kind: str, owner: str, fn, payload: Dict[str, Any]) -> None:
+        while len(upload_futures) >= max_uploads_in_flight:
+            done, _ = wait(upload_futures, return_when=FIRST_COMPLETED)
+            finish_uploads(done)
+        upload_futures[upload_pool.submit(fn, r2_client, bucket, payload)] = (kind, owner, payload.get("parent_doc_id", ""))
+        stats.peak_uploads_in_flight = max(stats.peak_uploads_in_flight, len(upload_futures))
+    
+    def finish_chunking(done) -> None:
+        nonlocal last_progress
+        for future in done:
+            doc_id, content_hash = chunk_futures.pop(future)
+            try:
+                chunks, parent_docs = future.result()
+            except Exception as e:
+                stats.docs_failed += 1
+                logger.error(f"Error processing document {doc_id}: {e}")
+                continue
+            stats.docs_chunked += 1
+            stats.chunks_generated += len(chunks)
+            if verbose:
+                logger.info(f"Generated {len(chunks)} chunks for document {doc_id}")
+            
+            # Registered before any upload is submitted: the document is recorded
+            # only once every chunk and parent upload has finished
+            doc_state[doc_id] = {
+                "content_hash": content_hash,
+                "pending": len(chunks) + len(parent_docs),
+                "keys": [],
+                "failed": False,
+            }
+            if not chunks and not parent_docs:
+                record_document(doc_id)
+            
+            for parent_doc in parent_docs:
+                if parents_file.tell():
+                    parents_file.write(b"\n")
+                parents_file.write(json.dumps(parent_doc, default=str).encode("utf-8"))
+                submit_upload("parent", doc_id, upload_parent_doc_to_r2, parent_doc)
+            
+            for entity_type, count in count_entities(chunk.get("entities") for chunk in chunks).items():
+                stats.entity_counts[entity_type] = stats.entity_counts.get(entity_type, 0) + count
+            for chunk in chunks:
+                stats.total_tokens += chunk.get("num_tokens") or 0
+                stats.total_chars += len(chunk.get("chunk_text") or "")
+                submit_upload("chunk", doc_id, upload_chunk_to_r2, chunk)
+        
+        if time.perf_counter() - last_progress >= CHUNK_PROGRESS_SECONDS:
+            logger.info(f"Progress: {stats.summary()}")
+            last_progress = time.perf_counter()
     
-    all_chunks: List[Chunk] = []
-    all_parent_docs = []
-    skipped_count = 0
+    # A single worker chunks in a background thread (no pickling, easier to debug)
+    chunk_pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else ThreadPoolExecutor(max_workers=1)
+    upload_pool = ThreadPoolExecutor(max_workers=upload_concurrency, thread_name_prefix="r2-upload")
+    # Parent docs for corpus/docs/docs.jsonl are spooled to disk rather than held in memory
+    parents_file = tempfile.TemporaryFile()
     
-    # Process each document
-    for doc in tqdm(documents, desc="Chunking documents"):
-        try:
+    try:
+        selected = 0
+        for doc in tqdm(iter_documents_from_r2(r2_client, bucket), desc="Chunking documents"):
             doc_id = doc.get('doc_id')
-            
-            # Skip if already chunked (unless forced)
-            if not force and check_document_already_chunked(r2_client, bucket, doc_id):
-                skipped_count += 1
+            if doc_ids and doc_id not in doc_ids:
                 continue
+            if max_docs and selected >= max_docs:
+                break
+            selected += 1
+            stats.docs_read += 1
             
-            # Determine document type and apply appropriate chunking strategy
-            doc_type_value = (doc.get("doc_type") or "").lower()
-            nature_value = (doc.get("extra", {}).get("nature") or "").lower()
-            is_legislation = (
-                doc_type_value in {"act", "si", "ordinance", "constitution", "legislation"}
-                or nature_value in {"act", "statutory instrument", "ordinance"}
-            )
-
-            if is_legislation:
-                chunks, parent_docs = chunk_legislation(doc)
-                all_chunks.extend(chunks)
-                all_parent_docs.extend(parent_docs)
-            else:
-                chunks = chunk_judgment(doc)
-                all_chunks.extend(chunks)
+            # Skip if chunked from the same content by this chunker version (unless forced)
+            content_hash = document_content_hash(doc)
+            if not force and is_document_current(manifest, doc_id, content_hash):
+                stats.docs_skipped += 1
+                continue
             
-            if verbose:
-                logger.info(f"Generated {len(chunks)} chunks for document {doc.get('doc_id')}")
+            if len(chunk_futures) >= max_docs_in_flight:
+                done, _ = wait(chunk_futures, return_when=FIRST_COMPLETED)
+                finish_chunking(done)
+            chunk_futures[chunk_pool.submit(chunk_document, doc, enrich)] = (doc_id, content_hash)
+            stats.peak_docs_in_flight = max(stats.peak_docs_in_flight, len(chunk_futures))
         
-        except Exception as e:
-            logger.error(f"Error processing document {doc.get('doc_id')}: {e}")
-            if verbose:
-                import traceback
-                logger.error(traceback.format_exc())
-    
-    # Apply advanced entity enrichment if requested
-    if enrich and all_chunks:
-        logger.info("Applying advanced entity enrichment...")
-        all_chunks = enrich_chunks(all_chunks, verbose)
-    
-    # ------------------------------------------------------------------
-    # Upload parent docs first (big chunks)
-    # ------------------------------------------------------------------
-    logger.info(f"Uploading {len(all_parent_docs)} parent docs to R2 ...")
-    for pd in tqdm(all_parent_docs, desc="Uploading parents"):
-        try:
-            upload_parent_doc_to_r2(r2_client, bucket, pd)
-        except Exception as e:
-            logger.error(f"Failed to upload parent doc {pd.get('parent_doc_id')}: {e}")
-
-    # Also upload docs.jsonl manifest
-    if all_parent_docs:
-        manifest_content = "\n".join([json.dumps(p, default=str) for p in all_parent_docs])
-        r2_client.put_object(
-            Bucket=bucket,
-            Key="corpus/docs/docs.jsonl",
-            Body=manifest_content.encode("utf-8"),
-            ContentType="application/json",
-        )
-
-    # ------------------------------------------------------------------
-    # Upload individual *small* chunks
-    # ------------------------------------------------------------------
-    logger.info(f"Uploading {len(all_chunks)} chunks to R2...")
-    successful_uploads = 0
-    failed_uploads = 0
-    
-    for chunk in tqdm(all_chunks, desc="Uploading chunks"):
-        try:
-            upload_chunk_to_r2(r2_client, bucket, chunk.model_dump()) # Use model_dump() for consistency
-            successful_uploads += 1
-        except Exception as e:
-            logger.error(f"Failed to upload chunk {chunk.chunk_id}: {e}")
-            failed_uploads += 1
+        # Drain the chunking stage, then the upload stage
+        while chunk_futures:
+            done, _ = wait(chunk_futures, return_when=FIRST_COMPLETED)
+            finish_chunking(done)
+        while upload_futures:
+            done, _ = wait(upload_futures, return_when=FIRST_COMPLETED)
+            finish_uploads(done)
+        
+        # Record fully uploaded documents; drop chunks they no longer produce
+        flush_manifest()
+        
+        # Record exact parent keys so the API resolves each parent with a single GET
+        if parent_keys:
+            try:
+                manifest_size = update_doc_manifest(r2_client, bucket, parent_keys)
+                logger.info(f"Parent document manifest updated ({manifest_size} documents)")
+            except Exception as e:
+                logger.error(f"Failed to update parent document manifest: {e}")
+        
+        # Also upload docs.jsonl manifest
+        if parents_file.tell():
+            parents_file.seek(0)
+            r2_client.put_object(
+                Bucket=bucket,
+                Key="corpus/docs/docs.jsonl",
+                Body=parents_file,
+                ContentType="application/json",
+            )
+    finally:
+        chunk_pool.shutdown(wait=True, cancel_futures=True)
+        upload_pool.shutdown(wait=True)
+        parents_file.close()
     
     # Log statistics
-    avg_tokens = sum(chunk.num_tokens for chunk in all_chunks) / len(all_chunks) if all_chunks else 0
-    avg_chars = sum(len(chunk.chunk_text) for chunk in all_chunks) / len(all_chunks) if all_chunks else 0
-    
-    logger.info(f"Generated {len(all_chunks)} chunks from {len(documents)} documents")
-    if skipped_count > 0:
-        logger.info(f"Skipped {skipped_count} already chunked documents")
-    logger.info(f"Successfully uploaded: {successful_uploads}, Failed: {failed_uploads}")
+    avg_tokens = stats.total_tokens / stats.chunks_generated if stats.chunks_generated else 0
+    avg_chars = stats.total_chars / stats.chunks_generated if stats.chunks_generated else 0
+    
+    logger.info(f"Pipeline finished in {time.perf_counter() - stats.started:.1f}s: {stats.summary()}")
+    if enrich and stats.entity_counts:
+        logger.info("Entity extraction statistics:")
+        for entity_type, count in stats.entity_counts.items():
+            logger.info(f"  {entity_type}: {count}")
     logger.info(f"Average chunk size: {avg_tokens:.1f} tokens, {avg_chars:.1f} characters")
+    return stats
 
 
 def fix_chunks_for_milvus(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -1436,6 +1767,10 @@ def main():
                         help="Skip advanced entity enrichment")
     parser.add_argument("--verbose", action="store_true", help="Print verbose output")
     parser.add_argument("--force", action="store_true", help="Force reprocessing of already chunked documents")
+    parser.add_argument("--workers", type=int, default=CHUNK_WORKERS,
+                        help="Chunking/enrichment processes (default: CHUNK_WORKERS or CPU count)")
+    parser.add_argument("--upload-concurrency", type=int, default=CHUNK_UPLOAD_CONCURRENCY,
+                        help="Concurrent R2 uploads (default: CHUNK_UPLOAD_CONCURRENCY)")
     
     args = parser.parse_args()
     
@@ -1448,7 +1783,7 @@ def main():
     
     try:
         # Get R2 client and bucket
-        r2_client = get_r2_client()
+        r2_client = get_r2_client(max_pool_connections=args.upload_concurrency)
         bucket = os.environ["CLOUDFLARE_R2_BUCKET_NAME"]
         
         # Process documents from R2 into chunks and upload back to R2
@@ -1459,7 +1794,9 @@ def main():
             verbose=args.verbose,
             enrich=not args.no_enrich,
             doc_ids=set(args.doc_ids.split(",")) if args.doc_ids else None,
-            force=args.force
+            force=args.force,
+            workers=args.workers,
+            upload_concurrency=args.upload_concurrency,
         )
             
     except Exception as e:
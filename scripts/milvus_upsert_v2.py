@@ -10,11 +10,17 @@ Key features:
 - Reads chunks directly from R2 (not local files)
 - Generates embeddings using OpenAI API in batches
 - Uses new v2.0 schema with chunk_id as primary key
-- Supports parallel processing for faster embedding generation
+- Pipelined ingestion (default): concurrent R2 reads, token-packed concurrent
+  embedding requests and Milvus inserts overlap through bounded queues
+- Chunks whose read, embedding or insert fails are written to a retry journal
+  (never inserted with placeholder vectors); --from_journal re-runs only those
 - Only stores lightweight metadata (chunk content retrieved from R2 later)
+- Publishes the doc_id -> parent document key manifest used by the API
 
 Usage:
     python scripts/milvus_upsert_v2.py [--max_chunks INT] [--batch_size INT] [--verbose]
+    python scripts/milvus_upsert_v2.py --embed_concurrency 8 --read_concurrency 32
+    python scripts/milvus_upsert_v2.py --from_journal
 
 Author: RightLine Team
 """
@@ -24,10 +30,15 @@ import asyncio
 import json
 import logging
 import os
+import queue
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
 from tqdm import tqdm
 
 import boto3
@@ -38,6 +49,8 @@ from dotenv import load_dotenv
 # Import chunk model
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from api.models import ChunkV3 as Chunk
+from api.doc_manifest import build_doc_manifest, save_doc_manifest
+from libs.caching.embedding_store import EmbeddingStore
 
 try:
     from pymilvus import (
@@ -62,7 +75,18 @@ logger = structlog.get_logger()
 # Default configuration
 DEFAULT_BATCH_SIZE = 100
 DEFAULT_MAX_CHUNKS = None
-EMBEDDING_BATCH_SIZE = 50  # OpenAI API batch size for embedding generation
+EMBEDDING_BATCH_SIZE = 50  # OpenAI API batch size for embedding generation (sequential mode)
+
+# Pipelined ingestion
+EMBEDDING_MAX_INPUT_TOKENS = 8192  # OpenAI per-input limit
+EMBEDDING_REQUEST_TOKEN_LIMIT = int(os.getenv("EMBEDDING_REQUEST_TOKEN_LIMIT", "300000"))  # OpenAI per-request limit
+EMBEDDING_MAX_BATCH_INPUTS = int(os.getenv("EMBEDDING_MAX_BATCH_INPUTS", "256"))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+R2_READ_CONCURRENCY = int(os.getenv("R2_READ_CONCURRENCY", "16"))
+INGEST_QUEUE_CHUNKS = int(os.getenv("INGEST_QUEUE_CHUNKS", "2048"))  # loaded chunks buffered ahead of embedding
+MILVUS_RETRY_JOURNAL = os.getenv("MILVUS_RETRY_JOURNAL", "data/processed/milvus_retry_journal.jsonl")
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "data/embeddings")  # content-hash vector store
 
 
 def get_config() -> Dict[str, Any]:
@@ -103,12 +127,16 @@ def get_config() -> Dict[str, Any]:
 
 def create_r2_client(endpoint: str, access_key: str, secret_key: str):
     """Create R2 client."""
+    from botocore.client import Config
+
     return boto3.client(
         "s3",
         endpoint_url=endpoint,
         aws_access_key_id=access_key,
         aws_secret_access_key=secret_key,
         region_name="auto",  # R2 uses 'auto' region
+        # One pooled connection per concurrent read
+        config=Config(max_pool_connections=max(10, R2_READ_CONCURRENCY)),
     )
 
 
@@ -156,15 +184,24 @@ def load_chunk_from_r2(r2_client, bucket: str, chunk_key: str) -> Dict[str, Any]
         return None
 
 
+@lru_cache(maxsize=4)
+def _openai_client(client_cls, api_key: str) -> "openai.OpenAI":
+    # The client retries 429/5xx with backoff (honouring Retry-After)
+    return client_cls(api_key=api_key, max_retries=EMBEDDING_MAX_RETRIES)
+
+
+def get_openai_client() -> "openai.OpenAI":
+    """Shared OpenAI client; its connection pool is reused across embedding threads."""
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY environment variable not set")
+    return _openai_client(openai.OpenAI, api_key)
+
+
 def generate_embeddings_batch(texts: List[str], model: str = "text-embedding-3-large") -> List[List[float]]:
     """Generate embeddings for a batch of texts using OpenAI API."""
     try:
-        # Initialize OpenAI client with explicit API key
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable not set")
-        
-        client = openai.OpenAI(api_key=api_key)
+        client = get_openai_client()
         
         response = client.embeddings.create(
             input=texts,
@@ -247,27 +284,67 @@ def transform_chunk_for_milvus_v2(chunk: Dict[str, Any]) -> Dict[str, Any]:
     return transformed
 
 
+def fetch_existing_chunk_ids(collection: Collection, page_size: int = 10000) -> Set[str]:
+    """All chunk_ids already in the collection (empty set if the query fails).
+
+    Pages through the collection with a query iterator. A single ``query``
+    is limited to Milvus's 16384-row result window, so the old one-shot
+    ``limit=100000`` query could not see the whole collection.
+    """
+    try:
+        existing_chunk_ids: Set[str] = set()
+        iterator = collection.query_iterator(
+            batch_size=page_size,
+            expr="chunk_id != ''",
+            output_fields=["chunk_id"],
+        )
+        try:
+            while True:
+                page = iterator.next()
+                if not page:
+                    break
+                existing_chunk_ids.update(item["chunk_id"] for item in page)
+        finally:
+            iterator.close()
+        logger.info(f"Found {len(existing_chunk_ids)} existing chunks in collection")
+        return existing_chunk_ids
+    except Exception as e:
+        logger.warning(f"Could not check existing chunks: {e}. Proceeding with insert...")
+        return set()
+
+
+def insert_batch_to_milvus_v2(collection: Collection, batch: List[Dict[str, Any]]) -> None:
+    """Insert one batch of transformed chunks, in the v3.0 schema field order."""
+    fields = [
+        "chunk_id",
+        "embedding",
+        "num_tokens",
+        "doc_type",
+        "language",
+        "parent_doc_id",
+        "tree_node_id",
+        "chunk_object_key",
+        "source_document_key",
+        "nature",
+        "year",
+        "chapter",
+        "date_context",
+        # Constitutional hierarchy fields
+        "authority_level",
+        "hierarchy_rank",
+        "binding_scope",
+        "subject_category",
+    ]
+    collection.insert([[item[name] for item in batch] for name in fields])
+
+
 def upload_to_milvus_v2(collection: Collection, data: List[Dict[str, Any]], batch_size: int = 100, verbose: bool = False, skip_duplicates: bool = True) -> None:
     """Upload chunks with embeddings to Milvus v2.0 collection."""
     
     # Filter out existing chunks if skip_duplicates is True
     if skip_duplicates:
         logger.info("Checking for existing chunks to avoid duplicates...")
-        existing_chunk_ids = set()
-        
-        # Get all existing chunk_ids from the collection
-        try:
-            # Query all chunk_ids in the collection
-            results = collection.query(
-                expr="chunk_id != ''",  # Get all records
-                output_fields=["chunk_id"],
-                limit=100000  # Adjust if you have more chunks
-            )
-            existing_chunk_ids = {item["chunk_id"] for item in results}
-            logger.info(f"Found {len(existing_chunk_ids)} existing chunks in collection")
-        except Exception as e:
-            logger.warning(f"Could not check existing chunks: {e}. Proceeding with insert...")
-            existing_chunk_ids = set()
+        existing_chunk_ids = fetch_existing_chunk_ids(collection)
         
         # Filter out chunks that already exist
         original_count = len(data)
@@ -286,68 +363,8 @@ def upload_to_milvus_v2(collection: Collection, data: List[Dict[str, Any]], batc
     for i in tqdm(range(0, len(data), batch_size), desc="Uploading to Milvus", unit="batch"):
         batch = data[i:i + batch_size]
         
-        # Prepare batch data according to v2.0 schema field order
-        chunk_ids = []
-        embeddings = []
-        num_tokens_list = []
-        doc_types = []
-        languages = []
-        parent_doc_ids = []
-        tree_node_ids = []
-        chunk_object_keys = []
-        source_document_keys = []
-        natures = []
-        years = []
-        chapters = []
-        date_contexts = []
-        # Constitutional hierarchy field lists
-        authority_levels = []
-        hierarchy_ranks = []
-        binding_scopes = []
-        subject_categories = []
-        
-        for item in batch:
-            chunk_ids.append(item["chunk_id"])
-            embeddings.append(item["embedding"])
-            num_tokens_list.append(item["num_tokens"])
-            doc_types.append(item["doc_type"])
-            languages.append(item["language"])
-            parent_doc_ids.append(item["parent_doc_id"])
-            tree_node_ids.append(item["tree_node_id"])
-            chunk_object_keys.append(item["chunk_object_key"])
-            source_document_keys.append(item["source_document_key"])
-            natures.append(item["nature"])
-            years.append(item["year"])
-            chapters.append(item["chapter"])
-            date_contexts.append(item["date_context"])
-            # Constitutional hierarchy fields
-            authority_levels.append(item["authority_level"])
-            hierarchy_ranks.append(item["hierarchy_rank"])
-            binding_scopes.append(item["binding_scope"])
-            subject_categories.append(item["subject_category"])
-        
-        # Insert batch with correct field order matching schema
         try:
-            collection.insert([
-                chunk_ids,
-                embeddings,
-                num_tokens_list,
-                doc_types,
-                languages,
-                parent_doc_ids,
-                tree_node_ids,
-                chunk_object_keys,
-                source_document_keys,
-                natures,
-                years,
-                chapters,
-                date_contexts,
-                # Constitutional hierarchy field lists
-                authority_levels,
-                hierarchy_ranks,
-                binding_scopes,
-                subject_categories
-            ])
+            insert_batch_to_milvus_v2(collection, batch)
             
             if verbose:
                 logger.info(f"Uploaded batch {i//batch_size + 1}/{total_batches}")
@@ -364,6 +381,462 @@ def upload_to_milvus_v2(collection: Collection, data: List[Dict[str, Any]], batc
     logger.info(f"✅ Successfully uploaded {len(data)} chunks to Milvus v2.0")
 
 
+# ---------------------------------------------------------------------------
+# Pipelined ingestion
+# ---------------------------------------------------------------------------
+
+class RetryJournal:
+    """Append-only JSONL record of chunks that could not be ingested.
+
+    Each line has the chunk's R2 key, its chunk_id, the failed stage
+    (read, oversized, embed, transform, insert) and the error. Re-running
+    with --from_journal ingests only the journaled keys.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._file = None
+        self.count = 0
+
+    def record(self, chunk_key: str, chunk_id: str, stage: str, error: str) -> None:
+        entry = {"chunk_object_key": chunk_key, "chunk_id": chunk_id, "stage": stage,
+                 "error": error[:500], "failed_at": time.time()}
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            self.count += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_journal_keys(path: str) -> List[str]:
+    """Distinct chunk keys in a retry journal, in first-seen order."""
+    keys: Dict[str, None] = {}
+    journal_path = Path(path)
+    if not journal_path.exists():
+        return []
+    with open(journal_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                keys.setdefault(json.loads(line)["chunk_object_key"], None)
+    return list(keys)
+
+
+@lru_cache(maxsize=1)
+def _token_encoder():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")  # text-embedding-3-* tokenizer
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable ({e}); estimating tokens from length")
+        return None
+
+
+def count_embedding_tokens(text: str) -> int:
+    """Tokens the embedding model will see; a conservative estimate without tiktoken."""
+    encoder = _token_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return len(text) // 3 + 1
+
+
+@dataclass
+class IngestStats:
+    """Per-stage counters for the ingestion pipeline (updated from several threads)."""
+
+    started: float = field(default_factory=time.perf_counter)
+    read: int = 0
+    skipped_existing: int = 0
+    store_hits: int = 0
+    embedded: int = 0
+    embedding_requests: int = 0
+    inserted: int = 0
+    journaled: int = 0
+    peak_chunk_queue: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def summary(self) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (
+            f"read {self.read} ({self.read / elapsed:.1f}/s, {self.skipped_existing} already in Milvus), "
+            f"reused {self.store_hits} stored embeddings, "
+            f"embedded {self.embedded} in {self.embedding_requests} requests ({self.embedded / elapsed:.1f}/s), "
+            f"inserted {self.inserted} ({self.inserted / elapsed:.1f}/s), journaled {self.journaled}, "
+            f"peak chunk queue {self.peak_chunk_queue}"
+        )
+
+
+_DONE = object()  # end-of-stream marker passed between stages
+
+
+def _chunk_id_from_key(chunk_key: str) -> str:
+    return chunk_key.rsplit("/", 1)[-1][:-len(".json")] if chunk_key.endswith(".json") else chunk_key
+
+
+def run_ingest_pipeline(
+    r2_client,
+    bucket: str,
+    chunk_keys: Iterable[str],
+    collection: Collection,
+    journal: RetryJournal,
+    model: str = "text-embedding-3-large",
+    embed_fn: Callable[[List[str], str], List[List[float]]] = generate_embeddings_batch,
+    skip_chunk_ids: Optional[Set[str]] = None,
+    read_concurrency: int = R2_READ_CONCURRENCY,
+    embed_concurrency: int = EMBEDDING_CONCURRENCY,
+    insert_batch_size: int = DEFAULT_BATCH_SIZE,
+    max_batch_inputs: int = EMBEDDING_MAX_BATCH_INPUTS,
+    request_token_limit: int = EMBEDDING_REQUEST_TOKEN_LIMIT,
+    queue_chunks: int = INGEST_QUEUE_CHUNKS,
+    store: Optional[EmbeddingStore] = None,
+) -> IngestStats:
+    """
+    Stream chunks from R2 through embedding into Milvus.
+
+    Stages run concurrently and hand off through bounded queues, so R2 reads,
+    embedding requests and Milvus inserts overlap and memory stays bounded:
+
+    1. reader: ``read_concurrency`` concurrent R2 GETs; loaded chunks go to a
+       queue of at most ``queue_chunks``
+    2. packer: packs chunks into embedding requests of at most
+       ``max_batch_inputs`` inputs and ``request_token_limit`` tokens; chunks
+       over the 8192-token input limit are journaled
+    3. embedders: ``embed_concurrency`` requests in flight
+    4. inserter (calling thread): inserts ``insert_batch_size`` rows at a time
+
+    Chunks in ``skip_chunk_ids`` are not read or embedded. With a ``store``,
+    chunks whose text was embedded before (by any earlier run, under any
+    chunk_id) reuse the stored vector and skip the embeddings API; new
+    embeddings are added to it. Any chunk that fails a stage is written to
+    ``journal`` and left out of Milvus.
+    """
+    stats = IngestStats()
+    skip_chunk_ids = skip_chunk_ids or set()
+    chunk_queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_chunks))
+    batch_queue: "queue.Queue" = queue.Queue(maxsize=max(1, embed_concurrency))
+    row_queue: "queue.Queue" = queue.Queue(maxsize=max(1, embed_concurrency))
+
+    def fail(chunk: Dict[str, Any], stage: str, error: Exception) -> None:
+        journal.record(chunk.get("chunk_object_key", ""), chunk.get("chunk_id", ""), stage, str(error))
+        stats.add(journaled=1)
+
+    def read_stage() -> None:
+        try:
+            with ThreadPoolExecutor(max_workers=read_concurrency, thread_name_prefix="r2-read") as pool:
+                in_flight: Dict[Any, str] = {}
+
+                def collect(done) -> None:
+                    for future in done:
+                        chunk_key = in_flight.pop(future)
+                        chunk = future.result()
+                        if chunk is None:
+                            fail({"chunk_object_key": chunk_key}, "read", RuntimeError("could not load chunk"))
+                            continue
+                        if chunk.get("chunk_id") in skip_chunk_ids:
+                            stats.add(skipped_existing=1)
+                            continue
+                        chunk_queue.put(chunk)
+                        stats.add(read=1)
+                        stats.peak_chunk_queue = max(stats.peak_chunk_queue, chunk_queue.qsize())
+
+                for chunk_key in chunk_keys:
+                    if _chunk_id_from_key(chunk_key) in skip_chunk_ids:
+                        stats.add(skipped_existing=1)
+                        continue
+                    if len(in_flight) >= 2 * read_concurrency:
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    in_flight[pool.submit(load_chunk_from_r2, r2_client, bucket, chunk_key)] = chunk_key
+                while in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+        finally:
+            chunk_queue.put(_DONE)
+
+    def pack_stage() -> None:
+        batch: List[Dict[str, Any]] = []
+        batch_tokens = 0
+        stored_rows: List[Dict[str, Any]] = []
+        try:
+            while True:
+                chunk = chunk_queue.get()
+                if chunk is _DONE:
+                    break
+                if store is not None and chunk.get("chunk_text"):
+                    # Unchanged text: reuse the stored vector, straight to the inserter
+                    embedding = store.get(model, chunk["chunk_text"])
+                    if embedding is not None:
+                        try:
+                            stored_rows.append(transform_chunk_for_milvus_v2(dict(chunk, embedding=embedding.tolist())))
+                            stats.add(store_hits=1)
+                        except Exception as e:
+                            fail(chunk, "transform", e)
+                        if len(stored_rows) >= insert_batch_size:
+                            row_queue.put(stored_rows)
+                            stored_rows = []
+                        continue
+                tokens = count_embedding_tokens(chunk.get("chunk_text") or "")
+                if not chunk.get("chunk_text") or tokens > EMBEDDING_MAX_INPUT_TOKENS:
+                    fail(chunk, "oversized", ValueError(f"{tokens} tokens exceeds {EMBEDDING_MAX_INPUT_TOKENS}"))
+                    continue
+                if batch and (len(batch) >= max_batch_inputs or batch_tokens + tokens > request_token_limit):
+                    batch_queue.put(batch)
+                    batch, batch_tokens = [], 0
+                batch.append(chunk)
+                batch_tokens += tokens
+            if batch:
+                batch_queue.put(batch)
+            if stored_rows:
+                row_queue.put(stored_rows)
+        finally:
+            for _ in range(embed_concurrency):
+                batch_queue.put(_DONE)
+
+    def embed(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Embed and transform a batch; a rejected batch is split to isolate bad inputs."""
+        try:
+            embeddings = embed_fn([chunk["chunk_text"] for chunk in batch], model)
+            stats.add(embedding_requests=1)
+            if len(embeddings) != len(batch):
+                raise ValueError(f"expected {len(batch)} embeddings, got {len(embeddings)}")
+        except openai.BadRequestError as e:
+            if len(batch) == 1:
+                fail(batch[0], "embed", e)
+                return []
+            middle = len(batch) // 2
+            return embed(batch[:middle]) + embed(batch[middle:])
+        except Exception as e:
+            logger.error(f"Embedding request for {len(batch)} chunks failed: {e}")
+            for chunk in batch:
+                fail(chunk, "embed", e)
+            return []
+        if store is not None:
+            try:
+                store.put_many(model, [chunk["chunk_text"] for chunk in batch], embeddings)
+            except Exception as e:
+                logger.warning(f"Could not add {len(batch)} embeddings to the store: {e}")
+        rows = []
+        for chunk, embedding in zip(batch, embeddings):
+            try:
+                rows.append(transform_chunk_for_milvus_v2(dict(chunk, embedding=embedding)))
+            except Exception as e:
+                fail(chunk, "transform", e)
+        stats.add(embedded=len(rows))
+        return rows
+
+    def embed_stage() -> None:
+        try:
+            while True:
+                batch = batch_queue.get()
+                if batch is _DONE:
+                    break
+                rows = embed(batch)
+                if rows:
+                    row_queue.put(rows)
+        finally:
+            row_queue.put(_DONE)
+
+    threads = [threading.Thread(target=read_stage, name="ingest-read", daemon=True),
+               threading.Thread(target=pack_stage, name="ingest-pack", daemon=True)]
+    threads += [threading.Thread(target=embed_stage, name=f"ingest-embed-{i}", daemon=True)
+                for i in range(embed_concurrency)]
+    for thread in threads:
+        thread.start()
+
+    def insert(rows: List[Dict[str, Any]]) -> None:
+        try:
+            insert_batch_to_milvus_v2(collection, rows)
+            stats.add(inserted=len(rows))
+        except Exception as e:
+            logger.error(f"❌ Milvus insert of {len(rows)} chunks failed: {e}")
+            for row in rows:
+                fail(row, "insert", e)
+
+    # Insert stage: runs here until every embedder has finished
+    pending: List[Dict[str, Any]] = []
+    remaining = embed_concurrency
+    last_progress = time.perf_counter()
+    progress = tqdm(desc="Ingesting chunks", unit="chunk")
+    while remaining:
+        rows = row_queue.get()
+        if rows is _DONE:
+            remaining -= 1
+            continue
+        pending.extend(rows)
+        progress.update(len(rows))
+        while len(pending) >= insert_batch_size:
+            insert(pending[:insert_batch_size])
+            pending = pending[insert_batch_size:]
+        if time.perf_counter() - last_progress >= 30:
+            logger.info(f"Progress: {stats.summary()}")
+            last_progress = time.perf_counter()
+    if pending:
+        insert(pending)
+    progress.close()
+    for thread in threads:
+        thread.join()
+
+    collection.flush()
+    logger.info(f"Ingestion finished in {time.perf_counter() - stats.started:.1f}s: {stats.summary()}")
+    return stats
+
+
+def connect_collection(config: Dict[str, Any], clear: bool = False) -> Collection:
+    """Connect to Milvus and return the loaded collection, optionally cleared."""
+    logger.info(f"Connecting to Milvus Cloud: {config['milvus_endpoint']}")
+    connect_to_milvus(config["milvus_endpoint"], config["milvus_token"])
+    
+    # Check if collection exists
+    collection_name = config["milvus_collection_name"]
+    if not utility.has_collection(collection_name):
+        logger.error(f"❌ Collection '{collection_name}' does not exist. Run init-milvus-v2.py first.")
+        sys.exit(1)
+    
+    # Get collection
+    collection = Collection(collection_name)
+    
+    # Load collection into memory
+    logger.info(f"Loading collection '{collection_name}'...")
+    collection.load()
+    
+    # Clear collection if requested
+    if clear:
+        logger.info("🧹 Clearing collection to remove all existing data...")
+        try:
+            collection.delete(expr="chunk_id != ''")  # Delete all records
+            collection.flush()
+            logger.info(f"✅ Collection cleared. Current entities: {collection.num_entities}")
+        except Exception as e:
+            logger.error(f"❌ Error clearing collection: {e}")
+    return collection
+
+
+def run_sequential(
+    args,
+    config: Dict[str, Any],
+    r2_client,
+    chunk_keys: List[str],
+    journal: RetryJournal,
+    store: Optional[EmbeddingStore] = None,
+) -> Collection:
+    """Load everything, embed batch by batch, then upload (the original flow)."""
+    # Load chunks from R2
+    logger.info("Loading chunks from R2...")
+    chunks: List[Dict[str, Any]] = []
+    failed_chunks = 0
+    
+    for chunk_key in tqdm(chunk_keys, desc="Loading chunks"):
+        chunk_data = load_chunk_from_r2(r2_client, config["r2_bucket"], chunk_key)
+        if chunk_data:
+            chunks.append(chunk_data)
+        else:
+            journal.record(chunk_key, _chunk_id_from_key(chunk_key), "read", "could not load chunk")
+            failed_chunks += 1
+    
+    logger.info(f"Loaded {len(chunks)} chunks successfully, {failed_chunks} failed")
+    
+    if not chunks:
+        logger.error("No chunks loaded. Exiting.")
+        sys.exit(1)
+    
+    # Pre-filter chunks to remove those exceeding token limits
+    valid_chunks = []
+    oversized_chunks = []
+    
+    for chunk in chunks:
+        num_tokens = chunk.get('num_tokens', 0)
+        if num_tokens > EMBEDDING_MAX_INPUT_TOKENS:
+            oversized_chunks.append({
+                'chunk_id': chunk.get('chunk_id'),
+                'tokens': num_tokens,
+                'title': chunk.get('metadata', {}).get('title', 'Unknown')[:50]
+            })
+            journal.record(chunk['chunk_object_key'], chunk.get('chunk_id', ''), "oversized", f"{num_tokens} tokens")
+        else:
+            valid_chunks.append(chunk)
+    
+    if oversized_chunks:
+        logger.warning(f"Skipping {len(oversized_chunks)} oversized chunks (>{EMBEDDING_MAX_INPUT_TOKENS} tokens):")
+        for oc in oversized_chunks[:5]:  # Show first 5
+            logger.warning(f"  - {oc['chunk_id']}: {oc['tokens']:,} tokens from '{oc['title']}...'")
+    
+    logger.info(f"Processing {len(valid_chunks)} valid chunks (skipped {len(oversized_chunks)} oversized)")
+    
+    # Generate embeddings in batches for valid chunks only
+    logger.info("Generating embeddings...")
+    embedded_chunks: List[Dict[str, Any]] = []
+    model = config["openai_embedding_model"]
+    
+    # Reuse stored vectors for text embedded by an earlier run
+    if store is not None:
+        to_embed = []
+        for chunk, embedding in zip(valid_chunks, store.get_many(model, [c['chunk_text'] for c in valid_chunks])):
+            if embedding is None:
+                to_embed.append(chunk)
+            else:
+                chunk['embedding'] = embedding.tolist()
+                embedded_chunks.append(chunk)
+        logger.info(f"Reused {len(embedded_chunks)} stored embeddings, {len(to_embed)} chunks left to embed")
+        valid_chunks = to_embed
+    
+    # Process in batches to avoid API limits
+    for i in tqdm(range(0, len(valid_chunks), EMBEDDING_BATCH_SIZE), desc="Generating embeddings"):
+        batch = valid_chunks[i:i + EMBEDDING_BATCH_SIZE]
+        try:
+            batch_embeddings = generate_embeddings_batch([c['chunk_text'] for c in batch], model)
+        except Exception as e:
+            # Journal the batch rather than inserting placeholder vectors
+            logger.error(f"Batch {i//EMBEDDING_BATCH_SIZE + 1} failed, journaling {len(batch)} chunks: {e}")
+            for chunk in batch:
+                journal.record(chunk['chunk_object_key'], chunk.get('chunk_id', ''), "embed", str(e))
+            continue
+        if store is not None:
+            store.put_many(model, [c['chunk_text'] for c in batch], batch_embeddings)
+        for chunk, embedding in zip(batch, batch_embeddings):
+            chunk['embedding'] = embedding
+            embedded_chunks.append(chunk)
+    
+    logger.info(f"Generated {len(embedded_chunks)} embeddings")
+    
+    # Add embeddings to chunks and transform for Milvus
+    logger.info("Transforming chunks for Milvus v2.0...")
+    milvus_chunks = []
+    
+    for chunk_dict in embedded_chunks:
+        try:
+            milvus_chunks.append(transform_chunk_for_milvus_v2(chunk_dict))
+        except Exception as e:
+            logger.error(f"Error transforming chunk {chunk_dict.get('chunk_id', 'unknown')}: {e}")
+            journal.record(chunk_dict['chunk_object_key'], chunk_dict.get('chunk_id', ''), "transform", str(e))
+    
+    logger.info(f"Transformed {len(milvus_chunks)} chunks for Milvus")
+    
+    collection = connect_collection(config, clear=args.clear_collection)
+    
+    # Upload chunks to Milvus (with deduplication unless forced)
+    skip_duplicates = not args.force_duplicates
+    logger.info(f"Uploading {len(milvus_chunks)} chunks to Milvus (deduplication: {skip_duplicates})...")
+    upload_to_milvus_v2(collection, milvus_chunks, args.batch_size, args.verbose, skip_duplicates=skip_duplicates)
+    
+    logger.info(f"   Processed chunks: {len(chunks)}")
+    logger.info(f"   Generated embeddings: {len(embedded_chunks)}")
+    logger.info(f"   Uploaded to Milvus: {len(milvus_chunks)}")
+    return collection
+
+
 def main():
     parser = argparse.ArgumentParser(description="Upload chunks with embeddings to Milvus Cloud v2.0")
     parser.add_argument("--max_chunks", type=int, default=DEFAULT_MAX_CHUNKS,
@@ -375,8 +848,26 @@ def main():
                         help="Clear the collection before uploading (removes duplicates)")
     parser.add_argument("--force_duplicates", action="store_true",
                         help="Allow duplicate uploads (skip deduplication check)")
+    parser.add_argument("--skip_doc_manifest", action="store_true",
+                        help="Do not rebuild the doc_id -> parent document key manifest")
+    parser.add_argument("--sequential", action="store_true",
+                        help="Load all chunks, then embed, then upload (no pipelining)")
+    parser.add_argument("--read_concurrency", type=int, default=R2_READ_CONCURRENCY,
+                        help=f"Concurrent R2 reads (default: {R2_READ_CONCURRENCY})")
+    parser.add_argument("--embed_concurrency", type=int, default=EMBEDDING_CONCURRENCY,
+                        help=f"Concurrent embedding requests (default: {EMBEDDING_CONCURRENCY})")
+    parser.add_argument("--retry_journal", type=str, default=MILVUS_RETRY_JOURNAL,
+                        help=f"JSONL file recording chunks that failed (default: {MILVUS_RETRY_JOURNAL})")
+    parser.add_argument("--from_journal", action="store_true",
+                        help="Only ingest the chunks recorded in --retry_journal")
+    parser.add_argument("--embedding_store", type=str, default=EMBEDDING_STORE_DIR,
+                        help=f"Directory of the content-hash embedding store (default: {EMBEDDING_STORE_DIR})")
+    parser.add_argument("--no_embedding_store", action="store_true",
+                        help="Embed every chunk, ignoring and not updating the embedding store")
     
     args = parser.parse_args()
+    journal = RetryJournal(args.retry_journal)
+    store = None if args.no_embedding_store else EmbeddingStore(args.embedding_store)
     
     try:
         # Get configuration
@@ -390,133 +881,58 @@ def main():
             config["r2_secret_key"]
         )
         
-        # List all chunks in R2
-        logger.info("Listing chunks from R2...")
-        chunk_keys = list_chunks_from_r2(r2_client, config["r2_bucket"])
-        logger.info(f"Found {len(chunk_keys)} chunks in R2")
+        if args.from_journal:
+            chunk_keys = read_journal_keys(args.retry_journal)
+            if not chunk_keys:
+                logger.info(f"Retry journal {args.retry_journal} is empty, nothing to do")
+                return
+            # Keep the old journal until this run has recorded its own failures
+            Path(args.retry_journal).replace(args.retry_journal + ".prev")
+            logger.info(f"Retrying {len(chunk_keys)} chunks from {args.retry_journal}")
+        else:
+            # List all chunks in R2
+            logger.info("Listing chunks from R2...")
+            chunk_keys = list_chunks_from_r2(r2_client, config["r2_bucket"])
+            logger.info(f"Found {len(chunk_keys)} chunks in R2")
         
         if args.max_chunks:
             chunk_keys = chunk_keys[:args.max_chunks]
             logger.info(f"Limited to {len(chunk_keys)} chunks for testing")
         
-        # Load chunks from R2
-        logger.info("Loading chunks from R2...")
-        chunks: List[Dict[str, Any]] = []
-        failed_chunks = 0
-        
-        for chunk_key in tqdm(chunk_keys, desc="Loading chunks"):
-            chunk_data = load_chunk_from_r2(r2_client, config["r2_bucket"], chunk_key)
-            if chunk_data:
-                chunks.append(chunk_data)
-            else:
-                failed_chunks += 1
-        
-        logger.info(f"Loaded {len(chunks)} chunks successfully, {failed_chunks} failed")
-        
-        if not chunks:
-            logger.error("No chunks loaded. Exiting.")
-            sys.exit(1)
-        
-        # Pre-filter chunks to remove those exceeding token limits
-        TOKEN_LIMIT = 8192
-        valid_chunks = []
-        oversized_chunks = []
-        
-        for chunk in chunks:
-            num_tokens = chunk.get('num_tokens', 0)
-            if num_tokens > TOKEN_LIMIT:
-                oversized_chunks.append({
-                    'chunk_id': chunk.get('chunk_id'),
-                    'tokens': num_tokens,
-                    'title': chunk.get('metadata', {}).get('title', 'Unknown')[:50]
-                })
-            else:
-                valid_chunks.append(chunk)
-        
-        if oversized_chunks:
-            logger.warning(f"Skipping {len(oversized_chunks)} oversized chunks (>{TOKEN_LIMIT} tokens):")
-            for oc in oversized_chunks[:5]:  # Show first 5
-                logger.warning(f"  - {oc['chunk_id']}: {oc['tokens']:,} tokens from '{oc['title']}...'")
-        
-        logger.info(f"Processing {len(valid_chunks)} valid chunks (skipped {len(oversized_chunks)} oversized)")
-        
-        # Generate embeddings in batches for valid chunks only
-        logger.info("Generating embeddings...")
-        
-        # Extract texts for embedding (only valid chunks)
-        texts = [chunk['chunk_text'] for chunk in valid_chunks]
-        all_embeddings = []
-        
-        # Process in batches to avoid API limits
-        for i in tqdm(range(0, len(texts), EMBEDDING_BATCH_SIZE), desc="Generating embeddings"):
-            batch_texts = texts[i:i + EMBEDDING_BATCH_SIZE]
-            try:
-                batch_embeddings = generate_embeddings_batch(batch_texts, config["openai_embedding_model"])
-                all_embeddings.extend(batch_embeddings)
-            except Exception as e:
-                logger.error(f"Batch {i//EMBEDDING_BATCH_SIZE + 1} failed: {e}")
-                # Add placeholder embeddings for failed batch to keep indices aligned
-                placeholder_embeddings = [[0.0] * 3072] * len(batch_texts)
-                all_embeddings.extend(placeholder_embeddings)
-                logger.warning(f"Added {len(placeholder_embeddings)} placeholder embeddings for failed batch")
-        
-        logger.info(f"Generated {len(all_embeddings)} embeddings")
-        
-        # Add embeddings to chunks and transform for Milvus
-        logger.info("Transforming chunks for Milvus v2.0...")
-        milvus_chunks = []
-        
-        for chunk_dict, embedding in zip(valid_chunks, all_embeddings):
-            try:
-                # Add embedding to chunk data
-                chunk_dict['embedding'] = embedding
-                transformed_chunk = transform_chunk_for_milvus_v2(chunk_dict)
-                milvus_chunks.append(transformed_chunk)
-            except Exception as e:
-                logger.error(f"Error transforming chunk {chunk_dict.get('chunk_id', 'unknown')}: {e}")
-                continue
-        
-        logger.info(f"Transformed {len(milvus_chunks)} chunks for Milvus")
-        
-        # Connect to Milvus
-        logger.info(f"Connecting to Milvus Cloud: {config['milvus_endpoint']}")
-        connect_to_milvus(config["milvus_endpoint"], config["milvus_token"])
-        
-        # Check if collection exists
-        collection_name = config["milvus_collection_name"]
-        if not utility.has_collection(collection_name):
-            logger.error(f"❌ Collection '{collection_name}' does not exist. Run init-milvus-v2.py first.")
-            sys.exit(1)
-        
-        # Get collection
-        collection = Collection(collection_name)
-        
-        # Load collection into memory
-        logger.info(f"Loading collection '{collection_name}'...")
-        collection.load()
-        
-        # Clear collection if requested
-        if args.clear_collection:
-            logger.info("🧹 Clearing collection to remove all existing data...")
-            try:
-                collection.delete(expr="chunk_id != ''")  # Delete all records
-                collection.flush()
-                logger.info(f"✅ Collection cleared. Current entities: {collection.num_entities}")
-            except Exception as e:
-                logger.error(f"❌ Error clearing collection: {e}")
-        
-        # Upload chunks to Milvus (with deduplication unless forced)
-        skip_duplicates = not args.force_duplicates
-        logger.info(f"Uploading {len(milvus_chunks)} chunks to Milvus (deduplication: {skip_duplicates})...")
-        upload_to_milvus_v2(collection, milvus_chunks, args.batch_size, args.verbose, skip_duplicates=skip_duplicates)
+        if args.sequential:
+            collection = run_sequential(args, config, r2_client, chunk_keys, journal, store=store)
+        else:
+            collection = connect_collection(config, clear=args.clear_collection)
+            skip_chunk_ids = set() if args.force_duplicates else fetch_existing_chunk_ids(collection)
+            run_ingest_pipeline(
+                r2_client,
+                config["r2_bucket"],
+                chunk_keys,
+                collection,
+                journal,
+                model=config["openai_embedding_model"],
+                skip_chunk_ids=skip_chunk_ids,
+                read_concurrency=args.read_concurrency,
+                embed_concurrency=args.embed_concurrency,
+                insert_batch_size=args.batch_size,
+                store=store,
+            )
         
         # Log final statistics
         total_count = collection.num_entities
         logger.info(f"✅ Upload complete!")
-        logger.info(f"   Processed chunks: {len(chunks)}")
-        logger.info(f"   Generated embeddings: {len(all_embeddings)}")
-        logger.info(f"   Uploaded to Milvus: {len(milvus_chunks)}")
         logger.info(f"   Total entities in collection: {total_count}")
+        if store is not None:
+            logger.info(f"   Embedding store: {len(store)} vectors in {args.embedding_store}")
+        if journal.count:
+            logger.warning(f"   {journal.count} chunks journaled to {args.retry_journal}; re-run with --from_journal")
+        
+        # Publish the doc_id -> parent key manifest so the API fetches each parent with one GET
+        if not args.skip_doc_manifest:
+            logger.info("Rebuilding parent document manifest from R2...")
+            doc_manifest = build_doc_manifest(r2_client, config["r2_bucket"])
+            save_doc_manifest(r2_client, config["r2_bucket"], doc_manifest)
+            logger.info(f"   Parent documents in manifest: {len(doc_manifest)}")
         
     except Exception as e:
         logger.error(f"❌ Error: {e}")
@@ -526,6 +942,7 @@ def main():
         sys.exit(1)
         
     finally:
+        journal.close()
         # Disconnect from Milvus
         try:
             connections.disconnect("default")
@@ -204,7 +204,7 @@ async def test_retrieval_uses_adaptive_top_k(orchestrator):
         
         mock_engine.bm25_retriever = mock_bm25
         mock_engine.milvus_retriever = mock_milvus
-        mock_engine_class.return_value = mock_engine
+        mock_engine_class.return_value.__aenter__.return_value = mock_engine
         
         state = AgentState(
             user_id="test",
@@ -216,9 +216,9 @@ async def test_retrieval_uses_adaptive_top_k(orchestrator):
         
         result = await orchestrator._retrieve_concurrent_node(state)
         
-        # Verify top_k was set on retrievers
-        assert mock_engine.bm25_retriever.top_k == 40, "BM25 top_k should be set to 40"
-        assert mock_engine.milvus_retriever.top_k == 40, "Milvus top_k should be set to 40"
+        # Verify top_k was passed per call rather than set on the shared retrievers
+        assert mock_bm25.aget_relevant_documents.call_args.kwargs["top_k"] == 40, "BM25 top_k should be 40"
+        assert mock_milvus.aget_relevant_documents.call_args.kwargs["top_k"] == 40, "Milvus top_k should be 40"
 
 
 @pytest.mark.asyncio
@@ -316,7 +316,7 @@ async def test_end_to_end_adaptive_flow(orchestrator):
         
         mock_engine.bm25_retriever = mock_bm25
         mock_engine.milvus_retriever = mock_milvus
-        mock_engine_class.return_value = mock_engine
+        mock_engine_class.return_value.__aenter__.return_value = mock_engine
         
         # Start with intent classification
         state = AgentState(
@@ -339,5 +339,5 @@ async def test_end_to_end_adaptive_flow(orchestrator):
         retrieval_result = await orchestrator._retrieve_concurrent_node(state)
         
         # Verify top_k was used
-        assert mock_engine.bm25_retriever.top_k is not None
-        assert mock_engine.milvus_retriever.top_k is not None
+        assert mock_bm25.aget_relevant_documents.call_args.kwargs["top_k"] is not None
+        assert mock_milvus.aget_relevant_documents.call_args.kwargs["top_k"] is not None
@@ -186,3 +186,39 @@ async def test_cache_stats_accessible():
     else:
         # No cache = skip
         pytest.skip("Cache not available")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_queries_run_pipeline_once():
+    """A thundering herd of identical cache misses costs one graph run."""
+    import asyncio
+    from unittest.mock import MagicMock
+    from api.orchestrators.query_orchestrator import QueryOrchestrator
+    from api.schemas.agent_state import AgentState
+    
+    orch = QueryOrchestrator()
+    if orch.cache is None:
+        pytest.skip("Cache not available")
+    await orch._ensure_cache_connected()
+    await orch.cache.clear_cache("cache:*")
+    orch._embedding_client = MagicMock()
+    orch.cache._embedding_client = None
+    
+    runs = []
+    
+    async def ainvoke(state, config=None):
+        runs.append(state.trace_id)
+        await asyncio.sleep(0.05)
+        return {"final_answer": "Minimum wage is set by statutory instrument."}
+    
+    orch.graph = MagicMock()
+    orch.graph.ainvoke = ainvoke
+    
+    query = f"What is the minimum wage? {time.time()}"
+    states = [AgentState(user_id=f"user-{i}", session_id=f"s-{i}", raw_query=query) for i in range(5)]
+    results = await asyncio.gather(*(orch.run_query(state) for state in states))
+    
+    assert len(runs) == 1
+    assert all(r.final_answer == "Minimum wage is set by statutory instrument." for r in results)
+    assert sum(1 for r in results if r.safety_flags.get("cache_hit_type") == "single_flight") == 4
+    assert [r.user_id for r in results] == [f"user-{i}" for i in range(5)]
@@ -0,0 +1,90 @@
+"""
+Tests for the request-scoped memory snapshot.
+
+The intent classifier loads the conversation window and user profile once;
+the query rewriter and synthesis nodes slice it to their own token budgets.
+"""
+
+import pytest
+from unittest.mock import AsyncMock
+
+from api.orchestrators.query_orchestrator import QueryOrchestrator
+from api.schemas.agent_state import AgentState
+
+
+def _snapshot():
+    conversation = []
+    for i in range(4):
+        conversation.append({"role": "user", "content": f"Question {i} " + "x" * 400})
+        conversation.append({"role": "assistant", "content": f"Answer {i} " + "y" * 800})
+    return {
+        "conversation_history": conversation,
+        "user_profile": {
+            "expertise_level": "professional",
+            "typical_complexity": "expert",
+            "top_legal_interests": ["labour_law"],
+            "is_returning_user": True,
+        },
+        "tokens_used": {"short_term": 1200, "long_term": 30, "total": 1230},
+    }
+
+
+@pytest.fixture
+def orchestrator():
+    """Orchestrator with a stub memory coordinator counting snapshot fetches."""
+    orch = QueryOrchestrator()
+    orch.cache = None
+    orch.memory = AsyncMock()
+    orch.memory.get_snapshot = AsyncMock(return_value=_snapshot())
+    orch._classify_intent_llm = AsyncMock(return_value="rag_qa")
+    return orch
+
+
+@pytest.mark.asyncio
+async def test_intent_node_loads_snapshot_once(orchestrator):
+    """Intent classification returns the snapshot as state updates."""
+    state = AgentState(user_id="u1", session_id="s1", raw_query="What about employee rights?")
+
+    result = await orchestrator._route_intent_node(state)
+
+    orchestrator.memory.get_snapshot.assert_awaited_once_with(user_id="u1", session_id="s1")
+    assert len(result["short_term_context"]) == 8
+    assert result["long_term_profile"]["expertise_level"] == "professional"
+    assert result["memory_tokens_used"] == 1230
+    assert result["complexity"] == "expert"  # returning user profile applied
+
+
+@pytest.mark.asyncio
+async def test_nodes_slice_snapshot_to_budget(orchestrator):
+    """Each node's budget is cut from state without another fetch."""
+    state = AgentState(user_id="u1", session_id="s1", raw_query="What about employee rights?")
+    state = state.model_copy(update=await orchestrator._route_intent_node(state))
+
+    rewriter = orchestrator._memory_context(state, max_tokens=1000)
+    synthesis = orchestrator._memory_context(state, max_tokens=1500)
+
+    assert orchestrator.memory.get_snapshot.await_count == 1
+    assert rewriter["tokens_used"]["short_term"] <= 700
+    assert len(rewriter["conversation_history"]) < len(synthesis["conversation_history"])
+    assert synthesis["conversation_history"][-1]["content"].startswith("Answer 3")
+
+
+def test_no_snapshot_means_no_memory_context(orchestrator):
+    state = AgentState(user_id="u1", session_id="s1", raw_query="q")
+    assert orchestrator._memory_context(state, max_tokens=1000) is None
+
+
+@pytest.mark.asyncio
+async def test_no_memory_io_without_an_attached_coordinator():
+    """Memory is never connected on the query path; the default does no memory I/O."""
+    orch = QueryOrchestrator()
+    orch.cache = None
+    orch._ensure_memory_connected = AsyncMock()
+    orch._classify_intent_llm = AsyncMock(return_value="rag_qa")
+    state = AgentState(user_id="u1", session_id="s1", raw_query="What about employee rights?")
+
+    result = await orch._route_intent_node(state)
+
+    orch._ensure_memory_connected.assert_not_awaited()
+    assert orch.memory is None
+    assert "short_term_context" not in result
@@ -0,0 +1,77 @@
+"""
+Tests for request-scoped embedding reuse in QueryOrchestrator.
+
+Tests verify:
+- A query (rewrite, dense retrieval, cache write) makes one embeddings call
+- Every text sent upstream is one the request actually reads
+- With the semantic cache, only the lookup goes out before the rewrite
+
+Follows .cursorrules: TDD, integration testing, production scenarios.
+"""
+
+import pytest
+
+from api.orchestrators.query_orchestrator import QueryOrchestrator
+from api.schemas.agent_state import AgentState
+from api.tools.retrieval_engine import QueryProcessor
+from libs.caching.embedding_service import current_embedding_service
+
+RAW_QUERY = "What is the minimum wage under the Labour Act?"
+
+
+class CountingClient:
+    """Embedding client stand-in recording every batch it receives."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def get_embeddings(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+async def _run_request(orch):
+    """Embedding work of one cache-miss query: lookup, rewrite, retrieval, cache write."""
+    state = AgentState(user_id="u", session_id="s", raw_query=RAW_QUERY, jurisdiction="ZW")
+    read = []
+    async with orch._request_scope(state):
+        if orch.cache:
+            await orch.cache.get_cached_response(state.raw_query, "professional")
+            read.append(state.raw_query)
+        update = await orch._rewrite_expand_node(state)
+        variants = QueryProcessor.dense_query_variants(update["rewritten_query"], max_variants=4)
+        # What MilvusRetriever embeds, then the semantic cache write
+        assert await current_embedding_service().get_embeddings(variants)
+        assert await current_embedding_service().get_embeddings([state.raw_query])
+        read += variants + [state.raw_query]
+    return update["rewritten_query"], set(read)
+
+
+@pytest.mark.asyncio
+async def test_one_embeddings_call_per_query():
+    orch = QueryOrchestrator()
+    orch.cache = None
+    orch._embedding_client = CountingClient()
+
+    rewritten, read = await _run_request(orch)
+
+    assert rewritten != RAW_QUERY
+    assert len(orch._embedding_client.calls) == 1
+    assert set(orch._embedding_client.calls[0]) == read
+
+
+@pytest.mark.asyncio
+async def test_semantic_lookup_then_one_call_for_retrieval():
+    from fakeredis import aioredis as fakeredis
+    from libs.caching.semantic_cache import SemanticCache
+
+    orch = QueryOrchestrator()
+    orch.cache = SemanticCache(redis_url="redis://localhost:6379/9")
+    orch.cache._redis_client = fakeredis.FakeRedis(decode_responses=True)
+    orch._embedding_client = CountingClient()
+
+    _, read = await _run_request(orch)
+
+    lookup, retrieval = orch._embedding_client.calls
+    assert lookup == [RAW_QUERY]
+    assert set(lookup + retrieval) == read and RAW_QUERY not in retrieval
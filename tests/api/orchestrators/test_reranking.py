@@ -490,3 +490,72 @@ async def test_rerank_integration_with_state(orchestrator, mock_retrieval_result
     
     for cid, res in zip(chunk_ids, results):
         assert cid == res.chunk_id, "Chunk IDs should match result chunk_ids"
+
+
+class _CountingCrossEncoder:
+    """Stand-in cross-encoder that records every scored pair."""
+
+    def __init__(self):
+        self.pairs = []
+
+    def predict(self, pairs):
+        self.pairs.extend(pairs)
+        return [0.9 - 0.01 * int(text.split("topic ")[1].split(".")[0]) for _, text in pairs]
+
+
+@pytest.mark.asyncio
+async def test_reranker_only_scores_new_pairs(mock_retrieval_results):
+    """A second pass after iterative retrieval scores only the added candidates."""
+    from api.tools.reranker import BGEReranker, RerankScoreCache
+
+    reranker = BGEReranker(score_cache=RerankScoreCache())
+    reranker.model = _CountingCrossEncoder()
+    first_pass = mock_retrieval_results[:10]
+    original_scores = [r.confidence for r in first_pass]
+
+    await reranker.rerank("What are employee rights?", first_pass)
+    assert len(reranker.model.pairs) == 10
+    # Candidates keep their retrieval scores; the reranked copies carry the new ones
+    assert [r.confidence for r in first_pass] == original_scores
+
+    reranked = await reranker.rerank("What are employee rights?", mock_retrieval_results)
+    assert len(reranker.model.pairs) == 20
+    assert [r.chunk_id for r in reranked[:3]] == ["chunk_0", "chunk_1", "chunk_2"]
+    assert reranked[0].metadata["original_confidence"] == 0.5
+    assert reranked[0].metadata["source"] == "unknown_reranked"
+
+    # Reranking reranked results does not compound metadata
+    again = await reranker.rerank("What are employee rights?", reranked)
+    assert again[0].metadata["original_confidence"] == 0.5
+    assert again[0].metadata["source"] == "unknown_reranked"
+
+
+@pytest.mark.asyncio
+async def test_reranker_cache_shared_by_near_duplicate_queries(mock_retrieval_results):
+    from api.tools.reranker import BGEReranker, RerankScoreCache
+
+    cache = RerankScoreCache()
+    reranker = BGEReranker(score_cache=cache)
+    reranker.model = _CountingCrossEncoder()
+
+    await reranker.rerank("What are employee rights?", mock_retrieval_results[:5])
+    await reranker.rerank("what are  employee rights", mock_retrieval_results[:5])
+    assert len(reranker.model.pairs) == 5
+    assert cache.stats()["hits"] == 5
+
+    await reranker.rerank("What are employer duties?", mock_retrieval_results[:5])
+    assert len(reranker.model.pairs) == 10
+
+
+def test_rerank_score_cache_expiry_and_bound():
+    from api.tools.reranker import RerankScoreCache
+
+    cache = RerankScoreCache(max_entries=2, ttl_seconds=60)
+    for i in range(3):
+        cache.put(("q", f"c{i}", "t"), float(i))
+    assert cache.get(("q", "c0", "t")) is None
+    assert cache.get(("q", "c2", "t")) == 2.0
+
+    cache.ttl_seconds = -1
+    assert cache.get(("q", "c2", "t")) is None
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Tests for the inverted-index BM25 engine (api/bm25_index.py).
+
+Covers score parity with rank_bm25.BM25Okapi, MaxScore pruning exactness,
+legacy index conversion, the memory-mapped on-disk format and the
+ProductionBM25Provider search/load paths.
+
+Author: RightLine Team
+"""
+
+import io
+import json
+import random
+import shutil
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+
+from api.bm25_index import (
+    InvertedBM25Index,
+    SortedVocabulary,
+    open_index_dir,
+    optimize_tokenize_legal_text,
+    verify_index_dir,
+    write_index_dir,
+)
+from api.bm25_provider import ProductionBM25Provider
+
+
+class FakeR2:
+    """In-memory bucket with the boto3 calls the index writer and provider use."""
+
+    def __init__(self):
+        self.objects = {}
+        self.put_keys = []
+        self.downloads = 0
+
+    def upload_file(self, path, bucket, key, ExtraArgs=None):
+        with open(path, "rb") as f:
+            self.objects[key] = f.read()
+        self.put_keys.append(key)
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = Body
+        self.put_keys.append(Key)
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+    def download_file(self, bucket, key, dest):
+        self.downloads += 1
+        with open(dest, "wb") as f:
+            f.write(self.objects[key])
+
+
+@pytest.fixture
+def legal_corpus_tokens():
+    """Tokenized legal snippets plus a skewed synthetic tail for pruning coverage."""
+    texts = [
+        "Every employer must pay minimum wage to workers as prescribed by regulation",
+        "Employment contracts shall specify working hours, overtime pay, and leave entitlements",
+        "Any person convicted of theft shall be liable to imprisonment or fine",
+        "Section 12C of the Labour Act [Chapter 28:01] governs notice of termination",
+        "The Constitution protects the right to fair labour practices and minimum wage",
+    ]
+    rng = random.Random(7)
+    vocab = [f"term{i}" for i in range(400)]
+    weights = [1 / (i + 1) for i in range(400)]
+    synthetic = [" ".join(rng.choices(vocab, weights, k=rng.randint(5, 60))) for _ in range(600)]
+    return [optimize_tokenize_legal_text(t) for t in texts + synthetic]
+
+
+@pytest.fixture
+def chunk_metadata(legal_corpus_tokens):
+    return [
+        {"chunk_id": f"chunk_{i}", "parent_doc_id": f"doc_{i}", "doc_type": "act", "metadata": {"title": "Acté"}}
+        for i in range(len(legal_corpus_tokens))
+    ]
+
+
+def _reference_top_k(bm25: BM25Okapi, query, top_k):
+    scores = bm25.get_scores(query)
+    top = scores.argsort()[-top_k:][::-1]
+    return scores, [int(i) for i in top if scores[i] > 0]
+
+
+class TestInvertedBM25Index:
+    """Test postings construction and scoring."""
+
+    @pytest.mark.parametrize("query", [
+        ["minimum", "wage"],
+        ["section12c", "labour", "labour"],
+        ["term0", "term3", "term150", "term399"],
+        ["term1", "term2", "minimum"],
+    ])
+    def test_scores_match_rank_bm25(self, legal_corpus_tokens, query):
+        """Top-k ids and scores should match BM25Okapi's full-corpus scoring."""
+        bm25 = BM25Okapi(legal_corpus_tokens, k1=1.5, b=0.75)
+        index = InvertedBM25Index.build(legal_corpus_tokens, k1=1.5, b=0.75)
+
+        ref_scores, ref_ids = _reference_top_k(bm25, query, 20)
+        ids, scores = index.search(query, top_k=20)
+
+        assert set(ids.tolist()) == set(ref_ids)
+        np.testing.assert_allclose(scores, ref_scores[ids], rtol=1e-4)
+        assert list(scores) == sorted(scores, reverse=True)
+        np.testing.assert_allclose(index.get_scores(query), ref_scores, rtol=1e-4)
+
+    def test_maxscore_pruning_is_exact(self, legal_corpus_tokens):
+        """MaxScore pruning must not change the returned top-k."""
+        index = InvertedBM25Index.build(legal_corpus_tokens)
+        query = ["term0", "term1", "term5", "term80", "term300"]
+
+        pruned_ids, pruned_scores = index.search(query, top_k=10, use_maxscore=True)
+        full_ids, full_scores = index.search(query, top_k=10, use_maxscore=False)
+
+        assert set(pruned_ids.tolist()) == set(full_ids.tolist())
+        np.testing.assert_allclose(np.sort(pruned_scores), np.sort(full_scores), rtol=1e-5)
+
+    def test_unknown_terms_return_empty(self, legal_corpus_tokens):
+        """Queries with no indexed terms should return no results."""
+        index = InvertedBM25Index.build(legal_corpus_tokens)
+        ids, scores = index.search(["nonexistentterm"], top_k=5)
+        assert ids.size == 0 and scores.size == 0
+
+    def test_from_rank_bm25_conversion(self, legal_corpus_tokens):
+        """Legacy pickled BM25Okapi indexes convert to identical postings."""
+        bm25 = BM25Okapi(legal_corpus_tokens)
+        converted = InvertedBM25Index.from_rank_bm25(bm25)
+        built = InvertedBM25Index.build(legal_corpus_tokens)
+
+        assert converted.vocabulary == built.vocabulary
+        np.testing.assert_array_equal(converted.doc_ids, built.doc_ids)
+        np.testing.assert_allclose(converted.idf, built.idf)
+
+    def test_empty_corpus_rejected(self):
+        """Building from an empty corpus is an error."""
+        with pytest.raises(ValueError):
+            InvertedBM25Index.build([])
+
+
+class TestProviderUsesInvertedIndex:
+    """Test ProductionBM25Provider search over the inverted index."""
+
+    @pytest.mark.asyncio
+    async def test_provider_search_and_legacy_conversion(self, legal_corpus_tokens):
+        """Provider converts legacy data once and maps top hits to chunk metadata."""
+        provider = ProductionBM25Provider()
+        index_data = provider._prepare_index_data({
+            "bm25_index": BM25Okapi(legal_corpus_tokens),
+            "chunk_metadata": [
+                {"chunk_id": f"chunk_{i}", "parent_doc_id": f"doc_{i}", "doc_type": "act", "metadata": {}}
+                for i in range(len(legal_corpus_tokens))
+            ],
+        })
+        provider._index_data = index_data
+        provider._bm25_index = index_data["bm25_index"]
+        provider._chunk_metadata = index_data["chunk_metadata"]
+        provider._loaded = True
+
+        assert isinstance(provider._bm25_index, InvertedBM25Index)
+
+        results = await provider.search("minimum wage", top_k=3)
+
+        assert results
+        assert {r.chunk_id for r in results} <= {"chunk_0", "chunk_4"}
+        assert all(r.metadata["bm25_score"] > 0 for r in results)
+
+
+class TestMemoryMappedIndexFormat:
+    """Test the pickle-free, memory-mapped index directory."""
+
+    def test_round_trip_preserves_results(self, legal_corpus_tokens, chunk_metadata, tmp_path):
+        """A mapped index returns the same hits and scores as the in-memory build."""
+        index = InvertedBM25Index.build(legal_corpus_tokens)
+        manifest = write_index_dir(index, chunk_metadata, tmp_path)
+        mapped, metadata, loaded_manifest = open_index_dir(tmp_path)
+
+        assert loaded_manifest["build_id"] == manifest["build_id"]
+        assert isinstance(mapped.vocabulary, SortedVocabulary)
+        assert isinstance(mapped.doc_ids, np.memmap)
+        assert len(mapped.vocabulary) == len(index.vocabulary)
+        assert len(metadata) == len(chunk_metadata)
+        assert metadata[5] == chunk_metadata[5]
+
+        for query in (["minimum", "wage"], ["term0", "term3", "term150"], ["nonexistentterm"]):
+            ids, scores = index.search(query, top_k=20)
+            mapped_ids, mapped_scores = mapped.search(query, top_k=20)
+            np.testing.assert_array_equal(mapped_ids, ids)
+            np.testing.assert_allclose(mapped_scores, scores, rtol=1e-6)
+
+    def test_verify_detects_corruption_and_version(self, legal_corpus_tokens, chunk_metadata, tmp_path):
+        """Checksums catch same-size corruption; unknown versions are rejected."""
+        write_index_dir(InvertedBM25Index.build(legal_corpus_tokens), chunk_metadata, tmp_path)
+        assert verify_index_dir(tmp_path, deep=True) is None
+
+        tfs_path = tmp_path / "tfs.npy"
+        data = bytearray(tfs_path.read_bytes())
+        data[-1] ^= 0xFF
+        tfs_path.write_bytes(bytes(data))
+        assert verify_index_dir(tmp_path) is None  # size still matches
+        assert "checksum" in verify_index_dir(tmp_path, deep=True)
+
+        manifest = json.loads((tmp_path / "manifest.json").read_text())
+        manifest["format_version"] = 99
+        (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+        assert "format_version" in verify_index_dir(tmp_path)
+        with pytest.raises(ValueError):
+            open_index_dir(tmp_path)
+
+    def test_metadata_length_must_match_corpus(self, legal_corpus_tokens, tmp_path):
+        """Writing an index with misaligned metadata is an error."""
+        with pytest.raises(ValueError):
+            write_index_dir(InvertedBM25Index.build(legal_corpus_tokens), [], tmp_path)
+
+    @pytest.mark.asyncio
+    async def test_provider_loads_local_index_dir(self, legal_corpus_tokens, chunk_metadata, tmp_path):
+        """Provider maps a local v2 directory without touching legacy pickles."""
+        write_index_dir(InvertedBM25Index.build(legal_corpus_tokens), chunk_metadata, tmp_path / "v2")
+        provider = ProductionBM25Provider(
+            local_fallback=str(tmp_path / "missing.pkl"),
+            local_index_dir=str(tmp_path / "v2"),
+            cache_dir=str(tmp_path / "cache"),
+        )
+
+        with patch.object(provider, "_get_r2_client", return_value=None):
+            results = await provider.search("minimum wage", top_k=3)
+
+        assert provider._index_data["format_version"] == 2
+        assert {r.chunk_id for r in results} <= {"chunk_0", "chunk_4"}
+        assert results[0].metadata["title"] == "Acté"
+
+    def test_provider_installs_r2_build_into_cache(self, legal_corpus_tokens, chunk_metadata, tmp_path):
+        """Remote builds are downloaded once per build_id, then served from cache."""
+        from scripts.build_bm25_index import save_bm25_index_to_r2
+
+        source = tmp_path / "source"
+        manifest = write_index_dir(InvertedBM25Index.build(legal_corpus_tokens), chunk_metadata, source)
+        r2_client = FakeR2()
+        save_bm25_index_to_r2(r2_client, "bucket", str(source), manifest)
+
+        provider = ProductionBM25Provider(cache_dir=str(tmp_path / "cache"))
+        first = provider._install_build(r2_client, provider._fetch_remote_manifest(r2_client))
+        downloads = r2_client.downloads
+        second = provider._install_build(r2_client, provider._fetch_remote_manifest(r2_client))
+
+        assert first == second == str(tmp_path / "cache" / manifest["build_id"])
+        assert downloads > 0 and r2_client.downloads == downloads
+        assert verify_index_dir(first, deep=True) is None
+
+    def test_new_build_never_overwrites_the_published_one(self, legal_corpus_tokens, chunk_metadata, tmp_path):
+        """Each build uploads under its own prefix and the manifest pointer moves last."""
+        from scripts.build_bm25_index import save_bm25_index_to_r2
+
+        r2_client = FakeR2()
+        old = write_index_dir(InvertedBM25Index.build(legal_corpus_tokens), chunk_metadata, tmp_path / "old")
+        save_bm25_index_to_r2(r2_client, "bucket", str(tmp_path / "old"), old)
+        old_objects = dict(r2_client.objects)
+
+        new = write_index_dir(
+            InvertedBM25Index.build(legal_corpus_tokens[:4]), chunk_metadata[:4], tmp_path / "new"
+        )
+        save_bm25_index_to_r2(r2_client, "bucket", str(tmp_path / "new"), new)
+
+        assert new["build_id"] != old["build_id"]
+        changed = [key for key, body in old_objects.items() if r2_client.objects[key] != body]
+        assert changed == ["corpus/indexes/bm25_v2/manifest.json"]
+        assert r2_client.put_keys[-1] == "corpus/indexes/bm25_v2/manifest.json"
+
+        provider = ProductionBM25Provider(cache_dir=str(tmp_path / "cache"))
+        installed = provider._install_build(r2_client, provider._fetch_remote_manifest(r2_client))
+        assert installed.endswith(new["build_id"]) and verify_index_dir(installed, deep=True) is None
+
+    @pytest.mark.asyncio
+    async def test_slow_first_download_not_cut_by_load_timeout(
+        self, legal_corpus_tokens, chunk_metadata, tmp_path, monkeypatch
+    ):
+        """Only the manifest fetch is bounded by BM25_LOAD_TIMEOUT; downloads get their own budget."""
+        import time
+
+        from api import bm25_provider
+
+        source = tmp_path / "source"
+        write_index_dir(InvertedBM25Index.build(legal_corpus_tokens), chunk_metadata, source)
+
+        def slow_download(bucket, key, dest):
+            time.sleep(0.1)
+            shutil.copy(source / key.rsplit("/", 1)[-1], dest)
+
+        r2_client = MagicMock()
+        r2_client.get_object.side_effect = lambda Bucket, Key: {
+            "Body": io.BytesIO((source / "manifest.json").read_bytes())
+        }
+        r2_client.download_file.side_effect = slow_download
+        monkeypatch.setattr(bm25_provider, "BM25_LOAD_TIMEOUT", 0.2)
+
+        provider = ProductionBM25Provider(cache_dir=str(tmp_path / "cache"))
+        with patch.object(provider, "_get_r2_client", return_value=r2_client):
+            assert await provider._load_mapped_index_from_r2()
+
+        assert r2_client.download_file.call_count * 0.1 > 0.2
+        assert provider._index_data["format_version"] == 2
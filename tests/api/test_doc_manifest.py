@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for direct-key parent document resolution (api/doc_manifest.py).
+
+Author: RightLine Team
+"""
+
+import io
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from api.doc_manifest import DocManifest, build_doc_manifest, doc_id_from_key
+from api.tools.retrieval_engine import RetrievalEngine
+
+
+def _parent_body(doc_id: str) -> bytes:
+    return json.dumps({
+        "doc_id": doc_id,
+        "title": "Labour Act",
+        "canonical_citation": "Labour Act [Chapter 28:01]",
+        "pageindex_markdown": "# Labour Act",
+    }).encode()
+
+
+class _FakeR2:
+    """Minimal R2 stand-in that records every GET."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.gets = []
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self.gets.append(Key)
+        if Key not in self.objects:
+            raise KeyError(Key)
+        return {"Body": io.BytesIO(self.objects[Key]), "ETag": '"v1"'}
+
+
+def _manifest_body(docs):
+    return json.dumps({"version": 1, "build_timestamp": 0, "docs": docs}).encode()
+
+
+def _engine_with(r2, manifest: DocManifest) -> RetrievalEngine:
+    engine = RetrievalEngine()
+    engine._r2_client = r2
+    engine.doc_manifest = manifest
+    return engine
+
+
+class TestDocManifest:
+    """Test manifest building and parent fetch resolution."""
+
+    def test_build_from_listing_skips_non_documents(self):
+        """Only corpus/docs/**/<id>.json objects are mapped."""
+        r2 = MagicMock()
+        r2.get_paginator.return_value.paginate.return_value = [
+            {"Contents": [{"Key": "corpus/docs/act/a1.json"}, {"Key": "corpus/docs/docs.jsonl"}]},
+            {"Contents": [{"Key": "corpus/docs/judgment/j1.json"}]},
+        ]
+
+        assert build_doc_manifest(r2, "bucket") == {
+            "a1": "corpus/docs/act/a1.json",
+            "j1": "corpus/docs/judgment/j1.json",
+        }
+        assert doc_id_from_key("corpus/chunks/act/c1.json") is None
+
+    @pytest.mark.asyncio
+    async def test_manifest_hit_is_single_get(self):
+        """A manifested parent costs exactly one document GET."""
+        manifest = DocManifest(r2_key="corpus/indexes/doc_manifest.json")
+        r2 = _FakeR2({
+            "corpus/indexes/doc_manifest.json": _manifest_body({"j1": "corpus/docs/judgment/j1.json"}),
+            "corpus/docs/judgment/j1.json": _parent_body("j1"),
+        })
+        engine = _engine_with(r2, manifest)
+
+        parent = await engine._fetch_parent_document_from_r2("j1", "act")
+
+        assert parent.doc_id == "j1"
+        assert r2.gets == ["corpus/indexes/doc_manifest.json", "corpus/docs/judgment/j1.json"]
+        assert manifest.stats["hits"] == 1 and manifest.stats["fallback_probes"] == 0
+
+    @pytest.mark.asyncio
+    async def test_unmanifested_parent_probes_and_is_remembered(self):
+        """Missing entries fall back to counted probing and are learned."""
+        manifest = DocManifest(r2_key="corpus/indexes/doc_manifest.json")
+        r2 = _FakeR2({"corpus/docs/judgment/j2.json": _parent_body("j2")})
+        engine = _engine_with(r2, manifest)
+
+        parent = await engine._fetch_parent_document_from_r2("j2", "judgment")
+        assert parent.doc_id == "j2"
+        assert manifest.stats["misses"] == 1 and manifest.stats["fallback_probes"] == 1
+
+        r2.gets.clear()
+        engine.content_cache.clear()
+        await engine._fetch_parent_document_from_r2("j2", "judgment")
+        assert r2.gets == ["corpus/docs/judgment/j2.json"]
+        assert manifest.stats["hits"] == 1
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for Responses API streaming in the GPT-5 wrappers (api/llm/gpt5_wrapper.py).
+
+Author: RightLine Team
+"""
+
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from langchain_core.messages import HumanMessage
+from openai import AsyncOpenAI, BadRequestError
+
+from api.llm import gpt5_wrapper
+from api.llm.gpt5_wrapper import GPT5ProWrapper, GPT5Wrapper
+
+
+def _usage():
+    return SimpleNamespace(
+        input_tokens=10,
+        output_tokens=5,
+        total_tokens=15,
+        output_tokens_details=SimpleNamespace(reasoning_tokens=3),
+    )
+
+
+def _completed():
+    response = SimpleNamespace(id="resp_1", model="gpt-5", status="completed", usage=_usage(), output_text="Hello world")
+    return SimpleNamespace(type="response.completed", response=response)
+
+
+class FakeStream:
+    """Async iterator over Responses stream events that records close()."""
+
+    def __init__(self, events):
+        self.events = list(events)
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.events:
+            raise StopAsyncIteration
+        return self.events.pop(0)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeResponses:
+    def __init__(self, stream=None, reject_streaming=False):
+        self.stream = stream
+        self.reject_streaming = reject_streaming
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs.get("stream"):
+            if self.reject_streaming:
+                raise BadRequestError(
+                    "Unsupported value: 'stream' does not support true with this model.",
+                    response=httpx.Response(400, request=httpx.Request("POST", "https://api.openai.com/v1/responses")),
+                    body=None,
+                )
+            return self.stream
+        return _completed().response
+
+
+def _llm(cls, responses):
+    llm = cls(model="gpt-5", client=AsyncOpenAI(api_key="test"))
+    llm.client = SimpleNamespace(responses=responses)
+    return llm
+
+
+class TestGPT5Streaming:
+    """Test incremental streaming, metadata events and fallbacks."""
+
+    @pytest.mark.asyncio
+    async def test_deltas_reasoning_and_usage(self):
+        """Text deltas stream as content; reasoning and usage stay out of content."""
+        stream = FakeStream([
+            SimpleNamespace(type="response.reasoning_summary_text.delta", delta="Thinking"),
+            SimpleNamespace(type="response.output_text.delta", delta="Hello "),
+            SimpleNamespace(type="response.output_text.delta", delta="world"),
+            _completed(),
+        ])
+        responses = FakeResponses(stream)
+        llm = _llm(GPT5Wrapper, responses)
+
+        chunks = [chunk async for chunk in llm.astream([HumanMessage(content="hi")])]
+
+        assert [c.content for c in chunks if c.content] == ["Hello ", "world"]
+        merged = chunks[0]
+        for chunk in chunks[1:]:
+            merged = merged + chunk
+        assert merged.content == "Hello world"
+        assert merged.additional_kwargs["reasoning_summary"] == "Thinking"
+        assert merged.usage_metadata["total_tokens"] == 15
+        assert merged.usage_metadata["output_token_details"] == {"reasoning": 3}
+        assert responses.calls[0]["stream"] is True and responses.calls[0]["store"] is False
+        assert stream.closed
+
+    @pytest.mark.asyncio
+    async def test_closing_early_closes_upstream_stream(self):
+        """A consumer that stops reading releases the HTTP response."""
+        stream = FakeStream([
+            SimpleNamespace(type="response.output_text.delta", delta="Hello "),
+            SimpleNamespace(type="response.output_text.delta", delta="world"),
+        ])
+        llm = _llm(GPT5ProWrapper, FakeResponses(stream))
+
+        chunks = llm._astream([HumanMessage(content="hi")])
+        first = await chunks.__anext__()
+        await chunks.aclose()
+
+        assert first.message.content == "Hello "
+        assert stream.closed
+
+    @pytest.mark.asyncio
+    async def test_failed_response_raises(self):
+        """A response.failed event surfaces as an error rather than a silent empty answer."""
+        failed = SimpleNamespace(type="response.failed", response=SimpleNamespace(error=SimpleNamespace(message="boom")))
+        llm = _llm(GPT5Wrapper, FakeResponses(FakeStream([failed])))
+
+        with pytest.raises(RuntimeError, match="boom"):
+            async for _ in llm.astream([HumanMessage(content="hi")]):
+                pass
+
+    @pytest.mark.asyncio
+    async def test_models_rejecting_streaming_fall_back_once(self):
+        """Models that reject stream=True are served by one non-streaming call thereafter."""
+        responses = FakeResponses(reject_streaming=True)
+        llm = _llm(GPT5ProWrapper, responses)
+        try:
+            first = [c.content async for c in llm.astream([HumanMessage(content="hi")])]
+            second = [c.content async for c in llm.astream([HumanMessage(content="hi")])]
+        finally:
+            gpt5_wrapper._NON_STREAMING_MODELS.discard("gpt-5")
+
+        assert "".join(first) == "".join(second) == "Hello world"
+        assert [call.get("stream", False) for call in responses.calls] == [True, False, False]
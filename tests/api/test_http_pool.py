@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared upstream HTTP connection pools (api/http_pool.py).
+
+Author: RightLine Team
+"""
+
+import asyncio
+import http.server
+import socketserver
+import threading
+import time
+
+import httpx
+import pytest
+
+from api.http_pool import HTTPClientPool, UpstreamConfig
+from api.tools.retrieval_engine import RetrievalEngine
+
+
+class _SlowHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        time.sleep(0.02)
+        body = b'{"code": 0, "data": []}'
+        self.send_response(200)
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def local_url():
+    server = _Server(("127.0.0.1", 0), _SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def _pool(max_connections: int = 2) -> HTTPClientPool:
+    return HTTPClientPool({
+        "test": UpstreamConfig(
+            name="test",
+            timeout=httpx.Timeout(5.0),
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            http2=False,
+        )
+    })
+
+
+class TestHTTPClientPool:
+    """Test pooled client lifecycle and metrics."""
+
+    @pytest.mark.asyncio
+    async def test_fallback_client_when_not_started(self):
+        """Outside the lifespan each borrow gets its own short-lived client."""
+        pool = _pool()
+        async with pool.client("test") as first:
+            pass
+        async with pool.client("test") as second:
+            pass
+
+        assert not pool.is_started
+        assert first is not second
+        assert first.is_closed
+
+    @pytest.mark.asyncio
+    async def test_started_pool_shares_client_and_reuses_connections(self, local_url):
+        """Concurrent requests share one client, bounded by max_connections."""
+        pool = _pool(max_connections=2)
+        await pool.startup()
+        try:
+            async def call():
+                async with pool.client("test") as client:
+                    return client, (await client.post(f"{local_url}/search", json={})).status_code
+
+            results = await asyncio.gather(*(call() for _ in range(6)))
+            metrics = pool.metrics()["test"]
+        finally:
+            await pool.shutdown()
+
+        assert len({id(client) for client, _ in results}) == 1
+        assert all(status == 200 for _, status in results)
+        assert metrics["requests"] == 6
+        assert metrics["in_flight"] == 0 and metrics["queued"] == 0
+        assert metrics["connections_opened"] <= 2
+        assert metrics["reused_connections"] == 6 - metrics["connections_opened"]
+        assert not pool.is_started
+
+    @pytest.mark.asyncio
+    async def test_engine_clients_share_injected_pool(self):
+        """RetrievalEngine hands one pool to its Milvus and embedding clients."""
+        pool = _pool()
+        engine = RetrievalEngine(http_pool=pool)
+
+        assert engine.milvus_client.http_pool is pool
+        assert engine.embedding_client.http_pool is pool
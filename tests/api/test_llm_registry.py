@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Tests for the process-wide LLM registry (api/llm/registry.py).
+
+Author: RightLine Team
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from api.http_pool import HTTPClientPool
+from api.llm.gpt5_wrapper import GPT5ProWrapper, GPT5Wrapper
+from api.llm.registry import LLMRegistry, ModelBudget, ModelLimit, TokenBucket, model_limit
+
+
+@pytest.fixture
+async def registry(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    registry = LLMRegistry(http_pool=HTTPClientPool())
+    yield registry
+    await registry.shutdown()
+
+
+class TestLLMRegistry:
+    """Test wrapper caching and client sharing."""
+
+    @pytest.mark.asyncio
+    async def test_wrappers_cached_per_configuration(self, registry):
+        """Same configuration returns the same wrapper; all share one client and budget."""
+        synthesis = registry.get_gpt5_model("gpt-5-pro", max_tokens=4000)
+        mini = registry.get_gpt5_model("gpt-5-mini", "low", 400, "low")
+
+        assert isinstance(synthesis, GPT5ProWrapper) and isinstance(mini, GPT5Wrapper)
+        assert registry.get_gpt5_model("gpt-5-pro", max_tokens=4000) is synthesis
+        assert registry.get_gpt5_model("gpt-5-mini", "low", 800, "low") is not mini
+        assert synthesis.client is mini.client
+        assert mini.budget is registry.get_gpt5_model("gpt-5-mini", "medium").budget
+        assert registry.metrics()["cached_models"] == 4
+
+    @pytest.mark.asyncio
+    async def test_uses_started_http_pool(self, monkeypatch):
+        """When the app pool is running, the OpenAI client rides on its connections."""
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        pool = HTTPClientPool()
+        await pool.startup()
+        registry = LLMRegistry(http_pool=pool)
+        try:
+            registry.get_gpt5_model("gpt-5-mini", "low")
+            assert registry._scope().http_client is pool.get("openai")
+            assert registry.metrics()["pooled"] is True
+        finally:
+            await registry.shutdown()
+            await pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_shutdown_clears_cache(self, registry):
+        first = registry.get_gpt5_model("gpt-5-mini", "low")
+        await registry.shutdown()
+        assert registry.get_gpt5_model("gpt-5-mini", "low") is not first
+
+    def test_each_event_loop_gets_its_own_client_and_budgets(self, monkeypatch):
+        """Scripts running one asyncio.run per call never reuse objects bound to a closed loop."""
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        monkeypatch.setenv("LLM_LIMIT_GPT_5_MINI", "1,6000,1000000")
+        registry = LLMRegistry(http_pool=HTTPClientPool())
+
+        async def burst():
+            llm = registry.get_gpt5_model("gpt-5-mini", "low")
+
+            async def call():
+                async with llm.budget.reserve(10):  # contended, so the semaphore binds to this loop
+                    await asyncio.sleep(0.01)
+
+            await asyncio.gather(call(), call())
+            assert registry.get_gpt5_model("gpt-5-mini", "low") is llm
+            return llm
+
+        first = asyncio.run(burst())
+        second = asyncio.run(burst())
+
+        assert second is not first
+        assert second.client is not first.client and second.budget is not first.budget
+
+    def test_outside_a_loop_wrappers_are_not_cached(self, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        registry = LLMRegistry(http_pool=HTTPClientPool())
+
+        llm = registry.get_gpt5_model("gpt-5-mini", "low")
+
+        assert llm.budget is None and llm.client is not None
+        assert registry.get_gpt5_model("gpt-5-mini", "low") is not llm
+        assert registry.metrics()["loops"] == 0
+
+    def test_limit_override(self, monkeypatch):
+        monkeypatch.setenv("LLM_LIMIT_GPT_5_PRO", "2,30,1000")
+        assert model_limit("gpt-5-pro") == ModelLimit(2, 30, 1000)
+        monkeypatch.setenv("LLM_LIMIT_GPT_5_PRO", "bad")
+        assert model_limit("gpt-5-pro").max_concurrency == 4
+
+
+class TestModelBudget:
+    """Test local queuing of bursts."""
+
+    @pytest.mark.asyncio
+    async def test_semaphore_queues_burst(self):
+        """No more than max_concurrency calls run at once; the rest wait their turn."""
+        budget = ModelBudget("gpt-5-pro", ModelLimit(2, 6000, 1_000_000))
+        running = peak = 0
+
+        async def call():
+            nonlocal running, peak
+            async with budget.reserve(100):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(call() for _ in range(6)))
+
+        snapshot = budget.snapshot()
+        assert peak == 2
+        assert snapshot["calls"] == 6 and snapshot["in_flight"] == 0 and snapshot["queued"] == 0
+        assert snapshot["throttled"] >= 4
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_delays_when_exhausted(self):
+        """A drained bucket delays the next acquire until it refills."""
+        bucket = TokenBucket(per_minute=600)  # 10 per second
+        await bucket.acquire(600)
+
+        started = time.perf_counter()
+        waited = await bucket.acquire(1)
+
+        assert waited > 0
+        assert time.perf_counter() - started >= 0.09
+
+    @pytest.mark.asyncio
+    async def test_wrapper_call_reserves_budget(self, registry):
+        """Wrapper calls are counted against the model budget."""
+
+        class FakeResponses:
+            async def create(self, **kwargs):
+                return SimpleNamespace(output_text="ok")
+
+        llm = registry.get_gpt5_model("gpt-5-mini", "low", 100)
+        llm.client = SimpleNamespace(responses=FakeResponses())
+
+        message = await llm.ainvoke([HumanMessage(content="hi")])
+
+        assert message.content == "ok"
+        assert registry.metrics()["models"]["gpt-5-mini"]["calls"] == 1
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Tests for the tiered post-synthesis quality gate (api/composer/quality_gates.py).
+
+Author: RightLine Team
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from api.composer.quality_gates import (
+    AttributionVerificationResult,
+    DeterministicQualityChecker,
+    GateThresholds,
+    LogicalCoherenceResult,
+    QualityGateOrchestrator,
+    gate_thresholds,
+)
+
+CONTEXT = [
+    {
+        "doc_key": "constitution_sec_56",
+        "title": "Constitution of Zimbabwe",
+        "content": "Every person has the right to life and to personal security.",
+        "doc_type": "constitution",
+    },
+    {
+        "doc_key": "labour_act_12",
+        "title": "Labour Act",
+        "content": "An employer shall give written notice of termination of employment.",
+        "doc_type": "act",
+    },
+]
+
+GROUNDED_ANSWER = (
+    "(Source: Section 56 Constitution of Zimbabwe) Every person has the right to life and to personal security. "
+    "(Source: Labour Act Chapter 28:01) An employer must give written notice before terminating employment. "
+    'The Act states that "An employer shall give written notice of termination" [Source 2].'
+)
+
+
+class TestDeterministicQualityChecker:
+    """Test the cheap tier's verdicts."""
+
+    def test_grounded_answer_passes(self):
+        result = DeterministicQualityChecker().check(GROUNDED_ANSWER, CONTEXT)
+        assert result.verdict == "pass"
+        assert result.citation_density == 1.0
+        assert result.citation_coverage == 1.0
+        assert result.verified_quotes == 1 and not result.unverified_quotes
+
+    def test_subsection_citations_resolve(self):
+        """Citations in the prompts' own format, e.g. Section 56(1), keep the title after the subsection."""
+        answer = (
+            "(Source: Section 56(1) Constitution of Zimbabwe) Every person has the right to life and to personal security. "
+            "(Source: Section 12(2) Labour Act) An employer must give written notice before terminating employment."
+        )
+        result = DeterministicQualityChecker().check(answer, CONTEXT)
+        assert result.citation_density == 1.0
+        assert result.citation_coverage == 1.0
+        assert result.verdict == "pass"
+
+    def test_uncited_answer_fails(self):
+        answer = "People have rights under the law of the land. Employers can dismiss workers whenever they choose to."
+        result = DeterministicQualityChecker().check(answer, CONTEXT)
+        assert result.verdict == "fail"
+        assert result.citation_density == 0.0
+
+    def test_fabricated_quote_is_inconclusive(self):
+        answer = GROUNDED_ANSWER + ' The Constitution also says "employers may dismiss at will without notice" [Source 1].'
+        result = DeterministicQualityChecker().check(answer, CONTEXT)
+        assert result.verdict == "inconclusive"
+        assert result.unverified_quotes == ["employers may dismiss at will without notice"]
+
+    def test_unresolved_citations_are_inconclusive(self):
+        answer = (
+            "(Source: Companies and Other Business Entities Act) Directors owe fiduciary duties to the company. "
+            "(Source: Insolvency Act) Creditors may apply to have a company wound up by the court."
+        )
+        result = DeterministicQualityChecker().check(answer, CONTEXT)
+        assert result.verdict == "inconclusive"
+        assert result.citation_coverage == 0.0
+
+    def test_statute_before_constitution_is_inconclusive(self):
+        answer = (
+            "(Source: Labour Act) The Act requires an employer to give written notice of termination. "
+            "(Source: Constitution of Zimbabwe) The Constitution protects the right to life and security."
+        )
+        result = DeterministicQualityChecker().check(answer, CONTEXT)
+        assert result.verdict == "inconclusive"
+        assert result.hierarchy_issues
+
+    def test_thresholds_per_complexity(self, monkeypatch):
+        assert gate_thresholds("expert").pass_citation_density > gate_thresholds("simple").pass_citation_density
+        assert gate_thresholds(None) == gate_thresholds("moderate")
+
+        monkeypatch.setenv("QUALITY_GATE_EXPERT", "1.1,0.2,0.8")
+        assert gate_thresholds("expert") == GateThresholds(1.1, 0.2, 0.8)
+        # A pass density above 1 sends every answer to the LLM tier
+        assert DeterministicQualityChecker().check(GROUNDED_ANSWER, CONTEXT, gate_thresholds("expert")).verdict == "inconclusive"
+
+
+class TestTieredQualityGate:
+    """Test that LLM verifiers only run when the cheap tier is inconclusive."""
+
+    @pytest.mark.asyncio
+    async def test_cheap_pass_skips_llm_verifiers(self):
+        gate = QualityGateOrchestrator()
+        with patch.object(gate.attribution_verifier, "verify_attribution", new=AsyncMock()) as attribution, \
+             patch.object(gate.coherence_checker, "check_coherence", new=AsyncMock()) as coherence, \
+             patch.object(gate.relevance_filter, "filter_sources", new=AsyncMock()) as relevance:
+            result = await gate.run_comprehensive_quality_check(GROUNDED_ANSWER, CONTEXT, "notice of termination")
+
+        assert result.passed and result.metrics["tier"] == "deterministic"
+        assert result.metrics["llm_checks"] == 0
+        attribution.assert_not_called()
+        coherence.assert_not_called()
+        relevance.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_cheap_fail_skips_llm_verifiers(self):
+        gate = QualityGateOrchestrator()
+        with patch.object(gate.attribution_verifier, "verify_attribution", new=AsyncMock()) as attribution:
+            result = await gate.run_comprehensive_quality_check(
+                "People have rights under the law of the land. Nothing more needs to be said about it.",
+                CONTEXT,
+                "what are my rights",
+            )
+
+        assert not result.passed and result.issues
+        assert "Add missing source citations with specific section references" in result.recommendations
+        attribution.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_inconclusive_runs_attribution_and_coherence_only(self):
+        gate = QualityGateOrchestrator()
+        attribution = AttributionVerificationResult(
+            grounding_passed=True, citation_density=0.9, unsupported_statements=[],
+            missing_citations=[], incorrect_citations=[], overall_quality="good",
+        )
+        coherence = LogicalCoherenceResult(
+            coherence_passed=True, reasoning_quality="good", logical_issues=[],
+            missing_reasoning=[], counterargument_gaps=[],
+        )
+        answer = (
+            "(Source: Labour Act) An employer must give written notice before terminating employment. "
+            "Notice periods depend on the length of the contract and the terms agreed between the parties. "
+            "Summary dismissal is only permitted for serious misconduct established at a hearing."
+        )
+        with patch.object(gate.attribution_verifier, "verify_attribution", new=AsyncMock(return_value=attribution)), \
+             patch.object(gate.coherence_checker, "check_coherence", new=AsyncMock(return_value=coherence)), \
+             patch.object(gate.relevance_filter, "filter_sources", new=AsyncMock()) as relevance:
+            result = await gate.run_comprehensive_quality_check(answer, CONTEXT, "notice of termination")
+
+        assert result.passed and result.metrics["tier"] == "llm"
+        assert result.metrics["llm_checks"] == 2
+        relevance.assert_not_called()
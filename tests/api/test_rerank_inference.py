@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for the reranker inference service (api/tools/rerank_inference.py).
+
+Author: RightLine Team
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from api.tools.rerank_inference import RerankInferenceService
+
+
+class _RecordingModel:
+    """Stand-in cross-encoder that records each predict call and its thread."""
+
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.threads = set()
+        self.fail = fail
+
+    def predict(self, pairs):
+        self.calls.append(list(pairs))
+        self.threads.add(threading.current_thread().name)
+        if self.fail:
+            raise RuntimeError("inference failed")
+        return [float(len(doc)) for _, doc in pairs]
+
+
+class TestRerankInferenceService:
+    """Test micro-batching, isolation and metrics."""
+
+    @pytest.mark.asyncio
+    async def test_not_started_scores_inline(self):
+        """Without a running service, pairs are scored directly."""
+        service = RerankInferenceService()
+        model = _RecordingModel()
+        assert await service.score(model, [["q", "ab"], ["q", "abc"]]) == [2.0, 3.0]
+        assert await service.score(model, []) == []
+        assert len(model.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_predict(self):
+        """Requests arriving within the batch window are scored in one call."""
+        service = RerankInferenceService(workers=1, threads=1, batch_window=0.02)
+        model = _RecordingModel()
+        await service.startup()
+        try:
+            results = await asyncio.gather(
+                service.score(model, [["q1", "a"], ["q1", "ab"]]),
+                service.score(model, [["q2", "abc"]]),
+                service.score(model, [["q3", "abcd"], ["q3", "abcde"]]),
+            )
+        finally:
+            await service.shutdown()
+
+        assert results == [[1.0, 2.0], [3.0], [4.0, 5.0]]
+        assert len(model.calls) == 1 and len(model.calls[0]) == 5
+        assert all(name.startswith("rerank-inference") for name in model.threads)
+        metrics = service.metrics()
+        assert metrics["batches"] == 1 and metrics["requests"] == 3 and metrics["pairs"] == 5
+        assert metrics["queue_wait_p99_ms"] >= metrics["queue_wait_p50_ms"] >= 0
+
+    @pytest.mark.asyncio
+    async def test_batch_closes_at_max_pairs(self):
+        """A full batch is dispatched without waiting for the window."""
+        service = RerankInferenceService(workers=1, threads=1, batch_window=5, max_batch_pairs=2)
+        model = _RecordingModel()
+        await service.startup()
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(service.score(model, [["q", "a"]]), service.score(model, [["q", "ab"]])),
+                timeout=1,
+            )
+        finally:
+            await service.shutdown()
+
+        assert results == [[1.0], [2.0]]
+
+    @pytest.mark.asyncio
+    async def test_failure_propagates_to_every_caller(self):
+        service = RerankInferenceService(workers=1, threads=1, batch_window=0.01)
+        model = _RecordingModel(fail=True)
+        await service.startup()
+        try:
+            results = await asyncio.gather(
+                service.score(model, [["q", "a"]]),
+                service.score(model, [["q", "b"]]),
+                return_exceptions=True,
+            )
+        finally:
+            await service.shutdown()
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert service.metrics()["failed"] == 2
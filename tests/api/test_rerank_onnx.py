@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Tests for the ONNX Runtime reranker backend (api/tools/rerank_onnx.py).
+
+The bucketing tests run against a fake session. The parity and latency
+tests export a real cross-encoder and are skipped unless onnxruntime,
+transformers and sentence-transformers are installed.
+
+Author: RightLine Team
+"""
+
+import statistics
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from api.tools.rerank_onnx import OnnxCrossEncoder, default_activation
+
+PARITY_MODEL = "cross-encoder/ms-marco-TinyBERT-L-2-v2"
+
+QUERY_PAIRS = [
+    ["What are employee rights on dismissal?", "An employer shall not terminate a contract of employment without notice."],
+    ["What are employee rights on dismissal?", "The Minister may make regulations prescribing fees for licences."],
+    ["Who appoints the Chief Justice?", "The President appoints the Chief Justice after consultation with the Judicial Service Commission."],
+    ["Who appoints the Chief Justice?", "A road traffic offence is punishable by a fine."],
+    ["Minimum age of marriage", "No person under the age of eighteen years may enter into a marriage."],
+    ["Minimum age of marriage", "Section 12 deals with the registration of companies and their directors, " * 8],
+]
+
+
+class _FakeTokenizer:
+    pad_token_id = 0
+
+    def __call__(self, queries, docs, truncation, max_length, padding):
+        ids = [[1] + [2] * len(q.split()) + [3] + [4] * len(d.split()) for q, d in zip(queries, docs)]
+        ids = [row[:max_length] for row in ids]
+        return {"input_ids": ids, "attention_mask": [[1] * len(row) for row in ids]}
+
+
+class _FakeInput:
+    def __init__(self, name):
+        self.name = name
+
+
+class _FakeSession:
+    """Returns the unpadded length of each row as its logit and records batch shapes."""
+
+    def __init__(self):
+        self.shapes = []
+
+    def get_inputs(self):
+        return [_FakeInput("input_ids"), _FakeInput("attention_mask")]
+
+    def run(self, _, feeds):
+        self.shapes.append(feeds["input_ids"].shape)
+        return [feeds["attention_mask"].sum(axis=1, keepdims=True).astype(np.float32) - 6]
+
+
+class TestOnnxCrossEncoderBatching:
+    """Test dynamic padding and length buckets without a real model."""
+
+    def test_batches_padded_to_own_longest_pair(self):
+        session = _FakeSession()
+        model = OnnxCrossEncoder(session, _FakeTokenizer(), max_length=64, batch_size=2, buckets=(8, 16, 64))
+        pairs = [["q", "a " * 40], ["q", "a"], ["q", "a a"], ["q", "a " * 10], ["q", "a a a"]]
+
+        scores = model.predict(pairs)
+
+        lengths = [3 + len(d.split()) for _, d in pairs]
+        expected = [1 / (1 + np.exp(-(length - 6))) for length in lengths]
+        assert scores == pytest.approx(expected, rel=1e-5)
+        # Short pairs never share a batch with the 43-token pair
+        assert session.shapes == [(2, 5), (1, 6), (1, 13), (1, 43)]
+
+    def test_truncates_to_max_length_and_handles_empty(self):
+        session = _FakeSession()
+        model = OnnxCrossEncoder(session, _FakeTokenizer(), max_length=16, buckets=(32, 64))
+        assert model.predict([]) == []
+        model.predict([["q", "a " * 100]])
+        assert session.shapes == [(1, 16)]
+        assert model.buckets == (16,)
+
+    def test_identity_activation_returns_raw_logits(self):
+        model = OnnxCrossEncoder(_FakeSession(), _FakeTokenizer(), max_length=64, activation="identity")
+        assert model.predict([["q", "a a a"], ["q", "a " * 10]]) == [0.0, 7.0]
+
+
+class TestDefaultActivation:
+    """The activation matches what CrossEncoder.predict applies for the same config."""
+
+    def test_config_activation_wins(self):
+        config = {"num_labels": 1, "sentence_transformers": {"activation_fn": "torch.nn.modules.linear.Identity"}}
+        assert default_activation(config) == "identity"
+        assert default_activation({"sbert_ce_default_activation_function": "torch.nn.Sigmoid"}) == "sigmoid"
+
+    def test_falls_back_on_label_count(self):
+        assert default_activation({"id2label": {"0": "LABEL_0"}}) == "sigmoid"
+        assert default_activation({"num_labels": 3}) == "identity"
+
+
+@pytest.fixture(scope="module")
+def exported_models(tmp_path_factory):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("transformers")
+    st = pytest.importorskip("sentence_transformers")
+
+    cache_dir = tmp_path_factory.mktemp("rerank-onnx")
+    try:
+        torch_model = st.CrossEncoder(PARITY_MODEL, max_length=256, device="cpu")
+    except OSError as e:
+        pytest.skip(f"{PARITY_MODEL} not available offline: {e}")
+    fp32 = OnnxCrossEncoder.from_pretrained(PARITY_MODEL, quantize=False, cache_dir=cache_dir)
+    int8 = OnnxCrossEncoder.from_pretrained(PARITY_MODEL, quantize=True, cache_dir=cache_dir)
+    return torch_model, fp32, int8
+
+
+@pytest.mark.slow
+def test_onnx_scores_match_torch(exported_models):
+    """fp32 ONNX matches torch; int8 stays close and keeps the ranking."""
+    torch_model, fp32, int8 = exported_models
+    reference = [float(s) for s in torch_model.predict(QUERY_PAIRS)]
+
+    assert fp32.predict(QUERY_PAIRS) == pytest.approx(reference, abs=1e-4)
+
+    quantized = int8.predict(QUERY_PAIRS)
+    assert quantized == pytest.approx(reference, abs=0.05)
+    for i in range(0, len(QUERY_PAIRS), 2):
+        assert (quantized[i] > quantized[i + 1]) == (reference[i] > reference[i + 1])
+
+
+@pytest.mark.slow
+@pytest.mark.benchmark
+def test_onnx_int8_latency(exported_models):
+    """Report p50 latency per backend for a 50-pair rerank batch."""
+    torch_model, _, int8 = exported_models
+    pairs = (QUERY_PAIRS * 9)[:50]
+
+    def p50_ms(predict, runs=10):
+        predict(pairs)  # warm up
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            predict(pairs)
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
+
+    torch_ms = p50_ms(torch_model.predict)
+    int8_ms = p50_ms(int8.predict)
+    print(f"\nrerank 50 pairs p50: torch={torch_ms:.1f}ms onnx-int8={int8_ms:.1f}ms")
+    assert int8_ms < torch_ms * 1.5
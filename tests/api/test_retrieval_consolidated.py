@@ -16,6 +16,7 @@ Following TDD principles from .cursorrules.
 Author: RightLine Team
 """
 
+import asyncio
 import json
 import pytest
 import unittest
@@ -33,7 +34,9 @@ from api.tools.retrieval_engine import (
     RetrievalConfig,
     search_legal_documents,
     MilvusRetriever,
-    BM25Retriever
+    BM25Retriever,
+    RetrievalEngineRegistry,
+    MilvusClient,
 )
 from api.tools.reranker import BGEReranker
 from api.schemas.agent_state import AgentState
@@ -461,6 +464,138 @@ async def test_search_function_backward_compatibility():
         assert confidence == 0.0
 
 
+@pytest.mark.asyncio
+async def test_registry_shares_engine_after_startup():
+    """Test that the registry leases one shared engine and never disconnects it per call."""
+    registry = RetrievalEngineRegistry()
+    
+    with patch('api.tools.retrieval_engine.RetrievalEngine') as mock_engine_class:
+        mock_engine = MagicMock()
+        mock_engine.warmup = AsyncMock()
+        mock_engine.milvus_client.disconnect = AsyncMock()
+        mock_engine_class.return_value = mock_engine
+        
+        await registry.startup()
+        await registry.startup()  # Idempotent
+        
+        async with registry.lease() as first:
+            pass
+        async with registry.lease() as second:
+            pass
+        
+        assert first is second is mock_engine
+        assert registry.get_engine() is mock_engine
+        assert mock_engine_class.call_count == 1
+        mock_engine.warmup.assert_awaited_once()
+        mock_engine.milvus_client.disconnect.assert_not_awaited()
+        
+        await registry.shutdown()
+        assert not registry.is_started
+        mock_engine.milvus_client.disconnect.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_registry_falls_back_to_per_call_engine():
+    """Test that leasing without startup uses a short-lived engine context."""
+    registry = RetrievalEngineRegistry()
+    
+    with patch('api.tools.retrieval_engine.RetrievalEngine') as mock_engine_class:
+        per_call_engine = MagicMock()
+        mock_engine_class.return_value.__aenter__ = AsyncMock(return_value=per_call_engine)
+        mock_engine_class.return_value.__aexit__ = AsyncMock(return_value=None)
+        
+        async with registry.lease() as engine:
+            assert engine is per_call_engine
+        
+        mock_engine_class.return_value.__aexit__.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_retriever_top_k_override_does_not_mutate_shared_retriever():
+    """Test that a per-call top_k reaches the provider without changing the retriever."""
+    provider = MagicMock()
+    provider.search = AsyncMock(return_value=[])
+    retriever = BM25Retriever(bm25_provider=provider, top_k=50)
+    
+    await retriever.aget_relevant_documents("minimum wage", top_k=15)
+    
+    provider.search.assert_awaited_once_with("minimum wage", top_k=15)
+    assert retriever.top_k == 50
+
+
+def _milvus_hit(chunk_id: str, distance: float) -> Dict[str, Any]:
+    return {"chunk_id": chunk_id, "parent_doc_id": f"doc_{chunk_id}", "distance": distance, "doc_type": "act"}
+
+
+def _connected_milvus_client() -> MilvusClient:
+    client = MilvusClient()
+    client.connected = True
+    client.base_url = "https://milvus.test/v2/vectordb"
+    return client
+
+
+@pytest.mark.asyncio
+async def test_search_similar_multi_batches_and_dedupes():
+    """Grouped batch responses are split per variant and deduplicated on chunk_id."""
+    client = _connected_milvus_client()
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"data": [
+        [_milvus_hit("a", 0.9), _milvus_hit("b", 0.5)],
+        [_milvus_hit("b", 0.8), _milvus_hit("c", 0.4)],
+    ]}
+    http = MagicMock()
+    http.post = AsyncMock(return_value=response)
+    http.__aenter__ = AsyncMock(return_value=http)
+    http.__aexit__ = AsyncMock(return_value=False)
+
+    with patch("api.http_pool.httpx.AsyncClient", return_value=http):
+        results = await client.search_similar_multi([[0.1], [0.2]], top_k=2)
+
+    assert http.post.await_count == 1
+    assert len(http.post.call_args.kwargs["json"]["data"]) == 2
+    assert [r.chunk_id for r in results[0]] == ["a"]
+    assert [r.chunk_id for r in results[1]] == ["b", "c"]
+    b = results[1][0]
+    assert b.metadata["variant_idx"] == 1 and b.metadata["matched_variants"] == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_search_similar_multi_falls_back_to_concurrent_searches():
+    """Ungrouped batch responses switch to bounded concurrent per-vector searches."""
+    client = _connected_milvus_client()
+    flat = MagicMock(status_code=200)
+    flat.json.return_value = {"data": [_milvus_hit("a", 0.9)]}
+    http = MagicMock()
+    http.post = AsyncMock(return_value=flat)
+    http.__aenter__ = AsyncMock(return_value=http)
+    http.__aexit__ = AsyncMock(return_value=False)
+
+    in_flight = 0
+    peak = 0
+
+    async def fake_search(query_vector, top_k, doc_type_filter=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return [RetrievalResult(
+            chunk=ChunkV3(chunk_id=f"c{query_vector[0]}", doc_id="d", chunk_text=""),
+            confidence=0.5,
+        )]
+
+    with patch("api.http_pool.httpx.AsyncClient", return_value=http), \
+         patch("api.tools.retrieval_engine.MILVUS_SEARCH_CONCURRENCY", 2), \
+         patch.object(client, "search_similar", side_effect=fake_search):
+        results = await client.search_similar_multi([[0], [1], [2], [3]])
+        assert client._batch_search_supported is False
+        await client.search_similar_multi([[0], [1]])
+
+    assert http.post.await_count == 1  # batch mode not retried once unsupported
+    assert [[r.chunk_id for r in hits] for hits in results] == [["c0"], ["c1"], ["c2"], ["c3"]]
+    assert peak == 2
+
+
 @pytest.mark.asyncio
 async def test_retrieval_config_validation():
     """Test RetrievalConfig validation and defaults."""
@@ -6,14 +6,44 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
+from langgraph.graph import END, StateGraph
 
 from api.main import app
-from api.auth import User
+from api.auth import User, get_current_user
+from api.orchestrators.query_orchestrator import QueryOrchestrator, _emit_synthesis_token
+from api.schemas.agent_state import AgentState
+
+
+def _read_events(response):
+    """Parse an SSE response into (event, data) pairs."""
+    events = []
+    event_type = None
+    for line in response.iter_lines():
+        if line.startswith("event:"):
+            event_type = line.split(":", 1)[1].strip()
+        elif line.startswith("data:"):
+            data = json.loads(line.split(":", 1)[1].strip())
+            events.append((event_type, data))
+    return events
+
+
+class FakeStreamingOrchestrator:
+    """Orchestrator stand-in replaying a fixed event sequence."""
+
+    def __init__(self, events=None, error=None):
+        self.events = events or []
+        self.error = error
+
+    async def stream_query(self, state):
+        for event in self.events:
+            yield event
+        if self.error:
+            raise self.error
 
 
 class TestStreamingQuery:
     """Test the SSE streaming query endpoint."""
-    
+
     @pytest.fixture
     def mock_user(self):
         """Mock authenticated user."""
@@ -21,207 +51,178 @@ class TestStreamingQuery:
             uid="test-user-123",
             email="test@example.com"
         )
-    
+
     @pytest.fixture
-    def mock_retrieval_results(self):
-        """Mock retrieval results."""
-        return [
-            MagicMock(
-                chunk_id="chunk-1",
-                doc_id="doc-1",
-                chunk_text="Art unions are legal entities...",
-                score=0.85,
-                source="vector",
-                metadata={"title": "Art Unions Act", "chapter": "25:01"}
-            )
-        ], 0.85
-    
+    def client(self, mock_user):
+        """Test client with authentication overridden."""
+        app.dependency_overrides[get_current_user] = lambda: mock_user
+        yield TestClient(app)
+        app.dependency_overrides.pop(get_current_user, None)
+
     @pytest.fixture
-    def mock_composed_answer(self):
-        """Mock composed answer."""
-        return MagicMock(
-            tldr="Art unions for promoting fine arts are lawful and exempt from lottery laws.",
-            key_points=[
-                "Art unions aimed at fine arts promotion are legal",
-                "They are exempt from lottery laws",
-                "Must comply with specific requirements"
-            ],
-            citations=[
-                {"title": "Art Unions Act", "source_url": "https://example.com/doc1"}
-            ]
-        )
-    
-    @patch('api.routers.query.get_current_user')
-    @patch('api.routers.query.search_legal_documents')
-    @patch('api.routers.query.compose_legal_answer')
-    @patch('api.routers.query.log_query')
-    def test_streaming_query_success(
-        self,
-        mock_log_query,
-        mock_compose_answer,
-        mock_search_docs,
-        mock_get_user,
-        mock_user,
-        mock_retrieval_results,
-        mock_composed_answer
-    ):
+    def final_state(self):
+        """Orchestrator result for a completed query."""
+        state = AgentState(user_id="test-user-123", session_id="s", raw_query="art unions")
+        state.final_answer = "Art unions for promoting fine arts are lawful."
+        state.synthesis = {
+            "tldr": state.final_answer,
+            "key_points": ["Art unions aimed at fine arts promotion are legal"],
+            "citations": [{"title": "Art Unions Act", "source_url": "https://example.com/doc1"}],
+        }
+        state.reranked_results = [MagicMock()]
+        return state
+
+    @patch('api.routers.query.log_query', new_callable=AsyncMock)
+    @patch('api.routers.query.get_orchestrator')
+    def test_streaming_query_success(self, mock_get_orchestrator, mock_log_query, client, final_state):
         """Test successful streaming query with all events."""
-        
-        # Setup mocks
-        mock_get_user.return_value = mock_user
-        mock_search_docs.return_value = mock_retrieval_results
-        mock_compose_answer.return_value = mock_composed_answer
-        mock_log_query.return_value = AsyncMock()
-        
-        client = TestClient(app)
-        
-        # Make streaming request
+        mock_get_orchestrator.return_value = FakeStreamingOrchestrator([
+            {"type": "node", "node": "03_retrieval_parallel", "status": "start", "output": {}},
+            {"type": "node", "node": "04_merge_results", "status": "end", "output": {"combined_results": [1, 2]}},
+            {"type": "node", "node": "08_synthesis", "status": "start", "output": {}},
+            {"type": "token", "node": "08_synthesis", "content": "Art unions "},
+            {"type": "token", "node": "08_synthesis", "content": "are lawful."},
+            {"type": "final", "state": final_state, "from_cache": False},
+        ])
+
         with client.stream(
-            "GET", 
+            "GET",
             "/api/v1/query/stream?query=What are the requirements for art unions?"
         ) as response:
             assert response.status_code == 200
             assert response.headers["content-type"] == "text/event-stream; charset=utf-8"
-            
-            events = []
-            for line in response.iter_lines():
-                if line.startswith("event:"):
-                    event_type = line.split(":", 1)[1].strip()
-                elif line.startswith("data:"):
-                    data = json.loads(line.split(":", 1)[1].strip())
-                    events.append((event_type, data))
-        
+            events = _read_events(response)
+
         # Verify event sequence
         event_types = [event[0] for event in events]
         assert "meta" in event_types
         assert "retrieval" in event_types
-        assert "token" in event_types
         assert "citation" in event_types
-        assert "final" in event_types
-        
+        assert event_types.index("token") < event_types.index("final")
+
+        tokens = [data["token"] for event, data in events if event == "token"]
+        assert tokens == ["Art unions ", "are lawful."]
+
         # Verify final event contains expected data
         final_events = [event[1] for event in events if event[0] == "final"]
         assert len(final_events) == 1
         final_data = final_events[0]
-        
+
         assert "request_id" in final_data
-        assert final_data["tldr"] == mock_composed_answer.tldr
-        assert final_data["key_points"] == mock_composed_answer.key_points
-        assert final_data["confidence"] == 0.85
+        assert final_data["tldr"] == final_state.final_answer
+        assert final_data["key_points"] == final_state.synthesis["key_points"]
+        assert final_data["confidence"] == 0.7
         assert final_data["status"] == "completed"
-    
-    @patch('api.routers.query.get_current_user')
-    @patch('api.routers.query.search_legal_documents')
-    def test_streaming_query_no_results(
-        self,
-        mock_search_docs,
-        mock_get_user,
-        mock_user
-    ):
+        assert final_data["first_token_ms"] is not None
+
+    @patch('api.routers.query.log_query', new_callable=AsyncMock)
+    @patch('api.routers.query.get_orchestrator')
+    def test_streaming_query_no_results(self, mock_get_orchestrator, mock_log_query, client, final_state):
         """Test streaming query when no documents are found."""
-        
-        # Setup mocks
-        mock_get_user.return_value = mock_user
-        mock_search_docs.return_value = ([], 0.0)  # No results
-        
-        client = TestClient(app)
-        
-        # Make streaming request
-        with client.stream(
-            "GET", 
-            "/api/v1/query/stream?query=nonexistent legal topic"
-        ) as response:
+        mock_get_orchestrator.return_value = FakeStreamingOrchestrator([
+            {"type": "node", "node": "04_merge_results", "status": "end", "output": {"combined_results": []}},
+            {"type": "final", "state": final_state, "from_cache": False},
+        ])
+
+        with client.stream("GET", "/api/v1/query/stream?query=nonexistent legal topic") as response:
             assert response.status_code == 200
-            
-            events = []
-            for line in response.iter_lines():
-                if line.startswith("event:"):
-                    event_type = line.split(":", 1)[1].strip()
-                elif line.startswith("data:"):
-                    data = json.loads(line.split(":", 1)[1].strip())
-                    events.append((event_type, data))
-        
-        # Verify warning and final events are present
-        event_types = [event[0] for event in events]
-        assert "warning" in event_types
-        assert "final" in event_types
-        
-        # Verify warning event
-        warning_events = [event[1] for event in events if event[0] == "warning"]
+            events = _read_events(response)
+
+        warning_events = [data for event, data in events if event == "warning"]
         assert len(warning_events) == 1
         assert warning_events[0]["type"] == "no_results"
-        
-        # Verify final event shows no results
-        final_events = [event[1] for event in events if event[0] == "final"]
-        assert len(final_events) == 1
-        assert final_events[0]["confidence"] == 0.1
-        assert "No specific legal information found" in final_events[0]["tldr"]
-    
-    @patch('api.routers.query.get_current_user')
-    @patch('api.routers.query.search_legal_documents')
-    def test_streaming_query_error_handling(
-        self,
-        mock_search_docs,
-        mock_get_user,
-        mock_user
-    ):
+        assert [event for event, _ in events][-1] == "final"
+
+    @patch('api.routers.query.get_orchestrator')
+    def test_streaming_query_error_handling(self, mock_get_orchestrator, client):
         """Test streaming query error handling."""
-        
-        # Setup mocks
-        mock_get_user.return_value = mock_user
-        mock_search_docs.side_effect = Exception("Database connection failed")
-        
-        client = TestClient(app)
-        
-        # Make streaming request
-        with client.stream(
-            "GET", 
-            "/api/v1/query/stream?query=test query"
-        ) as response:
+        mock_get_orchestrator.return_value = FakeStreamingOrchestrator(
+            error=Exception("Database connection failed")
+        )
+
+        with client.stream("GET", "/api/v1/query/stream?query=test query") as response:
             assert response.status_code == 200
-            
-            events = []
-            for line in response.iter_lines():
-                if line.startswith("event:"):
-                    event_type = line.split(":", 1)[1].strip()
-                elif line.startswith("data:"):
-                    data = json.loads(line.split(":", 1)[1].strip())
-                    events.append((event_type, data))
-        
-        # Verify error event is present
-        event_types = [event[0] for event in events]
-        assert "error" in event_types
-        
+            events = _read_events(response)
+
         # Verify error event content
         error_events = [event[1] for event in events if event[0] == "error"]
         assert len(error_events) == 1
         assert error_events[0]["error"] == "Query processing failed"
         assert "request_id" in error_events[0]
-    
+
     def test_streaming_query_authentication_required(self):
         """Test that streaming endpoint requires authentication."""
-        
+
         client = TestClient(app)
-        
+
         # Make request without authentication
         response = client.get("/api/v1/query/stream?query=test")
-        
+
         # Should return 401 Unauthorized
         assert response.status_code == 401
-    
-    @patch('api.routers.query.get_current_user')
-    def test_streaming_query_missing_query_param(self, mock_get_user, mock_user):
+
+    def test_streaming_query_missing_query_param(self, client):
         """Test streaming endpoint with missing query parameter."""
-        
-        mock_get_user.return_value = mock_user
-        client = TestClient(app)
-        
+
         # Make request without query parameter
         response = client.get("/api/v1/query/stream")
-        
+
         # Should return 422 Unprocessable Entity
         assert response.status_code == 422
 
 
+class TestOrchestratorStreamQuery:
+    """Test QueryOrchestrator.stream_query over graph.astream_events."""
+
+    @pytest.fixture
+    def orchestrator(self):
+        """Orchestrator with a two-node graph standing in for the RAG pipeline."""
+        release = asyncio.Event()
+
+        async def retrieval(state: AgentState):
+            return {"combined_results": []}
+
+        async def synthesis(state: AgentState):
+            await _emit_synthesis_token("first ")
+            # Later deltas wait until the consumer has seen the first one
+            await release.wait()
+            await _emit_synthesis_token("second")
+            return {"final_answer": "first second"}
+
+        graph = StateGraph(AgentState)
+        graph.add_node("03_retrieval_parallel", retrieval)
+        graph.add_node("08_synthesis", synthesis)
+        graph.set_entry_point("03_retrieval_parallel")
+        graph.add_edge("03_retrieval_parallel", "08_synthesis")
+        graph.add_edge("08_synthesis", END)
+
+        orch = QueryOrchestrator.__new__(QueryOrchestrator)
+        orch.graph = graph.compile()
+        orch.cache = None
+        orch.memory = None
+        orch._embedding_client = MagicMock()
+        orch.release = release
+        return orch
+
+    @pytest.mark.asyncio
+    async def test_tokens_arrive_before_synthesis_completes(self, orchestrator):
+        """Synthesis deltas are yielded while the node is still running."""
+        state = AgentState(user_id="u", session_id="s", raw_query="What is labour law?")
+        events = []
+
+        async for event in orchestrator.stream_query(state):
+            events.append(event)
+            if event["type"] == "token" and event["content"] == "first ":
+                orchestrator.release.set()
+
+        tokens = [e["content"] for e in events if e["type"] == "token"]
+        nodes = [(e["node"], e["status"]) for e in events if e["type"] == "node"]
+
+        assert tokens == ["first ", "second"]
+        assert ("08_synthesis", "start") in nodes and ("08_synthesis", "end") in nodes
+        assert events[-1]["type"] == "final"
+        assert events[-1]["state"].final_answer == "first second"
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Tests for the WhatsApp webhook job queue (api/whatsapp_queue.py).
+
+Author: RightLine Team
+"""
+
+import asyncio
+import os
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from api.whatsapp_queue import WhatsAppJobQueue
+
+
+def _message(message_id, sender="263771111111", body="What is minimum wage?"):
+    return {"from": sender, "id": message_id, "timestamp": "1", "type": "text", "text": {"body": body}}
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+
+async def _wait_for(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+class TestWhatsAppJobQueue:
+    """Test dedup, per-sender ordering, retries and recovery."""
+
+    @pytest.mark.asyncio
+    async def test_not_started_runs_inline(self):
+        queue = WhatsAppJobQueue()
+        queue.register(lambda message, state: None)
+        assert await queue.submit(_message("wamid.1"), "263771111111") is False
+
+    @pytest.mark.asyncio
+    async def test_duplicate_message_ids_processed_once(self, redis_client):
+        handled = []
+
+        async def handler(message, state):
+            handled.append(message["id"])
+
+        queue = WhatsAppJobQueue(workers=2)
+        queue.register(handler)
+        await queue.startup(redis_client)
+        try:
+            assert await queue.submit(_message("wamid.1"), "263771111111")
+            assert await queue.submit(_message("wamid.1"), "263771111111")
+            await _wait_for(lambda: handled)
+        finally:
+            await queue.shutdown()
+
+        assert handled == ["wamid.1"]
+        metrics = queue.metrics()
+        assert metrics["enqueued"] == 1 and metrics["duplicates"] == 1 and metrics["processed"] == 1
+        assert await redis_client.xlen(queue.stream) == 0
+
+    @pytest.mark.asyncio
+    async def test_messages_from_one_sender_stay_in_order(self, redis_client):
+        """A slow first message does not let the sender's next one overtake it."""
+        handled = []
+
+        async def handler(message, state):
+            if message["id"] == "a1":
+                await asyncio.sleep(0.05)
+            handled.append(message["id"])
+
+        queue = WhatsAppJobQueue(workers=4)
+        queue.register(handler)
+        await queue.startup(redis_client)
+        try:
+            await queue.submit(_message("a1", sender="263770000001"), "263770000001")
+            await queue.submit(_message("a2", sender="263770000001"), "263770000001")
+            await queue.submit(_message("a3", sender="263770000001"), "263770000001")
+            await _wait_for(lambda: len(handled) == 3)
+        finally:
+            await queue.shutdown()
+
+        assert handled == ["a1", "a2", "a3"]
+
+    @pytest.mark.asyncio
+    async def test_failed_job_retried_with_state(self, redis_client):
+        """Retries keep per-job state so the answer is composed only once."""
+        attempts = []
+
+        async def handler(message, state):
+            state.setdefault("composed", 0)
+            if not attempts:
+                state["composed"] += 1
+            attempts.append(state["composed"])
+            if len(attempts) < 3:
+                raise RuntimeError("send failed")
+
+        queue = WhatsAppJobQueue(workers=1, retry_base=0.01)
+        queue.register(handler)
+        await queue.startup(redis_client)
+        try:
+            await queue.submit(_message("wamid.2"), "263771111111")
+            await _wait_for(lambda: queue.metrics()["processed"] == 1)
+        finally:
+            await queue.shutdown()
+
+        assert attempts == [1, 1, 1]
+        assert queue.metrics()["retried"] == 2
+
+    @pytest.mark.asyncio
+    async def test_exhausted_job_goes_to_dead_letter(self, redis_client, monkeypatch):
+        async def handler(message, state):
+            raise RuntimeError("always fails")
+
+        queue = WhatsAppJobQueue(workers=1, max_attempts=2, retry_base=0.01)
+        queue.register(handler)
+        await queue.startup(redis_client)
+        try:
+            await queue.submit(_message("wamid.3"), "263771111111")
+            await _wait_for(lambda: queue.metrics()["dead_lettered"] == 1)
+        finally:
+            await queue.shutdown()
+
+        dead = await redis_client.xrange("whatsapp:dead")
+        assert dead and dead[0][1]["message_id"] == "wamid.3"
+        pending = await redis_client.xpending(queue.stream, queue.group)
+        assert pending["pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_lane_survives_failed_dead_letter(self, redis_client, monkeypatch):
+        """A Redis error while dead-lettering leaves the job pending but keeps the lane serving."""
+        handled = []
+
+        async def handler(message, state):
+            if message["id"] == "wamid.poison":
+                raise RuntimeError("always fails")
+            handled.append(message["id"])
+
+        xadd = redis_client.xadd
+
+        async def flaky_xadd(stream, *args, **kwargs):
+            if stream == "whatsapp:dead":
+                raise ConnectionError("redis went away")
+            return await xadd(stream, *args, **kwargs)
+
+        monkeypatch.setattr(redis_client, "xadd", flaky_xadd)
+        queue = WhatsAppJobQueue(workers=1, max_attempts=1, retry_base=0.01)
+        queue.register(handler)
+        await queue.startup(redis_client)
+        try:
+            await queue.submit(_message("wamid.poison"), "263771111111")
+            await queue.submit(_message("wamid.next"), "263771111111")
+            await _wait_for(lambda: handled)
+        finally:
+            await queue.shutdown()
+
+        assert handled == ["wamid.next"] and not queue._held
+        pending = await redis_client.xpending(queue.stream, queue.group)
+        assert pending["pending"] == 1  # reclaimed after claim_idle
+
+    @pytest.mark.asyncio
+    async def test_malformed_entry_dead_lettered_without_stopping_reader(self, redis_client):
+        handled = []
+
+        async def handler(message, state):
+            handled.append(message["id"])
+
+        queue = WhatsAppJobQueue(workers=1)
+        queue.register(handler)
+        await queue.startup(redis_client)
+        try:
+            await redis_client.xadd(queue.stream, {"message_id": "wamid.bad", "message": "{not json"})
+            await queue.submit(_message("wamid.good"), "263771111111")
+            await _wait_for(lambda: handled)
+        finally:
+            await queue.shutdown()
+
+        assert handled == ["wamid.good"]
+        dead = await redis_client.xrange("whatsapp:dead")
+        assert dead[0][1]["message_id"] == "wamid.bad" and dead[0][1]["error"].startswith("malformed")
+        pending = await redis_client.xpending(queue.stream, queue.group)
+        assert pending["pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_unfinished_jobs_recovered_after_restart(self, redis_client):
+        """Jobs read but not acknowledged are re-read by the same consumer."""
+        release = asyncio.Event()
+        handled = []
+
+        async def blocked(message, state):
+            await release.wait()
+
+        first = WhatsAppJobQueue(workers=1)
+        first.register(blocked)
+        await first.startup(redis_client)
+        await first.submit(_message("wamid.4"), "263771111111")
+        await _wait_for(lambda: first.metrics()["depth"] == 0 and first._lanes[0]._unfinished_tasks == 1)
+        await first.shutdown(timeout=0.01)
+
+        async def handler(message, state):
+            handled.append(message["id"])
+
+        second = WhatsAppJobQueue(workers=1)
+        second.register(handler)
+        await second.startup(redis_client)
+        try:
+            await _wait_for(lambda: handled)
+        finally:
+            await second.shutdown()
+
+        assert handled == ["wamid.4"]
+
+    @pytest.mark.asyncio
+    async def test_consumer_name_is_per_process(self, redis_client):
+        queue = WhatsAppJobQueue(consumer="")
+        queue.register(lambda message, state: None)
+        await queue.startup(redis_client)
+        await queue.shutdown()
+        assert queue.consumer.endswith(f"-{os.getpid()}")
+
+    @pytest.mark.asyncio
+    async def test_abandoned_jobs_claimed_by_another_consumer(self, redis_client):
+        """Jobs left pending by a consumer that went away are taken over once idle."""
+        release = asyncio.Event()
+        handled = []
+
+        async def blocked(message, state):
+            await release.wait()
+
+        gone = WhatsAppJobQueue(consumer="old-container-1", workers=1)
+        gone.register(blocked)
+        await gone.startup(redis_client)
+        await gone.submit(_message("wamid.5"), "263771111111")
+        await _wait_for(lambda: gone._lanes[0]._unfinished_tasks == 1 and gone.metrics()["depth"] == 0)
+        await gone.shutdown(timeout=0.01)
+
+        async def handler(message, state):
+            handled.append(message["id"])
+
+        survivor = WhatsAppJobQueue(consumer="new-container-1", workers=1, claim_idle=0.05)
+        survivor.register(handler)
+        await survivor.startup(redis_client)
+        try:
+            await _wait_for(lambda: handled)
+        finally:
+            await survivor.shutdown()
+
+        assert handled == ["wamid.5"]
+        assert survivor.metrics()["reclaimed"] == 1
+        assert (await redis_client.xpending(survivor.stream, survivor.group))["pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_live_consumer_keeps_its_slow_jobs(self, redis_client):
+        """A job still being processed is not claimed by another consumer."""
+        release = asyncio.Event()
+        handled = []
+
+        async def slow(message, state):
+            await release.wait()
+            handled.append(("slow", message["id"]))
+
+        async def other_handler(message, state):
+            handled.append(("other", message["id"]))
+
+        busy = WhatsAppJobQueue(consumer="busy", workers=1, claim_idle=0.2)
+        busy.register(slow)
+        # The other consumer would claim after 0.1s idle; busy refreshes every 0.05s
+        other = WhatsAppJobQueue(consumer="other", workers=1, claim_idle=0.1)
+        other.register(other_handler)
+        await busy.startup(redis_client)
+        try:
+            await busy.submit(_message("wamid.6"), "263771111111")
+            await _wait_for(lambda: busy._held)
+            await other.startup(redis_client)
+            await asyncio.sleep(0.6)  # several idle windows
+            release.set()
+            await _wait_for(lambda: handled)
+        finally:
+            await other.shutdown()
+            await busy.shutdown()
+
+        assert handled == [("slow", "wamid.6")]
+        assert other.metrics()["reclaimed"] == 0
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for the write-behind side-effect queue (api/write_behind.py).
+
+Author: RightLine Team
+"""
+
+import asyncio
+
+import pytest
+
+from api.write_behind import SideEffectConfig, WriteBehindQueue
+
+
+def _queue(handler, **config):
+    queue = WriteBehindQueue({"cache_response": SideEffectConfig(name="cache_response", **config)})
+    queue.register("cache_response", handler)
+    return queue
+
+
+class TestWriteBehindQueue:
+    """Test batching, bounding and draining."""
+
+    @pytest.mark.asyncio
+    async def test_not_started_runs_inline(self):
+        """Without a running queue, callers are told to apply the side effect themselves."""
+        queue = _queue(lambda batch: None)
+        assert queue.submit("cache_response", 1) is False
+        assert queue.submit("unknown", 1) is False
+
+    @pytest.mark.asyncio
+    async def test_batches_concurrent_items(self):
+        """Items submitted together are flushed as one batch."""
+        batches = []
+
+        async def handler(batch):
+            batches.append(batch)
+
+        queue = _queue(handler, batch_size=10, flush_interval=0.02)
+        await queue.startup()
+        try:
+            assert all(queue.submit("cache_response", i) for i in range(5))
+            await asyncio.sleep(0.05)
+        finally:
+            await queue.shutdown()
+
+        assert batches == [[0, 1, 2, 3, 4]]
+        metrics = queue.metrics()["cache_response"]
+        assert metrics["processed"] == 5 and metrics["batches"] == 1 and metrics["depth"] == 0
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_and_counts(self):
+        """A full queue drops new items instead of growing."""
+        release = asyncio.Event()
+
+        async def handler(batch):
+            await release.wait()
+
+        queue = _queue(handler, max_queue=2, batch_size=1, flush_interval=0)
+        await queue.startup()
+        try:
+            queue.submit("cache_response", "in-flight")
+            await asyncio.sleep(0)  # worker takes the first item
+            for item in ("a", "b", "c"):
+                queue.submit("cache_response", item)
+            metrics = queue.metrics()["cache_response"]
+            assert metrics["depth"] == 2 and metrics["dropped"] == 1
+        finally:
+            release.set()
+            await queue.shutdown()
+
+        assert queue.metrics()["cache_response"]["processed"] == 3
+
+    @pytest.mark.asyncio
+    async def test_shutdown_drains_pending_items(self):
+        """Queued side effects are written before shutdown returns."""
+        written = []
+
+        async def handler(batch):
+            await asyncio.sleep(0.01)
+            written.extend(batch)
+
+        queue = _queue(handler, batch_size=2, flush_interval=0.5)
+        await queue.startup()
+        for i in range(5):
+            queue.submit("cache_response", i)
+        await queue.shutdown()
+
+        assert sorted(written) == [0, 1, 2, 3, 4]
+        assert not queue.is_started
+
+    @pytest.mark.asyncio
+    async def test_handler_failure_is_counted(self):
+        async def handler(batch):
+            raise ConnectionError("redis down")
+
+        queue = _queue(handler, flush_interval=0)
+        await queue.startup()
+        queue.submit("cache_response", 1)
+        await queue.shutdown()
+
+        metrics = queue.metrics()["cache_response"]
+        assert metrics["failed"] == 1 and metrics["processed"] == 0
+
+
+@pytest.mark.asyncio
+async def test_semantic_cache_batch_uses_one_pipeline():
+    """A batch of cached responses is written with one pipeline and precomputed embeddings."""
+    from fakeredis import aioredis as fakeredis
+    from libs.caching.semantic_cache import SemanticCache
+
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    cache = SemanticCache(redis_url="redis://localhost:6379/9")
+    cache._redis_client = redis
+    pipelines = []
+    original = redis.pipeline
+
+    def pipeline(*args, **kwargs):
+        pipelines.append(kwargs)
+        return original(*args, **kwargs)
+
+    redis.pipeline = pipeline
+
+    await cache.cache_responses([
+        {"query": "What is labour law?", "response": {"answer": "A"}, "embedding": [1.0, 0.0, 0.0]},
+        {"query": "What is a contract?", "response": {"answer": "B"}, "user_type": "citizen", "embedding": [0.0, 1.0, 0.0]},
+    ])
+
+    assert len(pipelines) == 1
+    assert (await cache.get_cached_response("What is labour law?", "professional"))["answer"] == "A"
+    assert await redis.smembers("semantic_index:citizen")
+    assert len(cache._semantic_indexes["professional"].keys()) == 1
+    await redis.flushall()
@@ -49,3 +49,14 @@ def setup_test_env(monkeypatch):
     # Use fake Redis for tests
     if not os.getenv("REDIS_URL"):
         monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/9")
+
+
+@pytest.fixture(autouse=True)
+def isolated_content_cache(monkeypatch):
+    """Keep the process-wide R2 content cache from leaking objects between tests."""
+    from libs.caching.content_cache import r2_content_cache
+    
+    r2_content_cache.clear()
+    monkeypatch.setattr(r2_content_cache, "disk", None)
+    yield r2_content_cache
+    r2_content_cache.clear()
@@ -376,7 +376,7 @@ class TestMemoryIntegration:
         # Mock memory coordinator
         with patch.object(orchestrator, 'memory', create=True) as mock_memory:
             if mock_memory:
-                mock_memory.get_full_context = AsyncMock(return_value={
+                mock_memory.get_snapshot = AsyncMock(return_value={
                     'user_profile': {
                         'is_returning_user': True,
                         'typical_complexity': 'expert',
@@ -384,7 +384,8 @@ class TestMemoryIntegration:
                         'top_legal_interests': ['labour_law', 'constitutional_law'],
                         'query_count': 50
                     },
-                    'recent_context': []
+                    'conversation_history': [],
+                    'tokens_used': {'short_term': 0, 'long_term': 30, 'total': 30}
                 })
                 
                 state = AgentState(
@@ -172,7 +172,7 @@ class TestCacheMemoryFailures:
         """Memory fetch failure should not break classification."""
         # Mock memory failure
         if orchestrator.memory:
-            with patch.object(orchestrator.memory, 'get_full_context', side_effect=Exception("Firestore error")):
+            with patch.object(orchestrator.memory, 'get_snapshot', side_effect=Exception("Firestore error")):
                 state = AgentState(
                     raw_query="Test",
                     user_id="test_user",
@@ -0,0 +1,119 @@
+"""
+Tests for the two-tier R2 content cache.
+
+Tests verify:
+- Memory LRU hits skip loading and parsing
+- Byte-bounded eviction
+- Disk tier survives a new process-level cache and is keyed by ETag
+- Conditional revalidation (NOT_MODIFIED) of stale disk entries
+- Negative caching of missing keys
+- Transient loader errors are not cached
+
+Follows .cursorrules: TDD, comprehensive edge case coverage.
+"""
+
+import json
+
+import pytest
+
+from libs.caching.content_cache import NOT_MODIFIED, TieredContentCache
+
+
+class FakeLoader:
+    """Loader over an in-memory object store that records conditional GETs."""
+
+    def __init__(self, objects):
+        self.objects = objects  # key -> (body, etag)
+        self.calls = []
+
+    def for_key(self, key):
+        async def load(if_none_match):
+            self.calls.append((key, if_none_match))
+            if key not in self.objects:
+                return None
+            body, etag = self.objects[key]
+            if if_none_match == etag:
+                return NOT_MODIFIED
+            return body, etag
+        return load
+
+
+def parse(body):
+    return json.loads(body)
+
+
+@pytest.mark.asyncio
+async def test_memory_hit_skips_loader():
+    """Second lookup is served from the in-process LRU."""
+    cache = TieredContentCache(disk_dir=None)
+    loader = FakeLoader({"k": (b'{"a": 1}', '"e1"')})
+
+    first = await cache.get_or_load("k", loader.for_key("k"), parse)
+    second = await cache.get_or_load("k", loader.for_key("k"), parse)
+
+    assert first == second == {"a": 1}
+    assert len(loader.calls) == 1
+    stats = cache.get_stats()
+    assert stats.memory_hits == 1 and stats.misses == 1 and stats.bytes_fetched == 8
+
+
+@pytest.mark.asyncio
+async def test_lru_is_byte_bounded():
+    """Least recently used entries are evicted once over budget."""
+    cache = TieredContentCache(max_memory_bytes=20, disk_dir=None)
+    loader = FakeLoader({k: (b'{"v": "xxxx"}', '"e"') for k in ("a", "b", "c")})
+
+    for key in ("a", "b"):
+        await cache.get_or_load(key, loader.for_key(key), parse)
+    assert cache.peek("a") is None and cache.peek("b") is not None
+    assert cache.get_stats().evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_and_revalidation(tmp_path):
+    """Disk entries are shared across caches and revalidated by ETag when stale."""
+    loader = FakeLoader({"k": (b'{"a": 1}', '"e1"')})
+    await TieredContentCache(disk_dir=tmp_path).get_or_load("k", loader.for_key("k"), parse)
+
+    fresh = TieredContentCache(disk_dir=tmp_path)
+    assert await fresh.get_or_load("k", loader.for_key("k"), parse) == {"a": 1}
+    assert len(loader.calls) == 1
+    assert fresh.get_stats().disk_hits == 1
+
+    stale = TieredContentCache(disk_dir=tmp_path, revalidate_seconds=0)
+    assert await stale.get_or_load("k", loader.for_key("k"), parse) == {"a": 1}
+    assert loader.calls[-1] == ("k", '"e1"')
+    assert stale.get_stats().revalidated == 1
+
+    loader.objects["k"] = (b'{"a": 2}', '"e2"')
+    changed = TieredContentCache(disk_dir=tmp_path, revalidate_seconds=0)
+    assert await changed.get_or_load("k", loader.for_key("k"), parse) == {"a": 2}
+
+
+@pytest.mark.asyncio
+async def test_missing_keys_are_negatively_cached():
+    """A missing key is not re-fetched until the negative TTL expires."""
+    cache = TieredContentCache(disk_dir=None, negative_ttl=60)
+    loader = FakeLoader({})
+
+    assert await cache.get_or_load("gone", loader.for_key("gone"), parse) is None
+    assert await cache.get_or_load("gone", loader.for_key("gone"), parse) is None
+    assert len(loader.calls) == 1
+    assert cache.get_stats().negative_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_loader_errors_are_not_cached():
+    """Transient failures propagate and the next lookup retries."""
+    cache = TieredContentCache(disk_dir=None)
+    attempts = []
+
+    async def flaky(if_none_match):
+        attempts.append(if_none_match)
+        if len(attempts) == 1:
+            raise ConnectionError("R2 unavailable")
+        return b'{"ok": true}', '"e"'
+
+    with pytest.raises(ConnectionError):
+        await cache.get_or_load("k", flaky, parse)
+    assert await cache.get_or_load("k", flaky, parse) == {"ok": True}
@@ -0,0 +1,156 @@
+"""
+Tests for the request-scoped embedding service.
+
+Tests verify:
+- Each text is embedded at most once per request
+- Expected texts are batched into the next upstream call
+- Binary Redis embedding cache is read before calling upstream
+- Concurrent callers share in-flight work
+- Semantic cache lookup and write reuse the request's embedding
+- The local store is read first and only written back when enabled
+
+Follows .cursorrules: TDD, comprehensive edge case coverage.
+"""
+
+import asyncio
+
+import pytest
+
+from libs.caching.embedding_service import (
+    RequestEmbeddingService,
+    current_embedding_service,
+    embedding_scope,
+)
+
+
+class CountingClient:
+    """Embedding client stand-in recording every batch it receives."""
+
+    def __init__(self, delay: float = 0.0):
+        self.calls = []
+        self.delay = delay
+
+    async def get_embeddings(self, texts):
+        self.calls.append(list(texts))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+
+
+@pytest.fixture
+async def redis_client():
+    from fakeredis import aioredis as fakeredis
+    client = fakeredis.FakeRedis(decode_responses=True)
+    yield client
+    await client.flushall()
+
+
+@pytest.mark.asyncio
+async def test_memoizes_and_batches_expected_texts():
+    """Expected texts ride along with the first upstream call."""
+    client = CountingClient()
+    service = RequestEmbeddingService(client)
+    service.expect(["labour act", "labour act section 12"])
+
+    first = await service.get_embeddings(["What is the Labour Act?"])
+    variants = await service.get_embeddings(["labour act", "labour act section 12"])
+    again = await service.get_embeddings(["What is the Labour Act?"])
+
+    assert client.calls == [["What is the Labour Act?", "labour act", "labour act section 12"]]
+    assert first == again and len(variants) == 2
+    assert service.stats["api_calls"] == 1 and service.stats["memo_hits"] == 3
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_is_shared_across_requests(redis_client):
+    """A second request is served from the binary Redis embedding cache."""
+    client = CountingClient()
+    await RequestEmbeddingService(client, redis_client).get_embeddings(["q1", "q2"])
+
+    second = RequestEmbeddingService(client, redis_client)
+    embeddings = await second.get_embeddings(["q2", "q3"])
+
+    assert client.calls == [["q1", "q2"], ["q3"]]
+    assert embeddings[0] == [2.0, 1.0, 0.5]
+    assert second.stats["redis_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_inflight_request():
+    """Retrieval branches asking for the same text wait on one upstream call."""
+    client = CountingClient(delay=0.01)
+    service = RequestEmbeddingService(client)
+
+    results = await asyncio.gather(*(service.get_embeddings(["same"]) for _ in range(5)))
+
+    assert len(client.calls) == 1
+    assert all(r == results[0] for r in results)
+
+
+@pytest.mark.asyncio
+async def test_upstream_failure_is_not_memoized():
+    """A failed batch returns None and the next call retries."""
+
+    class FlakyClient(CountingClient):
+        async def get_embeddings(self, texts):
+            self.calls.append(list(texts))
+            return None if len(self.calls) == 1 else [[1.0] for _ in texts]
+
+    client = FlakyClient()
+    service = RequestEmbeddingService(client)
+
+    assert await service.get_embeddings(["q"]) is None
+    assert await service.get_embeddings(["q"]) == [[1.0]]
+    assert len(client.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_semantic_cache_reuses_request_embedding(redis_client):
+    """Cache lookup and cache write embed the query once within a request."""
+    from libs.caching.semantic_cache import SemanticCache
+
+    cache = SemanticCache(redis_url="redis://localhost:6379/9")
+    cache._redis_client = redis_client
+    client = CountingClient()
+
+    with embedding_scope(client, redis_client) as service:
+        assert current_embedding_service() is service
+        assert await cache.get_cached_response("What is labour law?", "professional") is None
+        await cache.cache_response("What is labour law?", {"answer": "A"}, "professional")
+
+    assert current_embedding_service() is None
+    assert client.calls == [["What is labour law?"]]
+
+
+@pytest.mark.asyncio
+async def test_local_store_checked_before_upstream(tmp_path):
+    """With write-back enabled, vectors fetched upstream are persisted and reused by later requests."""
+    from libs.caching.embedding_store import EmbeddingStore
+
+    store = EmbeddingStore(tmp_path)
+    client = CountingClient()
+    await RequestEmbeddingService(client, store=store, model="m", write_store=True).get_embeddings(["q1"])
+
+    second = RequestEmbeddingService(client, store=EmbeddingStore(tmp_path), model="m")
+    embeddings = await second.get_embeddings(["q1", "q2"])
+
+    assert client.calls == [["q1"], ["q2"]]
+    assert embeddings[0] == [2.0, 1.0, 0.5]
+    assert second.stats["store_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_query_vectors_not_written_to_store_by_default(tmp_path):
+    """The store never evicts, so unbounded query text stays out of it unless opted in."""
+    from libs.caching.embedding_store import EmbeddingStore
+
+    store = EmbeddingStore(tmp_path)
+    store.put("m", "ingested chunk", [1.0, 0.0, 0.0])
+    client = CountingClient()
+
+    with embedding_scope(client, store=store, model="m") as service:
+        embeddings = await service.get_embeddings(["ingested chunk", "user query"])
+
+    assert embeddings[0] == [1.0, 0.0, 0.0]
+    assert client.calls == [["user query"]]
+    assert len(EmbeddingStore(tmp_path)) == 1
@@ -0,0 +1,100 @@
+"""
+Tests for the content-hash embedding store.
+
+Tests verify:
+- Vectors round-trip as float16 and come back as float32
+- Keys depend on model and whitespace-normalized text
+- A reopened store (new process) sees earlier writes
+- Rows written by another handle become visible without reopening
+- The vector file grows past its initial capacity
+- A digest left half-written by a crashed writer is dropped before the next append
+
+Follows .cursorrules: TDD, comprehensive edge case coverage.
+"""
+
+import numpy as np
+import pytest
+
+from libs.caching import embedding_store
+from libs.caching.embedding_store import EmbeddingStore, embedding_key, get_embedding_store
+
+
+def _vec(seed, dim=8):
+    return np.random.default_rng(seed).standard_normal(dim).tolist()
+
+
+def test_roundtrip_as_float16(tmp_path):
+    store = EmbeddingStore(tmp_path)
+    assert store.put_many("m", ["a", "b"], [_vec(1), _vec(2)]) == 2
+
+    a, missing, b = store.get_many("m", ["a", "c", "b"])
+
+    assert missing is None
+    assert a.dtype == np.float32
+    np.testing.assert_allclose(a, _vec(1), rtol=1e-3, atol=1e-3)
+    np.testing.assert_array_equal(b, np.float16(_vec(2)).astype(np.float32))
+    assert store.get_stats().as_dict()["hits"] == 2
+
+
+def test_key_normalizes_whitespace_and_includes_model(tmp_path):
+    assert embedding_key("m", "Labour  Act\n s 12 ") == embedding_key("m", "Labour Act s 12")
+    assert embedding_key("m", "x") != embedding_key("other-model", "x")
+
+    store = EmbeddingStore(tmp_path)
+    store.put("m", "Labour Act\ts 12", _vec(3))
+    assert store.get("m", "  Labour Act s 12") is not None
+    assert store.get("other-model", "Labour Act s 12") is None
+    assert store.put("m", "Labour Act s 12", _vec(4)) == 0  # already stored
+
+
+def test_reopen_and_cross_handle_visibility(tmp_path):
+    writer = EmbeddingStore(tmp_path)
+    reader = EmbeddingStore(tmp_path)
+    writer.put_many("m", ["a"], [_vec(1)])
+
+    assert reader.get("m", "a") is not None  # picked up without reopening
+    reader.put_many("m", ["b"], [_vec(2)])
+
+    reopened = EmbeddingStore(tmp_path)
+    assert len(reopened) == 2 and reopened.dim == 8
+    np.testing.assert_array_equal(reopened.get("m", "b"), writer.get("m", "b"))
+
+
+def test_grows_past_initial_capacity(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_store, "_INITIAL_ROWS", 4)
+    store = EmbeddingStore(tmp_path)
+    texts = [f"chunk {i}" for i in range(11)]
+    for start in range(0, len(texts), 3):
+        batch = range(start, min(start + 3, len(texts)))
+        store.put_many("m", [texts[i] for i in batch], [_vec(i) for i in batch])
+
+    assert store.get_stats().capacity == 16
+    vectors = EmbeddingStore(tmp_path).get_many("m", texts)
+    for i, vector in enumerate(vectors):
+        np.testing.assert_allclose(vector, _vec(i), rtol=1e-3, atol=1e-3)
+
+
+def test_partial_key_from_crashed_writer_is_truncated(tmp_path):
+    store = EmbeddingStore(tmp_path)
+    store.put("m", "a", _vec(1))
+    with open(tmp_path / "keys.bin", "ab") as f:
+        f.write(embedding_key("m", "lost")[:13])  # writer died mid-append
+
+    assert store.put_many("m", ["b", "c"], [_vec(2), _vec(3)]) == 2
+
+    assert (tmp_path / "keys.bin").stat().st_size == 3 * 32
+    reopened = EmbeddingStore(tmp_path)
+    for text, seed in (("a", 1), ("b", 2), ("c", 3)):
+        np.testing.assert_allclose(reopened.get("m", text), _vec(seed), rtol=1e-3, atol=1e-3)
+
+
+def test_dimension_mismatch_rejected(tmp_path):
+    store = EmbeddingStore(tmp_path)
+    store.put("m", "a", _vec(1, dim=8))
+    with pytest.raises(ValueError):
+        store.put("m", "b", _vec(2, dim=4))
+
+
+def test_process_store_disabled_without_directory(tmp_path):
+    assert get_embedding_store("") is None
+    assert get_embedding_store(str(tmp_path)) is get_embedding_store(str(tmp_path))
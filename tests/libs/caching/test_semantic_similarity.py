@@ -12,6 +12,8 @@ Tests verify:
 Follows .cursorrules: TDD, comprehensive coverage, async testing.
 """
 
+import asyncio
+
 import pytest
 import numpy as np
 
@@ -335,3 +337,142 @@ async def test_semantic_cache_performance():
     assert search_time_ms < 100, f"Semantic search too slow: {search_time_ms:.2f}ms"
     
     await cache.disconnect()
+
+
+def test_semantic_index_search_and_removal():
+    """Index scores all rows in one product and stays consistent after removals."""
+    from libs.caching.semantic_cache import SemanticIndex
+    
+    index = SemanticIndex(initial_capacity=2)
+    index.add("a", [1.0, 0.0, 0.0], expires_at=float("inf"))
+    index.add("b", [0.0, 2.0, 0.0], expires_at=float("inf"))
+    index.add("c", [1.0, 1.0, 0.0], expires_at=float("inf"))  # Forces growth
+    
+    assert [key for key, _ in index.search([0.0, 1.0, 0.0], top_k=2)] == ["b", "c"]
+    assert not index.add("d", [1.0, 0.0], expires_at=float("inf")), "Dimension mismatch is rejected"
+    
+    index.remove("a")
+    key, similarity = index.search([1.0, 0.0, 0.0])[0]
+    assert key == "c" and abs(similarity - 2 ** -0.5) < 1e-6
+    assert len(index) == 2 and "a" not in index
+
+
+def test_semantic_index_prunes_expired_rows():
+    """Rows past their Redis expiry are dropped before scoring."""
+    from libs.caching.semantic_cache import SemanticIndex
+    
+    index = SemanticIndex()
+    index.add("old", [1.0, 0.0], expires_at=100.0)
+    index.add("new", [1.0, 0.1], expires_at=300.0)
+    
+    assert index.prune_expired(now=200.0) == ["old"]
+    assert [key for key, _ in index.search([1.0, 0.0], top_k=5)] == ["new"]
+
+
+@pytest.mark.asyncio
+async def test_embeddings_stored_as_binary(cache_with_embeddings):
+    """Embeddings are persisted as float32 bytes with their expiry, not JSON."""
+    from libs.caching.semantic_cache import decode_embedding
+    
+    await cache_with_embeddings.cache_response("What is labour law?", {"answer": "A"}, "professional")
+    
+    key = cache_with_embeddings._get_exact_cache_key("What is labour law?", "professional")
+    meta = await cache_with_embeddings._redis_client.hgetall(f"{key}:meta")
+    
+    assert "embedding" not in meta
+    assert decode_embedding(meta["embedding_f32"]).shape == (3072,)
+    assert float(meta["expires_at"]) > 0
+
+
+@pytest.mark.asyncio
+async def test_index_resyncs_from_redis_and_prunes_expired_members(cache_with_embeddings):
+    """A fresh worker loads the index from Redis; expired members leave the set."""
+    from libs.caching.semantic_cache import SemanticCache
+    
+    cache = cache_with_embeddings
+    await cache.cache_response("What is labour law?", {"answer": "A"}, "professional")
+    await cache.cache_response("What is company law?", {"answer": "B"}, "professional")
+    
+    # Simulate Redis expiring the company law entry
+    company_key = cache._get_exact_cache_key("What is company law?", "professional")
+    await cache._redis_client.delete(company_key, f"{company_key}:meta")
+    
+    worker = SemanticCache(redis_url=cache.redis_url, similarity_threshold=0.95)
+    worker._redis_client = cache._redis_client
+    worker._embedding_client = cache._embedding_client
+    
+    cached = await worker.get_cached_response("What is employment law?", "professional")
+    
+    assert cached is not None and cached["answer"] == "A"
+    assert await cache._redis_client.smembers("semantic_index:professional") == {
+        cache._get_exact_cache_key("What is labour law?", "professional")
+    }
+    assert worker.get_stats().semantic_pruned == 1
+
+
+class _RecordingRedis:
+    """Redis proxy recording index set reads and the metadata keys fetched."""
+
+    def __init__(self, client):
+        self._client = client
+        self.smembers_calls = 0
+        self.fetched = []
+
+    async def smembers(self, key):
+        self.smembers_calls += 1
+        await asyncio.sleep(0.01)  # keep the sync in flight while other callers arrive
+        return await self._client.smembers(key)
+
+    def pipeline(self):
+        pipe = self._client.pipeline()
+        hmget = pipe.hmget
+
+        def recording_hmget(key, *fields):
+            self.fetched.append(key)
+            return hmget(key, *fields)
+
+        pipe.hmget = recording_hmget
+        return pipe
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_index_sync(cache_with_embeddings):
+    from libs.caching.semantic_cache import SemanticCache
+
+    cache = cache_with_embeddings
+    await cache.cache_response("What is labour law?", {"answer": "A"}, "professional")
+
+    worker = SemanticCache(redis_url=cache.redis_url, similarity_threshold=0.95)
+    worker._redis_client = redis = _RecordingRedis(cache._redis_client)
+
+    indexes = await asyncio.gather(*(worker._get_semantic_index("professional") for _ in range(5)))
+
+    assert redis.smembers_calls == 1
+    assert all(index is indexes[0] and len(index) == 1 for index in indexes)
+
+
+@pytest.mark.asyncio
+async def test_resync_runs_in_background_and_fetches_only_new_members(cache_with_embeddings):
+    """Once loaded, a stale index is served as-is while one task fetches what other workers added."""
+    from libs.caching.semantic_cache import SemanticCache
+
+    cache = cache_with_embeddings
+    await cache.cache_response("What is labour law?", {"answer": "A"}, "professional")
+
+    worker = SemanticCache(redis_url=cache.redis_url, similarity_threshold=0.95)
+    worker._redis_client = redis = _RecordingRedis(cache._redis_client)
+    index = await worker._get_semantic_index("professional")
+
+    await cache.cache_response("What is company law?", {"answer": "B"}, "professional")
+    index.synced_at = 1.0  # past SEMANTIC_INDEX_SYNC_SECONDS
+    redis.fetched.clear()
+
+    assert len(await worker._get_semantic_index("professional")) == 1  # not blocked on the resync
+    await worker._index_syncs["professional"]
+
+    company_key = cache._get_exact_cache_key("What is company law?", "professional")
+    assert redis.fetched == [f"{company_key}:meta"]
+    assert len(index) == 2 and company_key in index
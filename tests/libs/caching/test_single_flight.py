@@ -0,0 +1,153 @@
+"""
+Tests for single-flight coalescing of identical queries.
+
+Tests verify:
+- Concurrent identical requests in one worker run the work once
+- A failed or cancelled leader lets followers run independently
+- A hung leader releases same-worker followers after the wait timeout
+- Followers in another worker receive the leader's result via Redis
+- Redis errors degrade to independent runs
+
+Follows .cursorrules: TDD, comprehensive edge case coverage.
+"""
+
+import asyncio
+
+import pytest
+
+from libs.caching.single_flight import SingleFlight
+
+
+@pytest.fixture
+async def redis_client():
+    from fakeredis import aioredis as fakeredis
+    client = fakeredis.FakeRedis(decode_responses=True)
+    yield client
+    await client.flushall()
+
+
+async def _coalesced(single_flight, key, runs, delay=0.02, fail=False):
+    async with single_flight.flight(key) as flight:
+        if flight.shared_result is not None:
+            return flight.shared_result
+        runs.append(key)
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError("pipeline failed")
+        result = {"final_answer": f"answer {len(runs)}"}
+        flight.set_result(result)
+        return result
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_run_once():
+    """N concurrent identical requests cost one run; all get the same answer."""
+    single_flight = SingleFlight()
+    runs = []
+
+    results = await asyncio.gather(*(_coalesced(single_flight, "cache:exact:professional:abc", runs) for _ in range(10)))
+
+    assert runs == ["cache:exact:professional:abc"]
+    assert all(r == {"final_answer": "answer 1"} for r in results)
+    assert single_flight.stats["leaders"] == 1 and single_flight.stats["local_followers"] == 9
+
+    # Once the flight lands, the next request starts a new one
+    await _coalesced(single_flight, "cache:exact:professional:abc", runs)
+    assert len(runs) == 2
+
+
+@pytest.mark.asyncio
+async def test_leader_failure_releases_followers():
+    """Followers of a failed leader run the work themselves instead of failing."""
+    single_flight = SingleFlight()
+    runs = []
+
+    leader = asyncio.create_task(_coalesced(single_flight, "k", runs, fail=True))
+    await asyncio.sleep(0)
+    followers = [asyncio.create_task(_coalesced(single_flight, "k", runs)) for _ in range(2)]
+
+    with pytest.raises(RuntimeError):
+        await leader
+    results = await asyncio.gather(*followers)
+
+    assert len(runs) == 3
+    assert all(r["final_answer"] for r in results)
+    assert single_flight.stats["fallbacks"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_follower_does_not_cancel_leader():
+    single_flight = SingleFlight()
+    runs = []
+
+    leader = asyncio.create_task(_coalesced(single_flight, "k", runs))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(_coalesced(single_flight, "k", runs))
+    await asyncio.sleep(0)
+    follower.cancel()
+
+    assert (await leader)["final_answer"] == "answer 1"
+
+
+@pytest.mark.asyncio
+async def test_hung_leader_releases_local_followers_after_wait_timeout():
+    single_flight = SingleFlight(wait_timeout=0.05)
+    runs = []
+
+    leader = asyncio.create_task(_coalesced(single_flight, "k", runs, delay=5))
+    await asyncio.sleep(0)
+    result = await asyncio.wait_for(_coalesced(single_flight, "k", runs), 1)
+
+    assert result["final_answer"] == "answer 2" and len(runs) == 2
+    assert single_flight.stats["fallbacks"] == 1
+    assert not leader.done()  # the follower's timeout does not cancel the leader
+    leader.cancel()
+
+
+@pytest.mark.asyncio
+async def test_followers_in_other_workers_receive_result(redis_client):
+    """A second worker waits on the Redis lock holder and receives its published result."""
+    worker_a = SingleFlight(redis_client)
+    worker_b = SingleFlight(redis_client, wait_timeout=2)
+    runs = []
+
+    leader = asyncio.create_task(_coalesced(worker_a, "k", runs, delay=0.1))
+    await asyncio.sleep(0.02)
+    follower = await _coalesced(worker_b, "k", runs)
+
+    assert await leader == follower == {"final_answer": "answer 1"}
+    assert runs == ["k"]
+    assert worker_b.stats["remote_followers"] == 1
+    assert await redis_client.get("k:flight:lock") is None
+
+    # Late arrivals within the result TTL read the stored result
+    late = SingleFlight(redis_client)
+    await redis_client.set("k:flight:lock", "other-worker")
+    assert (await _coalesced(late, "k", runs))["final_answer"] == "answer 1"
+
+
+@pytest.mark.asyncio
+async def test_remote_leader_failure_signals_followers(redis_client):
+    worker_a = SingleFlight(redis_client)
+    worker_b = SingleFlight(redis_client, wait_timeout=5)
+    runs = []
+
+    leader = asyncio.create_task(_coalesced(worker_a, "k", runs, delay=0.05, fail=True))
+    await asyncio.sleep(0.01)
+    result = await asyncio.wait_for(_coalesced(worker_b, "k", runs), timeout=2)
+
+    with pytest.raises(RuntimeError):
+        await leader
+    assert result["final_answer"] and len(runs) == 2
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_degrade_to_independent_runs():
+    class BrokenRedis:
+        def pubsub(self):
+            raise ConnectionError("redis down")
+
+    single_flight = SingleFlight(BrokenRedis())
+    runs = []
+
+    assert (await _coalesced(single_flight, "k", runs))["final_answer"] == "answer 1"
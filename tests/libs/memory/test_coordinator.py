@@ -0,0 +1,113 @@
+"""
+Tests for the memory coordinator snapshot.
+
+Tests verify:
+- A snapshot costs one Redis LRANGE and one profile read
+- Slicing a snapshot matches a budgeted get_full_context call
+- Failures degrade to an empty snapshot
+
+Follows .cursorrules: TDD, comprehensive coverage.
+"""
+
+import pytest
+
+
+class CountingRedis:
+    """Wraps fakeredis and counts LRANGE calls."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.lrange_calls = 0
+
+    async def lrange(self, *args):
+        self.lrange_calls += 1
+        return await self.redis.lrange(*args)
+
+    def __getattr__(self, name):
+        return getattr(self.redis, name)
+
+
+@pytest.fixture
+async def coordinator():
+    """Coordinator over fakeredis with a stubbed long-term profile read."""
+    from fakeredis import aioredis as fakeredis
+    from libs.memory.coordinator import MemoryCoordinator
+
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    coordinator = MemoryCoordinator(CountingRedis(redis), firestore_client=None)
+    coordinator.profile_reads = 0
+
+    async def get_personalization_context(user_id):
+        coordinator.profile_reads += 1
+        return {"expertise_level": "professional", "top_legal_interests": ["labour_law"], "is_returning_user": True}
+
+    coordinator.long_term.get_personalization_context = get_personalization_context
+
+    for i in range(6):
+        await coordinator.short_term.add_message("s1", "user", f"Question {i} " + "x" * 400)
+        await coordinator.short_term.add_message("s1", "assistant", f"Answer {i} " + "y" * 800)
+
+    yield coordinator
+    await redis.flushdb()
+    await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_fetches_once(coordinator):
+    """One LRANGE and one profile read cover the whole session window."""
+    snapshot = await coordinator.get_snapshot("u1", "s1")
+
+    assert coordinator.short_term.redis.lrange_calls == 1
+    assert coordinator.profile_reads == 1
+    assert len(snapshot["conversation_history"]) == 10  # sliding window
+    assert snapshot["conversation_history"][-1]["content"].startswith("Answer 5")
+    assert snapshot["user_profile"]["expertise_level"] == "professional"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("max_tokens", [500, 1000, 1500])
+async def test_slice_matches_full_context(coordinator, max_tokens):
+    """Per-node budgets sliced from the snapshot equal a fresh budgeted fetch."""
+    from libs.memory.coordinator import MemoryCoordinator
+
+    snapshot = await coordinator.get_snapshot("u1", "s1")
+    sliced = MemoryCoordinator.slice_context(snapshot, max_tokens)
+
+    assert sliced == await coordinator.get_full_context("u1", "s1", max_tokens=max_tokens)
+    assert sliced["tokens_used"]["short_term"] <= int(max_tokens * 0.7)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_degrades_on_failure(coordinator):
+    """A failing store yields an empty part instead of raising."""
+
+    async def failing_lrange(*args):
+        raise ConnectionError("redis down")
+
+    coordinator.short_term.redis.lrange = failing_lrange
+
+    snapshot = await coordinator.get_snapshot("u1", "s1")
+
+    assert snapshot["conversation_history"] == []
+    assert snapshot["user_profile"]["top_legal_interests"] == ["labour_law"]
+
+
+@pytest.mark.asyncio
+async def test_batched_updates_coalesce_profile_writes(coordinator):
+    """A batch writes all exchanges in order and one profile update per user."""
+    profile_writes = []
+
+    async def apply_query_updates(user_id, updates):
+        profile_writes.append((user_id, len(updates)))
+
+    coordinator.long_term.apply_query_updates = apply_query_updates
+
+    await coordinator.apply_updates([
+        {"user_id": "u1", "session_id": "s2", "query": "Q1", "response": "A1", "metadata": {"legal_areas": ["labour"]}},
+        {"user_id": "u1", "session_id": "s2", "query": "Q2", "response": "A2", "metadata": {}},
+        {"user_id": "u2", "session_id": "s3", "query": "Q3", "response": "A3", "metadata": {}},
+    ])
+
+    history = await coordinator.short_term.get_context("s2")
+    assert [m["content"] for m in history] == ["Q1", "A1", "Q2", "A2"]
+    assert sorted(profile_writes) == [("u1", 2), ("u2", 1)]
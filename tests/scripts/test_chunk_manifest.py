@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Tests for the chunk manifest used by scripts/chunk_docs.py to skip unchanged
+documents on re-runs.
+
+Author: RightLine Team
+"""
+
+import io
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+pytest.importorskip("boto3")
+pytest.importorskip("tqdm")
+
+from botocore.exceptions import ClientError
+
+from api.models import ChunkV3
+from scripts import chunk_docs
+from scripts.chunk_docs import (
+    CHUNK_MANIFEST_R2_KEY,
+    document_content_hash,
+    is_document_current,
+    process_documents_from_r2,
+    update_chunk_manifest,
+)
+
+CATALOG_KEY = "corpus/processed/legislation_docs.jsonl"
+
+
+class _FakeR2:
+    """In-memory R2 with ETags and conditional PUTs."""
+
+    def __init__(self):
+        self.objects = {}
+        self.versions = {}
+        self.gets = []
+        self.puts = []
+        self.deleted = []
+
+    def _etag(self, key):
+        return f'"{self.versions[key]}"'
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self.gets.append(Key)
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return {"Body": io.BytesIO(self.objects[Key]), "ETag": self._etag(Key)}
+
+    def put_object(self, Bucket, Key, Body, IfMatch=None, IfNoneMatch=None, **kwargs):
+        if IfNoneMatch == "*" and Key in self.objects:
+            raise ClientError({"Error": {"Code": "PreconditionFailed"}}, "PutObject")
+        if IfMatch is not None and (Key not in self.objects or IfMatch != self._etag(Key)):
+            raise ClientError({"Error": {"Code": "PreconditionFailed"}}, "PutObject")
+        self.puts.append(Key)
+        self.objects[Key] = Body
+        self.versions[Key] = self.versions.get(Key, 0) + 1
+        return {"ETag": self._etag(Key)}
+
+    def delete_objects(self, Bucket, Delete):
+        for obj in Delete["Objects"]:
+            self.deleted.append(obj["Key"])
+            self.objects.pop(obj["Key"], None)
+
+    def manifest(self):
+        return json.loads(self.objects[CHUNK_MANIFEST_R2_KEY])["docs"]
+
+
+def _judgment(doc_id, paragraphs):
+    return {"doc_id": doc_id, "doc_type": "judgment", "paragraphs": paragraphs}
+
+
+def _fake_chunk_judgment(doc):
+    return [
+        ChunkV3(doc_id=doc["doc_id"], chunk_id=f"{doc['doc_id']}-{i}", chunk_text=text, doc_type="judgment")
+        for i, text in enumerate(doc["paragraphs"])
+    ]
+
+
+@pytest.fixture
+def r2(monkeypatch):
+    monkeypatch.setattr(chunk_docs, "chunk_judgment", _fake_chunk_judgment)
+    return _FakeR2()
+
+
+def _publish(r2, docs):
+    r2.objects[CATALOG_KEY] = "\n".join(json.dumps(d) for d in docs).encode()
+    r2.versions[CATALOG_KEY] = 1
+
+
+def _chunk_puts(r2):
+    return [k for k in r2.puts if k.startswith("corpus/chunks/")]
+
+
+def test_unchanged_documents_skipped_without_scanning_chunks(r2):
+    _publish(r2, [_judgment("j1", ["a", "b"]), _judgment("j2", ["c"])])
+    process_documents_from_r2(r2, "bucket", enrich=False, workers=1)
+    assert len(_chunk_puts(r2)) == 3
+    assert r2.manifest()["j1"]["chunk_keys"] == ["corpus/chunks/judgment/j1-0.json", "corpus/chunks/judgment/j1-1.json"]
+
+    r2.gets.clear()
+    r2.puts.clear()
+    process_documents_from_r2(r2, "bucket", enrich=False, workers=1)
+
+    assert _chunk_puts(r2) == []
+    # One catalog read and one manifest read, no per-chunk GETs
+    assert sorted(r2.gets) == sorted([CATALOG_KEY, CHUNK_MANIFEST_R2_KEY])
+
+
+def test_changed_document_rechunked_and_stale_chunks_deleted(r2):
+    _publish(r2, [_judgment("j1", ["a", "b"]), _judgment("j2", ["c"])])
+    process_documents_from_r2(r2, "bucket", enrich=False, workers=1)
+    r2.puts.clear()
+
+    _publish(r2, [_judgment("j1", ["a2"]), _judgment("j2", ["c"])])
+    process_documents_from_r2(r2, "bucket", enrich=False, workers=1)
+
+    assert _chunk_puts(r2) == ["corpus/chunks/judgment/j1-0.json"]
+    assert r2.deleted == ["corpus/chunks/judgment/j1-1.json"]
+    assert r2.manifest()["j1"]["content_hash"] == document_content_hash(_judgment("j1", ["a2"]))
+
+
+def test_chunker_version_bump_forces_rechunk(r2, monkeypatch):
+    doc = _judgment("j1", ["a"])
+    manifest = {"j1": {"content_hash": document_content_hash(doc), "chunker_version": chunk_docs.CHUNKER_VERSION}}
+    assert is_document_current(manifest, "j1", document_content_hash(doc))
+
+    monkeypatch.setattr(chunk_docs, "CHUNKER_VERSION", chunk_docs.CHUNKER_VERSION + 1)
+    assert not is_document_current(manifest, "j1", document_content_hash(doc))
+
+
+def test_manifest_update_merges_concurrent_write(r2):
+    """A write from another run between read and PUT is merged, not lost."""
+    update_chunk_manifest(r2, "bucket", {"a": {"content_hash": "1"}}, etag=None)
+    stale_etag = r2._etag(CHUNK_MANIFEST_R2_KEY)
+    update_chunk_manifest(r2, "bucket", {"b": {"content_hash": "2"}}, etag=stale_etag)
+
+    docs = {"a": {"content_hash": "1"}}
+    size, etag = update_chunk_manifest(r2, "bucket", {"c": {"content_hash": "3"}}, etag=stale_etag, docs=docs)
+
+    assert size == 3 and etag == r2._etag(CHUNK_MANIFEST_R2_KEY)
+    assert set(r2.manifest()) == {"a", "b", "c"}
+    assert set(docs) == {"a", "b", "c"}  # refreshed in place for the caller
+
+
+def test_manifest_flushes_reuse_the_manifest_read_at_start(r2, monkeypatch):
+    """Each flush PUTs against the ETag of the previous write instead of re-reading the manifest."""
+    _publish(r2, [_judgment(f"j{i}", ["a"]) for i in range(4)])
+    monkeypatch.setattr(chunk_docs, "CHUNK_MANIFEST_FLUSH_DOCS", 1)
+
+    stats = process_documents_from_r2(r2, "bucket", enrich=False, workers=1)
+
+    assert stats.docs_recorded == 4
+    assert r2.gets.count(CHUNK_MANIFEST_R2_KEY) == 1
+    assert r2.puts.count(CHUNK_MANIFEST_R2_KEY) == 4
+    assert set(r2.manifest()) == {"j0", "j1", "j2", "j3"}
+
+
+def test_failed_document_is_resumed_on_next_run(r2, monkeypatch):
+    """Documents recorded before a failure are not chunked again by the next run."""
+    _publish(r2, [_judgment("j1", ["a"]), _judgment("j2", ["b"]), _judgment("j3", ["c"])])
+
+    def flaky(doc):
+        if doc["doc_id"] == "j2":
+            raise RuntimeError("parser bug")
+        return _fake_chunk_judgment(doc)
+
+    monkeypatch.setattr(chunk_docs, "chunk_judgment", flaky)
+    monkeypatch.setattr(chunk_docs, "CHUNK_MANIFEST_FLUSH_DOCS", 1)
+    stats = process_documents_from_r2(r2, "bucket", enrich=False, workers=1)
+    assert stats.docs_failed == 1 and stats.docs_recorded == 2
+    assert set(r2.manifest()) == {"j1", "j3"}
+
+    monkeypatch.setattr(chunk_docs, "chunk_judgment", _fake_chunk_judgment)
+    r2.puts.clear()
+    stats = process_documents_from_r2(r2, "bucket", enrich=False, workers=1)
+    assert stats.docs_skipped == 2
+    assert _chunk_puts(r2) == ["corpus/chunks/judgment/j2-0.json"]
+    assert set(r2.manifest()) == {"j1", "j2", "j3"}
+
+
+def test_pipeline_bounds_work_in_flight(r2):
+    _publish(r2, [_judgment(f"j{i}", [f"p{n}" for n in range(5)]) for i in range(40)])
+
+    stats = process_documents_from_r2(r2, "bucket", enrich=False, workers=1, upload_concurrency=2)
+
+    assert stats.docs_recorded == 40 and stats.chunks_uploaded == 200
+    assert stats.peak_docs_in_flight <= 2
+    assert stats.peak_uploads_in_flight <= 8
+
+
+def test_process_pool_matches_single_worker(monkeypatch):
+    """Chunking in worker processes produces the same chunks as in-process chunking."""
+    paragraphs = [f"{n}. The applicant appealed against the decision of the Labour Court. " * 8 for n in range(60)]
+    doc = {"doc_id": "j1", "doc_type": "judgment", "language": "eng",
+           "content_tree": {"headnote": ["Held: " + "appeal dismissed with costs. " * 40], "body": paragraphs}}
+    results = {}
+    for workers in (1, 2):
+        fake = _FakeR2()
+        _publish(fake, [doc, dict(doc, doc_id="j2")])
+        stats = process_documents_from_r2(fake, "bucket", enrich=True, workers=workers)
+        assert stats.docs_failed == 0
+        results[workers] = {k: json.loads(v) for k, v in fake.objects.items() if k.startswith("corpus/chunks/")}
+    assert results[1] and results[1] == results[2]
+
+
+def test_failed_parent_upload_retries_document(r2, monkeypatch):
+    """A document whose parent doc failed to upload is not recorded as current."""
+    _publish(r2, [_judgment("j1", ["a"]), _judgment("j2", ["b"])])
+
+    def with_parent(doc, enrich):
+        chunks = [chunk.model_dump() for chunk in _fake_chunk_judgment(doc)]
+        return chunks, [{"parent_doc_id": f"{doc['doc_id']}-parent", "doc_type": "act"}]
+
+    real_upload = chunk_docs.upload_parent_doc_to_r2
+
+    def flaky_parent(client, bucket, parent_doc):
+        if parent_doc["parent_doc_id"] == "j1-parent":
+            raise RuntimeError("R2 unavailable")
+        return real_upload(client, bucket, parent_doc)
+
+    monkeypatch.setattr(chunk_docs, "chunk_document", with_parent)
+    monkeypatch.setattr(chunk_docs, "upload_parent_doc_to_r2", flaky_parent)
+    stats = process_documents_from_r2(r2, "bucket", enrich=False, workers=1)
+    assert stats.parent_uploads_failed == 1 and stats.docs_recorded == 1
+    assert set(r2.manifest()) == {"j2"}
+
+    monkeypatch.setattr(chunk_docs, "upload_parent_doc_to_r2", real_upload)
+    stats = process_documents_from_r2(r2, "bucket", enrich=False, workers=1)
+    assert stats.docs_skipped == 1 and stats.parents_uploaded == 1
+    assert set(r2.manifest()) == {"j1", "j2"}
+
+
+def test_r2_pool_sized_for_upload_concurrency(monkeypatch):
+    monkeypatch.setenv("CLOUDFLARE_R2_S3_ENDPOINT", "https://r2.example.com")
+    monkeypatch.setenv("CLOUDFLARE_R2_ACCESS_KEY_ID", "key")
+    monkeypatch.setenv("CLOUDFLARE_R2_SECRET_ACCESS_KEY", "secret")
+
+    client = chunk_docs.get_r2_client(max_pool_connections=64)
+
+    assert client.meta.config.max_pool_connections == 64
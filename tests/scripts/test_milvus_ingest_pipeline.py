@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Tests for the pipelined R2 -> embedding -> Milvus ingestion in
+scripts/milvus_upsert_v2.py.
+
+Author: RightLine Team
+"""
+
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+pytest.importorskip("boto3")
+pytest.importorskip("pymilvus")
+openai = pytest.importorskip("openai")
+httpx = pytest.importorskip("httpx")
+
+from scripts import milvus_upsert_v2
+from scripts.milvus_upsert_v2 import RetryJournal, read_journal_keys, run_ingest_pipeline
+
+DIM = 4
+
+
+class _FakeR2:
+    def __init__(self, chunks):
+        self.objects = {
+            f"corpus/chunks/judgment/{c['chunk_id']}.json": json.dumps(c).encode() for c in chunks
+        }
+        self.gets = []
+
+    def get_object(self, Bucket, Key):
+        self.gets.append(Key)
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+
+class _FakeCollection:
+    def __init__(self, fail_inserts=0):
+        self.rows = []
+        self.fail_inserts = fail_inserts
+        self.flushed = False
+
+    def insert(self, columns):
+        if self.fail_inserts:
+            self.fail_inserts -= 1
+            raise RuntimeError("milvus unavailable")
+        chunk_ids, embeddings = columns[0], columns[1]
+        self.rows.extend(zip(chunk_ids, embeddings))
+
+    def flush(self):
+        self.flushed = True
+
+
+def _chunk(i, words=10):
+    return {"chunk_id": f"c{i:03d}", "doc_id": "d1", "doc_type": "judgment",
+            "chunk_text": " ".join(["word"] * words), "num_tokens": words}
+
+
+def _embed(texts, model):
+    return [[1.0] * DIM for _ in texts]
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    """Count one token per word so tests don't depend on tiktoken downloads."""
+    monkeypatch.setattr(milvus_upsert_v2, "count_embedding_tokens", lambda text: len(text.split()))
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = RetryJournal(str(tmp_path / "journal.jsonl"))
+    yield journal
+    journal.close()
+
+
+def _run(chunks, journal, embed_fn=_embed, collection=None, **kwargs):
+    r2 = _FakeR2(chunks)
+    collection = collection or _FakeCollection()
+    stats = run_ingest_pipeline(
+        r2, "bucket", list(r2.objects), collection, journal, embed_fn=embed_fn,
+        read_concurrency=4, embed_concurrency=3, insert_batch_size=7, **kwargs,
+    )
+    return stats, collection, r2
+
+
+def test_all_chunks_inserted_with_packed_concurrent_requests(journal):
+    requests = []
+    active = [0, 0]  # current, peak
+    lock = threading.Lock()
+
+    def embed(texts, model):
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+            requests.append(sum(len(t.split()) for t in texts))
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return _embed(texts, model)
+
+    chunks = [_chunk(i, words=10 + i % 5) for i in range(60)]
+    stats, collection, _ = _run(chunks, journal, embed_fn=embed, max_batch_inputs=8, request_token_limit=50)
+
+    assert sorted(cid for cid, _ in collection.rows) == sorted(c["chunk_id"] for c in chunks)
+    assert stats.inserted == 60 and stats.journaled == 0 and collection.flushed
+    assert max(requests) <= 50
+    assert active[1] > 1
+
+
+def test_failed_embedding_batch_is_journaled_not_zero_filled(journal):
+    def embed(texts, model):
+        if any("fail" in t for t in texts):
+            raise RuntimeError("rate limited")
+        return _embed(texts, model)
+
+    chunks = [_chunk(i) for i in range(10)]
+    chunks[3]["chunk_text"] = "fail " * 5
+    stats, collection, _ = _run(chunks, journal, embed_fn=embed, max_batch_inputs=1)
+
+    assert "c003" not in {cid for cid, _ in collection.rows}
+    assert all(any(v != 0.0 for v in emb) for _, emb in collection.rows)
+    assert stats.inserted == 9 and stats.journaled == 1
+    journal.close()
+    assert read_journal_keys(journal.path) == ["corpus/chunks/judgment/c003.json"]
+
+
+def test_rejected_batch_is_split_to_isolate_bad_input(journal):
+    response = httpx.Response(400, request=httpx.Request("POST", "https://api.openai.com/v1/embeddings"))
+
+    def embed(texts, model):
+        if any("bad" in t for t in texts):
+            raise openai.BadRequestError("invalid input", response=response, body=None)
+        return _embed(texts, model)
+
+    chunks = [_chunk(i) for i in range(8)]
+    chunks[5]["chunk_text"] = "bad input"
+    stats, collection, _ = _run(chunks, journal, embed_fn=embed, max_batch_inputs=8)
+
+    assert stats.inserted == 7 and stats.journaled == 1
+    assert "c005" not in {cid for cid, _ in collection.rows}
+
+
+def test_oversized_existing_and_failed_inserts(journal):
+    chunks = [_chunk(i) for i in range(5)]
+    chunks[1]["chunk_text"] = "word " * 9000
+    stats, collection, r2 = _run(
+        chunks, journal, skip_chunk_ids={"c002"},
+    )
+
+    assert "corpus/chunks/judgment/c002.json" not in r2.gets
+    assert stats.skipped_existing == 1 and stats.journaled == 1
+    assert sorted(cid for cid, _ in collection.rows) == ["c000", "c003", "c004"]
+
+    stats, collection, _ = _run([_chunk(i) for i in range(3)], journal, collection=_FakeCollection(fail_inserts=1))
+    assert stats.inserted == 0 and stats.journaled == 3
+
+
+def test_stored_embeddings_skip_the_api(journal, tmp_path):
+    from libs.caching.embedding_store import EmbeddingStore
+
+    requested = []
+
+    def embed(texts, model):
+        requested.extend(texts)
+        return [[float(len(t)), 1.0, 0.0, 0.0] for t in texts]
+
+    store = EmbeddingStore(tmp_path / "embeddings")
+    chunks = [_chunk(i, words=3 + i) for i in range(10)]
+    _run(chunks, journal, embed_fn=embed, store=store)
+    assert len(requested) == 10
+
+    # Re-ingest with two chunks edited (one only by whitespace) under new ids
+    requested.clear()
+    chunks[4]["chunk_text"] = "edited text"
+    chunks[5]["chunk_text"] = "  " + chunks[5]["chunk_text"].replace(" ", "\n")
+    for chunk in chunks:
+        chunk["chunk_id"] = chunk["chunk_id"] + "-v2"
+    stats, collection, _ = _run(chunks, journal, embed_fn=embed, store=EmbeddingStore(tmp_path / "embeddings"))
+
+    assert requested == ["edited text"]
+    assert stats.store_hits == 9 and stats.inserted == 10
+    assert dict(collection.rows)["c000-v2"] == [14.0, 1.0, 0.0, 0.0]  # len("word word word")